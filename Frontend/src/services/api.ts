@@ -96,6 +96,7 @@ export interface ChatMessage {
   content: string;
   sender: string;
   timestamp: string;
+  seq: number;
 }
 
 // Get all sessions
@@ -112,16 +113,32 @@ export async function getSessions(studentId: string): Promise<Session[]> {
   return await response.json();
 }
 
-// Get messages from a specific session
+// Get messages from a specific session (fetched page by page, oldest first)
+const SESSION_MESSAGES_PAGE_SIZE = 200;
+
 export async function getSessionMessages(sessionId: number, studentId: string): Promise<ChatMessage[]> {
-  const response = await fetch(`${API_BASE_URL}/messages/sessions/${sessionId}/messages?student_id=${studentId}`);
+  const messages: ChatMessage[] = [];
+  // Omitted on the first page: messages copied from before chat_messages have seqs below 1
+  let afterSeq: number | null = null;
   
-  if (!response.ok) {
-    const error = await response.json().catch(() => ({ detail: 'Failed to fetch session messages' }));
-    throw new Error(error.detail || 'Failed to fetch session messages');
+  while (true) {
+    const after = afterSeq === null ? '' : `&after_seq=${afterSeq}`;
+    const response = await fetch(
+      `${API_BASE_URL}/messages/sessions/${sessionId}/messages?student_id=${studentId}${after}&limit=${SESSION_MESSAGES_PAGE_SIZE}`
+    );
+    
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ detail: 'Failed to fetch session messages' }));
+      throw new Error(error.detail || 'Failed to fetch session messages');
+    }
+    
+    const page: ChatMessage[] = await response.json();
+    messages.push(...page);
+    if (page.length < SESSION_MESSAGES_PAGE_SIZE) {
+      return messages;
+    }
+    afterSeq = page[page.length - 1].seq;
   }
-  
-  return await response.json();
 }
 
 // Get risk profile for a student
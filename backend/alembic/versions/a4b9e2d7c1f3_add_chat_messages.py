@@ -0,0 +1,112 @@
+"""add_chat_messages
+
+Revision ID: a4b9e2d7c1f3
+Revises: f1c7b4e9a2d6
+Create Date: 2026-10-17 20:11:52.640174
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a4b9e2d7c1f3'
+down_revision = 'f1c7b4e9a2d6'
+branch_labels = None
+depends_on = None
+
+# Sessions read per backfill query
+BATCH_SIZE = 500
+# Legacy message i (1-based) is copied to seq i - LEGACY_SEQ_OFFSET, below the
+# app's own seqs (1..), so the two never collide and legacy messages sort first
+LEGACY_SEQ_OFFSET = 1_000_000
+
+sessions = sa.table('sessions', sa.column('id', sa.Integer), sa.column('student_id', sa.String),
+                    sa.column('messages', sa.JSON), sa.column('legacy_message_count', sa.Integer))
+chat_messages = sa.table('chat_messages', sa.column('session_id', sa.Integer), sa.column('seq', sa.Integer),
+                         sa.column('student_id', sa.String), sa.column('message_id', sa.String),
+                         sa.column('sender', sa.String), sa.column('content', sa.String),
+                         sa.column('sent_at', sa.String), sa.column('created_at', sa.DateTime),
+                         sa.column('updated_at', sa.DateTime))
+
+
+def upgrade() -> None:
+    # Append-only transcript replacing the sessions.messages JSON array
+    op.create_table('chat_messages',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.String(), nullable=False),
+    sa.Column('message_id', sa.String(), nullable=False),
+    sa.Column('sender', sa.String(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('sent_at', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.student_id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id', 'seq', name='uq_chat_messages_session_seq')
+    )
+    op.create_index(op.f('ix_chat_messages_id'), 'chat_messages', ['id'], unique=False)
+    op.create_index(op.f('ix_chat_messages_student_id'), 'chat_messages', ['student_id'], unique=False)
+    op.add_column('sessions', sa.Column('message_count', sa.Integer(), nullable=False, server_default=sa.text('0')))
+    op.add_column('sessions', sa.Column('legacy_message_count', sa.Integer(), nullable=True))
+
+    # Backfill outside the migration's transaction so sessions stays writable
+    # while it runs; the new code may already be appending turns (seq 1..)
+    with op.get_context().autocommit_block():
+        copy_legacy_messages(op.get_bind())
+
+
+def copy_legacy_messages(bind) -> None:
+    """
+    Copy sessions.messages into chat_messages for every session not yet copied.
+
+    Progress is legacy_message_count (NULL until a session is copied), never
+    message_count, which belongs to the app. Legacy rows go below seq 1, so
+    turns the app appended before or during the backfill are never deleted,
+    renumbered or counted over. An interrupted run can be re-run. Messages
+    that instances of the previous release append to sessions.messages after
+    their session is copied sit past legacy_message_count; the migration
+    that drops sessions.messages copies them first.
+    """
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(sessions.c.id, sessions.c.student_id, sessions.c.messages)
+            .where(sessions.c.id > last_id, sessions.c.legacy_message_count.is_(None))
+            .order_by(sessions.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        now = datetime.utcnow()
+        for session_id, student_id, messages in batch:
+            messages = messages or []
+            # Legacy rows left by a run interrupted before the session was marked
+            bind.execute(chat_messages.delete().where(chat_messages.c.session_id == session_id,
+                                                      chat_messages.c.seq < 1))
+            if messages:
+                bind.execute(chat_messages.insert(), [{
+                    "session_id": session_id,
+                    "seq": index - LEGACY_SEQ_OFFSET,
+                    "student_id": student_id,
+                    "message_id": str(message.get("id") or f"legacy_{session_id}_{index}"),
+                    "sender": message.get("sender") or "user",
+                    "content": message.get("content") or "",
+                    "sent_at": message.get("timestamp") or now.isoformat(),
+                    "created_at": now,
+                    "updated_at": now
+                } for index, message in enumerate(messages, start=1)])
+            bind.execute(sessions.update().where(sessions.c.id == session_id)
+                         .values(legacy_message_count=len(messages)))
+        last_id = batch[-1][0]
+
+
+def downgrade() -> None:
+    # sessions.messages was not modified by the upgrade; turns recorded since then exist only in chat_messages
+    op.drop_column('sessions', 'legacy_message_count')
+    op.drop_column('sessions', 'message_count')
+    op.drop_index(op.f('ix_chat_messages_student_id'), table_name='chat_messages')
+    op.drop_index(op.f('ix_chat_messages_id'), table_name='chat_messages')
+    op.drop_table('chat_messages')
@@ -0,0 +1,158 @@
+"""compact_baseline_profiles
+
+Revision ID: b7d3f5a9e1c2
+Revises: a4b9e2d7c1f3
+Create Date: 2026-10-17 22:03:18.457296
+
+"""
+import copy
+import json
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3f5a9e1c2'
+down_revision = 'a4b9e2d7c1f3'
+branch_labels = None
+depends_on = None
+
+# Students read per query
+BATCH_SIZE = 200
+# settings.baseline_* at the time of this migration
+RECENT_SAMPLES = 20
+HISTOGRAM_DECAY = 0.98
+HISTOGRAM_MAX_KEYS = 32
+# app.services.analysis.baseline_stats at the time of this migration; the
+# compaction below is a frozen copy so later changes there do not change it
+SCHEMA_VERSION = 2
+SENTIMENT_SCORES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+MOOD_SCORES = {"very_negative": -2.0, "negative": -1.0, "neutral": 0.0, "positive": 1.0, "very_positive": 2.0}
+
+
+students = sa.table('students', sa.column('id', sa.Integer), sa.column('baseline_profile', sa.JSON))
+
+
+def upgrade() -> None:
+    # Fold the unbounded sample lists into accumulators (schema_version 2).
+    # Data only, outside the migration's transaction so students stays
+    # writable; the app compacts any row it reads before this reaches it.
+    with op.get_context().autocommit_block():
+        compact_profiles(op.get_bind())
+
+
+def compact_profiles(bind) -> None:
+    """
+    Rewrite every version 1 baseline_profile as version 2.
+
+    Each update is a compare-and-set on the profile text that was read, so a
+    profile the app wrote after the read (already version 2) is left alone
+    rather than overwritten by the compacted stale one. Can be re-run.
+    """
+    profile_text = sa.cast(students.c.baseline_profile, sa.Text)
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(students.c.id, profile_text)
+            .where(students.c.id > last_id)
+            .order_by(students.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        for student_id, raw in batch:
+            profile = json.loads(raw) if raw else None
+            if profile and profile.get("schema_version") != SCHEMA_VERSION:
+                bind.execute(
+                    students.update()
+                    .where(students.c.id == student_id, profile_text == raw)
+                    .values(baseline_profile=_compact(profile))
+                )
+        last_id = batch[-1][0]
+
+
+def _welford(values) -> dict:
+    acc = {"n": 0, "mean": 0.0, "m2": 0.0}
+    for value in values:
+        acc["n"] += 1
+        delta = value - acc["mean"]
+        acc["mean"] += delta / acc["n"]
+        acc["m2"] += delta * (value - acc["mean"])
+    return acc
+
+
+def _steady_state(counts: dict) -> dict:
+    total = sum(counts.values())
+    limit = 1.0 / (1.0 - HISTOGRAM_DECAY)
+    scale = limit / total if total > limit else 1.0
+    largest = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:HISTOGRAM_MAX_KEYS]
+    return {key: count * scale for key, count in largest}
+
+
+def _statistics(profile: dict) -> dict:
+    stats = {}
+    messages = profile.get("message_length", {}).get("n", 0)
+    if messages:
+        stats["total_messages"] = messages
+        stats["avg_message_length"] = profile["message_length"]["mean"]
+        stats["emoji_usage_rate"] = profile.get("emoji_per_message", {}).get("mean") or 0
+    mood = profile.get("mood")
+    if mood and mood.get("n"):
+        stats["typical_sentiment"] = mood["mean"]
+        stats["sentiment_variance"] = mood["m2"] / mood["n"]
+        stats["typical_emotionality"] = abs(mood["mean"])
+    if messages:
+        stats["sarcasm_frequency"] = profile.get("humor_messages", 0) / messages
+        stats["dark_humor_baseline"] = stats["sarcasm_frequency"] > 0.3
+    if profile.get("session_length", {}).get("n"):
+        stats["typical_session_length"] = profile["session_length"]["mean"]
+    stats["common_themes"] = profile.get("common_themes", [])
+    return stats
+
+
+def _compact(profile: dict) -> dict:
+    """Version 2 profile from a version 1 one (see baseline_stats.compact at this revision)."""
+    profile = copy.deepcopy(profile)
+
+    language_patterns = profile.pop("language_patterns", None) or []
+    if language_patterns:
+        profile["message_length"] = _welford(p.get("message_length", 0) for p in language_patterns)
+        profile["emoji_per_message"] = _welford(p.get("emoji_count", 0) for p in language_patterns)
+        profile["language_patterns"] = language_patterns[-RECENT_SAMPLES:]
+
+    mood_samples = profile.pop("mood_samples", None) or []
+    if mood_samples:
+        profile["mood"] = _welford(SENTIMENT_SCORES.get(s.get("mood", "neutral"), 0.0) for s in mood_samples)
+        profile["mood_scale"] = _welford(MOOD_SCORES.get(s.get("mood", "neutral"), 0.0) for s in mood_samples)
+        profile["mood_samples"] = mood_samples[-RECENT_SAMPLES:]
+
+    humor_indicators = profile.pop("humor_indicators", None) or []
+    if humor_indicators:
+        profile["humor_messages"] = len(humor_indicators)
+        profile["humor_indicators"] = humor_indicators[-RECENT_SAMPLES:]
+
+    session_lengths = profile.pop("session_lengths", None) or []
+    if session_lengths:
+        profile["session_length"] = _welford(session_lengths)
+
+    emoji_baseline = profile.get("emoji_baseline")
+    if emoji_baseline:
+        emoji_counts = emoji_baseline.pop("emoji_count", None) or []
+        if emoji_counts:
+            usage = _welford(emoji_counts)
+            emoji_baseline["emoji_per_message"] = usage
+            emoji_baseline["avg_emoji_per_message"] = usage["mean"]
+            emoji_baseline["recent_counts"] = emoji_counts[-RECENT_SAMPLES:]
+        for name in ("common_emojis", "function_distribution"):
+            if isinstance(emoji_baseline.get(name), dict):
+                emoji_baseline[name] = _steady_state(emoji_baseline[name])
+
+    if "statistics" in profile:
+        profile["statistics"] = _statistics(profile)
+    profile["schema_version"] = SCHEMA_VERSION
+    return profile
+
+
+def downgrade() -> None:
+    # Compaction drops samples beyond the newest RECENT_SAMPLES; version 2
+    # profiles keep them as (shorter) lists under the old keys, which the
+    # previous code reads and appends to.
+    pass
@@ -0,0 +1,28 @@
+"""add_crisis_followup_to_alerts
+
+Revision ID: c7e2a9f14b3d
+Revises: bc4668787e80
+Create Date: 2026-10-17 09:12:31.482113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a9f14b3d'
+down_revision = 'bc4668787e80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Track background crisis follow-up work on the alert it belongs to
+    op.add_column('alerts', sa.Column('followup_status', sa.String(), nullable=True))
+    op.add_column('alerts', sa.Column('followup_completed_at', sa.DateTime(), nullable=True))
+    op.add_column('alerts', sa.Column('followup_error', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('alerts', 'followup_error')
+    op.drop_column('alerts', 'followup_completed_at')
+    op.drop_column('alerts', 'followup_status')
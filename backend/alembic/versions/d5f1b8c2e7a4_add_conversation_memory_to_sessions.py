@@ -0,0 +1,30 @@
+"""add_conversation_memory_to_sessions
+
+Revision ID: d5f1b8c2e7a4
+Revises: c7e2a9f14b3d
+Create Date: 2026-10-17 14:05:47.203518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd5f1b8c2e7a4'
+down_revision = 'c7e2a9f14b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rolling per-session memory: recent turns verbatim plus a summary of older ones
+    op.add_column('sessions', sa.Column('recent_turns', sa.JSON(), nullable=True))
+    op.add_column('sessions', sa.Column('turn_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('sessions', sa.Column('conversation_summary', sa.String(), nullable=True))
+    op.add_column('sessions', sa.Column('summarized_turns', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('sessions', 'summarized_turns')
+    op.drop_column('sessions', 'conversation_summary')
+    op.drop_column('sessions', 'turn_count')
+    op.drop_column('sessions', 'recent_turns')
@@ -0,0 +1,44 @@
+"""add_analysis_jobs
+
+Revision ID: e8a3c6d1f2b9
+Revises: d5f1b8c2e7a4
+Create Date: 2026-10-17 16:42:11.508321
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3c6d1f2b9'
+down_revision = 'd5f1b8c2e7a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Work queue for deferred deep analysis (claimed oldest-first per student)
+    op.create_table('analysis_jobs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('student_id', sa.String(), nullable=False),
+    sa.Column('job_type', sa.String(), nullable=False, server_default='message_analysis'),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False, server_default='PENDING'),
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default=sa.text('0')),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analysis_jobs_id'), 'analysis_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_analysis_jobs_student_id'), 'analysis_jobs', ['student_id'], unique=False)
+    op.create_index(op.f('ix_analysis_jobs_status'), 'analysis_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_analysis_jobs_status'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_student_id'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_id'), table_name='analysis_jobs')
+    op.drop_table('analysis_jobs')
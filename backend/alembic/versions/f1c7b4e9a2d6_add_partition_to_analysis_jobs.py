@@ -0,0 +1,39 @@
+"""add_partition_to_analysis_jobs
+
+Revision ID: f1c7b4e9a2d6
+Revises: e8a3c6d1f2b9
+Create Date: 2026-10-17 18:20:37.914602
+
+"""
+import zlib
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7b4e9a2d6'
+down_revision = 'e8a3c6d1f2b9'
+branch_labels = None
+depends_on = None
+
+# settings.analysis_queue_partitions at the time of this migration
+PARTITIONS = 64
+
+
+def upgrade() -> None:
+    # Workers own partitions (hash of student_id), so one student's jobs always go to one worker
+    op.add_column('analysis_jobs', sa.Column('partition', sa.Integer(), nullable=False, server_default=sa.text('0')))
+    op.create_index(op.f('ix_analysis_jobs_partition'), 'analysis_jobs', ['partition'], unique=False)
+
+    # Unfinished jobs need their partition, or no worker but partition 0's owner claims them
+    bind = op.get_bind()
+    jobs = sa.table('analysis_jobs', sa.column('id', sa.Integer), sa.column('student_id', sa.String),
+                    sa.column('status', sa.String), sa.column('partition', sa.Integer))
+    rows = bind.execute(sa.select(jobs.c.id, jobs.c.student_id).where(jobs.c.status.in_(('PENDING', 'RUNNING')))).all()
+    for job_id, student_id in rows:
+        bind.execute(jobs.update().where(jobs.c.id == job_id)
+                     .values(partition=zlib.crc32(student_id.encode("utf-8")) % PARTITIONS))
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_analysis_jobs_partition'), table_name='analysis_jobs')
+    op.drop_column('analysis_jobs', 'partition')
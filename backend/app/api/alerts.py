@@ -1,12 +1,13 @@
 """Alert API endpoints."""
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime
 from app.schemas.risk import RiskProfile, AlertRecommendation
 from app.schemas.alerts import AlertOutcomeUpdate
 from app.services.alerts.risk_calculator import RiskCalculator
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.models.analysis import MessageAnalysis
 import structlog
 
@@ -17,11 +18,11 @@ router = APIRouter(prefix="/api/alerts", tags=["alerts"])
 @router.get("/risk-profile/{student_id}")
 async def get_risk_profile(
     student_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current risk profile for student."""
     calculator = RiskCalculator(db)
-    profile = calculator.get_current_risk_profile(student_id)
+    profile = await calculator.get_current_risk_profile(student_id)
     
     if not profile:
         raise HTTPException(status_code=404, detail="No risk profile found")
@@ -75,7 +76,8 @@ async def get_pending_alerts(
             "status": "Unread",
             "triggeredAt": a.created_at.strftime("%Y-%m-%d %I:%M %p"),
             "actionRequired": "Immediate intervention recommended" if severity == "Critical" else "Review and follow-up needed",
-            "testType": "Message Analysis"
+            "testType": "Message Analysis",
+            "followupStatus": a.followup_status
         })
     
     return result
@@ -147,7 +149,10 @@ async def get_alert_detail(
             "reviewed_at": alert.reviewed_at,
             "reviewed_by": alert.counselor_id,
             "status": alert.routing_status,
-            "message": alert.message
+            "message": alert.message,
+            "followup_status": alert.followup_status,
+            "followup_completed_at": alert.followup_completed_at,
+            "followup_error": alert.followup_error
         },
         "triggering_message": {
             "text": message_analysis.message_text if message_analysis else None,
@@ -207,14 +207,8 @@ async def generate_analytics_for_student(
                 detail=f"Student '{student_id}' not found"
             )
     
-    # Get LLM client - FORCE LOCAL LLM
-    from app.core.config import settings
-    from app.core.llm_client import LLMClient
-    llm_client = LLMClient(
-        provider="local",
-        base_url=settings.local_llm_base_url,
-        model=settings.local_llm_model
-    )
+    # Shared client: reuses the process-wide backends and connection pool
+    llm_client = get_llm_client()
     
     # Initialize collector
     collector = CrisisAnalyticsCollector(db, llm_client)
@@ -1,6 +1,7 @@
 """Assessment API endpoints."""
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing import Optional, List
 from scipy.stats import linregress
@@ -10,7 +11,7 @@ from app.schemas.assessment import (
 )
 from app.services.assessment.hybrid_assessment import HybridAssessmentService
 from app.services.assessment.cssrs import CSSRSService
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 import structlog
 
 logger = structlog.get_logger()
@@ -20,12 +21,12 @@ router = APIRouter(prefix="/api/assessments", tags=["assessments"])
 @router.get("/checkpoint-plan/{student_id}")
 async def get_checkpoint_plan(
     student_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get checkpoint assessment plan for student."""
     service = HybridAssessmentService(db)
     
-    if not service.should_trigger_checkpoint_assessment(student_id):
+    if not await service.should_trigger_checkpoint_assessment(student_id):
         return {"should_trigger": False}
     
     plan = service.get_checkpoint_assessment_plan(student_id)
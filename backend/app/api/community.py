@@ -1,14 +1,15 @@
 """Community API endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, and_, select
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 import uuid
 import structlog
 
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.models.student import Student
 from app.models.community import (
     Community, CommunityMembership, Post, PostLike, 
@@ -453,33 +454,42 @@ async def list_posts(
     community_id: Optional[str] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List posts."""
-    query = db.query(Post)
+    query = (
+        select(Post, Community.name, Student)
+        .outerjoin(Community, Community.community_id == Post.community_id)
+        .outerjoin(Student, Student.student_id == Post.author_id)
+    )
     
     if community_id:
-        query = query.filter(Post.community_id == community_id)
-    
-    posts = query.order_by(Post.created_at.desc()).limit(limit).offset(offset).all()
-    
-    result = []
-    for post in posts:
-        community = db.query(Community).filter(Community.community_id == post.community_id).first()
-        author = get_student_by_id(db, post.author_id)
-        
-        # Check if liked
-        is_liked = db.query(PostLike).filter(
-            and_(
-                PostLike.post_id == post.post_id,
+        query = query.where(Post.community_id == community_id)
+    
+    rows = (await db.execute(
+        query.order_by(Post.created_at.desc()).limit(limit).offset(offset)
+    )).all()
+    
+    # Check likes for the whole page at once
+    post_ids = [post.post_id for post, _, _ in rows]
+    liked_ids = set()
+    if post_ids:
+        liked_ids = set((await db.scalars(
+            select(PostLike.post_id).where(
+                PostLike.post_id.in_(post_ids),
                 PostLike.student_id == student_id
             )
-        ).first() is not None
+        )).all())
+    
+    result = []
+    for post, community_name, author in rows:
+        if not author:
+            raise HTTPException(status_code=404, detail="Student not found")
         
         result.append(PostResponse(
             post_id=post.post_id,
             community_id=post.community_id,
-            community_name=community.name if community else "Unknown",
+            community_name=community_name or "Unknown",
             author_id=post.author_id,
             author_name=author.anonymized_name or author.name or "Anonymous",
             title=post.title,
@@ -488,7 +498,7 @@ async def list_posts(
             video_url=post.video_url,
             likes_count=post.likes_count,
             comments_count=post.comments_count,
-            is_liked=is_liked,
+            is_liked=post.post_id in liked_ids,
             created_at=post.created_at
         ))
     
@@ -1,11 +1,15 @@
 """Counselor dashboard API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, case, select
 from typing import Optional
 from datetime import datetime, timedelta
-from app.db.database import get_db
-from app.api.deps import get_current_counselor
+import asyncio
+import json
+from app.db.database import get_db, get_async_db
+from app.api.deps import get_current_counselor, get_current_counselor_async
 from app.schemas.counselor import (
     AlertQueueResponse,
     AlertQueueItem,
@@ -35,6 +39,7 @@ from app.models.intervention_outcome import InterventionOutcome
 from app.models.learning import CounselorFeedback
 from app.services.learning.feedback_collector import FeedbackCollector
 from app.services.learning.performance_monitor import PerformanceMonitor
+from app.services.alerts.alert_notifier import get_alert_notifier
 import structlog
 
 logger = structlog.get_logger()
@@ -45,60 +50,43 @@ router = APIRouter(prefix="/api/counselor", tags=["counselor"])
 async def get_alert_queue(
     status: str = Query("PENDING", description="Filter by routing_status"),
     limit: int = Query(50, ge=1, le=200, description="Maximum number of alerts to return"),
-    db: Session = Depends(get_db),
-    counselor: Student = Depends(get_current_counselor)
+    db: AsyncSession = Depends(get_async_db),
+    counselor: Student = Depends(get_current_counselor_async)
 ):
     """
     Get counselor's alert queue with priority ordering.
     Shows pending alerts with risk profile data.
     """
     # Priority order: IMMEDIATE > URGENT > ROUTINE
-    priority_map = {"IMMEDIATE": 1, "URGENT": 2, "ROUTINE": 3}
-    
-    # Query alerts with joins
-    alerts_query = db.query(Alert)\
-        .filter(Alert.routing_status == status)\
-        .order_by(
-            func.case(
-                (Alert.alert_type == "IMMEDIATE", 1),
-                (Alert.alert_type == "URGENT", 2),
-                (Alert.alert_type == "ROUTINE", 3),
-                else_=4
-            ),
-            desc(Alert.created_at)
-        )\
-        .limit(limit)
+    priority = case(
+        (Alert.alert_type == "IMMEDIATE", 1),
+        (Alert.alert_type == "URGENT", 2),
+        (Alert.alert_type == "ROUTINE", 3),
+        else_=4
+    )
     
-    alerts = alerts_query.all()
+    # One round-trip: student name and risk profile are joined in rather than
+    # fetched per alert
+    rows = (await db.execute(
+        select(Alert, Student.name, RiskProfile.overall_risk, RiskProfile.confidence)
+        .outerjoin(Student, Student.student_id == Alert.student_id)
+        .outerjoin(RiskProfile, RiskProfile.id == Alert.risk_profile_id)
+        .where(Alert.routing_status == status)
+        .order_by(priority, desc(Alert.created_at))
+        .limit(limit)
+    )).all()
     
     result = []
     now = datetime.utcnow()
     
-    for alert in alerts:
-        # Get student information
-        student = db.query(Student).filter(Student.student_id == alert.student_id).first()
-        student_name = student.name if student and student.name else alert.student_id
-        
-        # Get risk profile
-        risk_profile = None
-        overall_risk = None
-        confidence = None
-        
-        if alert.risk_profile_id:
-            risk_profile = db.query(RiskProfile).filter(
-                RiskProfile.id == alert.risk_profile_id
-            ).first()
-            if risk_profile:
-                overall_risk = risk_profile.overall_risk
-                confidence = risk_profile.confidence
-        
+    for alert, student_name, overall_risk, confidence in rows:
         # Calculate time elapsed
         time_elapsed = (now - alert.created_at).total_seconds() / 3600.0
         
         result.append(AlertQueueItem(
             id=alert.id,
             student_id=alert.student_id,
-            student_name=student_name,
+            student_name=student_name or alert.student_id,
             alert_type=alert.alert_type,
             overall_risk=overall_risk,
             confidence=confidence,
@@ -114,6 +102,37 @@ async def get_alert_queue(
     )
 
 
+@router.get("/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    counselor: Student = Depends(get_current_counselor_async)
+):
+    """
+    Server-sent events for alerts created after the stream opens.
+    
+    Events:
+    - alert: id, student_id, alert_type, message, routing_status, risk_profile_id, created_at
+    
+    Includes alerts raised late by deferred analysis. A comment line is sent
+    every 15s of quiet so proxies keep the connection open.
+    """
+    async def event_stream():
+        with get_alert_notifier().subscribe() as queue:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: alert\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/alerts/{alert_id}/full-context", response_model=AlertFullContextResponse)
 async def get_alert_full_context(
     alert_id: int,
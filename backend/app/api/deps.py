@@ -1,8 +1,10 @@
 """API dependencies for authentication and authorization."""
 from fastapi import Depends, HTTPException, Header, Query, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.models.student import Student
 import structlog
 
@@ -20,6 +22,33 @@ async def get_current_counselor(
     For now, uses counselor_id query parameter.
     Future: Implement JWT token validation from authorization header.
     """
+    _require_counselor_id(counselor_id)
+    
+    # Find student and verify they are an admin/counselor
+    student = db.query(Student).filter(Student.student_id == counselor_id).first()
+    _verify_counselor(student, counselor_id)
+    
+    logger.debug("counselor_authenticated", counselor_id=counselor_id)
+    return student
+
+
+async def get_current_counselor_async(
+    counselor_id: Optional[str] = Query(None, description="Counselor/Admin student_id"),
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> Student:
+    """Async-session variant of get_current_counselor for routes on the async DB layer."""
+    _require_counselor_id(counselor_id)
+    
+    student = await db.scalar(select(Student).where(Student.student_id == counselor_id))
+    _verify_counselor(student, counselor_id)
+    
+    logger.debug("counselor_authenticated", counselor_id=counselor_id)
+    return student
+
+
+def _require_counselor_id(counselor_id: Optional[str]):
+    """Reject requests without a counselor_id."""
     if not counselor_id:
         # Try to extract from authorization header if present
         # For now, require counselor_id parameter
@@ -27,10 +56,10 @@ async def get_current_counselor(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Counselor ID required. Provide counselor_id query parameter."
         )
-    
-    # Find student and verify they are an admin/counselor
-    student = db.query(Student).filter(Student.student_id == counselor_id).first()
-    
+
+
+def _verify_counselor(student: Optional[Student], counselor_id: str):
+    """Verify the counselor exists and has admin privileges."""
     if not student:
         logger.warning("counselor_not_found", counselor_id=counselor_id)
         raise HTTPException(
@@ -46,9 +75,3 @@ async def get_current_counselor(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. Admin privileges required."
         )
-    
-    logger.debug("counselor_authenticated", counselor_id=counselor_id)
-    return student
-
-
-
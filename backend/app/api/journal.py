@@ -88,6 +88,7 @@ Provide a single, personalized suggestion for today based on these entries. Be w
         suggestion = await llm_client.generate(
             prompt=user_prompt,
             max_tokens=200,
+            call_site="journal",
             system_message="You are a supportive mental health assistant helping students reflect on their journal entries. Provide thoughtful, personalized suggestions that encourage growth and self-awareness."
         )
         
@@ -197,6 +198,7 @@ Provide a single, personalized suggestion for today based on these entries. Be w
         suggestion = await llm_client.generate(
             prompt=user_prompt,
             max_tokens=200,
+            call_site="journal",
             system_message="You are a supportive mental health assistant helping students reflect on their journal entries. Provide thoughtful, personalized suggestions that encourage growth and self-awareness."
         )
         
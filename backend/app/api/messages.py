@@ -1,15 +1,21 @@
 """Message processing API endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any
 from app.schemas.message import Message, MessageAnalysis
 from app.services.analysis.sequential_processor import SequentialProcessor
-from app.services.assessment.hybrid_assessment import HybridAssessmentService
-from app.db.database import get_db
+from app.services.analysis.turn_followup import handle_processed_message
+from app.services.alerts.alert_notifier import get_alert_notifier
+from app.db.database import get_db, get_async_db
+from app.db import unit_of_work
 from app.core.llm_client import get_llm_client
-from app.models.student import Session as SessionModel
+from app.core.student_locks import StudentBusyError, student_turn
+from app.models.student import Session as SessionModel, ChatMessage as ChatMessageModel
 from pydantic import BaseModel
 from datetime import datetime
+import json
 import structlog
 
 logger = structlog.get_logger()
@@ -31,114 +37,106 @@ class ChatMessage(BaseModel):
     content: str
     sender: str
     timestamp: str
+    seq: int  # Position in the session; pass the last one as after_seq for the next page
 
 
 @router.post("/process", response_model=MessageAnalysis)
 async def process_message(
     message: Message,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     llm_client = Depends(get_llm_client)
 ):
     """Process incoming student message through sequential checkpoints."""
     try:
         processor = SequentialProcessor(db, llm_client)
-        analysis = await processor.process_message(message)
         
-        # Create alert if crisis protocol triggered or high risk detected
-        if analysis.crisis_protocol_triggered or (analysis.risk_profile and analysis.risk_profile.get("overall_risk") in ["HIGH", "CRISIS"]):
-            from app.models.analysis import Alert
-            from app.services.crisis.analytics_collector import CrisisAnalyticsCollector
-            
-            alert_type = "IMMEDIATE" if analysis.crisis_protocol_triggered else "URGENT"
-            alert_message = "Crisis protocol triggered - immediate intervention required" if analysis.crisis_protocol_triggered else f"High risk detected: {analysis.risk_profile.get('overall_risk', 'HIGH')} risk level"
-            
-            # Check if alert already exists for this message (avoid duplicates)
-            existing_alert = db.query(Alert).filter(
-                Alert.student_id == message.student_id,
-                Alert.message == alert_message,
-                Alert.routing_status == "PENDING"
-            ).first()
-            
-            alert = None
-            if not existing_alert:
-                alert = Alert(
-                    student_id=message.student_id,
-                    alert_type=alert_type,
-                    message=alert_message,
-                    routing_status="PENDING"
-                )
-                db.add(alert)
-                db.commit()
-                db.refresh(alert)
-                logger.info("alert_created",
-                           student_id=message.student_id,
-                           alert_type=alert_type,
-                           crisis_triggered=analysis.crisis_protocol_triggered,
-                           alert_id=alert.id)
-            
-            # Collect comprehensive analytics and generate report when emergency protocol is triggered
-            if analysis.crisis_protocol_triggered:
-                try:
-                    collector = CrisisAnalyticsCollector(db, llm_client)
-                    
-                    # Determine priority
-                    priority = "CRITICAL" if analysis.crisis_protocol_triggered else "HIGH"
-                    
-                    # Collect and save analytics
-                    analytics = await collector.collect_and_save_analytics(
-                        student_id=message.student_id,
-                        alert_id=alert.id if alert else None,
-                        trigger_reason="Crisis protocol triggered - immediate safety concern detected",
-                        trigger_message=message.message_text[:500],  # Limit message length
-                        current_risk_profile=analysis.risk_profile,
-                        priority=priority
-                    )
-                    
-                    # Generate and save word summary report
-                    report = await collector.generate_and_save_report(
-                        student_id=message.student_id,
-                        analytics_id=analytics.id,
-                        alert_id=alert.id if alert else None,
-                        report_type="CRISIS"
-                    )
-                    
-                    logger.info("crisis_data_collected_and_reported",
-                               student_id=message.student_id,
-                               analytics_id=analytics.id,
-                               report_id=report.id,
-                               alert_id=alert.id if alert else None)
-                    
-                except Exception as e:
-                    # Log error but don't fail the message processing
-                    logger.error("crisis_analytics_collection_failed",
-                               student_id=message.student_id,
-                               error=str(e),
-                               exc_info=True)
-        
-        # Track in hybrid assessment system
-        assessment_service = HybridAssessmentService(db, llm_client)
-        tier = assessment_service.get_assessment_tier(message.student_id)
-        
-        if tier == "TIER_1_PASSIVE":
-            # Track passive monitoring (await async method)
-            await assessment_service.track_passive_monitoring(
-                message.student_id,
-                message.message_text,
-                {
-                    "text": message.message_text,
-                    "emoji_count": len([c for c in message.message_text if ord(c) > 127]),
-                    "sentiment": "neutral",  # Will be calculated by LLM if available
-                    "contains_humor": False,  # Will be detected by LLM if available
-                    "mood": "neutral"
-                }
-            )
+        # One turn at a time per student (baseline and session updates are
+        # read-modify-write); all of the turn's writes land in one transaction
+        async with student_turn(message.student_id):
+            async with unit_of_work.unit_of_work(db):
+                analysis = await processor.process_message(message)
+                
+                alert = await handle_processed_message(db, llm_client, message, analysis, processor.snapshot)
         
+        if alert:
+            get_alert_notifier().publish(alert)
         return analysis
+    except StudentBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error("message_processing_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/process/stream")
+async def process_message_stream(
+    message: Message,
+    db: AsyncSession = Depends(get_async_db),
+    llm_client = Depends(get_llm_client)
+):
+    """
+    Streaming variant of /process using server-sent events.
+    
+    Events:
+    - token: {"text": ...} filtered reply text as it is generated
+    - replace: {"text": ...} gating discarded the streamed reply; show this instead
+    - final: gating decision, final response text and analysis id
+    - error: processing failed
+    """
+    processor = SequentialProcessor(db, llm_client)
+    
+    async def event_stream():
+        try:
+            # One turn at a time per student; all of the turn's writes land in
+            # one transaction, committed before "final"
+            async with student_turn(message.student_id):
+                async with unit_of_work.unit_of_work(db):
+                    analysis = None
+                    async for event, payload in processor.process_message_stream(message):
+                        if event == "analysis":
+                            analysis = payload
+                        else:
+                            yield _sse_event(event, {"text": payload})
+                    
+                    alert = await handle_processed_message(db, llm_client, message, analysis, processor.snapshot)
+            
+            if alert:
+                get_alert_notifier().publish(alert)
+            yield _sse_event("final", {
+                "analysis_id": analysis.analysis_id,
+                "message_id": analysis.message_id,
+                "gating_decision": _gating_decision(analysis),
+                "crisis_protocol_triggered": analysis.crisis_protocol_triggered,
+                "risk_profile_pending": analysis.risk_profile_pending,
+                "response_text": analysis.response_text
+            })
+        except Exception as e:
+            logger.error("message_stream_processing_failed",
+                        student_id=message.student_id,
+                        error=str(e),
+                        exc_info=True)
+            yield _sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _gating_decision(analysis: MessageAnalysis) -> str:
+    """Gating decision recorded by Checkpoint 5 (crisis screen failures skip gating)."""
+    for checkpoint in analysis.checkpoint_results:
+        if checkpoint.checkpoint_name == "RESPONSE_GATING":
+            return checkpoint.result.get("gating_decision", "LOW")
+    return "CRISIS" if analysis.crisis_protocol_triggered else "LOW"
+
+
 @router.get("/analysis/{student_id}")
 async def get_message_analyses(
     student_id: str,
@@ -176,7 +174,7 @@ async def get_sessions(
         id=s.id,
         session_number=s.session_number,
         created_at=s.created_at,
-        message_count=len(s.messages) if s.messages else 0
+        message_count=s.total_messages
     ) for s in sessions]
 
 
@@ -184,10 +182,17 @@ async def get_sessions(
 async def get_session_messages(
     session_id: int,
     student_id: str = Query(..., description="Student ID"),
+    after_seq: Optional[int] = Query(None, description="Return messages after this seq (keyset pagination); omit for the first page"),
+    limit: int = Query(200, ge=1, le=500),
     db: Session = Depends(get_db)
 ):
-    """Get all messages from a specific session."""
-    session = db.query(SessionModel).filter(
+    """
+    Get a page of a session's messages, oldest first.
+    
+    Pages are keyed on (session_id, seq), so a page costs the same however
+    long the conversation is; a page shorter than limit is the last one.
+    """
+    session = db.query(SessionModel.id).filter(
         SessionModel.id == session_id,
         SessionModel.student_id == student_id
     ).first()
@@ -195,8 +200,18 @@ async def get_session_messages(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    messages = session.messages if session.messages else []
-    return [ChatMessage(**msg) for msg in messages]
+    query = db.query(ChatMessageModel).filter(ChatMessageModel.session_id == session_id)
+    if after_seq is not None:
+        query = query.filter(ChatMessageModel.seq > after_seq)
+    messages = query.order_by(ChatMessageModel.seq).limit(limit).all()
+    
+    return [ChatMessage(
+        id=m.message_id,
+        content=m.content,
+        sender=m.sender,
+        timestamp=m.sent_at,
+        seq=m.seq
+    ) for m in messages]
 
 
 
@@ -0,0 +1,121 @@
+"""Circuit breaker that lets LLM callers fall back instantly when the model is down."""
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from app.core.config import settings
+from app.core import metrics
+from app.core.llm_router import is_backend_failure
+import structlog
+
+logger = structlog.get_logger()
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling the LLM while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker around upstream LLM calls.
+
+    What This Breaker Does:
+    - Opens after failure_threshold consecutive connection, timeout or 5xx
+      errors; while open every call raises CircuitOpenError immediately, so
+      the callers' existing fallbacks (keyword analysis, heuristic concern
+      indicators) run without waiting on a dead model
+    - After cooldown_seconds lets up to half_open_max_calls trial calls
+      through; one success closes it, one failure re-opens it
+    - Exports its state and transitions as metrics
+
+    What This Breaker Does NOT Do:
+    - Does NOT count bad requests (4xx, parse errors) as failures: the
+      model answered, so it is up
+    - Does NOT apply to cache hits
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    @asynccontextmanager
+    async def guard(self, call_site: str = "unknown"):
+        """Fail fast when open; otherwise record how the call in the block went."""
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._trials >= self.half_open_max_calls):
+            metrics.LLM_ERRORS.labels(call_site=call_site, error="circuit_open").inc()
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+        trial = state == HALF_OPEN
+        if trial:
+            self._trials += 1
+        try:
+            yield
+        except Exception as e:
+            if is_backend_failure(e):
+                self._on_failure(e)
+            else:
+                self._on_success()
+            raise
+        else:
+            self._on_success()
+        finally:
+            if trial:
+                self._trials -= 1
+
+    def _on_success(self):
+        self._failures = 0
+        if self._state != CLOSED:
+            self._transition(CLOSED)
+
+    def _on_failure(self, error: BaseException):
+        self._failures += 1
+        if self._state == HALF_OPEN or (
+            self._state == CLOSED and self._failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._transition(OPEN)
+            logger.warning("llm_circuit_opened",
+                          failures=self._failures,
+                          cooldown_seconds=self.cooldown_seconds,
+                          error=str(error))
+
+    def _transition(self, state: str):
+        self._state = state
+        metrics.LLM_CIRCUIT_STATE.set(_STATE_VALUES[state])
+        metrics.LLM_CIRCUIT_TRANSITIONS.labels(state=state).inc()
+        if state != OPEN:
+            self._failures = 0
+            logger.info("llm_circuit_state_changed", state=state)
+
+
+_circuit_breaker: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Process-wide breaker shared by every LLMClient."""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker(
+            failure_threshold=settings.llm_breaker_failure_threshold,
+            cooldown_seconds=settings.llm_breaker_cooldown_seconds,
+            half_open_max_calls=settings.llm_breaker_half_open_max_calls
+        )
+    return _circuit_breaker
@@ -3,7 +3,7 @@ try:
     from pydantic_settings import BaseSettings
 except ImportError:
     from pydantic import BaseSettings
-from typing import Optional
+from typing import Optional, Dict
 
 
 class Settings(BaseSettings):
@@ -11,6 +11,9 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str
+    async_database_url: Optional[str] = None  # Derived from database_url when unset
+    async_db_pool_size: int = 20
+    async_db_max_overflow: int = 30
     redis_url: str = "redis://localhost:6379/0"
     
     # LLM Configuration
@@ -22,6 +25,45 @@ class Settings(BaseSettings):
     local_llm_base_url: str = "http://localhost:11434/v1"  # Ollama default
     local_llm_model: str = "llama2"  # or "mistral", "llama3", etc.
     local_llm_api_key: Optional[str] = None  # Usually not needed for local
+    local_llm_base_urls: Optional[str] = None  # Comma-separated; overrides local_llm_base_url
+    
+    # LLM Backends (router over one or more OpenAI-compatible endpoints)
+    llm_http_max_connections: int = 100  # Shared httpx pool across all backends
+    llm_request_timeout: float = 120.0  # Seconds
+    llm_eject_after_errors: int = 3  # Consecutive connection/5xx errors before ejecting a backend
+    llm_eject_seconds: float = 30.0
+    llm_health_check_interval: float = 10.0  # Seconds between /models probes (0 disables)
+    
+    # LLM Response Cache (opt-in; call sites without a TTL are never cached)
+    llm_cache_enabled: bool = False
+    llm_cache_backend: str = "redis"  # "redis" (LRU fallback when unreachable) or "memory"
+    llm_cache_max_entries: int = 2048  # In-process LRU size
+    llm_cache_ttls: Dict[str, int] = {  # Seconds per call site
+        "emoji": 86400,
+        "concern": 3600,
+        "contextual_risk": 3600,
+        "baseline": 86400,
+        "structured_analysis": 3600,
+        "journal": 21600,
+        "crisis_report": 600,
+    }
+    # Temperature for classification call sites (emoji, concern, contextual_risk,
+    # baseline, structured_analysis); 0 makes their answers repeatable and cacheable
+    llm_classification_temperature: float = 0.7
+    
+    # LLM Scheduling (shared across all LLMClient instances)
+    llm_max_concurrency: int = 8  # Upstream calls in flight at once
+    llm_priority_weights: Dict[str, int] = {  # Weighted fair queuing share per class
+        "crisis": 16,
+        "chat": 8,
+        "analysis": 4,
+        "batch": 1,
+    }
+    
+    # LLM Circuit Breaker (shared; while open, calls fail fast into the keyword fallbacks)
+    llm_breaker_failure_threshold: int = 5  # Consecutive connection/timeout/5xx errors that open it
+    llm_breaker_cooldown_seconds: float = 30.0  # Time open before a half-open trial call
+    llm_breaker_half_open_max_calls: int = 1  # Trial calls let through while half-open
     
     # Environment
     environment: str = "development"
@@ -40,6 +82,53 @@ class Settings(BaseSettings):
     cssrs_high_risk_score: int = 3
     cssrs_urgent_score: int = 1
     
+    # Pipeline Configuration
+    concurrent_checkpoints: bool = True  # Run checkpoint 3 (generation) and 4 (deep analysis) in parallel
+    structured_analysis_enabled: bool = True  # One consolidated analysis LLM call per message
+    crisis_fast_path: bool = True  # Return crisis protocol before risk profiling finishes
+    unit_of_work_enabled: bool = True  # Commit a processed message's writes in one transaction
+    
+    # Conversation Memory and Prompt Budget
+    conversation_memory_turns: int = 10  # Turns per session kept verbatim; older ones are summarized
+    conversation_summary_max_tokens: int = 200
+    prompt_token_budget: int = 1500  # Estimated tokens per pipeline prompt (system prompt excluded)
+    
+    # Triage Classifier (local model that lets confidently benign messages skip LLM deep analysis)
+    triage_mode: str = "off"  # "off", "shadow" (score and record only) or "enforce"
+    triage_benign_threshold: float = 0.98  # Benign probability needed to skip (with no safety flags)
+    triage_model_dir: str = "models/triage"  # Relative to the backend directory
+    triage_model_version: Optional[str] = None  # None: newest model in triage_model_dir
+    
+    # Safety Lexicon (crisis phrases screened at checkpoint 1)
+    safety_lexicon_path: Optional[str] = None  # None: bundled app/services/analysis/lexicons/safety_lexicon.json
+    safety_variant_matching: bool = True  # Also match obfuscated variants (leetspeak, spacing, typos)
+    safety_screen_budget_ms: float = 10.0  # Hard cap on variant matching per message
+    
+    # Emoji Analysis (tiers: no emoji -> skip, known emojis -> local lexicon, contradictions -> LLM)
+    emoji_fast_path: bool = True  # False: every message goes to the LLM as before
+    emoji_lexicon_path: Optional[str] = None  # None: bundled app/services/analysis/lexicons/emoji_lexicon.json
+    
+    # Deferred Analysis (reply after generation + a cheap gate; deep analysis runs on the analysis_jobs queue)
+    deferred_analysis_enabled: bool = False
+    analysis_queue_consumer_enabled: bool = True  # Consume the queue inside the API process
+    analysis_queue_concurrency: int = 4  # Jobs run at once per consumer (always for different students)
+    analysis_queue_poll_interval: float = 0.5  # Seconds between polls when the queue is idle
+    analysis_queue_lease_seconds: float = 300.0  # A RUNNING job is reclaimed after this; also the job timeout
+    analysis_queue_max_attempts: int = 5
+    analysis_queue_retry_backoff_seconds: float = 2.0  # Doubles per attempt
+    analysis_queue_partitions: int = 64  # Jobs hash to a partition by student_id; each worker owns a share
+    analysis_worker_drain_seconds: float = 60.0  # Standalone worker: wait this long for running jobs on shutdown
+    alert_notifier_backend: str = "memory"  # "redis" when analysis runs in standalone workers (pushes cross processes)
+    
+    # Per-Student Turn Ordering (one turn at a time per student in this process; others run in parallel)
+    student_turn_lock_enabled: bool = True
+    student_turn_max_pending: int = 8  # Turns waiting behind a running one before a student gets 429
+    
+    # Baseline Profile (fixed-size per student: running accumulators, recent samples, decayed histograms)
+    baseline_recent_samples: int = 20  # Newest samples kept per list
+    baseline_histogram_decay: float = 0.98  # Per emoji message; counts settle near 1 / (1 - decay)
+    baseline_histogram_max_keys: int = 32  # Distinct emojis kept per student
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,141 @@
+"""Opt-in response cache for LLMClient.generate (Redis, with an in-process LRU fallback)."""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core import metrics
+import structlog
+
+logger = structlog.get_logger()
+
+# How long to stay on the local LRU after Redis fails before trying it again
+REDIS_RETRY_SECONDS = 30.0
+
+
+class LRUCache:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: int):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LLMResponseCache:
+    """
+    Caches completions keyed on (model, system prompt, prompt, max_tokens, temperature).
+
+    What This Cache Does:
+    - Stores responses for call sites that have a TTL in settings.llm_cache_ttls
+    - Uses Redis when it is configured and reachable, the local LRU otherwise
+    - Counts hits and misses per call site
+
+    What This Cache Does NOT Do:
+    - Does NOT cache streamed replies or call sites without a TTL (chat
+      generation is personal and sampled, so it is left out by default)
+    - Does NOT fail a call when Redis errors (it falls back to the LRU)
+    """
+
+    def __init__(self, enabled: bool = False, ttls: Optional[Dict[str, int]] = None,
+                 redis_url: Optional[str] = None, max_entries: int = 2048):
+        self.enabled = enabled
+        self.ttls = ttls or {}
+        self.redis_url = redis_url
+        self.local = LRUCache(max_entries)
+        self._redis = None
+        self._redis_down_until = 0.0
+
+    def ttl_for(self, call_site: str) -> int:
+        return int(self.ttls.get(call_site, 0))
+
+    def enabled_for(self, call_site: str) -> bool:
+        return self.enabled and self.ttl_for(call_site) > 0
+
+    @staticmethod
+    def key(model: str, system_message: str, prompt: str, max_tokens: int, temperature: float) -> str:
+        payload = json.dumps([model, system_message, prompt, max_tokens, temperature], ensure_ascii=False)
+        return "llm:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, call_site: str, key: str) -> Optional[str]:
+        value = None
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(key)
+                value = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+            except Exception as e:
+                self._redis_failed(e)
+                value = self.local.get(key)
+        else:
+            value = self.local.get(key)
+
+        metrics.LLM_CACHE_REQUESTS.labels(call_site=call_site, result="hit" if value is not None else "miss").inc()
+        return value
+
+    async def set(self, call_site: str, key: str, value: str):
+        ttl = self.ttl_for(call_site)
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                await redis.set(key, value, ex=ttl)
+                return
+            except Exception as e:
+                self._redis_failed(e)
+        self.local.set(key, value, ttl)
+
+    def _get_redis(self):
+        """Redis client, or None while Redis is unconfigured, missing or failing."""
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError:
+                logger.warning("llm_cache_redis_unavailable", reason="redis package not installed")
+                self.redis_url = None
+                return None
+            self._redis = redis_asyncio.from_url(self.redis_url, socket_timeout=0.5,
+                                                 socket_connect_timeout=0.5)
+        return self._redis
+
+    def _redis_failed(self, error: Exception):
+        logger.warning("llm_cache_redis_error", error=str(error), fallback="lru",
+                       retry_in_s=REDIS_RETRY_SECONDS)
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Process-wide response cache built from settings."""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            enabled=settings.llm_cache_enabled,
+            ttls=settings.llm_cache_ttls,
+            redis_url=settings.redis_url if settings.llm_cache_backend == "redis" else None,
+            max_entries=settings.llm_cache_max_entries
+        )
+    return _llm_cache
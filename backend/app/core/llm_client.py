@@ -1,9 +1,16 @@
 """LLM client wrapper supporting both OpenAI and local LLMs."""
-from typing import Optional
+from typing import Optional, AsyncIterator, Awaitable, Callable, Dict, List
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core import metrics
+from app.core.llm_cache import LLMResponseCache, get_llm_cache
+from app.core.llm_scheduler import LLMScheduler, get_llm_scheduler, resolve_priority
+from app.core.circuit_breaker import CircuitBreaker, get_circuit_breaker
+from app.core.llm_router import LLMRouter, LLMBackend, shared_http_client, close_shared_http_client
 import structlog
+import asyncio
 import httpx
+import time
 from pathlib import Path
 
 logger = structlog.get_logger()
@@ -42,80 +49,295 @@ def _load_system_prompt() -> str:
 _DEFAULT_SYSTEM_PROMPT = _load_system_prompt()
 
 
+# Call sites that classify rather than converse; they use
+# settings.llm_classification_temperature so their answers can be cached
+CLASSIFICATION_CALL_SITES = frozenset({
+    "emoji", "concern", "contextual_risk", "baseline", "structured_analysis"
+})
+
+_EMPTY_RESPONSE_TEXT = "I apologize, but I couldn't generate a response. Please try again."
+
+
+class _Flight:
+    """One upstream call and the number of callers waiting on it."""
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Joins concurrent callers with the same key onto one upstream call.
+    
+    What This Does:
+    - Runs the first caller's call in its own task; later callers with the
+      same key await that task instead of calling the model again
+    - Shields the shared call from any one caller's cancellation, and only
+      cancels it when every caller has gone away
+    - Propagates the call's result or exception to every waiting caller
+    
+    What This Does NOT Do:
+    - Does NOT remember results after the call finishes (that is the cache's job)
+    """
+    
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+    
+    def in_flight(self) -> int:
+        return len(self._flights)
+    
+    async def do(self, key: str, call: Callable[[], Awaitable], call_site: str = "unknown"):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            metrics.LLM_COALESCED_CALLS.labels(call_site=call_site).inc()
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Last caller left: nobody wants the answer any more
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+    
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+# Shared by every LLMClient so duplicate prompts coalesce process-wide
+_single_flight = SingleFlight()
+
+
+def _configured_local_base_urls() -> List[str]:
+    """LOCAL_LLM_BASE_URLS (comma-separated) when set, else LOCAL_LLM_BASE_URL."""
+    urls = [u.strip() for u in (settings.local_llm_base_urls or "").split(",") if u.strip()]
+    return urls or [settings.local_llm_base_url]
+
+
 class LLMClient:
     """Wrapper for LLM API calls supporting OpenAI and local LLMs."""
     
     def __init__(self, provider: str = "openai", api_key: Optional[str] = None, 
-                 base_url: Optional[str] = None, model: Optional[str] = None):
+                 base_url: Optional[str] = None, model: Optional[str] = None,
+                 cache: Optional[LLMResponseCache] = None, scheduler: Optional[LLMScheduler] = None,
+                 base_urls: Optional[List[str]] = None, breaker: Optional[CircuitBreaker] = None):
         self.provider = provider
         self.model = model or (settings.local_llm_model if provider == "local" else settings.openai_model)
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.scheduler = scheduler if scheduler is not None else get_llm_scheduler()
+        self.single_flight = _single_flight
+        self.breaker = breaker if breaker is not None else get_circuit_breaker()
         
         if provider == "openai":
             # Use OpenAI API
             if not api_key and not settings.openai_api_key:
                 raise ValueError("OpenAI API key required when using OpenAI provider")
-            self.client = AsyncOpenAI(
-                api_key=api_key or settings.openai_api_key,
-                base_url=base_url  # Allows custom endpoints
-            )
+            api_key = api_key or settings.openai_api_key
+            base_urls = base_urls or [base_url]  # None: OpenAI's default endpoint
         elif provider == "local":
             # Use local LLM (Ollama, LM Studio, etc.)
-            base_url = base_url or settings.local_llm_base_url
-            api_key = api_key or settings.local_llm_api_key
-            self.client = AsyncOpenAI(
-                api_key=api_key or "ollama",  # Ollama doesn't need real key, but some clients require it
-                base_url=base_url
-            )
+            base_urls = base_urls or ([base_url] if base_url else _configured_local_base_urls())
+            api_key = api_key or settings.local_llm_api_key or "ollama"  # Ollama doesn't need real key, but some clients require it
         else:
             raise ValueError(f"Unknown LLM provider: {provider}")
+        
+        # Every backend shares the process-wide httpx connection pool
+        http_client = shared_http_client()
+        self.router = LLMRouter(
+            [LLMBackend(url, AsyncOpenAI(api_key=api_key, base_url=url, http_client=http_client))
+             for url in base_urls],
+            eject_after_errors=settings.llm_eject_after_errors,
+            eject_seconds=settings.llm_eject_seconds,
+            health_check_interval=settings.llm_health_check_interval
+        )
+        self.base_url = ", ".join(b.base_url for b in self.router.backends)
     
-    async def generate(self, prompt: str, max_tokens: int = 500, system_message: str = None) -> str:
-        """Generate response from LLM."""
-        try:
-            # Use provided system message, or default to unified mental health prompt, or fallback
-            system_content = system_message or _DEFAULT_SYSTEM_PROMPT
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_content},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=0.7
-            )
-            
-            result = response.choices[0].message.content
-            
-            if not result:
-                logger.warning("llm_returned_empty_response", provider=self.provider, model=self.model)
-                return "I apologize, but I couldn't generate a response. Please try again."
-            
+    async def generate(self, prompt: str, max_tokens: int = 500, system_message: str = None,
+                       call_site: str = "unknown", temperature: Optional[float] = None,
+                       priority: Optional[str] = None) -> str:
+        """
+        Generate response from LLM.
+        
+        call_site labels the latency/token/error metrics (emoji, concern,
+        contextual_risk, generation, baseline, journal, crisis_report, ...)
+        and selects the cache TTL. temperature defaults to 0.7, or to
+        settings.llm_classification_temperature for classification call sites.
+        priority is the scheduler class (crisis, chat, analysis, batch); by
+        default it comes from an enclosing llm_priority() block or the call site.
+        """
+        # Use provided system message, or default to unified mental health prompt, or fallback
+        system_content = system_message or _DEFAULT_SYSTEM_PROMPT
+        if temperature is None:
+            temperature = self._default_temperature(call_site)
+        
+        key = self.cache.key(self.model, system_content, prompt, max_tokens, temperature)
+        use_cache = self.cache.enabled_for(call_site)
+        if use_cache:
+            cached = await self.cache.get(call_site, key)
+            if cached is not None:
+                return cached
+        
+        async def fetch() -> Optional[str]:
+            result = await self._complete(prompt, max_tokens, system_content, call_site, temperature,
+                                          resolve_priority(call_site, priority))
+            if result and use_cache:
+                await self.cache.set(call_site, key, result)
             return result
-            
-        except httpx.ConnectError as e:
-            logger.error("llm_connection_error", 
-                        provider=self.provider, 
-                        base_url=self.client.base_url,
-                        error=str(e))
-            raise ConnectionError(
-                f"Could not connect to LLM at {self.client.base_url}. "
-                f"Make sure your local LLM server is running. "
-                f"For Ollama, run: ollama serve"
-            )
-        except Exception as e:
-            logger.error("llm_generation_error", 
-                        provider=self.provider, 
+        
+        # Identical prompts already on their way to the model are joined, not re-sent
+        result = await self.single_flight.do(key, fetch, call_site)
+        
+        if not result:
+            logger.warning("llm_returned_empty_response", provider=self.provider, model=self.model)
+            return _EMPTY_RESPONSE_TEXT
+        return result
+    
+    def _default_temperature(self, call_site: str) -> float:
+        if call_site in CLASSIFICATION_CALL_SITES:
+            return settings.llm_classification_temperature
+        return 0.7
+    
+    async def _complete(self, prompt: str, max_tokens: int, system_content: str,
+                        call_site: str, temperature: float, priority: str) -> Optional[str]:
+        """
+        One upstream chat completion, with metrics. Returns None for an empty reply.
+        
+        Raises CircuitOpenError at once (without queueing) while the breaker is open.
+        """
+        async with self.breaker.guard(call_site), self.scheduler.slot(priority):
+            start = time.perf_counter()
+            in_flight = metrics.LLM_CALLS_IN_FLIGHT.labels(call_site=call_site)
+            in_flight.inc()
+            try:
+                async with self.router.backend() as backend:
+                    response = await backend.client.chat.completions.create(
                         model=self.model,
-                        error=str(e))
-            raise
+                        messages=[
+                            {"role": "system", "content": system_content},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=max_tokens,
+                        temperature=temperature
+                    )
+                metrics.record_llm_usage(call_site, getattr(response, "usage", None))
+                
+                return response.choices[0].message.content or None
+                
+            except httpx.ConnectError as e:
+                metrics.LLM_ERRORS.labels(call_site=call_site, error="connection").inc()
+                logger.error("llm_connection_error", 
+                            provider=self.provider, 
+                            base_url=self.base_url,
+                            error=str(e))
+                raise ConnectionError(
+                    f"Could not connect to LLM at {self.base_url}. "
+                    f"Make sure your local LLM server is running. "
+                    f"For Ollama, run: ollama serve"
+                )
+            except Exception as e:
+                metrics.LLM_ERRORS.labels(call_site=call_site, error=type(e).__name__).inc()
+                logger.error("llm_generation_error", 
+                            provider=self.provider, 
+                            model=self.model,
+                            error=str(e))
+                raise
+            finally:
+                in_flight.dec()
+                self._observe_latency(call_site, start)
+
+
+    async def generate_stream(self, prompt: str, max_tokens: int = 500,
+                              system_message: str = None,
+                              call_site: str = "unknown",
+                              priority: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream response text from the LLM as it is generated.
+        
+        Latency covers the whole stream, and the scheduler slot is held until
+        it ends. Streamed responses carry no usage block, so completion tokens
+        are counted as content chunks (one token per chunk for
+        OpenAI-compatible servers). Like generate(), raises CircuitOpenError
+        before the first chunk while the breaker is open.
+        """
+        priority = resolve_priority(call_site, priority)
+        async with self.breaker.guard(call_site), self.scheduler.slot(priority):
+            start = time.perf_counter()
+            chunks = 0
+            in_flight = metrics.LLM_CALLS_IN_FLIGHT.labels(call_site=call_site)
+            in_flight.inc()
+            try:
+                system_content = system_message or _DEFAULT_SYSTEM_PROMPT
+                
+                async with self.router.backend() as backend:
+                    stream = await backend.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": system_content},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=max_tokens,
+                        temperature=0.7,
+                        stream=True
+                    )
+                    
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            chunks += 1
+                            yield delta
+            
+            except httpx.ConnectError as e:
+                metrics.LLM_ERRORS.labels(call_site=call_site, error="connection").inc()
+                logger.error("llm_connection_error", 
+                            provider=self.provider, 
+                            base_url=self.base_url,
+                            error=str(e))
+                raise ConnectionError(
+                    f"Could not connect to LLM at {self.base_url}. "
+                    f"Make sure your local LLM server is running. "
+                    f"For Ollama, run: ollama serve"
+                )
+            except Exception as e:
+                metrics.LLM_ERRORS.labels(call_site=call_site, error=type(e).__name__).inc()
+                logger.error("llm_stream_error", 
+                            provider=self.provider, 
+                            model=self.model,
+                            error=str(e))
+                raise
+            finally:
+                in_flight.dec()
+                if chunks:
+                    metrics.LLM_TOKENS.labels(call_site=call_site, kind="completion").inc(chunks)
+                self._observe_latency(call_site, start)
+    
+    def _observe_latency(self, call_site: str, start: float):
+        metrics.LLM_CALL_DURATION.labels(
+            call_site=call_site, provider=self.provider, model=self.model
+        ).observe(time.perf_counter() - start)
 
 
 _llm_client: Optional[LLMClient] = None
 
 
 def get_llm_client() -> LLMClient:
-    """Get LLM client instance based on configuration."""
+    """
+    Get LLM client instance based on configuration.
+    
+    This is the only way the app should obtain a client: the instance is
+    built once per process, so its backends, health checks and connection
+    pool are shared rather than rebuilt per request.
+    """
     global _llm_client
     if _llm_client is None:
         provider = settings.llm_provider.lower()
@@ -134,11 +356,11 @@ def get_llm_client() -> LLMClient:
         elif provider == "local":
             _llm_client = LLMClient(
                 provider="local",
-                base_url=settings.local_llm_base_url,
+                base_urls=_configured_local_base_urls(),
                 model=settings.local_llm_model
             )
             logger.info("using_local_llm", 
-                       base_url=settings.local_llm_base_url,
+                       base_url=_llm_client.base_url,
                        model=settings.local_llm_model)
         else:
             raise ValueError(
@@ -149,3 +371,10 @@ def get_llm_client() -> LLMClient:
     return _llm_client
 
 
+async def close_llm_client():
+    """Stop health checks and close the shared connection pool (app shutdown)."""
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.router.close()
+        _llm_client = None
+    await close_shared_http_client()
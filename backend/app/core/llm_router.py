@@ -0,0 +1,167 @@
+"""Balances LLM calls across several OpenAI-compatible endpoints."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import httpx
+import openai
+from app.core.config import settings
+from app.core import metrics
+import structlog
+
+logger = structlog.get_logger()
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def shared_http_client() -> httpx.AsyncClient:
+    """One pooled httpx client for every LLM backend in the process."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_http_max_connections,
+                max_keepalive_connections=settings.llm_http_max_connections
+            ),
+            timeout=httpx.Timeout(settings.llm_request_timeout, connect=5.0)
+        )
+    return _http_client
+
+
+async def close_shared_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """Errors that say the backend is unhealthy (not that the request was bad)."""
+    if isinstance(error, (httpx.TransportError, ConnectionError, asyncio.TimeoutError,
+                          openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+class LLMBackend:
+    """One OpenAI-compatible endpoint and its load/health state."""
+
+    def __init__(self, base_url: Optional[str], client):
+        self.base_url = base_url or "https://api.openai.com/v1"
+        self.client = client
+        self.outstanding = 0
+        self.consecutive_errors = 0
+        self.healthy = True
+        self.ejected_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+
+class LLMRouter:
+    """
+    Least-outstanding-requests balancing with health probing and ejection.
+
+    What This Router Does:
+    - Sends each call to the available backend with the fewest calls in
+      flight (rotating between ties)
+    - Ejects a backend for eject_seconds after eject_after_errors
+      consecutive connection/timeout/5xx errors
+    - Probes every backend's /models endpoint in the background (only when
+      there is more than one) and reinstates backends that answer
+
+    What This Router Does NOT Do:
+    - Does NOT retry a failed call on another backend (callers already have
+      fallbacks, and a retry would double the latency of a failing turn)
+    - Does NOT refuse calls when every backend is out; it falls back to
+      the full list rather than failing closed
+    """
+
+    def __init__(self, backends: List[LLMBackend], eject_after_errors: int = 3,
+                 eject_seconds: float = 30.0, health_check_interval: float = 10.0):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.eject_after_errors = eject_after_errors
+        self.eject_seconds = eject_seconds
+        self.health_check_interval = health_check_interval
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+        for backend in backends:
+            metrics.LLM_BACKEND_HEALTHY.labels(backend=backend.base_url).set(1)
+
+    def pick(self) -> LLMBackend:
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b.available(now)] or self.backends
+        lowest = min(b.outstanding for b in candidates)
+        tied = [b for b in candidates if b.outstanding == lowest]
+        self._next = (self._next + 1) % len(tied)
+        return tied[self._next]
+
+    @asynccontextmanager
+    async def backend(self):
+        """Pick a backend and account for the call made inside the block."""
+        self._ensure_health_checks()
+        backend = self.pick()
+        backend.outstanding += 1
+        metrics.LLM_BACKEND_OUTSTANDING.labels(backend=backend.base_url).set(backend.outstanding)
+        try:
+            yield backend
+        except Exception as e:
+            if is_backend_failure(e):
+                self._record_failure(backend, e)
+            raise
+        else:
+            backend.consecutive_errors = 0
+        finally:
+            backend.outstanding -= 1
+            metrics.LLM_BACKEND_OUTSTANDING.labels(backend=backend.base_url).set(backend.outstanding)
+
+    def _record_failure(self, backend: LLMBackend, error: BaseException):
+        backend.consecutive_errors += 1
+        if backend.consecutive_errors >= self.eject_after_errors and len(self.backends) > 1:
+            backend.ejected_until = time.monotonic() + self.eject_seconds
+            backend.consecutive_errors = 0
+            metrics.LLM_BACKEND_EJECTIONS.labels(backend=backend.base_url).inc()
+            metrics.LLM_BACKEND_HEALTHY.labels(backend=backend.base_url).set(0)
+            logger.warning("llm_backend_ejected",
+                          backend=backend.base_url,
+                          seconds=self.eject_seconds,
+                          error=str(error))
+
+    def _ensure_health_checks(self):
+        if len(self.backends) < 2 or self.health_check_interval <= 0:
+            return
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(
+                self._health_loop(), name="llm_backend_health_checks"
+            )
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.gather(*(self.probe(b) for b in self.backends))
+            await asyncio.sleep(self.health_check_interval)
+
+    async def probe(self, backend: LLMBackend):
+        """Mark a backend healthy or unhealthy from a /models request."""
+        try:
+            await asyncio.wait_for(backend.client.models.list(), timeout=5.0)
+        except Exception as e:
+            if backend.healthy:
+                logger.warning("llm_backend_unhealthy", backend=backend.base_url, error=str(e))
+            backend.healthy = False
+        else:
+            if not backend.healthy or backend.ejected_until:
+                logger.info("llm_backend_healthy", backend=backend.base_url)
+            backend.healthy = True
+            backend.ejected_until = 0.0
+            backend.consecutive_errors = 0
+        metrics.LLM_BACKEND_HEALTHY.labels(backend=backend.base_url).set(
+            1 if backend.available(time.monotonic()) else 0
+        )
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
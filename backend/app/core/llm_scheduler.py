@@ -0,0 +1,135 @@
+"""Priority-aware concurrency limit for upstream LLM calls."""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core import metrics
+import structlog
+
+logger = structlog.get_logger()
+
+PRIORITY_CLASSES = ("crisis", "chat", "analysis", "batch")
+
+# Default class per call site; anything unlisted is background analysis
+CALL_SITE_PRIORITIES = {
+    "generation": "chat",
+    "journal": "batch",
+    "crisis_report": "batch",
+    "summary": "batch",
+}
+
+_priority_scope: ContextVar[Optional[str]] = ContextVar("llm_priority_scope", default=None)
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """
+    Run every LLM call made inside the block (including nested services and
+    tasks spawned from it) in the given priority class.
+    """
+    token = _priority_scope.set(priority)
+    try:
+        yield
+    finally:
+        _priority_scope.reset(token)
+
+
+def resolve_priority(call_site: str, priority: Optional[str] = None) -> str:
+    """Explicit priority, else the enclosing llm_priority scope, else the call site's default."""
+    priority = priority or _priority_scope.get() or CALL_SITE_PRIORITIES.get(call_site, "analysis")
+    if priority not in PRIORITY_CLASSES:
+        logger.warning("unknown_llm_priority", priority=priority, call_site=call_site)
+        return "analysis"
+    return priority
+
+
+class LLMScheduler:
+    """
+    Bounded concurrency with weighted fair queuing across priority classes.
+
+    What This Scheduler Does:
+    - Lets at most max_concurrency upstream calls run at once
+    - Orders waiting calls by start-time fair queuing: each class gets slots
+      in proportion to its weight, so a batch burst cannot starve chat or
+      crisis calls, and batch still makes progress under chat load
+    - Exports queue depth, wait time and active calls
+
+    What This Scheduler Does NOT Do:
+    - Does NOT preempt calls that are already running
+    - Does NOT apply to cache hits (only upstream calls take a slot)
+    """
+
+    def __init__(self, max_concurrency: int, weights: Dict[str, int]):
+        self.max_concurrency = max(1, max_concurrency)
+        self.weights = {p: max(1, int(weights.get(p, 1))) for p in PRIORITY_CLASSES}
+        self.active = 0
+        self._queue = []  # heap of (finish_tag, seq, start_tag, priority, future)
+        self._last_finish = {p: 0.0 for p in PRIORITY_CLASSES}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: str):
+        """Hold one upstream-call slot for the duration of the block."""
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def queue_depth(self, priority: Optional[str] = None) -> int:
+        return sum(1 for entry in self._queue
+                   if not entry[4].done() and (priority is None or entry[3] == priority))
+
+    async def _acquire(self, priority: str):
+        future = asyncio.get_running_loop().create_future()
+        start_tag = max(self._virtual_time, self._last_finish[priority])
+        finish_tag = start_tag + 1.0 / self.weights[priority]
+        self._last_finish[priority] = finish_tag
+        heapq.heappush(self._queue, (finish_tag, next(self._seq), start_tag, priority, future))
+        metrics.LLM_QUEUE_DEPTH.labels(priority=priority).inc()
+
+        wait_start = time.perf_counter()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # Left the queue before getting a slot
+                metrics.LLM_QUEUE_DEPTH.labels(priority=priority).dec()
+            else:
+                # Granted a slot in the same tick we were cancelled: pass it on
+                self._release()
+            raise
+        metrics.LLM_QUEUE_WAIT.labels(priority=priority).observe(time.perf_counter() - wait_start)
+
+    def _release(self):
+        self.active -= 1
+        metrics.LLM_ACTIVE_CALLS.set(self.active)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._queue and self.active < self.max_concurrency:
+            _, _, start_tag, priority, future = heapq.heappop(self._queue)
+            if future.done():
+                continue  # Cancelled while waiting
+            metrics.LLM_QUEUE_DEPTH.labels(priority=priority).dec()
+            self._virtual_time = start_tag
+            self.active += 1
+            metrics.LLM_ACTIVE_CALLS.set(self.active)
+            future.set_result(None)
+
+
+_llm_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Process-wide scheduler shared by every LLMClient."""
+    global _llm_scheduler
+    if _llm_scheduler is None:
+        _llm_scheduler = LLMScheduler(settings.llm_max_concurrency, settings.llm_priority_weights)
+    return _llm_scheduler
@@ -0,0 +1,222 @@
+"""Prometheus metrics for the request path, the pipeline, LLM calls and SQL."""
+import time
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.routing import Match
+
+# Route template of the request being served ("background" inside spawned tasks)
+current_route: ContextVar[str] = ContextVar("metrics_current_route", default="none")
+
+# Seconds; LLM calls are slow, SQL queries are fast
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+_SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served", ["route"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency including streamed bodies",
+    ["route", "method", "status"], buckets=_LATENCY_BUCKETS
+)
+
+CHECKPOINT_DURATION = Histogram(
+    "pipeline_checkpoint_duration_seconds", "Latency of each pipeline checkpoint",
+    ["checkpoint"], buckets=_LATENCY_BUCKETS + (20.0, 30.0)
+)
+TRIAGE_DECISIONS = Counter(
+    "triage_decisions_total", "Triage classifier decisions per mode", ["mode", "decision"]
+)
+EMOJI_ANALYSES = Counter(
+    "emoji_analysis_total", "Emoji analyses per tier (none, lexicon, llm, structured)", ["tier"]
+)
+CONTEXTUAL_RISK_ANALYSES = Counter(
+    "contextual_risk_analyses_total",
+    "Contextual risk analyses per outcome (computed, memo_hit, structured_reuse); computed should match messages",
+    ["outcome"]
+)
+SAFETY_SCREEN_MATCHES = Counter(
+    "safety_screen_matches_total", "Crisis lexicon matches per screening stage", ["stage"]
+)
+SAFETY_SCREEN_BUDGET_EXCEEDED = Counter(
+    "safety_screen_budget_exceeded_total", "Screens whose variant matching was cut short by the time budget"
+)
+
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds", "LLM call latency per call site",
+    ["call_site", "provider", "model"], buckets=_LLM_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "LLM tokens per call site", ["call_site", "kind"]
+)
+LLM_ERRORS = Counter(
+    "llm_errors_total", "Failed LLM calls per call site", ["call_site", "error"]
+)
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total", "LLM response cache lookups", ["call_site", "result"]
+)
+LLM_COALESCED_CALLS = Counter(
+    "llm_coalesced_calls_total", "Callers joined onto an identical in-flight LLM call", ["call_site"]
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth", "LLM calls waiting for a scheduler slot", ["priority"]
+)
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds", "Time LLM calls spend waiting for a slot",
+    ["priority"], buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+LLM_ACTIVE_CALLS = Gauge(
+    "llm_active_calls", "Upstream LLM calls holding a scheduler slot"
+)
+LLM_BACKEND_OUTSTANDING = Gauge(
+    "llm_backend_outstanding_requests", "Calls in flight per LLM backend", ["backend"]
+)
+LLM_BACKEND_HEALTHY = Gauge(
+    "llm_backend_healthy", "1 when the LLM backend is taking traffic", ["backend"]
+)
+LLM_BACKEND_EJECTIONS = Counter(
+    "llm_backend_ejections_total", "Times an LLM backend was ejected after errors", ["backend"]
+)
+LLM_CIRCUIT_STATE = Gauge(
+    "llm_circuit_breaker_state", "LLM circuit breaker state (0=closed, 1=half-open, 2=open)"
+)
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "llm_circuit_breaker_transitions_total", "LLM circuit breaker state changes", ["state"]
+)
+LLM_CALLS_IN_FLIGHT = Gauge(
+    "llm_calls_in_flight", "LLM calls currently waiting on the model", ["call_site"]
+)
+
+DB_QUERIES = Counter(
+    "db_queries_total", "SQL statements executed per route", ["route"]
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement latency per route",
+    ["route"], buckets=_SQL_BUCKETS
+)
+
+BACKGROUND_TASKS_IN_FLIGHT = Gauge(
+    "background_tasks_in_flight", "Spawned background tasks still running"
+)
+ANALYSIS_JOBS = Counter(
+    "analysis_jobs_total", "Deferred analysis jobs by outcome (enqueued, completed, retried, failed)", ["outcome"]
+)
+ANALYSIS_JOBS_RUNNING = Gauge(
+    "analysis_jobs_running", "Deferred analysis jobs being processed by this process"
+)
+ANALYSIS_QUEUE_LAG = Gauge(
+    "analysis_queue_lag_seconds", "Age of the oldest runnable job in this consumer's partitions (0 when caught up)"
+)
+ANALYSIS_JOB_WAIT = Histogram(
+    "analysis_job_wait_seconds", "Time from enqueue to claim per deferred analysis job",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+STUDENT_LOCKS_ACTIVE = Gauge(
+    "student_locks_active", "Students with a turn running or waiting in this process"
+)
+STUDENT_LOCK_WAIT = Histogram(
+    "student_lock_wait_seconds", "Time a turn waits behind the same student's earlier turns",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+ALERT_SUBSCRIBERS = Gauge(
+    "alert_stream_subscribers", "Counselor alert streams connected to this process"
+)
+
+
+def observe_checkpoints(checkpoint_results):
+    """Record the time_ms of each checkpoint result dict from SequentialProcessor."""
+    for checkpoint in checkpoint_results:
+        if checkpoint.get("time_ms") is not None:
+            CHECKPOINT_DURATION.labels(checkpoint=checkpoint["name"]).observe(checkpoint["time_ms"] / 1000)
+
+
+def record_llm_usage(call_site: str, usage):
+    """Count prompt/completion tokens from an OpenAI usage object (may be None)."""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    if prompt_tokens:
+        LLM_TOKENS.labels(call_site=call_site, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(call_site=call_site, kind="completion").inc(completion_tokens)
+
+
+def route_template(scope) -> str:
+    """Path template of the route that will serve this scope, e.g. /api/alerts/{alert_id}."""
+    app = scope.get("app")
+    for route in getattr(app, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware for the request metrics.
+
+    What This Middleware Does:
+    - Tracks in-flight requests and latency per route template
+    - Sets current_route so SQL statements are attributed to the route
+
+    What This Middleware Does NOT Do:
+    - Does NOT label by raw path (ids in paths would explode cardinality)
+
+    A plain ASGI wrapper (not BaseHTTPMiddleware) so streamed responses stay
+    in flight until the last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        token = current_route.set(route)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        gauge = HTTP_REQUESTS_IN_FLIGHT.labels(route=route)
+        gauge.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            gauge.dec()
+            HTTP_REQUEST_DURATION.labels(
+                route=route, method=scope["method"], status=str(status["code"])
+            ).observe(time.perf_counter() - start)
+            current_route.reset(token)
+
+
+def instrument_engine(engine):
+    """Count and time every SQL statement on a (sync) engine, labelled by route."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if not starts:
+            return
+        route = current_route.get()
+        DB_QUERIES.labels(route=route).inc()
+        DB_QUERY_DURATION.labels(route=route).observe(time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_query_start"):
+            conn.info["metrics_query_start"].pop()
@@ -0,0 +1,108 @@
+"""Per-student serialization of chat turns in this process."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core import metrics
+import structlog
+
+logger = structlog.get_logger()
+
+
+class StudentBusyError(RuntimeError):
+    """Raised instead of queueing when a student already has max_pending turns waiting."""
+
+
+class _Mailbox:
+    """Lock for one student plus the number of holders/waiters using it."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class StudentLocks:
+    """
+    One lock per student id, held for a whole turn.
+
+    Turns read-modify-write per-student state (Student.baseline_profile in
+    EmojiAnalyzer._update_baseline and track_passive_monitoring, the
+    session's message_count and recent_turns in _save_to_session); two
+    concurrent turns for the same student would each read the old value
+    and the later commit would drop the earlier one's update.
+
+    What This Manager Does:
+    - Runs one block at a time per student, in arrival order (asyncio.Lock
+      wakes waiters first-in first-out)
+    - Never makes different students wait on each other
+    - Keeps a student's entry only while a block holds or waits for it, so
+      memory is bounded by the turns in flight, not by students ever seen
+    - Rejects a turn with StudentBusyError when max_pending turns for that
+      student are already waiting (a client retry loop cannot pile up)
+
+    What This Manager Does NOT Do:
+    - Does NOT serialize across processes
+    - Does NOT cover deferred analysis jobs: live turns in deferred mode do
+      not write the baseline, and the queue runs one job per student at a time
+    - Does NOT time out a holder; the LLM and database calls inside have their own
+    """
+
+    def __init__(self, max_pending: int = 8):
+        self.max_pending = max(1, max_pending)
+        self._mailboxes: Dict[str, _Mailbox] = {}
+
+    @asynccontextmanager
+    async def hold(self, student_id: str):
+        """Hold the student's lock for the duration of the block."""
+        mailbox = self._mailboxes.get(student_id)
+        if mailbox is None:
+            mailbox = self._mailboxes[student_id] = _Mailbox()
+            metrics.STUDENT_LOCKS_ACTIVE.set(len(self._mailboxes))
+        elif mailbox.users > self.max_pending:
+            # One holder plus max_pending waiters
+            logger.warning("student_turn_rejected", student_id=student_id, waiting=mailbox.users - 1)
+            raise StudentBusyError(f"Too many turns in progress for student {student_id}")
+
+        mailbox.users += 1
+        wait_start = time.perf_counter()
+        try:
+            await mailbox.lock.acquire()
+            metrics.STUDENT_LOCK_WAIT.observe(time.perf_counter() - wait_start)
+            try:
+                yield
+            finally:
+                mailbox.lock.release()
+        finally:
+            mailbox.users -= 1
+            if mailbox.users == 0:
+                # Idle: evict (a later turn starts a fresh entry)
+                del self._mailboxes[student_id]
+                metrics.STUDENT_LOCKS_ACTIVE.set(len(self._mailboxes))
+
+    def active(self) -> int:
+        """Students with a turn running or waiting."""
+        return len(self._mailboxes)
+
+
+@asynccontextmanager
+async def student_turn(student_id: str):
+    """Serialize the block with the student's other turns (no-op when disabled)."""
+    if not settings.student_turn_lock_enabled:
+        yield
+        return
+    async with get_student_locks().hold(student_id):
+        yield
+
+
+_student_locks: Optional[StudentLocks] = None
+
+
+def get_student_locks() -> StudentLocks:
+    """Process-wide per-student locks."""
+    global _student_locks
+    if _student_locks is None:
+        _student_locks = StudentLocks(settings.student_turn_max_pending)
+    return _student_locks
@@ -1,7 +1,10 @@
 """Database setup and session management."""
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 from app.models.base import Base
 
 # Import all models to ensure relationships are properly registered
@@ -11,6 +14,43 @@ from app.models import student, assessment, analysis, learning, intervention_out
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the sync URLs used in .env / alembic.ini
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_database_url(database_url: str) -> str:
+    """Map the configured sync database URL onto its asyncio driver."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _create_async_engine():
+    url = settings.async_database_url or _async_database_url(settings.database_url)
+    if make_url(url).get_backend_name() == "sqlite":
+        return create_async_engine(url)
+    return create_async_engine(
+        url,
+        pool_size=settings.async_db_pool_size,
+        max_overflow=settings.async_db_max_overflow,
+        pool_pre_ping=True
+    )
+
+
+async_engine = _create_async_engine()
+# expire_on_commit=False: attributes stay readable after commit without a lazy
+# reload, which an AsyncSession cannot do implicitly
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# SQL count/duration per route for /metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 
 def init_db():
     """Initialize database tables."""
@@ -26,5 +66,7 @@ def get_db() -> Session:
         db.close()
 
 
-
-
+async def get_async_db() -> AsyncSession:
+    """Get async database session (non-blocking; used by the message pipeline)."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,110 @@
+"""Unit of work: one transaction per processed message."""
+from contextlib import asynccontextmanager
+from typing import Callable
+from app.core.config import settings
+import structlog
+
+logger = structlog.get_logger()
+
+# Keys in AsyncSession.info
+_ACTIVE = "unit_of_work_active"
+_DEFERRED = "unit_of_work_deferred_commits"
+_AFTER_COMMIT = "unit_of_work_after_commit"
+
+
+def in_unit_of_work(db) -> bool:
+    """Whether the session is collecting writes for a unit of work."""
+    return bool(db.info.get(_ACTIVE))
+
+
+async def commit(db):
+    """
+    Commit the pipeline's pending writes.
+
+    Inside a unit of work this only flushes (rows get their ids and later
+    reads in the same transaction see them); the single commit happens when
+    the unit of work ends. Outside one it commits immediately.
+    """
+    if in_unit_of_work(db):
+        await db.flush()
+        db.info[_DEFERRED] = db.info.get(_DEFERRED, 0) + 1
+    else:
+        await db.commit()
+
+
+def after_commit(db, callback: Callable[[], None]):
+    """
+    Run callback once the pipeline's pending writes are committed.
+
+    Inside a unit of work it runs after the single commit and is dropped on
+    rollback, so work it starts (e.g. a background task with its own DB
+    session) sees this message's writes. Outside one, commit(db) has
+    already committed, so it runs now.
+    """
+    if in_unit_of_work(db):
+        db.info[_AFTER_COMMIT].append(callback)
+    else:
+        callback()
+
+
+@asynccontextmanager
+async def savepoint(db):
+    """
+    Keep a failing write from discarding the rest of the pipeline's writes.
+
+    Inside a unit of work the block runs in a SAVEPOINT: an error rolls back
+    only the block's writes and re-raises, and the unit of work still decides
+    whether the message's other writes are committed. Outside one, commit(db)
+    has already committed everything before the block, so an error rolls the
+    session back.
+    """
+    if in_unit_of_work(db):
+        async with db.begin_nested():
+            yield
+        return
+
+    try:
+        yield
+    except BaseException:
+        await db.rollback()
+        raise
+
+
+@asynccontextmanager
+async def unit_of_work(db, enabled: bool = None):
+    """
+    Collect every pipeline write for one message and commit them together.
+
+    What This Does:
+    - Turns commit(db) calls inside the block into flushes
+    - Commits once on success, rolls back on error
+    - Runs after_commit callbacks once the commit has succeeded
+
+    What This Does NOT Do:
+    - Does NOT stop code from calling db.commit() directly; crisis alerts do
+      that on purpose so they are durable before the response goes out
+    """
+    if enabled is None:
+        enabled = settings.unit_of_work_enabled
+    if not enabled or in_unit_of_work(db):
+        yield
+        return
+
+    db.info[_ACTIVE] = True
+    db.info[_DEFERRED] = 0
+    db.info[_AFTER_COMMIT] = []
+    try:
+        yield
+        await db.commit()
+        logger.debug("unit_of_work_committed", deferred_commits=db.info.get(_DEFERRED, 0))
+        callbacks = db.info[_AFTER_COMMIT]
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        db.info.pop(_ACTIVE, None)
+        db.info.pop(_DEFERRED, None)
+        db.info.pop(_AFTER_COMMIT, None)
+
+    for callback in callbacks:
+        callback()
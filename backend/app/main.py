@@ -1,15 +1,17 @@
 """Main FastAPI application."""
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from app.core.config import settings
 from app.core.logging import configure_logging
+from app.core.metrics import MetricsMiddleware
 from app.db.database import init_db
 from app.api import messages, assessments, alerts, learning, auth, students, temporal, outcomes, admin
 from app.api import community as community_api
-from app.api import journal, analytics
+from app.api import journal, analytics, counselor
 from app.tasks.outcome_checker import check_symptom_improvement
 
 # Import all models to ensure relationships are properly registered
@@ -46,8 +48,36 @@ async def lifespan(app: FastAPI):
     scheduler.start()
     logger.info("Background scheduler started with outcome_checker job")
     
+    # Deferred deep analysis: consume the analysis_jobs queue in this process
+    analysis_consumer = None
+    if settings.deferred_analysis_enabled and settings.analysis_queue_consumer_enabled:
+        from app.tasks.analysis_queue import get_analysis_queue_consumer
+        analysis_consumer = get_analysis_queue_consumer()
+        analysis_consumer.start()
+    
+    # Alerts raised in standalone analysis workers arrive over Redis
+    alert_relay = None
+    if settings.alert_notifier_backend == "redis":
+        import asyncio
+        from app.services.alerts.alert_notifier import get_alert_notifier
+        alert_relay = asyncio.create_task(get_alert_notifier().relay(), name="alert_relay")
+    
     yield
     
+    # Shutdown: Finish running analysis jobs (unstarted ones stay queued)
+    if analysis_consumer is not None:
+        await analysis_consumer.stop()
+    if alert_relay is not None:
+        alert_relay.cancel()
+    
+    # Shutdown: Let in-flight crisis follow-ups finish before stopping
+    from app.tasks import background
+    await background.drain()
+    
+    # Shutdown: Stop LLM health checks and close the shared connection pool
+    from app.core.llm_client import close_llm_client
+    await close_llm_client()
+    
     # Shutdown: Stop the scheduler
     logger.info("Shutting down background scheduler...")
     scheduler.shutdown(wait=False)
@@ -78,6 +108,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics (in-flight gauges, latency, SQL per route)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(messages.router)
@@ -89,6 +122,7 @@ app.include_router(students.router)
 app.include_router(temporal.router)
 app.include_router(outcomes.router)
 app.include_router(admin.router)
+app.include_router(counselor.router)
 app.include_router(journal.router)
 app.include_router(analytics.router)
 app.include_router(analytics.router)
@@ -111,6 +145,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -54,6 +54,11 @@ class Alert(Base, TimestampMixin):
     appointment_scheduled_at = Column(DateTime, nullable=True)
     appointment_attended_at = Column(DateTime, nullable=True)
     
+    # Background crisis follow-up (risk profiling, analytics, report)
+    followup_status = Column(String, nullable=True)  # "PENDING", "RUNNING", "COMPLETED", "FAILED"
+    followup_completed_at = Column(DateTime, nullable=True)
+    followup_error = Column(String, nullable=True)
+    
     # Relationships
     outcome = relationship("InterventionOutcome", back_populates="alert", uselist=False)
 
@@ -119,5 +124,18 @@ class CrisisReport(Base, TimestampMixin):
     analytics = relationship("CrisisAnalytics", foreign_keys=[analytics_id])
 
 
-
-
+class AnalysisJob(Base, TimestampMixin):
+    """Deferred deep analysis of a chat turn, queued with the turn's own transaction."""
+    __tablename__ = "analysis_jobs"
+    
+    student_id = Column(String, nullable=False, index=True)  # Jobs run one at a time, in id order, per student
+    partition = Column(Integer, nullable=False, default=0, index=True)  # crc32(student_id) % analysis_queue_partitions
+    job_type = Column(String, nullable=False, default="message_analysis")
+    payload = Column(JSON, nullable=False)  # Message, fast-path checkpoint results and context
+    
+    status = Column(String, nullable=False, default="PENDING", index=True)  # "PENDING", "RUNNING", "DONE", "FAILED"
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False)  # Not claimed before this (retry backoff)
+    locked_until = Column(DateTime, nullable=True)  # Lease of the RUNNING claim; expired leases are reclaimed
+    last_error = Column(String, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
@@ -1,6 +1,6 @@
 """Student and session models."""
-from sqlalchemy import Column, String, Integer, JSON, ForeignKey, Float, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, JSON, ForeignKey, Float, Boolean, UniqueConstraint
+from sqlalchemy.orm import relationship, deferred
 from app.models.base import Base, TimestampMixin
 
 
@@ -34,11 +34,44 @@ class Session(Base, TimestampMixin):
     
     student_id = Column(String, ForeignKey("students.student_id"), nullable=False)
     session_number = Column(Integer, nullable=False)
-    messages = Column(JSON, default=list)  # List of message objects
+    # Legacy transcript (before chat_messages); no longer written, kept until it is dropped
+    messages = deferred(Column(JSON, default=list))
+    message_count = Column(Integer, default=0, nullable=False)  # Last seq the app appended to chat_messages
+    # Legacy messages copied to chat_messages below seq 1 (NULL: not copied yet)
+    legacy_message_count = Column(Integer, default=0)
     session_metadata = Column(JSON, default=dict)  # Engagement patterns, time-of-day, etc.
     
+    # Conversation memory: the newest turns verbatim, older ones folded into a summary
+    recent_turns = Column(JSON, default=list)  # [{"turn", "user", "assistant", "at"}], oldest first
+    turn_count = Column(Integer, default=0, nullable=False)
+    conversation_summary = Column(String)
+    summarized_turns = Column(Integer, default=0, nullable=False)  # Turns folded into the summary
+    
     # Relationships
     student = relationship("Student", back_populates="sessions")
+    
+    @property
+    def total_messages(self) -> int:
+        """Messages in the session's transcript, legacy ones included."""
+        return (self.message_count or 0) + (self.legacy_message_count or 0)
+
+
+class ChatMessage(Base, TimestampMixin):
+    """
+    One chat message (student or reply); append-only, numbered 1.. within its
+    session. Messages copied from the legacy sessions.messages column are
+    numbered below 1, so they come first.
+    """
+    __tablename__ = "chat_messages"
+    __table_args__ = (UniqueConstraint("session_id", "seq", name="uq_chat_messages_session_seq"),)
+    
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    student_id = Column(String, ForeignKey("students.student_id"), nullable=False, index=True)
+    message_id = Column(String, nullable=False)  # "user_<ms>" / "haven_<ms>", as the client sees it
+    sender = Column(String, nullable=False)  # "user" or "haven"
+    content = Column(String, nullable=False)
+    sent_at = Column(String, nullable=False)  # ISO timestamp
 
 
 
@@ -0,0 +1,61 @@
+"""Structured per-message analysis schemas."""
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List, Literal
+
+
+class EmojiSection(BaseModel):
+    """Emoji interpretation section (consumed by EmojiAnalyzer)."""
+    genuine_distress: bool = False
+    confidence: float = Field(0.0, ge=0.0, le=1.0)
+    reasoning: str = ""
+    emoji_function: Literal["humor", "emphasis", "literal", "ambiguous"] = "ambiguous"
+    emoji_context: Dict[str, Any] = {}
+
+
+class ConcernSection(BaseModel):
+    """Concern indicator section (consumed by SequentialProcessor)."""
+    language_shift_detected: bool = False
+    hopelessness_themes: bool = False
+    engagement_drop: bool = False
+    sudden_mood_change: bool = False
+    reasoning: str = ""
+
+
+class SuicidalIdeationSection(BaseModel):
+    """Suicidal ideation estimate (consumed by RiskCalculator)."""
+    present: bool
+    is_literal: Optional[bool] = None
+    confidence: float = Field(ge=0.0, le=1.0)
+    reasoning: str = ""
+
+
+class DepressionSection(BaseModel):
+    """Depression indicator estimate (consumed by RiskCalculator)."""
+    severity_estimate: Literal["LOW", "MEDIUM", "HIGH"] = "LOW"
+    confidence: float = Field(0.0, ge=0.0, le=1.0)
+    indicators: List[str] = []
+    reasoning: str = ""
+
+
+class OverallContextSection(BaseModel):
+    """Overall tone and escalation (consumed by RiskCalculator)."""
+    tone: str = "unknown"
+    escalation: bool = False
+    concern_level: Literal["LOW", "MEDIUM", "HIGH", "CRISIS"] = "LOW"
+
+
+class SentimentSection(BaseModel):
+    """Sentiment and humor section (consumed by HybridAssessmentService)."""
+    sentiment: Literal["positive", "neutral", "negative"] = "neutral"
+    sentiment_score: float = Field(0.0, ge=-1.0, le=1.0)
+    contains_humor: bool = False
+
+
+class StructuredAnalysis(BaseModel):
+    """Single JSON document returned by the consolidated analysis call."""
+    emoji: EmojiSection
+    concern_indicators: ConcernSection
+    suicidal_ideation: SuicidalIdeationSection
+    depression_indicators: DepressionSection
+    overall_context: OverallContextSection
+    sentiment: SentimentSection
@@ -27,6 +27,7 @@ class MessageAnalysis(BaseModel):
     student_id: str
     message_id: str
     message_text: str
+    analysis_id: Optional[int] = None  # message_analyses row id once logged
     
     # Checkpoint results
     checkpoint_results: List[CheckpointResult]
@@ -38,6 +39,10 @@ class MessageAnalysis(BaseModel):
     
     # Risk assessment
     risk_profile: Optional[Dict[str, Any]] = None
+    risk_profile_pending: bool = False  # Crisis fast path: profile is computed in the background
+    
+    # Sentiment/humor from the consolidated analysis (reused for baseline tracking)
+    sentiment: Optional[Dict[str, Any]] = None
     
     # Response handling
     response_generated: bool
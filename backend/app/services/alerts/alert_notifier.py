@@ -0,0 +1,132 @@
+"""Fan-out of newly created alerts to connected counselor dashboards."""
+import asyncio
+import json
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional, Set
+from app.core.config import settings
+from app.core import metrics
+import structlog
+
+logger = structlog.get_logger()
+
+ALERT_CHANNEL = "alerts:created"
+# Wait before resubscribing after the Redis connection drops
+RELAY_RETRY_SECONDS = 5.0
+
+
+def alert_event(alert) -> Dict[str, Any]:
+    """Push payload for an Alert row (the dashboard fetches full context by id)."""
+    return {
+        "id": alert.id,
+        "student_id": alert.student_id,
+        "alert_type": alert.alert_type,
+        "message": alert.message,
+        "routing_status": alert.routing_status,
+        "risk_profile_id": alert.risk_profile_id,
+        "created_at": alert.created_at.isoformat() if alert.created_at else None
+    }
+
+
+class AlertNotifier:
+    """
+    Publish/subscribe for alert events.
+
+    What This Notifier Does:
+    - Hands every published alert to each local subscriber's bounded queue
+    - With a redis_url, publishes on a Redis channel instead and relays that
+      channel to local subscribers (relay()), so alerts raised by standalone
+      analysis workers reach the API process serving the dashboards
+    - Drops a slow subscriber's oldest event rather than blocking the publisher
+
+    What This Notifier Does NOT Do:
+    - Does NOT persist events (the alerts table is the record; a dashboard
+      reloads /alerts/queue when it reconnects)
+    """
+
+    def __init__(self, max_queued: int = 100, redis_url: Optional[str] = None):
+        self.max_queued = max_queued
+        self.redis_url = redis_url
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._redis = None
+
+    @contextmanager
+    def subscribe(self) -> Iterator[asyncio.Queue]:
+        """Queue receiving alert events until the with-block exits."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queued)
+        self._subscribers.add(queue)
+        metrics.ALERT_SUBSCRIBERS.set(len(self._subscribers))
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+            metrics.ALERT_SUBSCRIBERS.set(len(self._subscribers))
+
+    def publish(self, alert):
+        """Push an alert (committed Alert row) to subscribers."""
+        event = alert_event(alert)
+        redis = self._get_redis()
+        if redis is None:
+            self._fan_out(event)
+            return
+
+        from app.tasks import background
+        background.spawn(self._publish_redis(redis, event), name=f"alert_publish:{event['id']}")
+
+    async def _publish_redis(self, redis, event: Dict[str, Any]):
+        try:
+            await redis.publish(ALERT_CHANNEL, json.dumps(event))
+        except Exception as e:
+            # Local dashboards still hear about it
+            logger.warning("alert_publish_redis_error", alert_id=event["id"], error=str(e))
+            self._fan_out(event)
+
+    def _fan_out(self, event: Dict[str, Any]):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                logger.warning("alert_stream_event_dropped", alert_id=event["id"])
+            queue.put_nowait(event)
+        logger.debug("alert_published", alert_id=event["id"], subscribers=len(self._subscribers))
+
+    async def relay(self):
+        """Forward the Redis alert channel to local subscribers until cancelled (Redis backend only)."""
+        while self._get_redis() is not None:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(ALERT_CHANNEL)
+                logger.info("alert_relay_subscribed", channel=ALERT_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._fan_out(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("alert_relay_error", error=str(e), retry_in_s=RELAY_RETRY_SECONDS)
+                await asyncio.sleep(RELAY_RETRY_SECONDS)
+
+    def _get_redis(self):
+        """Redis client, or None when unconfigured or the package is missing."""
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError:
+                logger.warning("alert_notifier_redis_unavailable", reason="redis package not installed")
+                self.redis_url = None
+                return None
+            self._redis = redis_asyncio.from_url(self.redis_url)
+        return self._redis
+
+
+_alert_notifier: Optional[AlertNotifier] = None
+
+
+def get_alert_notifier() -> AlertNotifier:
+    """Process-wide notifier built from settings."""
+    global _alert_notifier
+    if _alert_notifier is None:
+        _alert_notifier = AlertNotifier(
+            redis_url=settings.redis_url if settings.alert_notifier_backend == "redis" else None
+        )
+    return _alert_notifier
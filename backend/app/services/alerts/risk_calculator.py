@@ -1,15 +1,19 @@
 """Solution 2: Confidence-Weighted Alert System."""
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+from sqlalchemy import select, func
 from app.schemas.risk import RiskProfile, RiskLevel, RiskFactors, AlertRecommendation
 from app.services.analysis.temporal_analyzer import TemporalAnalyzer
+from app.services.analysis.context_snapshot import get_student
+from app.services.analysis.prompt_builder import PromptBuilder
+from app.services.analysis.safety_lexicon import get_safety_lexicon
+from app.db import unit_of_work
+from app.core.metrics import CONTEXTUAL_RISK_ANALYSES
 import structlog
 import json
-import re
 
 logger = structlog.get_logger()
 
-
 class RiskCalculator:
     """
     Multi-dimensional risk profile calculator with LLM-based contextual understanding.
@@ -33,7 +37,7 @@ class RiskCalculator:
         Initialize RiskCalculator.
         
         Args:
-            db_session: Database session for querying risk profiles and assessments
+            db_session: AsyncSession for querying risk profiles and assessments
             llm_client: Optional LLM client for contextual analysis. If None, falls back to keyword matching.
         """
         self.db = db_session
@@ -41,8 +45,15 @@ class RiskCalculator:
         self.llm = llm_client  # May be None for fallback scenarios
     
     async def calculate_risk(self, student_id: str, message_text: str,
-                           context: Dict[str, Any], concern_indicators: List[str]) -> Dict[str, Any]:
-        """Calculate multi-dimensional risk profile."""
+                           context: Dict[str, Any], concern_indicators: List[str],
+                           snapshot=None) -> Dict[str, Any]:
+        """
+        Calculate multi-dimensional risk profile.
+        
+        snapshot is the per-message ContextSnapshot; when given, risk history,
+        validated assessments and the student row come from it instead of
+        separate queries.
+        """
         logger.info("calculate_risk_started",
                    student_id=student_id,
                    message_length=len(message_text),
@@ -50,14 +61,19 @@ class RiskCalculator:
         
         try:
             # Get temporal patterns
-            temporal_patterns = await self.temporal_analyzer.analyze_trajectory(student_id)
+            temporal_patterns = await self.temporal_analyzer.analyze_trajectory(student_id, snapshot)
             logger.debug("temporal_patterns_retrieved",
                         student_id=student_id,
                         patterns_count=len(temporal_patterns.get("patterns", [])))
             
+            # Request-scoped cache: contextual analysis is computed at most once per message
+            # and shared between every risk factor
+            analysis_cache: Dict[str, Any] = {}
+            
             # Calculate individual risk factors (await async methods)
-            suicidal_ideation = await self._assess_suicidal_ideation(message_text, context)
-            depression_severity = await self._assess_depression_severity(student_id, message_text, context)
+            suicidal_ideation = await self._assess_suicidal_ideation(message_text, context, analysis_cache)
+            depression_severity = await self._assess_depression_severity(student_id, message_text, context,
+                                                                         analysis_cache, snapshot)
             behavior_change = self._assess_behavior_change(student_id, context)
             
             logger.debug("risk_factors_assessed",
@@ -101,14 +117,14 @@ class RiskCalculator:
             logger.info("saving_risk_profile",
                        student_id=student_id,
                        overall_risk=overall_risk.value)
-            self._save_risk_profile(risk_profile)
+            db_profile = await self._save_risk_profile(risk_profile, snapshot)
             logger.info("risk_profile_saved_successfully",
                        student_id=student_id)
             
             # Save temporal patterns if detected (Solution 7 Fix)
             if temporal_patterns.get("patterns") and not temporal_patterns.get("use_snapshot_only", False):
                 try:
-                    self.temporal_analyzer.save_temporal_pattern(
+                    await self.temporal_analyzer.save_temporal_pattern(
                         student_id,
                         temporal_patterns
                     )
@@ -131,7 +147,8 @@ class RiskCalculator:
                 "risk_factors": risk_factors.dict(),
                 "recommended_action": recommended_action,
                 "temporal_patterns": temporal_patterns.get("patterns", []),
-                "alert_recommendation": alert_rec.dict()
+                "alert_recommendation": alert_rec.dict(),
+                "risk_profile_id": db_profile.id
             }
             
             logger.info("calculate_risk_completed",
@@ -148,6 +165,29 @@ class RiskCalculator:
                         exc_info=True)
             raise
     
+    async def _get_contextual_analysis(self, message_text: str, context: Dict[str, Any],
+                                       analysis_cache: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Return the contextual risk analysis, memoized in analysis_cache.
+        
+        The first caller within a calculate_risk() run computes the analysis;
+        later risk factors reuse it instead of issuing another LLM call.
+        Outcomes are counted in contextual_risk_analyses_total; an analysis
+        read off the structured result counts as structured_reuse, not computed.
+        """
+        if analysis_cache is not None and "contextual_risk" in analysis_cache:
+            CONTEXTUAL_RISK_ANALYSES.labels(outcome="memo_hit").inc()
+            logger.debug("contextual_analysis_cache_hit")
+            return analysis_cache["contextual_risk"]
+        
+        analysis = await self._analyze_contextual_risk(message_text, context)
+        CONTEXTUAL_RISK_ANALYSES.labels(
+            outcome="structured_reuse" if context.get("structured_analysis") else "computed"
+        ).inc()
+        if analysis_cache is not None:
+            analysis_cache["contextual_risk"] = analysis
+        return analysis
+    
     async def _analyze_contextual_risk(self, message_text: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Use LLM to analyze message for contextual risk understanding.
@@ -158,6 +198,13 @@ class RiskCalculator:
         Returns:
             Dict with suicidal_ideation, depression_indicators, and overall_context
         """
+        structured = context.get("structured_analysis")
+        if structured:
+            from app.services.analysis.structured_analysis import StructuredAnalysisEngine
+            return self._calibrate_confidence(
+                StructuredAnalysisEngine.contextual_risk_section(structured), context
+            )
+        
         if not self.llm:
             # Fallback: Use keyword matching with low confidence
             logger.warning("llm_unavailable_using_keyword_fallback")
@@ -168,7 +215,7 @@ class RiskCalculator:
             prompt = self._build_contextual_risk_prompt(message_text, context)
             
             # Get LLM analysis
-            response = await self.llm.generate(prompt, max_tokens=800)
+            response = await self.llm.generate(prompt, max_tokens=800, call_site="contextual_risk")
             
             # Parse JSON response
             try:
@@ -214,19 +261,8 @@ class RiskCalculator:
     
     def _build_contextual_risk_prompt(self, message_text: str, context: Dict[str, Any]) -> str:
         """Build prompt for LLM contextual risk analysis."""
-        conversation_history = context.get("conversation_history", [])
         baseline = context.get("student_info", {}).get("baseline_profile", {})
         
-        # Format conversation history
-        history_text = ""
-        if conversation_history:
-            history_text = "\n".join([
-                f"Previous: {msg.get('message_text', '')[:100]}"
-                for msg in conversation_history[-5:]  # Last 5 messages
-            ])
-        else:
-            history_text = "No previous conversation history available."
-        
         # Format baseline info
         baseline_info = ""
         if baseline:
@@ -237,7 +273,8 @@ Student Baseline:
 - Common themes: {', '.join(baseline.get('common_themes', []))}
 """
         
-        return f"""Analyze this message for mental health risk in context:
+        def render(history_text: str) -> str:
+            return f"""Analyze this message for mental health risk in context:
 
 Current Message: "{message_text}"
 
@@ -277,6 +314,11 @@ Respond in JSON format only:
     "concern_level": "LOW|MEDIUM|HIGH|CRISIS"
   }}
 }}"""
+        
+        # Conversation summary plus as many recent messages as the token budget allows
+        return PromptBuilder().build(render, context,
+                                     format_turn=lambda msg: f"Previous: {msg.get('message_text', '')[:100]}",
+                                     empty="No previous conversation history available.")
     
     def _validate_llm_response(self, analysis: Dict[str, Any]) -> bool:
         """Validate LLM response structure."""
@@ -362,22 +404,8 @@ Respond in JSON format only:
         This is a conservative fallback that flags potential risks
         but with low confidence, requiring human review.
         """
-        text_lower = message_text.lower()
-        suicidal_patterns = [
-            r"kill\s+(myself|my\s+self)",
-            r"killing\s+(myself|my\s+self)",
-            r"end\s+it\s+all",
-            r"ending\s+my\s+life",
-            r"taking\s+my\s+life",
-            r"suicide",
-            r"commit\s+suicide",
-        ]
-        
-        keyword_match = False
-        for pattern in suicidal_patterns:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                keyword_match = True
-                break
+        # Same compiled lexicon as SafetyScreener; suicidal_ideation entries only
+        keyword_match = get_safety_lexicon().has_tag(message_text, "suicidal_ideation")
         
         return {
             "suicidal_ideation": {
@@ -400,7 +428,8 @@ Respond in JSON format only:
             "requires_human_review": True
         }
     
-    async def _assess_suicidal_ideation(self, message_text: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def _assess_suicidal_ideation(self, message_text: str, context: Dict[str, Any],
+                                        analysis_cache: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Assess suicidal ideation risk factor using LLM contextual analysis.
         
@@ -443,7 +472,7 @@ Respond in JSON format only:
         
         # Use LLM for contextual analysis
         try:
-            llm_analysis = await self._analyze_contextual_risk(message_text, context)
+            llm_analysis = await self._get_contextual_analysis(message_text, context, analysis_cache)
             si_analysis = llm_analysis.get("suicidal_ideation", {})
             
             if not si_analysis.get("present", False):
@@ -473,7 +502,9 @@ Respond in JSON format only:
                 }
             return None
     
-    async def _assess_depression_severity(self, student_id: str, message_text: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def _assess_depression_severity(self, student_id: str, message_text: str, context: Dict[str, Any],
+                                          analysis_cache: Optional[Dict[str, Any]] = None,
+                                          snapshot=None) -> Optional[Dict[str, Any]]:
         """
         Assess depression severity risk factor using validated assessments or LLM contextual analysis.
         
@@ -488,7 +519,7 @@ Respond in JSON format only:
         - Does NOT replace validated assessments with LLM estimates
         """
         # Priority 1: Get latest validated PHQ-9 score if available
-        latest_assessment = self._get_latest_assessment(student_id, "PHQ9")
+        latest_assessment = await self._get_latest_assessment(student_id, "PHQ9", snapshot)
         
         if latest_assessment:
             return {
@@ -500,7 +531,7 @@ Respond in JSON format only:
         # Priority 2: Use LLM for contextual analysis if available
         if self.llm:
             try:
-                llm_analysis = await self._analyze_contextual_risk(message_text, context)
+                llm_analysis = await self._get_contextual_analysis(message_text, context, analysis_cache)
                 dep_analysis = llm_analysis.get("depression_indicators", {})
                 
                 if dep_analysis.get("severity_estimate") and dep_analysis.get("severity_estimate") != "LOW":
@@ -723,37 +754,39 @@ Respond in JSON format only:
             priority_score=priority_score
         )
     
-    def get_current_risk_profile(self, student_id: str) -> Dict[str, Any]:
-        """Get current risk profile from database."""
+    async def get_current_risk_profile(self, student_id: str, snapshot=None) -> Dict[str, Any]:
+        """Get current risk profile from the snapshot when given, otherwise from the database."""
         from app.models.assessment import RiskProfile
         
+        if snapshot is not None and snapshot.covers(student_id):
+            return self._profile_summary(snapshot.latest_risk_profile)
+        
         try:
             logger.debug("querying_risk_profile",
                         student_id=student_id)
             
-            profile = self.db.query(RiskProfile).filter(
-                RiskProfile.student_id == student_id
-            ).order_by(RiskProfile.calculated_at.desc()).first()
+            profile = await self.db.scalar(
+                select(RiskProfile).where(
+                    RiskProfile.student_id == student_id
+                ).order_by(RiskProfile.calculated_at.desc()).limit(1)
+            )
             
             if profile:
                 logger.info("risk_profile_found",
                            student_id=student_id,
                            overall_risk=profile.overall_risk,
                            calculated_at=profile.calculated_at.isoformat())
-                return {
-                    "overall_risk": profile.overall_risk,
-                    "confidence": profile.confidence,
-                    "risk_factors": profile.risk_factors,
-                    "calculated_at": profile.calculated_at.isoformat()
-                }
+                return self._profile_summary(profile)
             
             logger.warning("no_risk_profile_found",
                           student_id=student_id)
             
             # Check if any profiles exist for this student at all
-            count = self.db.query(RiskProfile).filter(
-                RiskProfile.student_id == student_id
-            ).count()
+            count = await self.db.scalar(
+                select(func.count()).select_from(RiskProfile).where(
+                    RiskProfile.student_id == student_id
+                )
+            )
             logger.debug("risk_profile_count",
                         student_id=student_id,
                         total_profiles=count)
@@ -767,22 +800,37 @@ Respond in JSON format only:
                         exc_info=True)
             return {}
     
-    def _get_latest_assessment(self, student_id: str, assessment_type: str):
+    def _profile_summary(self, profile) -> Dict[str, Any]:
+        """Current risk profile in the shape used as pipeline context ({} when none)."""
+        if not profile:
+            return {}
+        return {
+            "overall_risk": profile.overall_risk,
+            "confidence": profile.confidence,
+            "risk_factors": profile.risk_factors,
+            "calculated_at": profile.calculated_at.isoformat()
+        }
+    
+    async def _get_latest_assessment(self, student_id: str, assessment_type: str, snapshot=None):
         """Get latest assessment of given type."""
         from app.models.assessment import Assessment
+        from app.services.analysis.context_snapshot import SNAPSHOT_ASSESSMENT_TYPES
+        
+        if snapshot is not None and snapshot.covers(student_id) and assessment_type in SNAPSHOT_ASSESSMENT_TYPES:
+            return snapshot.latest_assessment(assessment_type)
         
-        return self.db.query(Assessment).filter(
-            Assessment.student_id == student_id,
-            Assessment.assessment_type == assessment_type
-        ).order_by(Assessment.administered_at.desc()).first()
+        return await self.db.scalar(
+            select(Assessment).where(
+                Assessment.student_id == student_id,
+                Assessment.assessment_type == assessment_type
+            ).order_by(Assessment.administered_at.desc()).limit(1)
+        )
     
-    def _ensure_student_exists(self, student_id: str):
+    async def _ensure_student_exists(self, student_id: str, snapshot=None):
         """Ensure student record exists in database."""
         from app.models.student import Student
         
-        student = self.db.query(Student).filter(
-            Student.student_id == student_id
-        ).first()
+        student = await get_student(self.db, student_id, snapshot)
         
         if not student:
             student = Student(
@@ -791,38 +839,42 @@ Respond in JSON format only:
                 session_count=0
             )
             self.db.add(student)
-            self.db.commit()
+            await unit_of_work.commit(self.db)
+            if snapshot is not None and snapshot.covers(student_id):
+                snapshot.student = student
             logger.info("created_student", student_id=student_id)
     
-    def _save_risk_profile(self, risk_profile: RiskProfile):
-        """Save risk profile to database."""
+    async def _save_risk_profile(self, risk_profile: RiskProfile, snapshot=None):
+        """Save risk profile to database and return the stored row."""
         from app.models.assessment import RiskProfile as RiskProfileModel
         
         try:
-            # Ensure student exists before saving risk profile
-            self._ensure_student_exists(risk_profile.student_id)
-            
-            db_profile = RiskProfileModel(
-                student_id=risk_profile.student_id,
-                overall_risk=risk_profile.overall_risk.value,
-                confidence=risk_profile.confidence,
-                risk_factors=risk_profile.risk_factors.dict(),
-                recommended_action=risk_profile.recommended_action,
-                calculated_at=risk_profile.calculated_at
-            )
-            
-            self.db.add(db_profile)
-            self.db.commit()
+            # Savepoint so a failed save doesn't roll back the turn's other writes
+            async with unit_of_work.savepoint(self.db):
+                # Ensure student exists before saving risk profile
+                await self._ensure_student_exists(risk_profile.student_id, snapshot)
+                
+                db_profile = RiskProfileModel(
+                    student_id=risk_profile.student_id,
+                    overall_risk=risk_profile.overall_risk.value,
+                    confidence=risk_profile.confidence,
+                    risk_factors=risk_profile.risk_factors.dict(),
+                    recommended_action=risk_profile.recommended_action,
+                    calculated_at=risk_profile.calculated_at
+                )
+                
+                self.db.add(db_profile)
+                await unit_of_work.commit(self.db)
             logger.info("risk_profile_saved", 
                        student_id=risk_profile.student_id,
                        overall_risk=risk_profile.overall_risk.value,
                        confidence=risk_profile.confidence)
+            return db_profile
         except Exception as e:
             logger.error("risk_profile_save_failed",
                         student_id=risk_profile.student_id,
                         error=str(e),
                         error_type=type(e).__name__)
-            self.db.rollback()
             raise
 
 
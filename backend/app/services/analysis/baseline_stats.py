@@ -0,0 +1,224 @@
+"""Bounded streaming statistics for Student.baseline_profile."""
+import copy
+import math
+from typing import Any, Dict, Iterable, List, Optional
+from app.core.config import settings
+
+# Version 1 kept every sample in unbounded lists; version 2 keeps accumulators
+SCHEMA_VERSION = 2
+
+# Passive monitoring's sentiment scale (typical_sentiment); very_* labels score 0 as they always have
+SENTIMENT_SCORES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+# Adaptive sensitivity's mood scale (mood_distribution)
+MOOD_SCORES = {"very_negative": -2.0, "negative": -1.0, "neutral": 0.0, "positive": 1.0, "very_positive": 2.0}
+
+
+def welford_update(acc: Dict[str, float], value: float) -> Dict[str, float]:
+    """Add one sample to a {"n", "mean", "m2"} accumulator in place (Welford's algorithm)."""
+    acc["n"] = acc.get("n", 0) + 1
+    delta = value - acc.get("mean", 0.0)
+    acc["mean"] = acc.get("mean", 0.0) + delta / acc["n"]
+    acc["m2"] = acc.get("m2", 0.0) + delta * (value - acc["mean"])
+    return acc
+
+
+def welford_mean(acc: Optional[Dict[str, float]]) -> Optional[float]:
+    return acc["mean"] if acc and acc.get("n") else None
+
+
+def welford_variance(acc: Optional[Dict[str, float]]) -> Optional[float]:
+    """Population variance (what the per-list statistics used to compute)."""
+    return acc["m2"] / acc["n"] if acc and acc.get("n") else None
+
+
+def ring_push(ring: List[Any], item: Any, size: Optional[int] = None) -> List[Any]:
+    """Append to a list kept at the newest size items (in place)."""
+    ring.append(item)
+    del ring[:-(size or settings.baseline_recent_samples)]
+    return ring
+
+
+def decay_add(histogram: Dict[str, float], keys: Iterable[str], decay: Optional[float] = None,
+              max_keys: Optional[int] = None) -> Dict[str, float]:
+    """
+    Decay every count, then add one to each distinct key (in place).
+
+    Counts settle near 1 / (1 - decay) for a key seen every time, so old
+    habits fade; only the max_keys largest keys are kept.
+    """
+    decay = settings.baseline_histogram_decay if decay is None else decay
+    max_keys = max_keys or settings.baseline_histogram_max_keys
+    for key in histogram:
+        histogram[key] *= decay
+    for key in dict.fromkeys(keys):
+        histogram[key] = histogram.get(key, 0.0) + 1.0
+    if len(histogram) > max_keys:
+        for key in sorted(histogram, key=histogram.get)[:len(histogram) - max_keys]:
+            del histogram[key]
+    return histogram
+
+
+def record_message(profile: Dict[str, Any], message_length: int, emoji_count: int, sentiment: str,
+                   mood: str, contains_humor: bool, at: str) -> Dict[str, Any]:
+    """Passive monitoring: fold one message into a version 2 profile (in place)."""
+    welford_update(profile.setdefault("message_length", {}), message_length)
+    welford_update(profile.setdefault("emoji_per_message", {}), emoji_count)
+    welford_update(profile.setdefault("mood", {}), SENTIMENT_SCORES.get(mood, 0.0))
+    welford_update(profile.setdefault("mood_scale", {}), MOOD_SCORES.get(mood, 0.0))
+    if contains_humor:
+        profile["humor_messages"] = profile.get("humor_messages", 0) + 1
+        ring_push(profile.setdefault("humor_indicators", []), at)
+
+    ring_push(profile.setdefault("language_patterns", []), {
+        "timestamp": at,
+        "message_length": message_length,
+        "emoji_count": emoji_count,
+        "sentiment": sentiment
+    })
+    ring_push(profile.setdefault("mood_samples", []), {"timestamp": at, "mood": mood})
+    return profile
+
+
+def record_emojis(profile: Dict[str, Any], emojis: List[str], emoji_function: Optional[str]) -> Dict[str, Any]:
+    """Emoji analysis: fold one message's emojis into a version 2 profile (in place)."""
+    emoji_baseline = profile.setdefault("emoji_baseline", {})
+    usage = welford_update(emoji_baseline.setdefault("emoji_per_message", {}), len(emojis))
+    emoji_baseline["avg_emoji_per_message"] = usage["mean"]
+    ring_push(emoji_baseline.setdefault("recent_counts", []), len(emojis))
+
+    # Messages without emojis have no function and leave the histograms alone
+    if emojis:
+        # Each emoji counts once per message however often it repeats
+        decay_add(emoji_baseline.setdefault("common_emojis", {}), emojis)
+        decay_add(emoji_baseline.setdefault("function_distribution", {}), [emoji_function or "ambiguous"])
+    return profile
+
+
+def statistics(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary statistics of a version 2 profile, read straight off its accumulators."""
+    stats = {}
+
+    # Communication style statistics
+    messages = profile.get("message_length", {}).get("n", 0)
+    if messages:
+        stats["total_messages"] = messages
+        stats["avg_message_length"] = welford_mean(profile["message_length"])
+        stats["emoji_usage_rate"] = welford_mean(profile.get("emoji_per_message")) or 0
+
+    # Emotional baseline statistics
+    mood = profile.get("mood")
+    if mood and mood.get("n"):
+        stats["typical_sentiment"] = welford_mean(mood)
+        stats["sentiment_variance"] = welford_variance(mood)
+        stats["typical_emotionality"] = abs(stats["typical_sentiment"])  # How emotional (regardless of direction)
+
+    # Humor/sarcasm frequency
+    if messages:
+        stats["sarcasm_frequency"] = profile.get("humor_messages", 0) / messages
+        stats["dark_humor_baseline"] = stats["sarcasm_frequency"] > 0.3  # If >30% humor
+
+    # Engagement statistics (if available)
+    if profile.get("session_length", {}).get("n"):
+        stats["typical_session_length"] = welford_mean(profile["session_length"])
+
+    # Common themes (would be extracted from message content)
+    stats["common_themes"] = profile.get("common_themes", [])
+    return stats
+
+
+def mood_distribution(profile: Optional[Dict[str, Any]]) -> Optional[Dict[str, float]]:
+    """{"n", "mean", "std"} of the profile's MOOD_SCORES, or None before any sample."""
+    mood = current(profile).get("mood_scale")
+    if not mood or not mood.get("n"):
+        return None
+    return {"n": mood["n"], "mean": welford_mean(mood), "std": math.sqrt(welford_variance(mood))}
+
+
+def current(profile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    A version 2 copy of a stored profile, safe to update and assign back.
+
+    Version 1 profiles (rows not yet compacted by the migration) are
+    compacted on the way.
+    """
+    if not profile:
+        return {"schema_version": SCHEMA_VERSION}
+    if profile.get("schema_version") == SCHEMA_VERSION:
+        return copy.deepcopy(profile)
+    return compact(profile)
+
+
+def compact(profile: Dict[str, Any], recent_samples: Optional[int] = None, decay: Optional[float] = None,
+            max_keys: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Version 2 profile from a version 1 one (sample lists), keeping every
+    other key as is.
+
+    Lists are folded into accumulators and trimmed to the newest
+    recent_samples; raw emoji counts are scaled down to the decayed
+    histograms' steady-state total so new messages still move them.
+    """
+    recent_samples = recent_samples or settings.baseline_recent_samples
+    decay = settings.baseline_histogram_decay if decay is None else decay
+    max_keys = max_keys or settings.baseline_histogram_max_keys
+    profile = copy.deepcopy(profile)
+
+    language_patterns = profile.pop("language_patterns", None) or []
+    if language_patterns:
+        message_length, emoji_per_message = {}, {}
+        for pattern in language_patterns:
+            welford_update(message_length, pattern.get("message_length", 0))
+            welford_update(emoji_per_message, pattern.get("emoji_count", 0))
+        profile["message_length"] = message_length
+        profile["emoji_per_message"] = emoji_per_message
+        profile["language_patterns"] = language_patterns[-recent_samples:]
+
+    mood_samples = profile.pop("mood_samples", None) or []
+    if mood_samples:
+        mood, mood_scale = {}, {}
+        for sample in mood_samples:
+            welford_update(mood, SENTIMENT_SCORES.get(sample.get("mood", "neutral"), 0.0))
+            welford_update(mood_scale, MOOD_SCORES.get(sample.get("mood", "neutral"), 0.0))
+        profile["mood"] = mood
+        profile["mood_scale"] = mood_scale
+        profile["mood_samples"] = mood_samples[-recent_samples:]
+
+    humor_indicators = profile.pop("humor_indicators", None) or []
+    if humor_indicators:
+        profile["humor_messages"] = len(humor_indicators)
+        profile["humor_indicators"] = humor_indicators[-recent_samples:]
+
+    session_lengths = profile.pop("session_lengths", None) or []
+    if session_lengths:
+        session_length = {}
+        for length in session_lengths:
+            welford_update(session_length, length)
+        profile["session_length"] = session_length
+
+    emoji_baseline = profile.get("emoji_baseline")
+    if emoji_baseline:
+        emoji_counts = emoji_baseline.pop("emoji_count", None) or []
+        if emoji_counts:
+            usage = {}
+            for count in emoji_counts:
+                welford_update(usage, count)
+            emoji_baseline["emoji_per_message"] = usage
+            emoji_baseline["avg_emoji_per_message"] = usage["mean"]
+            emoji_baseline["recent_counts"] = emoji_counts[-recent_samples:]
+        for name in ("common_emojis", "function_distribution"):
+            if isinstance(emoji_baseline.get(name), dict):
+                emoji_baseline[name] = _steady_state(emoji_baseline[name], decay, max_keys)
+
+    if "statistics" in profile:
+        profile["statistics"] = statistics(profile)
+    profile["schema_version"] = SCHEMA_VERSION
+    return profile
+
+
+def _steady_state(counts: Dict[str, float], decay: float, max_keys: int) -> Dict[str, float]:
+    """Raw counts scaled to at most the decayed histogram total, largest max_keys kept."""
+    total = sum(counts.values())
+    limit = 1.0 / (1.0 - decay) if decay < 1.0 else total
+    scale = limit / total if total > limit else 1.0
+    largest = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:max_keys]
+    return {key: count * scale for key, count in largest}
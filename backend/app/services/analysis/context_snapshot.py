@@ -0,0 +1,130 @@
+"""Per-message context snapshot shared by the pipeline services."""
+from typing import Dict, Any, Optional, List
+from datetime import datetime, timedelta
+from sqlalchemy import select, or_, func
+import structlog
+
+logger = structlog.get_logger()
+
+# Validated assessments the pipeline reads (RiskCalculator uses PHQ9 today)
+SNAPSHOT_ASSESSMENT_TYPES = ("PHQ9", "GAD7", "C_SSRS")
+
+
+class ContextSnapshot:
+    """
+    Everything the pipeline reads about a student, loaded once per message.
+
+    ORM rows stay attached to the session that loaded them, so services that
+    update the student (emoji baseline, session count) write through the
+    same object instead of re-fetching it.
+    """
+
+    def __init__(self, student_id: str, student=None, recent_analyses: Optional[List] = None,
+                 risk_history: Optional[List] = None, latest_risk_profile=None,
+                 latest_assessments: Optional[Dict[str, Any]] = None, risk_history_days: int = 30):
+        self.student_id = student_id
+        self.student = student
+        self.recent_analyses = recent_analyses or []  # Newest first
+        self.risk_history = risk_history or []  # Oldest first, within risk_history_days
+        self.latest_risk_profile = latest_risk_profile  # Newest overall, may predate the window
+        self.latest_assessments = latest_assessments or {}
+        self.risk_history_days = risk_history_days
+
+    def latest_assessment(self, assessment_type: str):
+        """Latest assessment of the given type, or None."""
+        return self.latest_assessments.get(assessment_type)
+
+    def covers(self, student_id: str) -> bool:
+        """Whether this snapshot was loaded for student_id."""
+        return self.student_id == student_id
+
+
+class ContextSnapshotLoader:
+    """
+    Loads a ContextSnapshot in four queries.
+
+    What This Loader Does:
+    - Fetches the student, the last N message analyses, the risk history
+      (plus the latest profile when it is older than the window) and the
+      latest PHQ-9/GAD-7/C-SSRS, one query each
+
+    What This Loader Does NOT Do:
+    - Does NOT refresh the snapshot after pipeline writes (rows written during
+      the turn are not part of the context the turn was analysed against)
+    """
+
+    def __init__(self, db_session, history_limit: int = 10, risk_history_days: int = 30):
+        self.db = db_session
+        self.history_limit = history_limit
+        self.risk_history_days = risk_history_days
+
+    async def load(self, student_id: str) -> ContextSnapshot:
+        """Load the snapshot for one message."""
+        from app.models.student import Student
+        from app.models.analysis import MessageAnalysis as MessageAnalysisModel
+        from app.models.assessment import RiskProfile, Assessment
+
+        student = await self.db.scalar(select(Student).where(Student.student_id == student_id))
+
+        recent_analyses = (await self.db.scalars(
+            select(MessageAnalysisModel).where(
+                MessageAnalysisModel.student_id == student_id
+            ).order_by(MessageAnalysisModel.created_at.desc()).limit(self.history_limit)
+        )).all()
+
+        # Risk history window plus the latest profile in one query
+        cutoff = datetime.utcnow() - timedelta(days=self.risk_history_days)
+        latest_profile_id = select(RiskProfile.id).where(
+            RiskProfile.student_id == student_id
+        ).order_by(RiskProfile.calculated_at.desc()).limit(1).scalar_subquery()
+        profiles = (await self.db.scalars(
+            select(RiskProfile).where(
+                RiskProfile.student_id == student_id,
+                or_(RiskProfile.calculated_at >= cutoff, RiskProfile.id == latest_profile_id)
+            ).order_by(RiskProfile.calculated_at.asc())
+        )).all()
+
+        # Latest assessment per type in one query
+        ranked = select(
+            Assessment.id,
+            func.row_number().over(
+                partition_by=Assessment.assessment_type,
+                order_by=Assessment.administered_at.desc()
+            ).label("rank")
+        ).where(
+            Assessment.student_id == student_id,
+            Assessment.assessment_type.in_(SNAPSHOT_ASSESSMENT_TYPES)
+        ).subquery()
+        assessments = (await self.db.scalars(
+            select(Assessment).join(ranked, ranked.c.id == Assessment.id).where(ranked.c.rank == 1)
+        )).all()
+
+        snapshot = ContextSnapshot(
+            student_id=student_id,
+            student=student,
+            recent_analyses=list(recent_analyses),
+            risk_history=[p for p in profiles if p.calculated_at >= cutoff],
+            latest_risk_profile=profiles[-1] if profiles else None,
+            latest_assessments={a.assessment_type: a for a in assessments},
+            risk_history_days=self.risk_history_days
+        )
+
+        logger.debug("context_snapshot_loaded",
+                    student_id=student_id,
+                    student_found=student is not None,
+                    analyses=len(snapshot.recent_analyses),
+                    risk_history=len(snapshot.risk_history),
+                    assessments=list(snapshot.latest_assessments))
+        return snapshot
+
+
+async def get_student(db_session, student_id: str, snapshot: Optional[ContextSnapshot] = None):
+    """Student row from the snapshot when it has one, otherwise from the database."""
+    if snapshot is not None and snapshot.covers(student_id) and snapshot.student is not None:
+        return snapshot.student
+
+    from app.models.student import Student
+    student = await db_session.scalar(select(Student).where(Student.student_id == student_id))
+    if snapshot is not None and snapshot.covers(student_id):
+        snapshot.student = student
+    return student
@@ -0,0 +1,121 @@
+"""Per-session conversation memory: recent turns verbatim, older turns summarized."""
+from typing import Dict, Any, Optional, List
+from app.core.config import settings
+from app.services.analysis.prompt_builder import estimate_tokens, truncate_to_tokens
+import structlog
+
+logger = structlog.get_logger()
+
+
+def has_memory(session) -> bool:
+    """Whether the session has recorded turns (sessions from before memory existed do not)."""
+    return session is not None and bool(session.recent_turns or session.conversation_summary)
+
+
+def seed_turns(conversation_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turns for a new session, from the student's earlier history (oldest first)."""
+    return [
+        {"turn": i, "user": h.get("message_text") or "", "assistant": h.get("response_text"),
+         "at": h.get("created_at")}
+        for i, h in enumerate(conversation_history, start=1)
+    ]
+
+
+def record_turn(session, message_text: str, response_text: Optional[str], at: str,
+                window: Optional[int] = None) -> bool:
+    """
+    Append one turn to the session's window.
+
+    Turns already folded into the summary are dropped from the window.
+    Returns True when more than `window` turns remain, i.e. the oldest
+    ones are waiting to be summarized.
+    """
+    window = window or settings.conversation_memory_turns
+    turn_count = (session.turn_count or 0) + 1
+    summarized = session.summarized_turns or 0
+    turns = [t for t in (session.recent_turns or []) if t["turn"] > summarized]
+    turns.append({"turn": turn_count, "user": message_text, "assistant": response_text, "at": at})
+
+    session.recent_turns = turns
+    session.turn_count = turn_count
+    return len(turns) > window
+
+
+def turns_to_fold(session, window: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Unsummarized turns older than the newest `window` turns."""
+    window = window or settings.conversation_memory_turns
+    summarized = session.summarized_turns or 0
+    turns = [t for t in (session.recent_turns or []) if t["turn"] > summarized]
+    return turns[:-window] if len(turns) > window else []
+
+
+def history_from_session(session, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """The session's newest turns in the conversation_history shape (oldest first)."""
+    limit = limit or settings.conversation_memory_turns
+    summarized = session.summarized_turns or 0
+    turns = [t for t in (session.recent_turns or []) if t["turn"] > summarized][-limit:]
+    return [
+        {"message_text": t["user"], "response_text": t["assistant"], "created_at": t["at"]}
+        for t in turns
+    ]
+
+
+class ConversationSummarizer:
+    """
+    Folds turns that leave the recent window into the session's running summary.
+
+    What This Summarizer Does:
+    - Asks the LLM to update the previous summary with the new turns,
+      keeping mood, stressors, coping and any safety-relevant statements
+    - Caps the summary at settings.conversation_summary_max_tokens
+    - Falls back to an extractive summary (the student's own words,
+      shortened) when the LLM is unavailable, so memory keeps advancing
+
+    What This Summarizer Does NOT Do:
+    - Does NOT write to the database (app.tasks.conversation_summary does)
+    """
+
+    def __init__(self, llm_client, max_tokens: Optional[int] = None):
+        self.llm = llm_client
+        self.max_tokens = max_tokens or settings.conversation_summary_max_tokens
+
+    async def fold(self, summary: Optional[str], turns: List[Dict[str, Any]]) -> str:
+        if self.llm:
+            try:
+                response = await self.llm.generate(
+                    self._build_prompt(summary, turns),
+                    max_tokens=self.max_tokens,
+                    call_site="summary"
+                )
+                return truncate_to_tokens(response.strip(), self.max_tokens)
+            except Exception as e:
+                logger.warning("conversation_summary_llm_failed",
+                              error=str(e),
+                              error_type=type(e).__name__)
+        return self._extractive(summary, turns)
+
+    def _extractive(self, summary: Optional[str], turns: List[Dict[str, Any]]) -> str:
+        said = "; ".join(t["user"][:80] for t in turns if t.get("user"))
+        text = f"{summary} Student later said: {said}" if summary else f"Student said: {said}"
+        # Over the cap: drop the oldest words (every word costs at least one token)
+        words = text.split()
+        excess = estimate_tokens(text) - self.max_tokens
+        while excess > 0 and words:
+            words = words[excess:]
+            excess = estimate_tokens(" ".join(words)) - self.max_tokens
+        return " ".join(words)
+
+    def _build_prompt(self, summary: Optional[str], turns: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(
+            f"Student: {t['user']}" + (f"\nAssistant: {t['assistant']}" if t.get("assistant") else "")
+            for t in turns
+        )
+        return f"""Update the running summary of a conversation between a student and a supportive mental health assistant.
+
+Previous summary:
+{summary or "None yet."}
+
+New turns:
+{transcript}
+
+Write one short paragraph (under {self.max_tokens // 2} words) covering the student's mood, stressors, coping, plans and anything safety-relevant they said. Keep earlier facts that still matter. Respond with the summary only."""
@@ -1,6 +1,12 @@
 """Solution 5: Contextual Emoji Understanding."""
-from typing import Dict, Any, Optional
+from collections import Counter
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+from app.core.metrics import EMOJI_ANALYSES
 from app.schemas.message import EmojiAnalysis
+from app.services.analysis import baseline_stats
+from app.services.analysis.context_snapshot import get_student
+from app.services.analysis.emoji_lexicon import EmojiLexicon, extract_emojis, get_emoji_lexicon
 import json
 import structlog
 
@@ -8,30 +14,75 @@ logger = structlog.get_logger()
 
 
 class EmojiAnalyzer:
-    """LLM-based emoji interpretation with personal baselines."""
+    """
+    Emoji interpretation with personal baselines, in three tiers.
     
-    def __init__(self, llm_client, db_session):
+    What This Analyzer Does:
+    - none: messages without emojis return immediately (no LLM, no lexicon)
+    - lexicon: messages whose emojis are all in the bundled emoji lexicon are
+      scored locally from the lexicon and the student's emoji baseline
+    - llm: the LLM is asked only about unknown emojis, text/emoji
+      contradictions and humor or ambiguous emojis on text that is not
+      positive ("nobody would even miss me 😂"), where context matters
+    - Counts analyses per tier (emoji_analysis_total) so avoided LLM calls show up
+    
+    What This Analyzer Does NOT Do:
+    - Does NOT commit; the baseline change is written with the turn's other writes
+    """
+    
+    def __init__(self, llm_client, db_session, lexicon: Optional[EmojiLexicon] = None):
         self.llm = llm_client
         self.db = db_session
+        self.lexicon = lexicon or get_emoji_lexicon()
     
     async def analyze(self, student_id: str, message_text: str, 
-                     context: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze emoji usage in message."""
+                     context: Dict[str, Any], snapshot=None) -> Dict[str, Any]:
+        """Analyze emoji usage in message (snapshot: per-message ContextSnapshot, if loaded)."""
+        # Reuse the consolidated analysis when checkpoint 4 already ran it
+        structured = context.get("structured_analysis")
+        if structured:
+            from app.services.analysis.structured_analysis import StructuredAnalysisEngine
+            analysis = StructuredAnalysisEngine.emoji_section(structured)
+            await self._update_baseline(student_id, message_text, analysis, snapshot)
+            EMOJI_ANALYSES.labels(tier="structured").inc()
+            return analysis
+        
+        emojis = extract_emojis(message_text)
+        
+        # Tier 1: nothing to interpret
+        if settings.emoji_fast_path and not emojis:
+            analysis = self._no_emoji_analysis()
+            await self._update_baseline(student_id, message_text, analysis, snapshot)
+            EMOJI_ANALYSES.labels(tier="none").inc()
+            return analysis
+        
         # Get student's emoji baseline
-        baseline = self._get_emoji_baseline(student_id)
+        baseline = await self._get_emoji_baseline(student_id, snapshot)
+        
+        # Tier 2: known emojis whose meaning is clear from the lexicon and baseline
+        if settings.emoji_fast_path:
+            analysis = self._lexicon_analysis(message_text, emojis, baseline)
+            if analysis is not None:
+                await self._update_baseline(student_id, message_text, analysis, snapshot)
+                EMOJI_ANALYSES.labels(tier="lexicon").inc()
+                return analysis
+        
+        # Tier 3: unknown emojis or a text/emoji contradiction
+        EMOJI_ANALYSES.labels(tier="llm").inc()
         
         # Build prompt for LLM analysis
         prompt = self._build_emoji_analysis_prompt(message_text, baseline, context)
         
         try:
             # Get LLM analysis
-            response = await self.llm.generate(prompt)
+            response = await self.llm.generate(prompt, call_site="emoji")
             
             # Parse JSON response
             analysis = json.loads(response)
+            analysis["tier"] = "llm"
             
             # Update baseline if needed
-            self._update_baseline(student_id, message_text, analysis)
+            await self._update_baseline(student_id, message_text, analysis, snapshot)
             
             return analysis
         except Exception as e:
@@ -43,6 +94,80 @@ class EmojiAnalyzer:
                 "emoji_function": "ambiguous"
             }
     
+    def _no_emoji_analysis(self) -> Dict[str, Any]:
+        return {
+            "genuine_distress": False,
+            "confidence": 1.0,
+            "reasoning": "No emojis in message",
+            "emoji_function": "none",
+            "emoji_context": {"emojis_found": [], "text_emoji_alignment": "neutral"},
+            "tier": "none"
+        }
+    
+    def _lexicon_analysis(self, message_text: str, emojis: List[str],
+                          baseline: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Local analysis, or None when the LLM should decide (unknown emoji or contradiction)."""
+        entries = [self.lexicon.lookup(emoji) for emoji in emojis]
+        if any(entry is None for entry in entries):
+            return None
+        
+        sentiment = sum(entry["sentiment"] for entry in entries) / len(entries)
+        functions = Counter(entry["function"] for entry in entries)
+        emoji_function = functions.most_common(1)[0][0]
+        text_polarity = self.lexicon.text_polarity(message_text)
+        
+        # Humor and ambiguous emojis can mask ideation ("nobody would even miss me 😂");
+        # the cue words cannot rule that out, so only positive text is scored locally
+        if text_polarity <= 0 and any(entry["function"] in ("humor", "ambiguous") for entry in entries):
+            return None
+        
+        # An ambiguous emoji the student habitually uses one way takes that meaning
+        typical_function = self._typical_function(baseline)
+        familiar = all(self._use_count(baseline, emoji) >= 3 for emoji in emojis)
+        habitual_humor = emoji_function == "ambiguous" and familiar and typical_function == "humor"
+        if emoji_function == "ambiguous" and familiar and typical_function:
+            emoji_function = typical_function
+        
+        # A habitual joke emoji ("finally done 😭") does not contradict positive text
+        contradicts = (text_polarity < 0 and sentiment > 0.2) or (text_polarity > 0 and sentiment < -0.2)
+        if contradicts and not habitual_humor:
+            return None
+        
+        alignment = "neutral" if text_polarity == 0 else "amplifies"
+        
+        genuine_distress = (
+            emoji_function in ("literal", "emphasis", "ambiguous") and sentiment <= -0.5 and text_polarity <= 0
+        )
+        confidence = min(0.6 + 0.2 * abs(sentiment) + (0.1 if familiar else 0.0), 0.9)
+        
+        return {
+            "genuine_distress": genuine_distress,
+            "confidence": round(confidence, 2),
+            "reasoning": f"Emoji lexicon v{self.lexicon.version}: mean sentiment {sentiment:+.2f}, "
+                         f"{emoji_function} use, text {('negative', 'neutral', 'positive')[text_polarity + 1]}",
+            "emoji_function": emoji_function,
+            "emoji_context": {"emojis_found": emojis, "text_emoji_alignment": alignment},
+            "tier": "lexicon"
+        }
+    
+    @staticmethod
+    def _typical_function(baseline: Dict[str, Any]) -> Optional[str]:
+        """The student's usual emoji function, if one clearly dominates (60%+ of 5+ messages)."""
+        distribution = {
+            function: count for function, count in (baseline.get("function_distribution") or {}).items()
+            if function not in ("none", "ambiguous")
+        }
+        total = sum((baseline.get("function_distribution") or {}).values())
+        if not distribution or total < 5:
+            return None
+        function, count = max(distribution.items(), key=lambda item: item[1])
+        return function if count / total >= 0.6 else None
+    
+    @staticmethod
+    def _use_count(baseline: Dict[str, Any], emoji: str) -> int:
+        common = baseline.get("common_emojis") or {}
+        return common.get(emoji, 0) if isinstance(common, dict) else 0
+    
     def _build_emoji_analysis_prompt(self, message_text: str, baseline: Dict[str, Any],
                                     context: Dict[str, Any]) -> str:
         """Build prompt for emoji analysis."""
@@ -81,69 +206,28 @@ Respond in JSON format:
 }}
 """
     
-    def _get_emoji_baseline(self, student_id: str) -> Dict[str, Any]:
+    async def _get_emoji_baseline(self, student_id: str, snapshot=None) -> Dict[str, Any]:
         """Get student's emoji usage baseline."""
-        from app.models.student import Student
-        
-        student = self.db.query(Student).filter(Student.student_id == student_id).first()
+        student = await get_student(self.db, student_id, snapshot)
         if not student or not student.baseline_profile:
             return {}
         
         return student.baseline_profile.get("emoji_baseline", {})
     
-    def _update_baseline(self, student_id: str, message_text: str, analysis: Dict[str, Any]):
-        """Update student's emoji baseline."""
-        from app.models.student import Student
-        
-        student = self.db.query(Student).filter(Student.student_id == student_id).first()
+    async def _update_baseline(self, student_id: str, message_text: str, analysis: Dict[str, Any],
+                               snapshot=None):
+        """Update student's emoji baseline (fixed-size accumulators; see baseline_stats)."""
+        student = await get_student(self.db, student_id, snapshot)
         if not student:
             return
         
-        baseline = student.baseline_profile or {}
-        emoji_baseline = baseline.get("emoji_baseline", {})
-        
-        # Extract emojis from message
-        emojis = self._extract_emojis(message_text)
-        
-        # Update frequency
-        if "emoji_count" not in emoji_baseline:
-            emoji_baseline["emoji_count"] = []
-        emoji_baseline["emoji_count"].append(len(emojis))
+        baseline = baseline_stats.current(student.baseline_profile)
+        baseline_stats.record_emojis(baseline, self._extract_emojis(message_text),
+                                     analysis.get("emoji_function", "ambiguous"))
         
-        # Update common emojis
-        if "common_emojis" not in emoji_baseline:
-            emoji_baseline["common_emojis"] = {}
-        for emoji in emojis:
-            emoji_baseline["common_emojis"][emoji] = emoji_baseline["common_emojis"].get(emoji, 0) + 1
-        
-        # Update typical function
-        emoji_function = analysis.get("emoji_function", "ambiguous")
-        if "function_distribution" not in emoji_baseline:
-            emoji_baseline["function_distribution"] = {}
-        emoji_baseline["function_distribution"][emoji_function] = \
-            emoji_baseline["function_distribution"].get(emoji_function, 0) + 1
-        
-        baseline["emoji_baseline"] = emoji_baseline
+        # No commit here: the row is flushed and committed with the turn's other writes
         student.baseline_profile = baseline
-        
-        self.db.commit()
     
     def _extract_emojis(self, text: str) -> list:
-        """Extract emojis from text."""
-        import re
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # emoticons
-            "\U0001F300-\U0001F5FF"  # symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # transport & map symbols
-            "\U0001F1E0-\U0001F1FF"  # flags
-            "\U00002702-\U000027B0"
-            "\U000024C2-\U0001F251"
-            "]+",
-            flags=re.UNICODE
-        )
-        return emoji_pattern.findall(text)
-
-
-
-
+        """Extract emojis from text (module-level precompiled pattern)."""
+        return extract_emojis(text)
@@ -0,0 +1,87 @@
+"""Versioned emoji sentiment/function lexicon for the local emoji tier."""
+import json
+import re
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+import structlog
+
+logger = structlog.get_logger()
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent.parent
+DEFAULT_LEXICON_PATH = Path(__file__).resolve().parent / "lexicons" / "emoji_lexicon.json"
+
+# One emoji per match: pictographs (skin-tone modifiers excluded), dingbats and
+# misc symbols, regional-indicator flags and a few standalone symbols
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F300-\U0001F3FA"
+    "\U0001F400-\U0001FAFF"
+    "\U00002600-\U000027BF"
+    "\U0001F1E6-\U0001F1FF"
+    "\U00002B50\U00002B55\U0000231A\U0000231B\U000023E9-\U000023FA"
+    "]"
+)
+_WORDS = re.compile(r"[a-z']+")
+
+
+def extract_emojis(text: str) -> List[str]:
+    """Emojis in text, one entry per emoji, in order."""
+    return EMOJI_PATTERN.findall(text)
+
+
+class EmojiLexicon:
+    """
+    Emoji sentiment and usual function, plus text cue words.
+
+    What This Lexicon Does:
+    - Loads per-emoji sentiment (-1..1) and function (humor, emphasis,
+      literal, ambiguous) and a version from a JSON file
+    - Gives a coarse text polarity from cue words, enough to spot a
+      text/emoji contradiction ("I want to disappear 😂")
+
+    What This Lexicon Does NOT Do:
+    - Does NOT decide distress (EmojiAnalyzer combines it with the baseline)
+    """
+
+    def __init__(self, version: str, emojis: Dict[str, Dict[str, Any]],
+                 text_cues: Optional[Dict[str, List[str]]] = None):
+        self.version = str(version)
+        self.emojis = {emoji.replace("\ufe0f", ""): entry for emoji, entry in emojis.items()}
+        text_cues = text_cues or {}
+        self.negative_cues = frozenset(text_cues.get("negative", ()))
+        self.positive_cues = frozenset(text_cues.get("positive", ()))
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "EmojiLexicon":
+        """Lexicon from path (default: settings.emoji_lexicon_path, else the bundled file)."""
+        lexicon_path = Path(path or settings.emoji_lexicon_path or DEFAULT_LEXICON_PATH)
+        if not lexicon_path.is_absolute():
+            lexicon_path = _BACKEND_DIR / lexicon_path
+        with open(lexicon_path, encoding="utf-8") as f:
+            document = json.load(f)
+        return cls(document["version"], document["emojis"], document.get("text_cues"))
+
+    def lookup(self, emoji: str) -> Optional[Dict[str, Any]]:
+        """{"sentiment", "function"} for a known emoji, else None."""
+        return self.emojis.get(emoji)
+
+    def text_polarity(self, text: str) -> int:
+        """-1, 0 or 1 from the cue words in text (emojis ignored)."""
+        words = _WORDS.findall(text.lower())
+        score = sum(word in self.positive_cues for word in words) - sum(word in self.negative_cues for word in words)
+        return (score > 0) - (score < 0)
+
+
+_emoji_lexicon: Optional[EmojiLexicon] = None
+
+
+def get_emoji_lexicon() -> EmojiLexicon:
+    """Process-wide lexicon, loaded once."""
+    global _emoji_lexicon
+    if _emoji_lexicon is None:
+        _emoji_lexicon = EmojiLexicon.load()
+        logger.info("emoji_lexicon_loaded",
+                   version=_emoji_lexicon.version,
+                   emojis=len(_emoji_lexicon.emojis))
+    return _emoji_lexicon
@@ -0,0 +1,86 @@
+"""Token-budgeted prompt assembly shared by the pipeline's LLM prompts."""
+import re
+from typing import Dict, Any, Callable, Optional
+from app.core.config import settings
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate (no tokenizer download or network call).
+
+    Counts words and punctuation, charging long words one extra token per
+    six characters; this slightly overestimates BPE tokenizers on English,
+    which is the safe direction for a budget.
+    """
+    if not text:
+        return 0
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN_PIECES.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest word-boundary prefix of text within max_tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    kept, used = [], 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens - 1:
+            break
+        kept.append(word)
+        used += cost
+    return " ".join(kept) + " ..." if kept else ""
+
+
+class PromptBuilder:
+    """
+    Fits conversation history into a prompt without exceeding a token budget.
+
+    What This Builder Does:
+    - Renders the prompt once without history to measure its fixed cost
+    - Spends what is left of the budget on the rolling conversation summary
+      (at most summary_share of it) and then on the newest turns that fit,
+      so prompt size stops growing with conversation length
+
+    What This Builder Does NOT Do:
+    - Does NOT shorten the current message or the instructions; if those
+      alone exceed the budget the prompt goes out without history
+    """
+
+    def __init__(self, budget_tokens: Optional[int] = None, summary_share: float = 1 / 3):
+        self.budget_tokens = budget_tokens if budget_tokens is not None else settings.prompt_token_budget
+        self.summary_share = summary_share
+
+    def build(self, render: Callable[[str], str], context: Dict[str, Any],
+              format_turn: Callable[[Dict[str, Any]], str], empty: str = "") -> str:
+        """render(history_text) with history from context fitted to the remaining budget."""
+        remaining = self.budget_tokens - estimate_tokens(render(empty))
+        return render(self.history(context, remaining, format_turn, empty))
+
+    def history(self, context: Dict[str, Any], budget_tokens: int,
+                format_turn: Callable[[Dict[str, Any]], str], empty: str = "") -> str:
+        """Summary plus newest turns (oldest first) within budget_tokens."""
+        if budget_tokens <= 0:
+            return empty
+
+        summary = context.get("conversation_summary")
+        summary_text = ""
+        if summary:
+            summary_text = truncate_to_tokens(f"Summary of earlier conversation: {summary}",
+                                              int(budget_tokens * self.summary_share))
+        remaining = budget_tokens - estimate_tokens(summary_text)
+
+        lines = []
+        for turn in reversed(context.get("conversation_history") or []):
+            line = format_turn(turn)
+            cost = estimate_tokens(line) + 1  # Newline
+            if cost > remaining:
+                break
+            lines.append(line)
+            remaining -= cost
+        lines.reverse()
+
+        parts = ([summary_text] if summary_text else []) + lines
+        return "\n".join(parts) if parts else empty
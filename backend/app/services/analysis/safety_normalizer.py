@@ -0,0 +1,240 @@
+"""Normalization and approximate matching for obfuscated crisis phrases."""
+import re
+import time
+import unicodedata
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Lowercase Cyrillic/Greek letters that render like Latin ones
+_HOMOGLYPHS = str.maketrans({
+    "а": "a", "в": "b", "е": "e", "і": "i", "ј": "j", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s",
+    "α": "a", "β": "b", "ε": "e", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t", "υ": "u",
+})
+
+_LEET = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "@": "a", "$": "s", "!": "i", "|": "l", "+": "t",
+})
+
+# Words starting with a letter (or @/$) that contain leet characters. Words starting
+# with a digit ("5pm", "3rd") are left alone, and a word never ends on a symbol,
+# so "die!" keeps its "!"
+_LEET_WORD = re.compile(r"(?<![a-z0-9@$!|+])(?=[a-z@$])(?=[a-z0-9@$!|+]*[0-9@$!|+][a-z0-9@$!|+]*[a-z0-9])"
+                        r"[a-z0-9@$!|+]*[a-z0-9]")
+# Three or more single letters separated by spaces/punctuation ("k i l l", "s.u.i.c.i.d.e")
+_SPACED_LETTERS = re.compile(r"(?<![a-z])[a-z](?:[ .\-_*]+[a-z](?![a-z])){2,}")
+_SEPARATORS = re.compile(r"[ .\-_*]+")
+_LONG_REPEATS = re.compile(r"([a-z])\1{2,}")
+_NON_LETTERS = re.compile(r"[^a-z]+")
+_NON_LETTERS_OR_SPACE = re.compile(r"[^a-z\s]+")
+# A letter repeating the one before it (deleted, which keeps one of each run)
+_REPEATS = re.compile(r"(?<=([a-z]))\1+")
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+# Squashed words shorter than this never take typos in approximate matching
+_MIN_FUZZY_WORD = 5
+
+
+def _fold_non_ascii(match: re.Match) -> str:
+    """A run of non-ASCII characters without accents, lowercased, homoglyphs folded."""
+    text = unicodedata.normalize("NFKD", match.group())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return text.lower().translate(_HOMOGLYPHS)
+
+
+def normalize_for_screening(text: str) -> str:
+    """
+    Lowercase text with common obfuscation undone.
+
+    Strips accents, folds homoglyphs and leetspeak ("k1ll" -> "kill"),
+    joins spaced-out letters ("k i l l" -> "kill") and shortens runs of
+    three or more repeated letters to two ("killlll" -> "kill").
+    """
+    # Accents and homoglyphs are folded per run of non-ASCII characters, so
+    # plain ASCII text (most messages) costs only the lower()
+    text = _NON_ASCII.sub(_fold_non_ascii, text).lower()
+    text = _LEET_WORD.sub(lambda m: m.group().translate(_LEET), text)
+    text = _SPACED_LETTERS.sub(lambda m: _SEPARATORS.sub("", m.group()), text)
+    return _LONG_REPEATS.sub(r"\1\1", text)
+
+
+def squash(text: str) -> str:
+    """Letters only, every run of a repeated letter collapsed to one ("kill myself" -> "kilmyself")."""
+    return _REPEATS.sub("", _NON_LETTERS.sub("", text))
+
+
+def squash_words(text: str) -> List[str]:
+    """squash() of every whitespace-separated word, dropping words left empty (two passes over text)."""
+    return _REPEATS.sub("", _NON_LETTERS_OR_SPACE.sub("", text)).split()
+
+
+def bounded_edit_distance(a: str, b: str, max_edits: int,
+                          fixed: Optional[Sequence[bool]] = None) -> Optional[int]:
+    """
+    Levenshtein distance between a and b, or None if it exceeds max_edits.
+
+    fixed marks characters of b that must not be edited: they cannot be
+    substituted or deleted, and nothing can be inserted next to them unless
+    the other neighbour is editable.
+    """
+    if abs(len(a) - len(b)) > max_edits:
+        return None
+    fixed = fixed or [False] * len(b)
+    blocked = max_edits + 1
+    # Cost of editing b[j - 1], and of inserting a character between b[j - 1] and b[j]
+    edit = [blocked if exact else 1 for exact in fixed]
+    if b:
+        ends = [fixed[0]] + list(fixed) + [fixed[-1]]
+        insertion = [blocked if ends[j] and ends[j + 1] else 1 for j in range(len(b) + 1)]
+    else:
+        insertion = [1]
+
+    previous = [0]
+    for j in range(1, len(b) + 1):
+        previous.append(min(blocked, previous[-1] + edit[j - 1]))
+    for i, char_a in enumerate(a, start=1):
+        # Cells further than max_edits from the diagonal cost more than max_edits
+        current = [blocked] * (len(b) + 1)
+        current[0] = min(blocked, previous[0] + insertion[0])
+        for j in range(max(1, i - max_edits), min(len(b), i + max_edits) + 1):
+            char_b = b[j - 1]
+            current[j] = min(blocked, previous[j] + insertion[j], current[j - 1] + edit[j - 1],
+                             previous[j - 1] + (0 if char_a == char_b else edit[j - 1]))
+        if min(current) > max_edits:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_edits else None
+
+
+def phrase_key(phrase: str) -> Tuple[str, List[bool]]:
+    """
+    (squashed phrase, which of its characters must match exactly).
+
+    The first word of a multi-word phrase and every word shorter than
+    _MIN_FUZZY_WORD letters are exact, since their one-letter neighbours are
+    everyday words ("will"/"fill" for "kill", "live"/"lie" for "life").
+    """
+    words = [word for word in (squash(normalize_for_screening(w)) for w in phrase.split()) if word]
+    key, fixed = "", []
+    for position, word in enumerate(words):
+        # Merge a repeated letter at the join, as squash() does for the whole phrase
+        part = word[1:] if key and key[-1] == word[0] else word
+        exact = len(word) < _MIN_FUZZY_WORD or (position == 0 and len(words) > 1)
+        key += part
+        fixed.extend([exact] * len(part))
+    return key, fixed
+
+
+def _pieces(key: str, count: int) -> List[Tuple[str, int]]:
+    """key split into count contiguous, near-equal pieces, as (piece, offset in key)."""
+    count = min(count, len(key))
+    size, extra = divmod(len(key), count)
+    pieces, position = [], 0
+    for i in range(count):
+        end = position + size + (1 if i < extra else 0)
+        pieces.append((key[position:end], position))
+        position = end
+    return pieces
+
+
+class ApproximatePhraseIndex:
+    """
+    Bounded edit-distance matching of squashed lexicon phrases.
+
+    What This Index Does:
+    - Compares runs of consecutive words, squashed the same way as the
+      phrases, so spacing and repeated letters do not count as edits
+    - Prefilters with the pigeonhole rule: a phrase within k edits keeps one
+      of k + 1 pieces intact, so a phrase is only compared with the few word
+      runs around where one of its pieces occurs in the squashed message
+      (C substring search); the work per run is bounded, so the scan stays
+      linear in message length
+    - Stops at the deadline and reports that the scan was incomplete
+
+    What This Index Does NOT Do:
+    - Does NOT fuzz phrases with max_edits 0 (they match only after
+      normalization and squashing, e.g. "k m s" or "wantttt to die")
+    - Does NOT allow typos in the first word of a multi-word phrase or in
+      short words (see phrase_key), so "I will myself to get up" or
+      "ending my live stream" never match
+    """
+
+    def __init__(self, phrases: List[Tuple[int, str, int]]):
+        # (entry index, squashed phrase, exact characters, max_edits, (piece, offset)s, word-run sizes, anchor)
+        self._phrases: List[Tuple[int, str, List[bool], int, List[Tuple[str, int]], Tuple[int, ...], str]] = []
+        for entry_index, phrase, max_edits in phrases:
+            key, fixed = phrase_key(phrase)
+            if not key:
+                continue
+            words = phrase.split()
+            sizes = tuple(size for size in (len(words) - 1, len(words), len(words) + 1) if size > 0)
+            # A run must start with the (exact) first word of a multi-word phrase
+            anchor = squash(normalize_for_screening(words[0])) if len(words) > 1 else ""
+            self._phrases.append(
+                (entry_index, key, fixed, max_edits, _pieces(key, max_edits + 1), sizes, anchor)
+            )
+
+    def find(self, normalized_text: str, exclude: Set[int] = frozenset(),
+             deadline: Optional[float] = None) -> Tuple[Set[int], bool]:
+        """(entry indexes found, complete) for text from normalize_for_screening."""
+        found: Set[int] = set()
+        words = squash_words(normalized_text)
+
+        # The squashed message (equal to squash(normalized_text)) and where each
+        # word's letters start in it; a word whose first letter repeats the
+        # previous word's last one is merged at the join, as in a run key
+        offsets, parts, last = [], [], ""
+        position = 0
+        for word in words:
+            part = word[1:] if word[0] == last else word
+            offsets.append(position)
+            parts.append(part)
+            position += len(part)
+            last = word[-1]
+        squashed = "".join(parts)
+
+        # Word runs worth comparing, by start word: only runs around an intact
+        # piece (pigeonhole) of a phrase, so the work grows with the pieces
+        # found, not with every word times every phrase
+        runs: Dict[int, List[tuple]] = {}
+        for phrase in self._phrases:
+            if phrase[0] in exclude:
+                continue
+            window = max(phrase[5])
+            for piece in {piece for piece, _ in phrase[4]}:
+                at = squashed.find(piece)
+                while at != -1:
+                    # Runs containing the word at "at", or starting with the
+                    # letter merged into it
+                    first = max(0, bisect_right(offsets, at) - window)
+                    for start in range(first, bisect_right(offsets, at + 1)):
+                        starts = runs.setdefault(start, [])
+                        if not starts or starts[-1] is not phrase:
+                            starts.append(phrase)
+                    at = squashed.find(piece, at + 1)
+
+        for start in sorted(runs):
+            if deadline is not None and time.perf_counter() > deadline:
+                return found, False
+            phrases = runs[start]
+            largest = max(size for phrase in phrases for size in phrase[5])
+            longest = max(len(phrase[1]) + phrase[3] for phrase in phrases)
+            key = ""
+            for size, word in enumerate(words[start:start + largest], start=1):
+                # Extend the run one word at a time, merging a repeated letter at the join
+                key += word[1:] if key and key[-1] == word[0] else word
+                if len(key) > longest:
+                    break
+                for entry_index, target, fixed, max_edits, pieces, phrase_sizes, anchor in phrases:
+                    if size not in phrase_sizes or entry_index in found or not key.startswith(anchor):
+                        continue
+                    if abs(len(key) - len(target)) > max_edits:
+                        continue
+                    # An intact piece is at most max_edits away from its place in the phrase
+                    if all(key.find(piece, max(0, offset - max_edits), offset + max_edits + len(piece)) == -1
+                           for piece, offset in pieces):
+                        continue
+                    if bounded_edit_distance(key, target, max_edits, fixed) is not None:
+                        found.add(entry_index)
+        return found, True
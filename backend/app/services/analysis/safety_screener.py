@@ -1,100 +1,100 @@
 """Safety screening for immediate crisis detection."""
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import re
+import time
+from app.core.config import settings
+from app.core.metrics import SAFETY_SCREEN_MATCHES, SAFETY_SCREEN_BUDGET_EXCEEDED
+from app.services.analysis.safety_lexicon import SafetyLexicon, get_safety_lexicon
+import structlog
+
+logger = structlog.get_logger()
 
 
 class SafetyScreener:
     """Immediate safety screening for high-risk keywords."""
     
-    # High-risk keywords that trigger immediate crisis protocol
-    CRISIS_KEYWORDS = [
-        r"kill\s+(myself|my\s+self)",
-        r"killing\s+(myself|my\s+self)",
-        r"end\s+it\s+all",
-        r"suicide",
-        r"commit\s+suicide",
-        r"goodbye\s+forever",
-        r"won't\s+be\s+here\s+tomorrow",
-        r"final\s+message",
-        r"ending\s+my\s+life",
-        r"taking\s+my\s+life",
-        r"want\s+to\s+die",
-        r"wanna\s+die",
-    ]
-    
-    # Suicide plan indicators
-    PLAN_INDICATORS = [
-        r"plan\s+to\s+kill",
-        r"going\s+to\s+end",
-        r"method\s+to",
-        r"way\s+to\s+die",
-    ]
+    def __init__(self, lexicon: Optional[SafetyLexicon] = None):
+        # Crisis and plan phrases come from the versioned lexicon file (compiled once per process)
+        self.lexicon = lexicon or get_safety_lexicon()
     
     def screen_immediate(self, message_text: str) -> Dict[str, Any]:
-        """Screen message for immediate safety concerns."""
-        text_lower = message_text.lower()
-        flags = []
-        crisis_detected = False
-        
-        # Check for crisis keywords
-        for pattern in self.CRISIS_KEYWORDS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                flags.append(f"crisis_keyword: {pattern}")
-                crisis_detected = True
-        
-        # Check for plan indicators
-        for pattern in self.PLAN_INDICATORS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                flags.append(f"plan_indicator: {pattern}")
-                crisis_detected = True
+        """
+        Screen message for immediate safety concerns.
+        
+        Exact lexicon matches come first (one pass over the message). Unless
+        disabled, obfuscated variants ("k1ll myself", "s u i c i d e", "kms",
+        small typos) are then matched within settings.safety_screen_budget_ms;
+        a scan cut short by the budget keeps what it found and sets
+        screen_complete to False, which checkpoint 4 treats as needing full
+        analysis (triage never skips it; contextual risk always runs).
+        """
+        start = time.perf_counter()
+        
+        # One pass over the message for every crisis keyword and plan indicator
+        matches = self.lexicon.match(message_text)
+        flags = [self.lexicon.flag(entry) for entry in matches]
+        SAFETY_SCREEN_MATCHES.labels(stage="exact").inc(len(matches))
+        
+        variant_matches = []
+        complete = True
+        if settings.safety_variant_matching:
+            deadline = start + settings.safety_screen_budget_ms / 1000
+            variants, complete = self.lexicon.match_variants(message_text, exclude=matches, deadline=deadline)
+            for entry, stage in variants:
+                flags.append(self.lexicon.flag(entry))
+                variant_matches.append({"flag": self.lexicon.flag(entry), "stage": stage})
+                SAFETY_SCREEN_MATCHES.labels(stage=stage).inc()
+            if not complete:
+                SAFETY_SCREEN_BUDGET_EXCEEDED.inc()
+                logger.warning("safety_screen_budget_exceeded",
+                              message_length=len(message_text),
+                              budget_ms=settings.safety_screen_budget_ms)
+        
+        crisis_detected = bool(flags)
         
         return {
             "crisis_detected": crisis_detected,
             "flags": flags,
-            "reason": "immediate_safety_concern" if crisis_detected else None
+            "reason": "immediate_safety_concern" if crisis_detected else None,
+            "lexicon_version": self.lexicon.version,
+            "variant_matches": variant_matches,
+            "screen_complete": complete
         }
     
+    # Medical advice patterns removed from LLM output
+    HARMFUL_PATTERNS = [
+        r"take\s+\d+\s+mg",
+        r"prescribe\s+",
+        r"you\s+should\s+take\s+medication",
+    ]
+    
+    # Reasoning/analysis section markers - everything from the first marker onward is dropped
+    REASONING_MARKERS = [
+        r'Reasoning:',
+        r'Evidence:',
+        r'Context:',
+        r'Interpretation:',
+        r'Uncertainty:',
+        r'Analysis:',
+        r'Note:',
+    ]
+    
     def filter_response(self, response: str) -> str:
         """Filter LLM response for safety and remove analysis sections."""
-        import re
-        
         # Remove any potentially harmful content
         # Basic filtering - can be enhanced
         
         # Remove medical advice keywords
-        harmful_patterns = [
-            r"take\s+\d+\s+mg",
-            r"prescribe\s+",
-            r"you\s+should\s+take\s+medication",
-        ]
-        
-        filtered = response
-        for pattern in harmful_patterns:
-            filtered = re.sub(pattern, "[medical advice removed]", filtered, flags=re.IGNORECASE)
+        filtered = self.redact_medical_advice(response)
         
         # Remove reasoning/analysis sections that LLM might include
         # Find where "Reasoning:" appears and remove everything from that point onward
         # This handles formats like:
         # "Response text. Reasoning: - Evidence: ... - Context: ... - Interpretation: ... - Uncertainty: ..."
-        reasoning_markers = [
-            r'Reasoning:',
-            r'Evidence:',
-            r'Context:',
-            r'Interpretation:',
-            r'Uncertainty:',
-            r'Analysis:',
-            r'Note:',
-        ]
-        
-        # Find the earliest occurrence of any reasoning marker
-        earliest_pos = len(filtered)
-        for marker in reasoning_markers:
-            match = re.search(marker, filtered, re.IGNORECASE)
-            if match and match.start() < earliest_pos:
-                earliest_pos = match.start()
+        earliest_pos = self.find_reasoning_marker(filtered)
         
         # If we found a reasoning marker, truncate the response at that point
-        if earliest_pos < len(filtered):
+        if earliest_pos is not None:
             filtered = filtered[:earliest_pos].strip()
         
         # Also remove any standalone analysis patterns that might remain
@@ -115,7 +115,81 @@ class SafetyScreener:
         filtered = filtered.strip()
         
         return filtered
+    
+    def redact_medical_advice(self, text: str) -> str:
+        """Replace medical advice patterns with a redaction marker."""
+        for pattern in self.HARMFUL_PATTERNS:
+            text = re.sub(pattern, "[medical advice removed]", text, flags=re.IGNORECASE)
+        return text
+    
+    def find_reasoning_marker(self, text: str):
+        """Return the position of the earliest reasoning marker, or None."""
+        earliest_pos = None
+        for marker in self.REASONING_MARKERS:
+            match = re.search(marker, text, re.IGNORECASE)
+            if match and (earliest_pos is None or match.start() < earliest_pos):
+                earliest_pos = match.start()
+        return earliest_pos
 
 
-
-
+class StreamingResponseFilter:
+    """
+    Incremental version of SafetyScreener.filter_response for streamed replies.
+    
+    What This Filter Does:
+    - Holds back the last HOLD_BACK_CHARS characters so a reasoning marker or
+      medical-advice phrase split across chunks is seen whole before release
+    - Never releases text that starts inside a medical-advice match
+    - Stops releasing text permanently once a reasoning marker appears
+    
+    What This Filter Does NOT Do:
+    - Does NOT collapse blank lines (filter_response still does that for storage)
+    """
+    
+    # Longer than every reasoning marker and typical medical-advice phrase
+    HOLD_BACK_CHARS = 48
+    
+    def __init__(self, screener: SafetyScreener):
+        self.screener = screener
+        self.pending = ""
+        self.truncated = False
+        self.started = False
+    
+    def feed(self, chunk: str) -> str:
+        """Add a streamed chunk; return the text that is now safe to send."""
+        if self.truncated:
+            return ""
+        self.pending += chunk
+        return self._release(final=False)
+    
+    def finish(self) -> str:
+        """Flush whatever is left once the stream has ended."""
+        if self.truncated:
+            return ""
+        return self._release(final=True).rstrip()
+    
+    def _release(self, final: bool) -> str:
+        text = self.pending
+        
+        marker_pos = self.screener.find_reasoning_marker(text)
+        if marker_pos is not None:
+            text = text[:marker_pos].rstrip()
+            self.truncated = True
+            final = True
+        
+        boundary = len(text) if final else max(len(text) - self.HOLD_BACK_CHARS, 0)
+        
+        # Do not cut through a medical-advice match; hold the whole match back
+        for pattern in SafetyScreener.HARMFUL_PATTERNS:
+            for match in re.finditer(pattern, text, re.IGNORECASE):
+                if match.start() < boundary < match.end():
+                    boundary = match.start()
+        
+        ready = text[:boundary]
+        self.pending = "" if self.truncated else text[boundary:]
+        
+        if not self.started:
+            ready = ready.lstrip()
+            self.started = bool(ready)
+        
+        return self.screener.redact_medical_advice(ready)
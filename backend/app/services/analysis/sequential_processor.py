@@ -1,11 +1,22 @@
 """Solution 3: Sequential Analysis Architecture."""
+import asyncio
 import time
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from datetime import datetime
+from sqlalchemy import insert, select
+from app.core.config import settings
+from app.core import metrics
+from app.core.llm_scheduler import llm_priority
 from app.schemas.message import Message, CheckpointResult, MessageAnalysis
 from app.services.analysis.emoji_analyzer import EmojiAnalyzer
-from app.services.analysis.safety_screener import SafetyScreener
+from app.services.analysis.safety_screener import SafetyScreener, StreamingResponseFilter
+from app.services.analysis.structured_analysis import StructuredAnalysisEngine
+from app.services.analysis.triage import MessageTriage, benign_analysis
+from app.services.analysis.prompt_builder import PromptBuilder
+from app.services.analysis import conversation_memory
+from app.services.analysis.context_snapshot import ContextSnapshot, ContextSnapshotLoader, get_student
 from app.services.alerts.risk_calculator import RiskCalculator
+from app.db import unit_of_work
 import structlog
 
 logger = structlog.get_logger()
@@ -15,12 +26,22 @@ class SequentialProcessor:
     """Sequential checkpoint-based message processor."""
     
     def __init__(self, db_session, llm_client):
+        # db_session is an AsyncSession; only the deep-analysis branch touches
+        # it, so concurrent checkpoints never share it between tasks
         self.db = db_session
         self.llm = llm_client
         self.safety_screener = SafetyScreener()
         self.emoji_analyzer = EmojiAnalyzer(llm_client, db_session)
+        self.structured_analysis = StructuredAnalysisEngine(llm_client)
+        self.triage = MessageTriage()
+        self.prompts = PromptBuilder()
         # Pass LLM client to RiskCalculator for contextual analysis
         self.risk_calculator = RiskCalculator(db_session, llm_client)
+        self.snapshot_loader = ContextSnapshotLoader(db_session)
+        # Snapshot of the message most recently processed (reused by post-processing)
+        self.snapshot: Optional[ContextSnapshot] = None
+        # Session row read for conversation memory (reused when the turn is saved)
+        self.session = None
     
     async def process_message(self, message: Message) -> MessageAnalysis:
         """Process message through sequential checkpoints."""
@@ -32,72 +53,217 @@ class SequentialProcessor:
         checkpoint_results.append(checkpoint1_result)
         
         if not checkpoint1_result["passed"]:
-            # Crisis protocol - but still calculate risk profile
-            logger.warning("crisis_protocol_triggered",
-                          student_id=message.student_id,
-                          reason=checkpoint1_result["result"].get("reason"))
-            
-            # Still enrich context and calculate risk even for crisis
-            checkpoint2_result = await self._checkpoint_2_context_enrichment(message, checkpoint1_result)
-            checkpoint_results.append(checkpoint2_result)
-            context = checkpoint2_result["result"]["context"]
-            
-            # Calculate risk profile even in crisis
-            concern_indicators = ["crisis_detected"]
-            risk_profile = None
-            try:
-                logger.info("calculating_risk_for_crisis",
-                           student_id=message.student_id,
-                           message_preview=message.message_text[:50],
-                           safety_flags=context.get("safety_flags", []))
-                risk_profile = await self.risk_calculator.calculate_risk(
-                    message.student_id,
-                    message.message_text,
-                    context,
-                    concern_indicators
-                )
-                logger.info("risk_profile_calculated",
-                           student_id=message.student_id,
-                           overall_risk=risk_profile.get("overall_risk"),
-                           confidence=risk_profile.get("confidence"))
-            except Exception as e:
-                logger.error("risk_calculation_failed_in_crisis",
-                            student_id=message.student_id,
-                            error=str(e),
-                            error_type=type(e).__name__,
-                            exc_info=True)
-                # Continue without risk profile rather than failing completely
-            
-            # Create crisis response with risk profile
-            return self._create_crisis_response(message, checkpoint_results, risk_profile)
+            return await self._handle_crisis(message, checkpoint_results, checkpoint1_result)
         
         # CHECKPOINT 2: Context Enrichment
-        checkpoint2_result = await self._checkpoint_2_context_enrichment(message, checkpoint1_result)
+        snapshot = await self._load_snapshot(message)
+        checkpoint2_result = await self._checkpoint_2_context_enrichment(message, checkpoint1_result, snapshot)
         checkpoint_results.append(checkpoint2_result)
         context = checkpoint2_result["result"]["context"]
         
-        # CHECKPOINT 3: LLM Generation with Safety Constraints
-        checkpoint3_result = await self._checkpoint_3_llm_generation(message, context)
-        checkpoint_results.append(checkpoint3_result)
-        llm_response = checkpoint3_result["result"].get("response")
+        if settings.deferred_analysis_enabled:
+            # Reply after generation and a cheap gate; Checkpoint 4 runs on the analysis queue
+            checkpoint3_result = await self._checkpoint_3_llm_generation(message, context)
+            checkpoint_results.append(checkpoint3_result)
+            checkpoint5_result = await self._checkpoint_5_response_gating(
+                message, checkpoint3_result["result"].get("response"), self._provisional_analysis(context)
+            )
+            checkpoint_results.append(checkpoint5_result)
+            return await self._finalize_analysis(message, checkpoint_results, {}, checkpoint5_result,
+                                                 start_time, snapshot, deferred=True)
+        
+        branch_timings = None
+        if settings.concurrent_checkpoints:
+            # CHECKPOINTS 3 + 4: Generation and deep analysis are independent,
+            # so run them side by side and join at response gating
+            checkpoint3_result, checkpoint4_result, branch_timings = \
+                await self._run_generation_and_analysis(message, context, snapshot)
+        else:
+            # CHECKPOINT 3: LLM Generation with Safety Constraints
+            checkpoint3_result = await self._checkpoint_3_llm_generation(message, context)
+            
+            # CHECKPOINT 4: Deep Analysis (Async)
+            checkpoint4_result = await self._checkpoint_4_deep_analysis(message, context, snapshot)
         
-        # CHECKPOINT 4: Deep Analysis (Async)
-        checkpoint4_result = await self._checkpoint_4_deep_analysis(message, context)
+        checkpoint_results.append(checkpoint3_result)
         checkpoint_results.append(checkpoint4_result)
+        llm_response = checkpoint3_result["result"].get("response")
         deep_analysis = checkpoint4_result["result"]
         
         # CHECKPOINT 5: Response Gating
         checkpoint5_result = await self._checkpoint_5_response_gating(
             message, llm_response, deep_analysis
         )
+        if branch_timings:
+            checkpoint5_result["result"]["branch_timings"] = branch_timings
         checkpoint_results.append(checkpoint5_result)
         
-        # Build final analysis
-        total_time = int((time.time() - start_time) * 1000)
+        return await self._finalize_analysis(message, checkpoint_results, deep_analysis,
+                                             checkpoint5_result, start_time, snapshot)
+    
+    async def process_message_stream(self, message: Message) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of process_message.
+        
+        Checkpoint 3 streams the reply through StreamingResponseFilter while
+        Checkpoint 4 runs alongside it; gating happens once both are done.
+        Unlike process_message, reply text reaches the student before gating,
+        so gating can only append to it or replace it afterwards.
+        
+        Yields:
+            ("token", text) for each piece of filtered reply text,
+            ("replace", text) when gating discards the streamed reply,
+            ("analysis", MessageAnalysis) once the turn has been saved
+        """
+        checkpoint_results = []
+        start_time = time.time()
+        
+        # CHECKPOINT 1: Immediate Safety Screen
+        checkpoint1_result = await self._checkpoint_1_safety_screen(message)
+        checkpoint_results.append(checkpoint1_result)
+        
+        if not checkpoint1_result["passed"]:
+            analysis = await self._handle_crisis(message, checkpoint_results, checkpoint1_result)
+            yield "token", analysis.response_text
+            yield "analysis", analysis
+            return
+        
+        # CHECKPOINT 2: Context Enrichment
+        snapshot = await self._load_snapshot(message)
+        checkpoint2_result = await self._checkpoint_2_context_enrichment(message, checkpoint1_result, snapshot)
+        checkpoint_results.append(checkpoint2_result)
+        context = checkpoint2_result["result"]["context"]
         
-        analysis = MessageAnalysis(
+        # CHECKPOINT 4 runs in the background while Checkpoint 3 streams (or on the
+        # analysis queue after the turn, in deferred mode)
+        deferred = settings.deferred_analysis_enabled
+        analysis_task = None
+        if not deferred:
+            analysis_task = asyncio.create_task(self._checkpoint_4_deep_analysis(message, context, snapshot))
+        
+        try:
+            # CHECKPOINT 3: Streamed LLM Generation with incremental safety filtering
+            generation_start = time.time()
+            stream_filter = StreamingResponseFilter(self.safety_screener)
+            raw_parts = []
+            sent_parts = []
+            try:
+                prompt = self._build_safe_prompt(message, context)
+                async for chunk in self.llm.generate_stream(prompt, call_site="generation"):
+                    raw_parts.append(chunk)
+                    safe_text = stream_filter.feed(chunk)
+                    if safe_text:
+                        sent_parts.append(safe_text)
+                        yield "token", safe_text
+                
+                tail = stream_filter.finish()
+                if tail:
+                    sent_parts.append(tail)
+                    yield "token", tail
+                
+                checkpoint3_result = {
+                    "name": "LLM_GENERATION",
+                    "passed": True,
+                    "result": {
+                        "response": "".join(sent_parts),
+                        "original_response": "".join(raw_parts),
+                        "streamed": True
+                    },
+                    "time_ms": int((time.time() - generation_start) * 1000)
+                }
+            except Exception as e:
+                logger.error("llm_generation_failed", error=str(e))
+                checkpoint3_result = {
+                    "name": "LLM_GENERATION",
+                    "passed": False,
+                    "result": {"error": str(e), "response": "".join(sent_parts) or None},
+                    "time_ms": int((time.time() - generation_start) * 1000)
+                }
+            checkpoint_results.append(checkpoint3_result)
+            
+            if analysis_task is not None:
+                try:
+                    checkpoint4_result = await analysis_task
+                except Exception as e:
+                    logger.error("deep_analysis_branch_failed",
+                                student_id=message.student_id,
+                                error=str(e),
+                                error_type=type(e).__name__)
+                    checkpoint4_result = {
+                        "name": "DEEP_ANALYSIS",
+                        "passed": False,
+                        "result": {"error": str(e), "concern_indicators": []},
+                        "time_ms": int((time.time() - generation_start) * 1000)
+                    }
+                checkpoint_results.append(checkpoint4_result)
+        finally:
+            # Client went away mid-stream: nothing will persist this turn
+            if analysis_task is not None and not analysis_task.done():
+                analysis_task.cancel()
+        
+        streamed_response = checkpoint3_result["result"].get("response")
+        deep_analysis = {} if deferred else checkpoint4_result["result"]
+        
+        # CHECKPOINT 5: Response Gating
+        checkpoint5_result = await self._checkpoint_5_response_gating(
+            message, streamed_response, self._provisional_analysis(context) if deferred else deep_analysis
+        )
+        checkpoint_results.append(checkpoint5_result)
+        
+        final_response = checkpoint5_result["result"].get("final_response") or ""
+        streamed_text = streamed_response or ""
+        if checkpoint5_result["result"].get("crisis_triggered"):
+            yield "replace", final_response
+        elif final_response.startswith(streamed_text) and len(final_response) > len(streamed_text):
+            yield "token", final_response[len(streamed_text):]
+        
+        yield "analysis", await self._finalize_analysis(message, checkpoint_results, deep_analysis,
+                                                        checkpoint5_result, start_time, snapshot, deferred)
+    
+    async def _load_snapshot(self, message: Message) -> ContextSnapshot:
+        """Load everything the checkpoints read about the student in one pass."""
+        self.snapshot = await self.snapshot_loader.load(message.student_id)
+        return self.snapshot
+    
+    async def _handle_crisis(self, message: Message, checkpoint_results: List[Dict[str, Any]],
+                             checkpoint1_result: Dict[str, Any]) -> MessageAnalysis:
+        """Build the crisis protocol response after Checkpoint 1 fails."""
+        logger.warning("crisis_protocol_triggered",
+                      student_id=message.student_id,
+                      reason=checkpoint1_result["result"].get("reason"))
+        
+        if settings.crisis_fast_path:
+            # Respond with the crisis protocol right away; risk profiling,
+            # analytics and the report finish as background follow-up work
+            analysis = self._create_crisis_response(message, checkpoint_results, None)
+            analysis.risk_profile_pending = True
+            return analysis
+        
+        # Crisis protocol - but still calculate risk profile
+        risk_profile = await self.calculate_crisis_risk(message, checkpoint1_result, checkpoint_results)
+        
+        # Create crisis response with risk profile
+        return self._create_crisis_response(message, checkpoint_results, risk_profile)
+    
+    def _provisional_analysis(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cheap stand-in for Checkpoint 4 that deferred mode gates on.
+        
+        Uses the student's latest risk profile (computed from their previous
+        turns), so a student already at HIGH/CRISIS keeps getting the counseling
+        note or the crisis protocol while this turn's analysis is queued.
+        """
+        return {"risk_profile": context.get("current_risk_profile") or {}}
+    
+    def _build_analysis(self, message: Message, checkpoint_results: List[Dict[str, Any]],
+                        deep_analysis: Dict[str, Any], checkpoint5_result: Dict[str, Any],
+                        message_id: Optional[str] = None) -> MessageAnalysis:
+        """MessageAnalysis from checkpoint result dicts."""
+        checkpoint1_result = checkpoint_results[0]
+        
+        return MessageAnalysis(
             student_id=message.student_id,
-            message_id=f"{message.student_id}_{int(time.time())}",
+            message_id=message_id or f"{message.student_id}_{int(time.time())}",
             message_text=message.message_text,
             checkpoint_results=[
                 CheckpointResult(
@@ -113,19 +279,126 @@ class SequentialProcessor:
             concern_indicators=deep_analysis.get("concern_indicators", []),
             safety_flags=checkpoint1_result["result"].get("flags", []),
             risk_profile=deep_analysis.get("risk_profile"),
+            sentiment=deep_analysis.get("sentiment"),
             response_generated=checkpoint5_result["result"].get("response_sent", False),
             response_text=checkpoint5_result["result"].get("final_response"),
             crisis_protocol_triggered=checkpoint5_result["result"].get("crisis_triggered", False)
         )
+    
+    async def _finalize_analysis(self, message: Message, checkpoint_results: List[Dict[str, Any]],
+                           deep_analysis: Dict[str, Any], checkpoint5_result: Dict[str, Any],
+                           start_time: float, snapshot: Optional[ContextSnapshot] = None,
+                           deferred: bool = False) -> MessageAnalysis:
+        """
+        Build the final analysis, save the turn to its session and log it.
+        
+        In deferred mode the turn is queued for Checkpoint 4 instead of logged;
+        the queued job logs it once the analysis is done.
+        """
+        total_time = int((time.time() - start_time) * 1000)
+        metrics.observe_checkpoints(checkpoint_results)
+        
+        analysis = self._build_analysis(message, checkpoint_results, deep_analysis, checkpoint5_result)
         
         # Save messages to session
-        self._save_to_session(message, analysis)
+        await self._save_to_session(message, analysis, snapshot)
+        
+        if deferred:
+            from app.tasks import analysis_queue
+            
+            analysis.risk_profile_pending = True
+            # Committed with the turn, so an acknowledged reply always has its analysis queued
+            await analysis_queue.enqueue(self.db, message.student_id, {
+                "message": message.model_dump(mode="json"),
+                "message_id": analysis.message_id,
+                "checkpoint_results": checkpoint_results,
+                "processing_time_ms": total_time
+            })
+            return analysis
         
         # Log for auditing
-        self._log_processing(message, analysis, total_time)
+        db_analysis = await self._log_processing(message, analysis, total_time, snapshot)
+        analysis.analysis_id = db_analysis.id
         
         return analysis
     
+    async def complete_deferred_analysis(self, message: Message, payload: Dict[str, Any]) -> MessageAnalysis:
+        """
+        Run Checkpoint 4 for a turn answered in deferred mode and log the turn.
+        
+        payload is the analysis job queued by _finalize_analysis. Checkpoint 4
+        reads the context the turn was answered with and a fresh snapshot (so
+        baselines build on the student's previous analyzed turn). The returned
+        analysis carries the new risk profile for alerting; its reply fields
+        are what the student was sent.
+        """
+        checkpoint_results = list(payload["checkpoint_results"])
+        context = next(cp["result"]["context"] for cp in checkpoint_results if cp["name"] == "CONTEXT_ENRICHMENT")
+        checkpoint5_result = next(cp for cp in checkpoint_results if cp["name"] == "RESPONSE_GATING")
+        
+        snapshot = await self._load_snapshot(message)
+        checkpoint4_result = await self._checkpoint_4_deep_analysis(message, context, snapshot)
+        checkpoint4_result["result"]["deferred"] = True
+        metrics.observe_checkpoints([checkpoint4_result])
+        checkpoint_results.insert(checkpoint_results.index(checkpoint5_result), checkpoint4_result)
+        
+        analysis = self._build_analysis(message, checkpoint_results, checkpoint4_result["result"],
+                                        checkpoint5_result, payload["message_id"])
+        db_analysis = await self._log_processing(message, analysis, payload["processing_time_ms"], snapshot)
+        analysis.analysis_id = db_analysis.id
+        
+        return analysis
+    
+    async def calculate_crisis_risk(self, message: Message,
+                                    checkpoint1_result: Optional[Dict[str, Any]] = None,
+                                    checkpoint_results: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Enrich context and calculate the risk profile for a crisis message.
+        
+        Used inline when the crisis fast path is disabled, and by the background
+        crisis follow-up task otherwise. Returns None if risk calculation fails.
+        """
+        if checkpoint1_result is None:
+            checkpoint1_result = await self._checkpoint_1_safety_screen(message)
+        
+        # Still enrich context and calculate risk even for crisis
+        snapshot = await self._load_snapshot(message)
+        checkpoint2_result = await self._checkpoint_2_context_enrichment(message, checkpoint1_result, snapshot)
+        if checkpoint_results is not None:
+            checkpoint_results.append(checkpoint2_result)
+        context = checkpoint2_result["result"]["context"]
+        
+        # Calculate risk profile even in crisis
+        concern_indicators = ["crisis_detected"]
+        risk_profile = None
+        try:
+            logger.info("calculating_risk_for_crisis",
+                       student_id=message.student_id,
+                       message_preview=message.message_text[:50],
+                       safety_flags=context.get("safety_flags", []))
+            # Crisis calls go ahead of queued chat, analysis and batch work
+            with llm_priority("crisis"):
+                risk_profile = await self.risk_calculator.calculate_risk(
+                    message.student_id,
+                    message.message_text,
+                    context,
+                    concern_indicators,
+                    snapshot
+                )
+            logger.info("risk_profile_calculated",
+                       student_id=message.student_id,
+                       overall_risk=risk_profile.get("overall_risk"),
+                       confidence=risk_profile.get("confidence"))
+        except Exception as e:
+            logger.error("risk_calculation_failed_in_crisis",
+                        student_id=message.student_id,
+                        error=str(e),
+                        error_type=type(e).__name__,
+                        exc_info=True)
+            # Continue without risk profile rather than failing completely
+        
+        return risk_profile
+    
     async def _checkpoint_1_safety_screen(self, message: Message) -> Dict[str, Any]:
         """
         Checkpoint 1: Immediate safety screen (~10ms).
@@ -153,25 +426,34 @@ class SequentialProcessor:
             "time_ms": time_ms
         }
     
-    async def _checkpoint_2_context_enrichment(self, message: Message, checkpoint1_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Checkpoint 2: Context enrichment (~50ms)."""
+    async def _checkpoint_2_context_enrichment(self, message: Message, checkpoint1_result: Optional[Dict[str, Any]] = None,
+                                               snapshot: Optional[ContextSnapshot] = None) -> Dict[str, Any]:
+        """Checkpoint 2: Context enrichment (~50ms; reads the message's ContextSnapshot when given)."""
         start = time.time()
         
         # Get student information
-        student_info = self._get_student_info(message.student_id)
-        
-        # Pull conversation history
-        conversation_history = self._get_conversation_history(message.student_id, limit=10)
+        student_info = await self._get_student_info(message.student_id, snapshot)
+        
+        # Pull conversation history: the session's memory window and summary when it
+        # has one, otherwise the student's recent analyses
+        session = await self._get_session(message)
+        conversation_summary = None
+        if conversation_memory.has_memory(session):
+            conversation_history = conversation_memory.history_from_session(session)
+            conversation_summary = session.conversation_summary
+        else:
+            conversation_history = await self._get_conversation_history(message.student_id, limit=10, snapshot=snapshot)
         
         # Pull behavioral metadata
         behavioral_metadata = self._get_behavioral_metadata(message.student_id)
         
         # Pull current risk profile
-        current_risk = self.risk_calculator.get_current_risk_profile(message.student_id)
+        current_risk = await self.risk_calculator.get_current_risk_profile(message.student_id, snapshot)
         
         context = {
             "student_info": student_info,
             "conversation_history": conversation_history,
+            "conversation_summary": conversation_summary,
             "behavioral_metadata": behavioral_metadata,
             "current_risk_profile": current_risk,
             "message_metadata": message.metadata or {}
@@ -181,6 +463,7 @@ class SequentialProcessor:
         if checkpoint1_result:
             context["safety_flags"] = checkpoint1_result.get("result", {}).get("flags", [])
             context["crisis_detected"] = checkpoint1_result.get("result", {}).get("crisis_detected", False)
+            context["screen_complete"] = checkpoint1_result.get("result", {}).get("screen_complete", True)
         
         time_ms = int((time.time() - start) * 1000)
         
@@ -213,7 +496,7 @@ class SequentialProcessor:
         
         # Generate response
         try:
-            response = await self.llm.generate(prompt)
+            response = await self.llm.generate(prompt, call_site="generation")
             
             # Run output through content filter
             filtered_response = self.safety_screener.filter_response(response)
@@ -239,7 +522,8 @@ class SequentialProcessor:
                 "time_ms": time_ms
             }
     
-    async def _checkpoint_4_deep_analysis(self, message: Message, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _checkpoint_4_deep_analysis(self, message: Message, context: Dict[str, Any],
+                                          snapshot: Optional[ContextSnapshot] = None) -> Dict[str, Any]:
         """
         Checkpoint 4: Deep analysis (async, ~2-5s).
         
@@ -253,11 +537,27 @@ class SequentialProcessor:
         - Does NOT send response (that's Checkpoint 5)
         - Does NOT skip analysis for crisis cases
         - Does NOT use keyword matching alone (uses LLM for context)
+        - Does NOT call the LLM for messages the triage classifier skips
+          (settings.triage_mode = "enforce"); risk profiling still runs
         """
         start = time.time()
         
+        # Confidently benign messages with no safety flags skip the LLM calls:
+        # a benign stand-in analysis feeds the same consumers instead. A safety
+        # screen cut short by its budget never counts as benign
+        triage = self.triage.assess(message.message_text, context.get("safety_flags", []),
+                                    context.get("screen_complete", True))
+        
+        # One consolidated LLM call; consumers fall back to their own calls if it fails
+        structured = None
+        if triage and triage["skipped"]:
+            structured = benign_analysis(triage["benign_probability"])
+        elif settings.structured_analysis_enabled:
+            structured = await self.structured_analysis.analyze(message.message_text, context)
+        context = {**context, "structured_analysis": structured}
+        
         # Run NLP pipeline
-        emoji_analysis = await self.emoji_analyzer.analyze(message.student_id, message.message_text, context)
+        emoji_analysis = await self.emoji_analyzer.analyze(message.student_id, message.message_text, context, snapshot)
         
         # Extract concern indicators (await async method)
         concern_indicators = await self._extract_concern_indicators(message, context, emoji_analysis)
@@ -267,7 +567,8 @@ class SequentialProcessor:
             message.student_id,
             message.message_text,
             context,
-            concern_indicators
+            concern_indicators,
+            snapshot
         )
         
         time_ms = int((time.time() - start) * 1000)
@@ -278,11 +579,78 @@ class SequentialProcessor:
             "result": {
                 "emoji_analysis": emoji_analysis,
                 "concern_indicators": concern_indicators,
-                "risk_profile": risk_profile
+                "risk_profile": risk_profile,
+                "sentiment": StructuredAnalysisEngine.sentiment_section(structured) if structured else None,
+                "structured_analysis_used": structured is not None,
+                "triage": triage
             },
             "time_ms": time_ms
         }
     
+    async def _run_generation_and_analysis(self, message: Message, context: Dict[str, Any],
+                                           snapshot: Optional[ContextSnapshot] = None
+                                           ) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        """
+        Run Checkpoint 3 and Checkpoint 4 as independent concurrent branches.
+        
+        Deep analysis never reads the generated reply, so the turn only has to
+        wait for the slower of the two branches. A failure in one branch is
+        recorded as a failed checkpoint and does not discard the other branch.
+        
+        Returns:
+            Tuple of (checkpoint3_result, checkpoint4_result, branch_timings)
+        """
+        start = time.time()
+        branch_ms: Dict[str, int] = {}
+        
+        async def timed(name: str, coro):
+            branch_start = time.time()
+            try:
+                return await coro
+            finally:
+                branch_ms[name] = int((time.time() - branch_start) * 1000)
+        
+        generation, analysis = await asyncio.gather(
+            timed("llm_generation", self._checkpoint_3_llm_generation(message, context)),
+            timed("deep_analysis", self._checkpoint_4_deep_analysis(message, context, snapshot)),
+            return_exceptions=True
+        )
+        
+        if isinstance(generation, BaseException):
+            logger.error("llm_generation_branch_failed",
+                        student_id=message.student_id,
+                        error=str(generation),
+                        error_type=type(generation).__name__)
+            generation = {
+                "name": "LLM_GENERATION",
+                "passed": False,
+                "result": {"error": str(generation)},
+                "time_ms": branch_ms.get("llm_generation", 0)
+            }
+        
+        if isinstance(analysis, BaseException):
+            logger.error("deep_analysis_branch_failed",
+                        student_id=message.student_id,
+                        error=str(analysis),
+                        error_type=type(analysis).__name__)
+            analysis = {
+                "name": "DEEP_ANALYSIS",
+                "passed": False,
+                "result": {"error": str(analysis), "concern_indicators": []},
+                "time_ms": branch_ms.get("deep_analysis", 0)
+            }
+        
+        wall_ms = int((time.time() - start) * 1000)
+        branch_timings = {
+            "mode": "concurrent",
+            "llm_generation_ms": branch_ms.get("llm_generation", 0),
+            "deep_analysis_ms": branch_ms.get("deep_analysis", 0),
+            "wall_ms": wall_ms,
+            "saved_ms": max(sum(branch_ms.values()) - wall_ms, 0)
+        }
+        
+        return generation, analysis, branch_timings
+    
     async def _checkpoint_5_response_gating(self, message: Message, 
                                            llm_response: Optional[str],
                                            deep_analysis: Dict[str, Any]) -> Dict[str, Any]:
@@ -303,10 +671,14 @@ class SequentialProcessor:
         """
         start = time.time()
         
-        risk_profile = deep_analysis.get("risk_profile", {})
+        risk_profile = deep_analysis.get("risk_profile") or {}
         overall_risk = risk_profile.get("overall_risk", "LOW")
         confidence = risk_profile.get("confidence", 0.0)
         
+        if deep_analysis.get("error"):
+            # Deep analysis failed - never treat an unknown risk as LOW
+            overall_risk = "MEDIUM"
+        
         final_response = None
         response_sent = False
         crisis_triggered = False
@@ -340,14 +712,35 @@ class SequentialProcessor:
             "time_ms": time_ms
         }
     
-    def _get_conversation_history(self, student_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    async def _get_session(self, message: Message):
+        """The session the message belongs to, if it names one (read once per turn)."""
+        from app.models.student import Session
+        
+        if not message.session_id:
+            return None
+        if self.session is None or self.session.id != message.session_id:
+            self.session = await self.db.scalar(
+                select(Session).where(
+                    Session.id == message.session_id,
+                    Session.student_id == message.student_id
+                )
+            )
+        return self.session
+    
+    async def _get_conversation_history(self, student_id: str, limit: int = 10,
+                                        snapshot: Optional[ContextSnapshot] = None) -> List[Dict[str, Any]]:
         """Get recent conversation history."""
         from app.models.analysis import MessageAnalysis as MessageAnalysisModel
         
         # Get recent message analyses for this student
-        analyses = self.db.query(MessageAnalysisModel).filter(
-            MessageAnalysisModel.student_id == student_id
-        ).order_by(MessageAnalysisModel.created_at.desc()).limit(limit).all()
+        if snapshot is not None and snapshot.covers(student_id):
+            analyses = snapshot.recent_analyses[:limit]
+        else:
+            analyses = (await self.db.scalars(
+                select(MessageAnalysisModel).where(
+                    MessageAnalysisModel.student_id == student_id
+                ).order_by(MessageAnalysisModel.created_at.desc()).limit(limit)
+            )).all()
         
         # Return in chronological order (oldest first)
         history = []
@@ -375,13 +768,9 @@ class SequentialProcessor:
         
         return history
     
-    def _get_student_info(self, student_id: str) -> Dict[str, Any]:
-        """Get student information from database."""
-        from app.models.student import Student
-        
-        student = self.db.query(Student).filter(
-            Student.student_id == student_id
-        ).first()
+    async def _get_student_info(self, student_id: str, snapshot: Optional[ContextSnapshot] = None) -> Dict[str, Any]:
+        """Get student information from the snapshot or database."""
+        student = await get_student(self.db, student_id, snapshot)
         
         if student:
             return {
@@ -417,15 +806,10 @@ class SequentialProcessor:
         else:
             greeting = "Hello! "
         
-        # Get conversation history for context
-        conversation_history = context.get('conversation_history', [])
-        history_text = ""
-        if conversation_history:
-            history_text = "\n\nPrevious conversation:\n"
-            for msg in conversation_history[-5:]:  # Last 5 messages
-                history_text += f"- {msg.get('message_text', '')}\n"
-        
-        return f"""
+        def render(history_text: str) -> str:
+            if history_text:
+                history_text = f"\n\nPrevious conversation:\n{history_text}\n"
+            return f"""
 You are a supportive mental health assistant. Respond to the student's message with empathy and care.
 
 STUDENT INFORMATION:
@@ -447,6 +831,10 @@ IMPORTANT: Provide ONLY your response to the student. Do NOT include any reasoni
 
 Response (be warm, empathetic, and use their name {student_name} naturally):
 """
+        
+        # Summary plus as many recent messages as the token budget allows
+        return self.prompts.build(render, context,
+                                  format_turn=lambda msg: f"- {msg.get('message_text', '')}")
     
     async def _extract_concern_indicators(self, message: Message, context: Dict[str, Any], 
                                          emoji_analysis: Dict[str, Any]) -> List[str]:
@@ -489,8 +877,13 @@ Response (be warm, empathetic, and use their name {student_name} naturally):
     
     async def _analyze_concern_indicators(self, message: Message, context: Dict[str, Any]) -> List[str]:
         """Use LLM to analyze concern indicators like language shifts and hopelessness."""
+        structured = context.get("structured_analysis")
+        if structured:
+            return self._concern_indicators_from_analysis(
+                message, StructuredAnalysisEngine.concern_section(structured)
+            )
+        
         baseline = context.get("student_info", {}).get("baseline_profile", {})
-        conversation_history = context.get("conversation_history", [])
         
         # Build prompt for concern indicator analysis
         baseline_info = ""
@@ -503,14 +896,8 @@ Student Baseline:
 - Common themes: {', '.join(baseline.get('common_themes', []))}
 """
         
-        history_text = ""
-        if conversation_history:
-            history_text = "\n".join([
-                f"Previous: {msg.get('message_text', '')[:100]}"
-                for msg in conversation_history[-5:]
-            ])
-        
-        prompt = f"""Analyze this message for concern indicators:
+        def render(history_text: str) -> str:
+            return f"""Analyze this message for concern indicators:
 
 Current Message: "{message.message_text}"
 
@@ -534,8 +921,11 @@ Respond in JSON format:
   "reasoning": "string explaining detected indicators"
 }}"""
         
+        prompt = self.prompts.build(render, context,
+                                    format_turn=lambda msg: f"Previous: {msg.get('message_text', '')[:100]}")
+        
         try:
-            response = await self.llm.generate(prompt, max_tokens=400)
+            response = await self.llm.generate(prompt, max_tokens=400, call_site="concern")
             
             # Parse JSON
             import json
@@ -546,22 +936,7 @@ Respond in JSON format:
             else:
                 analysis = json.loads(response)
             
-            # Convert to indicator list
-            indicators = []
-            if analysis.get("language_shift_detected"):
-                indicators.append("sudden_language_shift")
-            if analysis.get("hopelessness_themes"):
-                indicators.append("hopelessness_themes")
-            if analysis.get("engagement_drop"):
-                indicators.append("significant_engagement_drop")
-            if analysis.get("sudden_mood_change"):
-                indicators.append("sudden_mood_change")
-            
-            logger.info("concern_indicators_analyzed",
-                       student_id=message.student_id,
-                       indicators=indicators)
-            
-            return indicators
+            return self._concern_indicators_from_analysis(message, analysis)
             
         except Exception as e:
             logger.error("concern_indicators_llm_failed",
@@ -569,6 +944,24 @@ Respond in JSON format:
                         exc_info=True)
             return []
     
+    def _concern_indicators_from_analysis(self, message: Message, analysis: Dict[str, Any]) -> List[str]:
+        """Convert a concern-indicator analysis into the indicator list."""
+        indicators = []
+        if analysis.get("language_shift_detected"):
+            indicators.append("sudden_language_shift")
+        if analysis.get("hopelessness_themes"):
+            indicators.append("hopelessness_themes")
+        if analysis.get("engagement_drop"):
+            indicators.append("significant_engagement_drop")
+        if analysis.get("sudden_mood_change"):
+            indicators.append("sudden_mood_change")
+        
+        logger.info("concern_indicators_analyzed",
+                   student_id=message.student_id,
+                   indicators=indicators)
+        
+        return indicators
+    
     def _fallback_concern_indicators(self, message: Message, context: Dict[str, Any]) -> List[str]:
         """Fallback concern indicator detection using heuristics."""
         indicators = []
@@ -593,6 +986,7 @@ Respond in JSON format:
     
     def _create_crisis_response(self, message: Message, checkpoint_results: List[Dict], risk_profile: Optional[Dict[str, Any]] = None) -> MessageAnalysis:
         """Create crisis protocol response."""
+        metrics.observe_checkpoints(checkpoint_results)
         return MessageAnalysis(
             student_id=message.student_id,
             message_id=f"{message.student_id}_{int(time.time())}",
@@ -623,13 +1017,11 @@ Campus Counseling: [CAMPUS_NUMBER]
 
 I'm here to support you, and professional help is available right now."""
     
-    def _ensure_student_exists(self, student_id: str):
-        """Ensure student record exists in database."""
+    async def _ensure_student_exists(self, student_id: str, snapshot: Optional[ContextSnapshot] = None):
+        """Ensure student record exists in database and return it."""
         from app.models.student import Student
         
-        student = self.db.query(Student).filter(
-            Student.student_id == student_id
-        ).first()
+        student = await get_student(self.db, student_id, snapshot)
         
         if not student:
             student = Student(
@@ -638,15 +1030,20 @@ I'm here to support you, and professional help is available right now."""
                 session_count=0
             )
             self.db.add(student)
-            self.db.commit()
+            await unit_of_work.commit(self.db)
+            if snapshot is not None and snapshot.covers(student_id):
+                snapshot.student = student
             logger.info("created_student", student_id=student_id)
+        
+        return student
     
-    def _log_processing(self, message: Message, analysis: MessageAnalysis, total_time: int):
-        """Log processing for auditing."""
+    async def _log_processing(self, message: Message, analysis: MessageAnalysis, total_time: int,
+                              snapshot: Optional[ContextSnapshot] = None):
+        """Log processing for auditing and return the stored analysis row."""
         from app.models.analysis import MessageAnalysis as MessageAnalysisModel
         
         # Ensure student exists before saving analysis
-        self._ensure_student_exists(message.student_id)
+        await self._ensure_student_exists(message.student_id, snapshot)
         
         # Convert checkpoint results - handle both Pydantic v1 and v2
         checkpoint_data = []
@@ -675,28 +1072,32 @@ I'm here to support you, and professional help is available right now."""
             emoji_analysis=analysis.emoji_analysis,
             concern_indicators=analysis.concern_indicators,
             safety_flags=analysis.safety_flags,
+            sentiment_score=(analysis.sentiment or {}).get("sentiment_score"),
             checkpoint_results=checkpoint_data,
             processing_time_ms=total_time
         )
         
         self.db.add(db_analysis)
-        self.db.commit()
+        await unit_of_work.commit(self.db)
+        return db_analysis
     
-    def _get_or_create_session(self, student_id: str, session_id: Optional[int] = None):
+    async def _get_or_create_session(self, student_id: str, session_id: Optional[int] = None,
+                                     snapshot: Optional[ContextSnapshot] = None):
         """Get existing session or create a new one."""
-        from app.models.student import Student, Session
+        from app.models.student import Session
         
-        student = self.db.query(Student).filter(Student.student_id == student_id).first()
-        if not student:
-            self._ensure_student_exists(student_id)
-            student = self.db.query(Student).filter(Student.student_id == student_id).first()
+        student = await self._ensure_student_exists(student_id, snapshot)
         
         # If session_id provided, try to get that session
         if session_id:
-            session = self.db.query(Session).filter(
-                Session.id == session_id,
-                Session.student_id == student_id
-            ).first()
+            if self.session is not None and self.session.id == session_id and self.session.student_id == student_id:
+                return self.session  # Already read for conversation memory
+            session = await self.db.scalar(
+                select(Session).where(
+                    Session.id == session_id,
+                    Session.student_id == student_id
+                )
+            )
             if session:
                 return session
         
@@ -705,25 +1106,36 @@ I'm here to support you, and professional help is available right now."""
         # For now, always create a new session when session_id is None to allow multiple chats per day
         # Create new session
         student.session_count = (student.session_count or 0) + 1
+        # Seed the new session's memory with the student's most recent turns
+        seeded_turns = conversation_memory.seed_turns(await self._get_conversation_history(
+            student_id, limit=settings.conversation_memory_turns, snapshot=snapshot
+        ))
         new_session = Session(
             student_id=student_id,
             session_number=student.session_count,
-            messages=[],
-            session_metadata={}
+            session_metadata={},
+            recent_turns=seeded_turns,
+            turn_count=len(seeded_turns),
+            summarized_turns=0
         )
         self.db.add(new_session)
-        self.db.commit()
-        self.db.refresh(new_session)
+        # Attributes stay loaded after commit (expire_on_commit=False), so no refresh
+        await unit_of_work.commit(self.db)
         return new_session
     
-    def _save_to_session(self, message: Message, analysis: MessageAnalysis):
-        """Save user message and AI response to session."""
-        from app.models.student import Session
+    async def _save_to_session(self, message: Message, analysis: MessageAnalysis,
+                               snapshot: Optional[ContextSnapshot] = None):
+        """
+        Append the user message and AI response to the session's chat_messages.
         
-        session = self._get_or_create_session(message.student_id, message.session_id)
+        Inserts the turn's rows (one statement) numbered after
+        session.message_count, so the cost does not grow with the transcript
+        (nothing earlier is read). The (session_id, seq) key rejects a
+        concurrent writer rather than letting it overwrite a message.
+        """
+        from app.models.student import ChatMessage
         
-        # Get current messages list
-        messages = session.messages if session.messages else []
+        session = await self._get_or_create_session(message.student_id, message.session_id, snapshot)
         
         # Add user message (use millisecond precision to avoid duplicate IDs)
         timestamp_ms = int(time.time() * 1000)
@@ -733,7 +1145,7 @@ I'm here to support you, and professional help is available right now."""
             "sender": "user",
             "timestamp": message.timestamp.isoformat() if hasattr(message.timestamp, 'isoformat') else datetime.utcnow().isoformat()
         }
-        messages.append(user_msg)
+        messages = [user_msg]
         
         # Add AI response if available
         if analysis.response_text:
@@ -746,14 +1158,33 @@ I'm here to support you, and professional help is available right now."""
             }
             messages.append(ai_msg)
         
-        # Update session
-        session.messages = messages
-        self.db.commit()
-        self.db.refresh(session)  # Refresh to ensure changes are persisted
+        # Conversation memory: turns leaving the recent window are summarized in the background
+        needs_summary = conversation_memory.record_turn(
+            session, message.message_text, analysis.response_text, user_msg["timestamp"]
+        )
+        
+        first_seq = (session.message_count or 0) + 1
+        await self.db.execute(insert(ChatMessage).values([{
+            "session_id": session.id,
+            "seq": seq,
+            "student_id": message.student_id,
+            "message_id": msg["id"],
+            "sender": msg["sender"],
+            "content": msg["content"],
+            "sent_at": msg["timestamp"]
+        } for seq, msg in enumerate(messages, start=first_seq)]))
+        session.message_count = first_seq + len(messages) - 1
+        await unit_of_work.commit(self.db)
         logger.info("messages_saved_to_session",
                    student_id=message.student_id,
                    session_id=session.id,
-                   message_count=len(messages))
+                   message_count=session.message_count)
+        
+        if needs_summary:
+            from app.tasks.conversation_summary import spawn_summary
+            # The task reads the session in its own DB session; it must see this turn
+            session_id = session.id
+            unit_of_work.after_commit(self.db, lambda: spawn_summary(session_id, self.llm))
 
 
 
@@ -0,0 +1,168 @@
+"""Consolidated structured analysis - one LLM call per message."""
+from typing import Dict, Any, Optional
+from app.schemas.analysis import StructuredAnalysis
+from app.services.analysis.prompt_builder import PromptBuilder
+import json
+import structlog
+
+logger = structlog.get_logger()
+
+
+class StructuredAnalysisEngine:
+    """
+    Builds one analysis prompt and fans the validated JSON out to consumers.
+
+    What This Engine Does:
+    - Replaces the separate emoji, concern-indicator, contextual-risk and
+      baseline-sentiment LLM calls with a single request per message
+    - Validates the returned document against the StructuredAnalysis schema
+    - Exposes each section in the shape its existing consumer already expects
+
+    What This Engine Does NOT Do:
+    - Does NOT calibrate confidence (RiskCalculator still does that)
+    - Does NOT fall back to keywords (consumers keep their own fallbacks and
+      use them whenever this engine returns None)
+    """
+
+    def __init__(self, llm_client):
+        self.llm = llm_client
+        self.prompts = PromptBuilder()
+
+    async def analyze(self, message_text: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Run the consolidated analysis. Returns None if the call or validation fails."""
+        if not self.llm:
+            return None
+
+        prompt = self._build_prompt(message_text, context)
+
+        try:
+            response = await self.llm.generate(prompt, max_tokens=900, call_site="structured_analysis")
+            document = self._parse_json(response)
+            analysis = StructuredAnalysis(**document)
+        except Exception as e:
+            logger.warning("structured_analysis_failed",
+                          error=str(e),
+                          error_type=type(e).__name__)
+            return None
+
+        logger.info("structured_analysis_completed",
+                   emoji_function=analysis.emoji.emoji_function,
+                   suicidal_ideation=analysis.suicidal_ideation.present,
+                   sentiment=analysis.sentiment.sentiment)
+        return analysis.dict()
+
+    @staticmethod
+    def emoji_section(structured: Dict[str, Any]) -> Dict[str, Any]:
+        """Section in the shape returned by EmojiAnalyzer.analyze."""
+        return dict(structured["emoji"])
+
+    @staticmethod
+    def concern_section(structured: Dict[str, Any]) -> Dict[str, Any]:
+        """Section in the shape parsed by SequentialProcessor._analyze_concern_indicators."""
+        return dict(structured["concern_indicators"])
+
+    @staticmethod
+    def contextual_risk_section(structured: Dict[str, Any]) -> Dict[str, Any]:
+        """Section in the shape returned by RiskCalculator._analyze_contextual_risk."""
+        return {
+            "suicidal_ideation": dict(structured["suicidal_ideation"]),
+            "depression_indicators": dict(structured["depression_indicators"]),
+            "overall_context": dict(structured["overall_context"])
+        }
+
+    @staticmethod
+    def sentiment_section(structured: Dict[str, Any]) -> Dict[str, Any]:
+        """Section in the shape returned by HybridAssessmentService._analyze_message_for_baseline."""
+        return dict(structured["sentiment"])
+
+    def _parse_json(self, response: str) -> Dict[str, Any]:
+        """Extract the JSON object from the response (may have markdown formatting)."""
+        json_start = response.find('{')
+        json_end = response.rfind('}') + 1
+        if json_start >= 0 and json_end > json_start:
+            return json.loads(response[json_start:json_end])
+        return json.loads(response)
+
+    def _build_prompt(self, message_text: str, context: Dict[str, Any]) -> str:
+        """Build the single analysis prompt covering every consumer."""
+        baseline = context.get("student_info", {}).get("baseline_profile", {}) or {}
+        emoji_baseline = baseline.get("emoji_baseline", {})
+
+        baseline_info = ""
+        if baseline:
+            baseline_info = f"""
+Student Baseline:
+- Typical sentiment: {baseline.get('typical_sentiment', 'unknown')}
+- Communication style: {baseline.get('communication_style', 'unknown')}
+- Typical message length: {baseline.get('avg_message_length', 'unknown')}
+- Common themes: {', '.join(baseline.get('common_themes', []))}
+"""
+        if emoji_baseline:
+            baseline_info += f"""- Common emojis: {', '.join(emoji_baseline.get('common_emojis', []))}
+- Typical emoji function: {emoji_baseline.get('typical_function', 'unknown')}
+"""
+
+        def render(history_text: str) -> str:
+            return f"""Analyze this student message once and answer every section below:
+
+Current Message: "{message_text}"
+
+Conversation History:
+{history_text}
+
+{baseline_info}
+
+Consider:
+1. Emoji usage among college students and whether emojis amplify, contradict or soften the text
+2. Changes in communication style, hopelessness themes, disengagement or abrupt mood shifts
+3. Whether any suicidal ideation is literal or idiomatic (gaming/casual, sarcasm, dark humor)
+4. Depression indicators, overall tone and escalation relative to previous messages
+5. Overall sentiment and whether the message contains humor or sarcasm
+
+Respond in JSON format only:
+{{
+  "emoji": {{
+    "genuine_distress": boolean,
+    "confidence": 0.0-1.0,
+    "reasoning": "string",
+    "emoji_function": "humor" | "emphasis" | "literal" | "ambiguous",
+    "emoji_context": {{
+      "emojis_found": [list of emojis],
+      "text_emoji_alignment": "amplifies" | "contradicts" | "softens" | "neutral"
+    }}
+  }},
+  "concern_indicators": {{
+    "language_shift_detected": boolean,
+    "hopelessness_themes": boolean,
+    "engagement_drop": boolean,
+    "sudden_mood_change": boolean,
+    "reasoning": "string"
+  }},
+  "suicidal_ideation": {{
+    "present": boolean,
+    "is_literal": boolean,
+    "confidence": 0.0-1.0,
+    "reasoning": "string"
+  }},
+  "depression_indicators": {{
+    "severity_estimate": "LOW|MEDIUM|HIGH",
+    "confidence": 0.0-1.0,
+    "indicators": ["list", "of", "indicators"],
+    "reasoning": "string"
+  }},
+  "overall_context": {{
+    "tone": "string describing tone",
+    "escalation": boolean,
+    "concern_level": "LOW|MEDIUM|HIGH|CRISIS"
+  }},
+  "sentiment": {{
+    "sentiment": "positive|neutral|negative",
+    "sentiment_score": -1.0 to 1.0,
+    "contains_humor": boolean
+  }}
+}}"""
+
+        # Conversation summary plus as many recent messages as the token budget allows
+        return self.prompts.build(render, context,
+                                  format_turn=lambda msg: f"Previous: {msg.get('message_text', '')[:100]}",
+                                  empty="No previous conversation history available.")
@@ -1,6 +1,8 @@
 """Solution 7: Temporal Pattern Recognition."""
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
+from sqlalchemy import select
+from app.db import unit_of_work
 import numpy as np
 import structlog
 
@@ -29,17 +31,25 @@ class TemporalAnalyzer:
     MINIMUM_HISTORY_FOR_ACCELERATION = 10  # Need 10+ risk profiles
     
     def __init__(self, db_session):
+        """
+        Args:
+            db_session: AsyncSession (all queries are awaited)
+        """
         self.db = db_session
     
-    async def analyze_trajectory(self, student_id: str) -> Dict[str, Any]:
+    async def analyze_trajectory(self, student_id: str, snapshot=None) -> Dict[str, Any]:
         """
         Analyze temporal patterns in student's risk trajectory.
         
         Returns analysis with confidence scores based on available data.
         If insufficient data, returns snapshot-only analysis.
+        Uses the per-message ContextSnapshot's risk history when given.
         """
         # Get time-series data
-        history = self._get_risk_history(student_id, days=30)
+        if snapshot is not None and snapshot.covers(student_id):
+            history = self._to_history(snapshot.risk_history)
+        else:
+            history = await self._get_risk_history(student_id, days=30)
         
         # Guard clause: Not enough data for temporal analysis
         if len(history) < self.MINIMUM_HISTORY_FOR_VELOCITY:
@@ -96,17 +106,23 @@ class TemporalAnalyzer:
             "use_snapshot_only": False
         }
     
-    def _get_risk_history(self, student_id: str, days: int = 30) -> List[Dict[str, Any]]:
+    async def _get_risk_history(self, student_id: str, days: int = 30) -> List[Dict[str, Any]]:
         """Get risk score history for student."""
         from app.models.assessment import RiskProfile
         
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        profiles = self.db.query(RiskProfile).filter(
-            RiskProfile.student_id == student_id,
-            RiskProfile.calculated_at >= cutoff_date
-        ).order_by(RiskProfile.calculated_at.asc()).all()
+        profiles = (await self.db.scalars(
+            select(RiskProfile).where(
+                RiskProfile.student_id == student_id,
+                RiskProfile.calculated_at >= cutoff_date
+            ).order_by(RiskProfile.calculated_at.asc())
+        )).all()
         
+        return self._to_history(profiles)
+    
+    def _to_history(self, profiles: List) -> List[Dict[str, Any]]:
+        """Convert RiskProfile rows (oldest first) to risk score history."""
         # Convert to risk scores (0-4 scale)
         risk_map = {"LOW": 1, "MEDIUM": 2, "HIGH": 3, "CRISIS": 4}
         
@@ -268,7 +284,7 @@ class TemporalAnalyzer:
         
         return multiplier
     
-    def save_temporal_pattern(self, student_id: str, pattern_data: Dict[str, Any]):
+    async def save_temporal_pattern(self, student_id: str, pattern_data: Dict[str, Any]):
         """Save detected temporal pattern to database."""
         from app.models.analysis import TemporalPattern
         
@@ -310,7 +326,7 @@ class TemporalAnalyzer:
                     )
                     self.db.add(pattern)
             
-            self.db.commit()
+            await unit_of_work.commit(self.db)
         except Exception as e:
             # Don't rollback here - it would rollback the entire outer transaction
             # Just log the error and re-raise - the outer handler (risk_calculator) will catch it
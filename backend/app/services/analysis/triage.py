@@ -0,0 +1,295 @@
+"""Local triage classifier that lets clearly benign messages skip LLM deep analysis."""
+import hashlib
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+from app.core.config import settings
+from app.core import metrics
+from app.schemas.analysis import StructuredAnalysis
+import structlog
+
+logger = structlog.get_logger()
+
+TRIAGE_MODES = ("off", "shadow", "enforce")
+
+# Counselor-confirmed severity that makes a flagged message benign after all
+BENIGN_SEVERITIES = {"none"}
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent.parent
+
+
+def checkpoint_result(checkpoint_results: Optional[List[Dict[str, Any]]], name: str) -> Dict[str, Any]:
+    """Result dict of a stored checkpoint (rows store checkpoint_name, older rows name)."""
+    for checkpoint in checkpoint_results or []:
+        if isinstance(checkpoint, dict) and name in (checkpoint.get("checkpoint_name"), checkpoint.get("name")):
+            return checkpoint.get("result") or {}
+    return {}
+
+
+def label_analysis(row, feedback_severity: Dict[int, str]) -> Optional[int]:
+    """
+    Training label for a stored MessageAnalysis row: 1 benign, 0 needs analysis.
+
+    The full LLM pipeline's verdict is the label, unless a counselor reviewed
+    the risk profile the message produced (feedback_severity maps
+    risk_profile_id to CounselorFeedback.actual_severity), in which case the
+    counselor wins. Rows whose deep analysis failed or was itself skipped by
+    triage return None: their verdict did not come from the LLM.
+    """
+    deep = checkpoint_result(row.checkpoint_results, "DEEP_ANALYSIS")
+    if not deep or deep.get("error") or (deep.get("triage") or {}).get("skipped"):
+        return None
+
+    risk_profile = deep.get("risk_profile") or {}
+    severity = feedback_severity.get(risk_profile.get("risk_profile_id"))
+    if severity is not None:
+        return 1 if severity.strip().lower() in BENIGN_SEVERITIES else 0
+
+    gating = checkpoint_result(row.checkpoint_results, "RESPONSE_GATING")
+    benign = (
+        not row.safety_flags
+        and not row.concern_indicators
+        and not (row.emoji_analysis or {}).get("genuine_distress")
+        and risk_profile.get("overall_risk", "LOW") == "LOW"
+        and gating.get("gating_decision", "LOW") == "LOW"
+    )
+    return 1 if benign else 0
+
+
+def load_training_examples(db) -> List[Tuple[str, int, Any]]:
+    """(message_text, label, row) for every labelable MessageAnalysis row (sync Session)."""
+    from sqlalchemy import select
+    from app.models.analysis import MessageAnalysis as MessageAnalysisModel
+    from app.models.learning import CounselorFeedback
+
+    feedback_severity = {
+        risk_profile_id: severity
+        for risk_profile_id, severity in db.execute(
+            select(CounselorFeedback.risk_profile_id, CounselorFeedback.actual_severity)
+            .where(CounselorFeedback.risk_profile_id.isnot(None))
+            .order_by(CounselorFeedback.feedback_date)
+        )
+    }
+
+    examples = []
+    rows = db.scalars(select(MessageAnalysisModel).order_by(MessageAnalysisModel.created_at))
+    for row in rows:
+        label = label_analysis(row, feedback_severity)
+        if label is not None and row.message_text:
+            examples.append((row.message_text, label, row))
+    return examples
+
+
+def evaluate(probabilities: Iterable[float], labels: Iterable[int],
+             thresholds: Iterable[float]) -> List[Dict[str, Any]]:
+    """
+    Recall impact of skipping analysis at each benign-probability threshold.
+
+    concerning_recall is the share of non-benign messages that would still
+    get full analysis; missed is how many would have been skipped.
+    """
+    pairs = list(zip(probabilities, labels))
+    concerning = sum(1 for _, label in pairs if label == 0)
+    report = []
+    for threshold in thresholds:
+        skipped = [label for p, label in pairs if p >= threshold]
+        missed = sum(1 for label in skipped if label == 0)
+        report.append({
+            "threshold": threshold,
+            "messages": len(pairs),
+            "skip_rate": round(len(skipped) / len(pairs), 4) if pairs else 0.0,
+            "concerning": concerning,
+            "missed": missed,
+            "concerning_recall": round(1 - missed / concerning, 4) if concerning else 1.0
+        })
+    return report
+
+
+def benign_analysis(benign_probability: float) -> Dict[str, Any]:
+    """Structured analysis document standing in for the LLM's on a triaged message."""
+    reasoning = f"Triage classifier: benign (p={benign_probability:.3f})"
+    return StructuredAnalysis(
+        emoji={"genuine_distress": False, "confidence": benign_probability,
+               "reasoning": reasoning, "emoji_function": "ambiguous"},
+        concern_indicators={"reasoning": reasoning},
+        suicidal_ideation={"present": False, "is_literal": None,
+                           "confidence": benign_probability, "reasoning": reasoning},
+        depression_indicators={"severity_estimate": "LOW", "confidence": benign_probability,
+                               "reasoning": reasoning},
+        overall_context={"tone": "neutral", "escalation": False, "concern_level": "LOW"},
+        sentiment={"sentiment": "neutral", "sentiment_score": 0.0, "contains_humor": False}
+    ).dict()
+
+
+class TriageClassifier:
+    """
+    Calibrated benign-vs-concerning text classifier (scikit-learn).
+
+    What This Classifier Does:
+    - Scores a message with word and character n-gram TF-IDF features and a
+      logistic regression, calibrated with sigmoid scaling so the benign
+      probability can be thresholded directly (well under 1ms per message)
+    - Saves and loads versioned models as triage-<version>.joblib
+
+    What This Classifier Does NOT Do:
+    - Does NOT see conversation history, baselines or safety flags; the
+      caller combines its score with SafetyScreener's result
+    """
+
+    def __init__(self, pipeline, version: str, metadata: Optional[Dict[str, Any]] = None):
+        self.pipeline = pipeline
+        self.version = version
+        self.metadata = metadata or {}
+        self._benign_index = list(pipeline.classes_).index(1)
+
+    def benign_probability(self, message_text: str) -> float:
+        return float(self.pipeline.predict_proba([message_text])[0][self._benign_index])
+
+    @classmethod
+    def train(cls, texts: List[str], labels: List[int],
+              metadata: Optional[Dict[str, Any]] = None) -> "TriageClassifier":
+        """Fit a new model; the version is the training time plus a hash of the data."""
+        import sklearn
+        from sklearn.calibration import CalibratedClassifierCV
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import FeatureUnion, Pipeline
+
+        if min(labels.count(0), labels.count(1)) < 5:
+            raise ValueError("Need at least 5 benign and 5 concerning examples to train triage")
+
+        pipeline = Pipeline([
+            ("features", FeatureUnion([
+                ("words", TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True)),
+                ("chars", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), min_df=2,
+                                          sublinear_tf=True)),
+            ])),
+            ("model", CalibratedClassifierCV(
+                LogisticRegression(class_weight="balanced", max_iter=1000),
+                method="sigmoid", cv=3, ensemble=False
+            )),
+        ])
+        pipeline.fit(texts, labels)
+
+        digest = hashlib.sha256()
+        for text, label in zip(texts, labels):
+            digest.update(f"{label}\t{text}\n".encode("utf-8"))
+        trained_at = datetime.utcnow()
+        version = f"{trained_at:%Y%m%d%H%M%S}-{digest.hexdigest()[:8]}"
+
+        return cls(pipeline, version, {
+            **(metadata or {}),
+            "trained_at": trained_at.isoformat(),
+            "examples": len(labels),
+            "benign_examples": labels.count(1),
+            "sklearn_version": sklearn.__version__
+        })
+
+    def save(self, model_dir: Optional[str] = None) -> Path:
+        import joblib
+
+        directory = resolve_model_dir(model_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"triage-{self.version}.joblib"
+        joblib.dump({"pipeline": self.pipeline, "version": self.version, "metadata": self.metadata}, path)
+        return path
+
+    @classmethod
+    def load(cls, model_dir: Optional[str] = None, version: Optional[str] = None) -> "TriageClassifier":
+        """Load a specific version, or the newest one in model_dir."""
+        import joblib
+
+        directory = resolve_model_dir(model_dir)
+        if version:
+            path = directory / f"triage-{version}.joblib"
+        else:
+            candidates = sorted(directory.glob("triage-*.joblib"))
+            if not candidates:
+                raise FileNotFoundError(f"No triage models in {directory}")
+            path = candidates[-1]
+
+        saved = joblib.load(path)
+        return cls(saved["pipeline"], saved["version"], saved.get("metadata"))
+
+
+def resolve_model_dir(model_dir: Optional[str] = None) -> Path:
+    """settings.triage_model_dir, relative paths taken from the backend directory."""
+    directory = Path(model_dir or settings.triage_model_dir)
+    return directory if directory.is_absolute() else _BACKEND_DIR / directory
+
+
+class MessageTriage:
+    """
+    Decides whether checkpoint 4 may skip its LLM calls for a message.
+
+    What This Does:
+    - Skips the structured, emoji, concern and contextual-risk LLM calls when
+      the classifier's benign probability is at least the threshold AND
+      SafetyScreener raised no flags AND finished its scan (enforce mode only)
+    - In shadow mode, scores every message and records the would-be decision
+      in the checkpoint result without changing anything, so
+      scripts/triage_classifier.py report can measure the recall impact
+
+    What This Does NOT Do:
+    - Does NOT skip risk profiling, baselines or response gating; those run
+      on a benign stand-in analysis instead of the LLM's
+    """
+
+    def __init__(self, classifier: Optional[TriageClassifier] = None, mode: Optional[str] = None,
+                 threshold: Optional[float] = None):
+        self.mode = mode or settings.triage_mode
+        if self.mode not in TRIAGE_MODES:
+            logger.warning("unknown_triage_mode", mode=self.mode)
+            self.mode = "off"
+        self.threshold = threshold if threshold is not None else settings.triage_benign_threshold
+        self.classifier = classifier if classifier is not None or self.mode == "off" else get_triage_classifier()
+
+    def assess(self, message_text: str, safety_flags: List[str],
+               screen_complete: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Triage result for the checkpoint 4 record, or None when triage is off.
+
+        screen_complete is False when the safety screen ran out of its time
+        budget; such a message may hold an obfuscated crisis phrase the
+        screen never reached, so it always gets the full analysis.
+        """
+        if self.mode == "off" or self.classifier is None:
+            return None
+
+        start = time.perf_counter()
+        probability = self.classifier.benign_probability(message_text)
+        confident = probability >= self.threshold and not safety_flags and screen_complete
+        skipped = confident and self.mode == "enforce"
+        metrics.TRIAGE_DECISIONS.labels(
+            mode=self.mode, decision="benign" if confident else "analyze"
+        ).inc()
+
+        return {
+            "model_version": self.classifier.version,
+            "mode": self.mode,
+            "benign_probability": round(probability, 4),
+            "threshold": self.threshold,
+            "confident_benign": confident,
+            "skipped": skipped,
+            "time_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+
+
+_triage_classifier: Optional[TriageClassifier] = None
+_triage_classifier_loaded = False
+
+
+def get_triage_classifier() -> Optional[TriageClassifier]:
+    """Process-wide model, loaded once; None (triage disabled) if it cannot be loaded."""
+    global _triage_classifier, _triage_classifier_loaded
+    if not _triage_classifier_loaded:
+        _triage_classifier_loaded = True
+        try:
+            _triage_classifier = TriageClassifier.load(version=settings.triage_model_version)
+            logger.info("triage_model_loaded",
+                       version=_triage_classifier.version,
+                       mode=settings.triage_mode)
+        except Exception as e:
+            logger.warning("triage_model_unavailable", error=str(e), error_type=type(e).__name__)
+    return _triage_classifier
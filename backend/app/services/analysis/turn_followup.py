@@ -0,0 +1,126 @@
+"""Alerts, crisis follow-up and Tier 1 baseline tracking for a processed turn."""
+from typing import Optional
+from sqlalchemy import select
+from app.schemas.message import Message, MessageAnalysis
+from app.services.assessment.hybrid_assessment import HybridAssessmentService
+from app.db import unit_of_work
+import structlog
+
+logger = structlog.get_logger()
+
+
+def needs_crisis_protocol(risk_profile: Optional[dict]) -> bool:
+    """Whether Checkpoint 5 would replace the reply with the crisis protocol for this profile."""
+    risk_profile = risk_profile or {}
+    overall_risk = risk_profile.get("overall_risk")
+    return overall_risk == "CRISIS" or (overall_risk == "HIGH" and risk_profile.get("confidence", 0.0) > 0.9)
+
+
+async def handle_processed_message(db, llm_client, message: Message, analysis: MessageAnalysis,
+                                   snapshot=None, late: bool = False):
+    """
+    Create alerts, schedule crisis follow-up and track Tier 1 baselines for a processed turn.
+
+    late is True when deep analysis finished after the reply was sent (deferred
+    analysis): a profile that would have triggered the crisis protocol then
+    raises an IMMEDIATE alert with crisis follow-up, since the student never
+    saw the protocol message for this turn.
+
+    Returns the alert created for the turn, if any, so the caller can push it
+    to counselors once its transaction is committed.
+    """
+    high_risk = bool(analysis.risk_profile) and analysis.risk_profile.get("overall_risk") in ["HIGH", "CRISIS"]
+    if late:
+        # A crisis protocol sent by the reply's own gate was alerted on at reply time
+        immediate = not analysis.crisis_protocol_triggered and needs_crisis_protocol(analysis.risk_profile)
+        high_risk = high_risk and not analysis.crisis_protocol_triggered
+    else:
+        immediate = analysis.crisis_protocol_triggered
+    alert = None
+
+    # Create alert if crisis protocol triggered or high risk detected
+    if immediate or high_risk:
+        from app.models.analysis import Alert
+
+        alert_type = "IMMEDIATE" if immediate else "URGENT"
+        if analysis.crisis_protocol_triggered:
+            alert_message = "Crisis protocol triggered - immediate intervention required"
+        elif late:
+            alert_message = f"High risk detected after reply: {analysis.risk_profile.get('overall_risk', 'HIGH')} risk level"
+        else:
+            alert_message = f"High risk detected: {analysis.risk_profile.get('overall_risk', 'HIGH')} risk level"
+
+        # Check if alert already exists for this message (avoid duplicates)
+        existing_alert = await db.scalar(
+            select(Alert).where(
+                Alert.student_id == message.student_id,
+                Alert.message == alert_message,
+                Alert.routing_status == "PENDING"
+            ).limit(1)
+        )
+
+        if not existing_alert:
+            alert = Alert(
+                student_id=message.student_id,
+                alert_type=alert_type,
+                message=alert_message,
+                routing_status="PENDING",
+                risk_profile_id=(analysis.risk_profile or {}).get("risk_profile_id"),
+                followup_status="PENDING" if immediate else None
+            )
+            db.add(alert)
+            if immediate:
+                # Crisis alerts are committed before the response is returned, even
+                # inside a unit of work (the follow-up task reads them from its own session)
+                await db.commit()
+            else:
+                await unit_of_work.commit(db)
+            logger.info("alert_created",
+                       student_id=message.student_id,
+                       alert_type=alert_type,
+                       crisis_triggered=analysis.crisis_protocol_triggered,
+                       late=late,
+                       alert_id=alert.id)
+
+        # Risk profiling (fast path only), analytics collection and report
+        # generation continue in the background; progress is tracked on the alert
+        if immediate:
+            from app.tasks import background
+            from app.tasks.crisis_followup import run_crisis_followup
+
+            background.spawn(
+                run_crisis_followup(
+                    alert_id=alert.id if alert else None,
+                    message=message,
+                    risk_profile=None if analysis.risk_profile_pending else analysis.risk_profile
+                ),
+                name=f"crisis_followup:{message.student_id}"
+            )
+
+    # Pending turns are tracked once their analysis lands (deferred job or crisis follow-up)
+    if not analysis.risk_profile_pending:
+        await track_baseline(db, llm_client, message, analysis.sentiment, snapshot)
+
+    return alert
+
+
+async def track_baseline(db, llm_client, message: Message, baseline_analysis: Optional[dict] = None,
+                         snapshot=None):
+    """Track the turn in the student's Tier 1 baseline while they are in passive monitoring."""
+    assessment_service = HybridAssessmentService(db, llm_client, snapshot=snapshot)
+    tier = await assessment_service.get_assessment_tier(message.student_id)
+
+    if tier == "TIER_1_PASSIVE":
+        # Track passive monitoring (await async method)
+        await assessment_service.track_passive_monitoring(
+            message.student_id,
+            message.message_text,
+            {
+                "text": message.message_text,
+                "emoji_count": len([c for c in message.message_text if ord(c) > 127]),
+                "sentiment": "neutral",  # Will be calculated by LLM if available
+                "contains_humor": False,  # Will be detected by LLM if available
+                "mood": "neutral"
+            },
+            baseline_analysis=baseline_analysis
+        )
@@ -1,8 +1,11 @@
 """Solution 1: Hybrid Assessment Model."""
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
+from app.services.analysis import baseline_stats
+from app.services.analysis.context_snapshot import get_student
 from app.core.config import settings
 from app.schemas.assessment import AssessmentType
+from app.db import unit_of_work
 import structlog
 import json
 
@@ -24,47 +27,49 @@ class HybridAssessmentService:
     - Does NOT replace validated assessments with conversation analysis
     """
     
-    def __init__(self, db_session, llm_client=None):
+    def __init__(self, db_session, llm_client=None, snapshot=None):
         """
         Initialize HybridAssessmentService.
         
         Args:
-            db_session: Database session
+            db_session: AsyncSession
             llm_client: Optional LLM client for sentiment/humor detection in Tier 1
+            snapshot: Optional ContextSnapshot already loaded for the current message
         """
         self.db = db_session
         self.llm = llm_client
+        self.snapshot = snapshot
         self.passive_sessions = settings.passive_monitoring_sessions
         self.checkpoint_interval = timedelta(days=settings.checkpoint_interval_days)
     
-    def get_assessment_tier(self, student_id: str) -> str:
+    async def get_assessment_tier(self, student_id: str) -> str:
         """Determine which assessment tier student is in."""
         # Get student session count
-        student = self._get_student(student_id)
+        student = await self._get_student(student_id)
         session_count = student.session_count if student else 0
         
         if session_count < self.passive_sessions:
             return "TIER_1_PASSIVE"
-        elif self._should_trigger_checkpoint(student_id):
+        elif await self._should_trigger_checkpoint(student_id):
             return "TIER_2_CHECKPOINT"
         else:
             return "TIER_3_CONTEXTUAL"
     
-    def _get_student(self, student_id: str):
+    async def _get_student(self, student_id: str):
         """Get student record."""
-        from app.models.student import Student
-        return self.db.query(Student).filter(Student.student_id == student_id).first()
+        return await get_student(self.db, student_id, self.snapshot)
     
-    def _should_trigger_checkpoint(self, student_id: str) -> bool:
+    async def _should_trigger_checkpoint(self, student_id: str) -> bool:
         """Check if checkpoint assessment should be triggered."""
-        student = self._get_student(student_id)
+        student = await self._get_student(student_id)
         if not student or not student.last_checkpoint_date:
             return True
         
         last_checkpoint = datetime.fromisoformat(student.last_checkpoint_date)
         return datetime.utcnow() - last_checkpoint >= self.checkpoint_interval
     
-    async def track_passive_monitoring(self, student_id: str, message_text: str, message_data: Dict[str, Any]):
+    async def track_passive_monitoring(self, student_id: str, message_text: str, message_data: Dict[str, Any],
+                                       baseline_analysis: Optional[Dict[str, Any]] = None):
         """
         Tier 1: Track baseline patterns without scoring.
         
@@ -72,23 +77,29 @@ class HybridAssessmentService:
         - Tracks communication style, sentiment, humor patterns
         - Builds baseline profile for deviation detection
         - Uses LLM for sentiment/humor detection when available
-        - Calculates baseline statistics (averages, variance)
+        - Calculates baseline statistics (averages, variance) from running
+          accumulators, so the update costs the same on every message
+        - Reuses baseline_analysis (sentiment/humor from the consolidated
+          per-message analysis) instead of making its own LLM call
         
         What This Method Does NOT Do:
         - Does NOT assign risk scores
         - Does NOT infer depression/anxiety levels
         - Does NOT flag concerns (that's Tier 3)
         """
-        student = self._get_student(student_id)
+        student = await self._get_student(student_id)
         if not student:
-            self._create_student(student_id)
-            student = self._get_student(student_id)
+            await self._create_student(student_id)
+            student = await self._get_student(student_id)
         
         # Analyze message with LLM if available
         sentiment = message_data.get("sentiment", "neutral")
         contains_humor = message_data.get("contains_humor", False)
         
-        if self.llm:
+        if baseline_analysis:
+            sentiment = baseline_analysis.get("sentiment", sentiment)
+            contains_humor = baseline_analysis.get("contains_humor", contains_humor)
+        elif self.llm:
             try:
                 llm_analysis = await self._analyze_message_for_baseline(message_text)
                 sentiment = llm_analysis.get("sentiment", sentiment)
@@ -98,38 +109,23 @@ class HybridAssessmentService:
                              error=str(e),
                              student_id=student_id)
         
-        # Update baseline profile with concrete schema
-        baseline = student.baseline_profile or {}
-        
-        # Track language patterns (raw data for statistics)
-        if "language_patterns" not in baseline:
-            baseline["language_patterns"] = []
-        baseline["language_patterns"].append({
-            "timestamp": datetime.utcnow().isoformat(),
-            "message_length": len(message_text),
-            "emoji_count": message_data.get("emoji_count", 0),
-            "sentiment": sentiment
-        })
-        
-        # Track humor patterns
-        if "humor_indicators" not in baseline:
-            baseline["humor_indicators"] = []
-        if contains_humor:
-            baseline["humor_indicators"].append(datetime.utcnow().isoformat())
-        
-        # Track mood samples
-        if "mood_samples" not in baseline:
-            baseline["mood_samples"] = []
-        baseline["mood_samples"].append({
-            "timestamp": datetime.utcnow().isoformat(),
-            "mood": message_data.get("mood", "neutral")
-        })
+        # Update baseline profile (accumulators plus the newest samples; see baseline_stats)
+        baseline = baseline_stats.current(student.baseline_profile)
+        baseline_stats.record_message(
+            baseline,
+            message_length=len(message_text),
+            emoji_count=message_data.get("emoji_count", 0),
+            sentiment=sentiment,
+            mood=message_data.get("mood", "neutral"),
+            contains_humor=contains_humor,
+            at=datetime.utcnow().isoformat()
+        )
         
         # Calculate baseline statistics (concrete schema)
         baseline = self._calculate_baseline_statistics(baseline)
         
         student.baseline_profile = baseline
-        self.db.commit()
+        await unit_of_work.commit(self.db)
         
         logger.info("passive_monitoring_tracked", student_id=student_id)
     
@@ -155,7 +151,7 @@ Respond in JSON:
 }}"""
         
         try:
-            response = await self.llm.generate(prompt, max_tokens=200)
+            response = await self.llm.generate(prompt, max_tokens=200, call_site="baseline")
             
             # Parse JSON
             json_start = response.find('{')
@@ -176,67 +172,26 @@ Respond in JSON:
     
     def _calculate_baseline_statistics(self, baseline: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Calculate baseline statistics from raw data.
+        Calculate baseline statistics from the profile's accumulators.
         
         Creates concrete baseline schema:
         - avg_message_length
-        - lexical_diversity
         - typical_emotionality
         - emoji_usage_rate
         - typical_sentiment
         - sentiment_variance
         - sarcasm_frequency
+        - total_messages
         - etc.
         """
-        stats = {}
-        
-        # Communication style statistics
-        language_patterns = baseline.get("language_patterns", [])
-        if language_patterns:
-            message_lengths = [p.get("message_length", 0) for p in language_patterns]
-            stats["avg_message_length"] = sum(message_lengths) / len(message_lengths) if message_lengths else 0
-            
-            emoji_counts = [p.get("emoji_count", 0) for p in language_patterns]
-            stats["emoji_usage_rate"] = sum(emoji_counts) / len(emoji_counts) if emoji_counts else 0
-        
-        # Emotional baseline statistics
-        mood_samples = baseline.get("mood_samples", [])
-        if mood_samples:
-            sentiments = [m.get("mood", "neutral") for m in mood_samples]
-            # Map to numeric for calculation
-            sentiment_map = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
-            sentiment_scores = [sentiment_map.get(s, 0.0) for s in sentiments]
-            
-            if sentiment_scores:
-                stats["typical_sentiment"] = sum(sentiment_scores) / len(sentiment_scores)
-                # Calculate variance
-                mean = stats["typical_sentiment"]
-                variance = sum((x - mean) ** 2 for x in sentiment_scores) / len(sentiment_scores)
-                stats["sentiment_variance"] = variance
-                stats["typical_emotionality"] = abs(mean)  # How emotional (regardless of direction)
-        
-        # Humor/sarcasm frequency
-        humor_indicators = baseline.get("humor_indicators", [])
-        language_patterns_count = len(baseline.get("language_patterns", []))
-        if language_patterns_count > 0:
-            stats["sarcasm_frequency"] = len(humor_indicators) / language_patterns_count
-            stats["dark_humor_baseline"] = stats["sarcasm_frequency"] > 0.3  # If >30% humor
-        
-        # Engagement statistics (if available)
-        if "session_lengths" in baseline:
-            stats["typical_session_length"] = sum(baseline["session_lengths"]) / len(baseline["session_lengths"])
-        
-        # Common themes (would be extracted from message content)
-        stats["common_themes"] = baseline.get("common_themes", [])
-        
         # Store statistics in baseline
-        baseline["statistics"] = stats
+        baseline["statistics"] = baseline_stats.statistics(baseline)
         
         return baseline
     
-    def should_trigger_checkpoint_assessment(self, student_id: str) -> bool:
+    async def should_trigger_checkpoint_assessment(self, student_id: str) -> bool:
         """Check if checkpoint assessment should be administered."""
-        tier = self.get_assessment_tier(student_id)
+        tier = await self.get_assessment_tier(student_id)
         return tier == "TIER_2_CHECKPOINT"
     
     def get_checkpoint_assessment_plan(self, student_id: str) -> Dict[str, Any]:
@@ -287,7 +242,7 @@ Respond in JSON:
         
         return indicators
     
-    def _create_student(self, student_id: str):
+    async def _create_student(self, student_id: str):
         """Create new student record."""
         from app.models.student import Student
         student = Student(
@@ -296,7 +251,7 @@ Respond in JSON:
             session_count=0
         )
         self.db.add(student)
-        self.db.commit()
+        await unit_of_work.commit(self.db)
 
 
 
@@ -2,7 +2,7 @@
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from app.models.analysis import CrisisAnalytics, CrisisReport, Alert
-from app.models.student import Student, Session
+from app.models.student import Student, Session, ChatMessage
 from app.models.assessment import Assessment, RiskProfile
 from app.models.analysis import MessageAnalysis, TemporalPattern
 import structlog
@@ -110,18 +110,17 @@ class CrisisAnalyticsCollector:
     
     def _collect_message_data(self, student_id: str) -> tuple[List[Dict], List[Dict]]:
         """Collect recent messages and their analyses."""
-        # Get recent messages from sessions (last 30 messages)
-        sessions = self.db.query(Session).filter(
-            Session.student_id == student_id
-        ).order_by(Session.created_at.desc()).limit(5).all()
-        
-        recent_messages = []
-        for session in sessions:
-            if session.messages:
-                recent_messages.extend(session.messages[-10:])  # Last 10 messages per session
+        # Get recent messages (last 30 across sessions, oldest first)
+        chat_messages = self.db.query(ChatMessage).filter(
+            ChatMessage.student_id == student_id
+        ).order_by(ChatMessage.id.desc()).limit(30).all()
         
-        # Limit to last 30 messages total
-        recent_messages = recent_messages[-30:]
+        recent_messages = [{
+            "id": m.message_id,
+            "content": m.content,
+            "sender": m.sender,
+            "timestamp": m.sent_at
+        } for m in reversed(chat_messages)]
         
         # Get message analyses
         message_analyses = self.db.query(MessageAnalysis).filter(
@@ -206,7 +205,7 @@ class CrisisAnalyticsCollector:
         ).all()
         
         total_sessions = len(sessions)
-        total_messages = sum(len(s.messages or []) for s in sessions)
+        total_messages = sum(s.total_messages for s in sessions)
         
         # Calculate engagement metrics
         if sessions:
@@ -235,7 +234,7 @@ class CrisisAnalyticsCollector:
             if session.created_at:
                 session_times.append({
                     "date": session.created_at.isoformat(),
-                    "message_count": len(session.messages or [])
+                    "message_count": session.total_messages
                 })
         
         return {
@@ -267,6 +266,7 @@ class CrisisAnalyticsCollector:
             summary = await self.llm.generate(
                 prompt=prompt,
                 max_tokens=1000,
+                call_site="crisis_report",
                 system_message="You are a clinical mental health report writer. Generate concise, professional summaries of student mental health data for counselors and administrators."
             )
             
@@ -2,6 +2,7 @@
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from app.core.config import settings
+from app.services.analysis import baseline_stats
 import structlog
 
 logger = structlog.get_logger()
@@ -194,30 +195,16 @@ class AdaptiveSensitivityService:
         if not student or not student.baseline_profile:
             return {}
         
-        baseline = student.baseline_profile
-        
-        # Calculate baseline statistics
-        mood_samples = baseline.get("mood_samples", [])
-        if not mood_samples:
+        # Running mean/variance of mood (baseline_stats), not a rescan of every sample
+        mood = baseline_stats.mood_distribution(student.baseline_profile)
+        if not mood or mood["n"] < 3:
             return {}
         
-        # Calculate mean and std of mood
-        moods = [m.get("mood", "neutral") for m in mood_samples]
-        mood_values = {"very_negative": -2, "negative": -1, "neutral": 0, "positive": 1, "very_positive": 2}
-        mood_scores = [mood_values.get(m, 0) for m in moods]
-        
-        if len(mood_scores) < 3:
-            return {}
-        
-        import numpy as np
-        mean_mood = np.mean(mood_scores)
-        std_mood = np.std(mood_scores)
-        
         return {
-            "mean_mood": mean_mood,
-            "std_mood": std_mood,
-            "sample_count": len(mood_samples),
-            "typical_emotionality": "high" if std_mood > 1.0 else "low"
+            "mean_mood": mood["mean"],
+            "std_mood": mood["std"],
+            "sample_count": mood["n"],
+            "typical_emotionality": "high" if mood["std"] > 1.0 else "low"
         }
     
     def check_deviation_from_baseline(self, student_id: str, current_indicators: Dict[str, Any]) -> bool:
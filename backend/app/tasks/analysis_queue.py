@@ -0,0 +1,300 @@
+"""Durable work queue (analysis_jobs table) for deferred deep analysis."""
+import asyncio
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from sqlalchemy import func, or_, select, update
+from app.core.config import settings
+from app.core import metrics
+from app.db import unit_of_work
+from app.models.analysis import AnalysisJob
+import structlog
+
+logger = structlog.get_logger()
+
+UNFINISHED = ("PENDING", "RUNNING")
+
+
+def partition_for(student_id: str, partitions: Optional[int] = None) -> int:
+    """Queue partition of a student (stable across processes and restarts, unlike hash())."""
+    return zlib.crc32(student_id.encode("utf-8")) % (partitions or settings.analysis_queue_partitions)
+
+
+def owned_partitions(worker_index: int, worker_count: int, partitions: Optional[int] = None) -> List[int]:
+    """Partitions worker worker_index of worker_count consumes (every partition has exactly one owner)."""
+    partitions = partitions or settings.analysis_queue_partitions
+    if not 0 <= worker_index < worker_count <= partitions:
+        raise ValueError(f"Worker {worker_index} of {worker_count} is not valid for {partitions} partitions")
+    return [partition for partition in range(partitions) if partition % worker_count == worker_index]
+
+
+async def enqueue(db, student_id: str, payload: Dict[str, Any],
+                  job_type: str = "message_analysis") -> AnalysisJob:
+    """
+    Add a job in the caller's transaction.
+
+    Inside a unit of work the job becomes visible to consumers only when the
+    turn commits, so a job never runs for a turn that was rolled back.
+    """
+    job = AnalysisJob(
+        student_id=student_id,
+        partition=partition_for(student_id),
+        job_type=job_type,
+        payload=payload,
+        status="PENDING",
+        attempts=0,
+        available_at=datetime.utcnow()
+    )
+    db.add(job)
+    await unit_of_work.commit(db)
+    metrics.ANALYSIS_JOBS.labels(outcome="enqueued").inc()
+    return job
+
+
+def _runnable(now: datetime, partitions: Optional[Iterable[int]] = None):
+    """Conditions for a claimable job (see claim_jobs), optionally within partitions."""
+    heads = (
+        select(func.min(AnalysisJob.id))
+        .where(AnalysisJob.status.in_(UNFINISHED))
+        .group_by(AnalysisJob.student_id)
+    )
+    conditions = [
+        AnalysisJob.id.in_(heads),
+        AnalysisJob.available_at <= now,
+        or_(AnalysisJob.status == "PENDING", AnalysisJob.locked_until < now)
+    ]
+    if partitions is not None:
+        partitions = list(partitions)
+        heads = heads.where(AnalysisJob.partition.in_(partitions))
+        conditions[0] = AnalysisJob.id.in_(heads)
+        conditions.append(AnalysisJob.partition.in_(partitions))
+    return conditions
+
+
+async def claim_jobs(db, limit: int, now: Optional[datetime] = None,
+                     partitions: Optional[Iterable[int]] = None) -> List[AnalysisJob]:
+    """
+    Claim up to limit runnable jobs, at most one per student, and commit the claims.
+
+    A job is runnable when it is its student's oldest unfinished job, its
+    backoff has passed, and it is PENDING or its RUNNING lease has expired.
+    Claims are compare-and-set updates on (status, attempts), so consumers
+    polling the same table never run a job twice at once. Returned rows keep
+    their pre-claim attribute values. partitions limits the claim to the
+    calling worker's partitions (None: all).
+    """
+    now = now or datetime.utcnow()
+    candidates = (await db.scalars(
+        select(AnalysisJob).where(*_runnable(now, partitions))
+        .order_by(AnalysisJob.id).limit(limit)
+        .execution_options(populate_existing=True)  # The compare-and-set needs current values
+    )).all()
+
+    claimed = []
+    for job in candidates:
+        if job.attempts >= settings.analysis_queue_max_attempts:
+            # Lease expired on the last attempt (the consumer died or hung)
+            values = {"status": "FAILED", "completed_at": now, "locked_until": None,
+                      "last_error": job.last_error or "lease expired"}
+        else:
+            values = {"status": "RUNNING", "attempts": job.attempts + 1,
+                      "locked_until": now + timedelta(seconds=settings.analysis_queue_lease_seconds)}
+        result = await db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job.id,
+                   AnalysisJob.status == job.status,
+                   AnalysisJob.attempts == job.attempts)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            continue  # Another consumer got there first
+        if values["status"] == "FAILED":
+            metrics.ANALYSIS_JOBS.labels(outcome="failed").inc()
+            logger.error("analysis_job_failed", job_id=job.id, student_id=job.student_id,
+                        attempts=job.attempts, error=values["last_error"])
+        else:
+            metrics.ANALYSIS_JOB_WAIT.observe(max(0.0, (now - job.created_at).total_seconds()))
+            claimed.append(job)
+    await db.commit()
+    return claimed
+
+
+async def queue_lag(db, now: Optional[datetime] = None, partitions: Optional[Iterable[int]] = None) -> float:
+    """Seconds the oldest runnable job has been waiting since it became available (0 when none)."""
+    now = now or datetime.utcnow()
+    oldest = await db.scalar(select(func.min(AnalysisJob.available_at)).where(*_runnable(now, partitions)))
+    return max(0.0, (now - oldest).total_seconds()) if oldest else 0.0
+
+
+async def complete(db, job_id: int):
+    """Mark a claimed job done in the caller's transaction (with the results it wrote)."""
+    await db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.status == "RUNNING")
+        .values(status="DONE", completed_at=datetime.utcnow(), locked_until=None, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+    await unit_of_work.commit(db)
+
+
+async def fail(db, job_id: int, error: str):
+    """
+    Release a claimed job after an error: retry with exponential backoff, or
+    mark it FAILED once it has used its attempts (later jobs for the student
+    then proceed).
+    """
+    job = await db.get(AnalysisJob, job_id, populate_existing=True)
+    if job is None or job.status != "RUNNING":
+        return
+
+    now = datetime.utcnow()
+    job.last_error = error[:500]
+    job.locked_until = None
+    if job.attempts >= settings.analysis_queue_max_attempts:
+        job.status = "FAILED"
+        job.completed_at = now
+        metrics.ANALYSIS_JOBS.labels(outcome="failed").inc()
+        logger.error("analysis_job_failed", job_id=job_id, student_id=job.student_id,
+                    attempts=job.attempts, error=job.last_error)
+    else:
+        delay = settings.analysis_queue_retry_backoff_seconds * 2 ** (job.attempts - 1)
+        job.status = "PENDING"
+        job.available_at = now + timedelta(seconds=delay)
+        metrics.ANALYSIS_JOBS.labels(outcome="retried").inc()
+        logger.warning("analysis_job_retry_scheduled", job_id=job_id, student_id=job.student_id,
+                      attempts=job.attempts, retry_in_seconds=delay, error=job.last_error)
+    await db.commit()
+
+
+JobHandler = Callable[[Any, AnalysisJob], Awaitable[None]]
+
+
+def _default_handlers() -> Dict[str, JobHandler]:
+    from app.tasks.deferred_analysis import run_message_analysis
+    return {"message_analysis": run_message_analysis}
+
+
+class AnalysisQueueConsumer:
+    """
+    Polls analysis_jobs and runs the claimed jobs.
+
+    What This Consumer Does:
+    - Keeps up to `concurrency` jobs running, each in its own DB session
+      (claims never include two jobs for one student, so a student's turns
+      are analyzed one at a time, in order)
+    - Bounds each job by the lease time and hands errors to fail() for retry
+    - On stop(), claims nothing new and waits for running jobs
+
+    What This Consumer Does NOT Do:
+    - Does NOT mark jobs done; handlers call complete() in the transaction
+      that writes their results
+    """
+
+    def __init__(self, session_factory=None, concurrency: Optional[int] = None,
+                 poll_interval: Optional[float] = None,
+                 handlers: Optional[Dict[str, JobHandler]] = None,
+                 partitions: Optional[List[int]] = None):
+        if session_factory is None:
+            from app.db.database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.analysis_queue_concurrency
+        self.poll_interval = poll_interval if poll_interval is not None else settings.analysis_queue_poll_interval
+        self.handlers = handlers
+        self.partitions = partitions  # None: every partition (the in-process consumer)
+        self._running: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Run the poll loop in the background."""
+        self._task = asyncio.create_task(self.run(), name="analysis_queue_consumer")
+        return self._task
+
+    async def run(self):
+        """Claim and run jobs until stop()."""
+        logger.info("analysis_queue_consumer_started",
+                   concurrency=self.concurrency,
+                   partitions=len(self.partitions) if self.partitions is not None else "all")
+        while not self._stopping.is_set():
+            claimed = 0
+            try:
+                # Full consumers still poll, to keep the lag metric current
+                claimed = await self.poll_once(max(0, self.concurrency - len(self._running)))
+            except Exception as e:
+                logger.error("analysis_queue_poll_failed", error=str(e), exc_info=True)
+            if claimed == 0 or len(self._running) >= self.concurrency:
+                # Idle or full: wait for a finished job, the poll interval or stop()
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("analysis_queue_consumer_stopped")
+
+    async def poll_once(self, limit: int) -> int:
+        """Claim up to limit jobs and start them; returns how many were started."""
+        async with self.session_factory() as db:
+            jobs = await claim_jobs(db, limit, partitions=self.partitions) if limit > 0 else []
+            metrics.ANALYSIS_QUEUE_LAG.set(await queue_lag(db, partitions=self.partitions))
+        for job in jobs:
+            task = asyncio.create_task(self._run_job(job), name=f"analysis_job:{job.id}")
+            self._running.add(task)
+            task.add_done_callback(self._on_done)
+        metrics.ANALYSIS_JOBS_RUNNING.set(len(self._running))
+        return len(jobs)
+
+    def _on_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        metrics.ANALYSIS_JOBS_RUNNING.set(len(self._running))
+        self._wake.set()
+
+    async def _run_job(self, job: AnalysisJob):
+        if self.handlers is None:
+            self.handlers = _default_handlers()
+        handler = self.handlers.get(job.job_type)
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job type '{job.job_type}'")
+            async with self.session_factory() as db:
+                await asyncio.wait_for(handler(db, job), timeout=settings.analysis_queue_lease_seconds)
+            metrics.ANALYSIS_JOBS.labels(outcome="completed").inc()
+        except Exception as e:
+            logger.error("analysis_job_error",
+                        job_id=job.id,
+                        student_id=job.student_id,
+                        attempt=job.attempts + 1,
+                        error=str(e),
+                        error_type=type(e).__name__)
+            try:
+                async with self.session_factory() as db:
+                    await fail(db, job.id, str(e) or type(e).__name__)
+            except Exception as release_error:
+                # The lease expires and the job is reclaimed
+                logger.error("analysis_job_release_failed", job_id=job.id, error=str(release_error))
+
+    async def stop(self, timeout: float = 30.0):
+        """Stop claiming and wait for running jobs (abandoned ones are reclaimed after their lease)."""
+        self._stopping.set()
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+        if self._running:
+            logger.info("draining_analysis_jobs", running=len(self._running))
+            done, pending = await asyncio.wait(set(self._running), timeout=timeout)
+            for task in pending:
+                logger.warning("analysis_job_abandoned_on_shutdown", task=task.get_name())
+                task.cancel()
+
+
+_consumer: Optional[AnalysisQueueConsumer] = None
+
+
+def get_analysis_queue_consumer() -> AnalysisQueueConsumer:
+    """Process-wide consumer for the API process."""
+    global _consumer
+    if _consumer is None:
+        _consumer = AnalysisQueueConsumer()
+    return _consumer
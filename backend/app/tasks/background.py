@@ -0,0 +1,60 @@
+"""Tracked in-process background work for the request path."""
+import asyncio
+from typing import Coroutine, Any, Set
+from app.core import metrics
+import structlog
+
+logger = structlog.get_logger()
+
+# Strong references keep tasks alive until they finish (asyncio only keeps weak ones)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine[Any, Any, Any], name: str) -> asyncio.Task:
+    """
+    Run a coroutine in the background and keep track of it.
+
+    Exceptions are logged rather than lost; the task is dropped from the
+    registry once it finishes.
+    """
+    task = asyncio.create_task(_unattributed(coro), name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_done)
+    logger.debug("background_task_spawned", task=name, in_flight=len(_background_tasks))
+    return task
+
+
+async def _unattributed(coro: Coroutine[Any, Any, Any]):
+    # Tasks copy the spawning request's context; keep their SQL off its route
+    metrics.current_route.set("background")
+    return await coro
+
+
+def _on_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if task.cancelled():
+        logger.warning("background_task_cancelled", task=task.get_name())
+    elif task.exception() is not None:
+        logger.error("background_task_failed",
+                    task=task.get_name(),
+                    error=str(task.exception()))
+
+
+def in_flight() -> int:
+    """Number of background tasks still running."""
+    return len(_background_tasks)
+
+
+metrics.BACKGROUND_TASKS_IN_FLIGHT.set_function(in_flight)
+
+
+async def drain(timeout: float = 30.0):
+    """Wait for in-flight background work during shutdown."""
+    if not _background_tasks:
+        return
+
+    logger.info("draining_background_tasks", in_flight=len(_background_tasks))
+    done, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    for task in pending:
+        logger.warning("background_task_abandoned_on_shutdown", task=task.get_name())
+        task.cancel()
@@ -0,0 +1,68 @@
+"""Background folding of old conversation turns into the session summary."""
+from typing import Set
+from sqlalchemy import update
+from app.db.database import AsyncSessionLocal
+from app.models.student import Session
+from app.services.analysis.conversation_memory import ConversationSummarizer, turns_to_fold
+from app.tasks import background
+import structlog
+
+logger = structlog.get_logger()
+
+# Sessions with a summary update already running (one at a time per session)
+_summarizing: Set[int] = set()
+
+
+def is_summarizing(session_id: int) -> bool:
+    return session_id in _summarizing
+
+
+def spawn_summary(session_id: int, llm_client):
+    """Start summarize_session in the background unless one is running for the session."""
+    if not is_summarizing(session_id):
+        background.spawn(summarize_session(session_id, llm_client), name=f"conversation_summary:{session_id}")
+
+
+async def summarize_session(session_id: int, llm_client):
+    """
+    Fold the session's turns older than the recent window into its summary.
+
+    What This Task Does:
+    - Reads the session in its own DB session and summarizes the turns that
+      have left the window (LLM, or extractive fallback)
+    - Writes the summary with a compare-and-set on summarized_turns, so a
+      concurrent update is never overwritten with an older summary
+
+    What This Task Does NOT Do:
+    - Does NOT touch recent_turns or messages (the request path owns them;
+      it drops summarized turns from the window on its next turn)
+    """
+    if session_id in _summarizing:
+        return
+    _summarizing.add(session_id)
+    try:
+        async with AsyncSessionLocal() as db:
+            session = await db.get(Session, session_id)
+            if session is None:
+                return
+            fold = turns_to_fold(session)
+            if not fold:
+                return
+
+            previous_through = session.summarized_turns or 0
+            summary = await ConversationSummarizer(llm_client).fold(session.conversation_summary, fold)
+
+            result = await db.execute(
+                update(Session)
+                .where(Session.id == session_id, Session.summarized_turns == previous_through)
+                .values(conversation_summary=summary, summarized_turns=fold[-1]["turn"])
+            )
+            await db.commit()
+
+            logger.info("conversation_summary_updated",
+                       session_id=session_id,
+                       folded_turns=len(fold),
+                       summarized_turns=fold[-1]["turn"],
+                       applied=result.rowcount == 1)
+    finally:
+        _summarizing.discard(session_id)
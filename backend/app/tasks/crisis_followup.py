@@ -0,0 +1,117 @@
+"""Background crisis follow-up: risk profiling, analytics collection and report."""
+from datetime import datetime
+from typing import Dict, Any, Optional
+from app.db.database import SessionLocal, AsyncSessionLocal
+from app.db.unit_of_work import unit_of_work
+from app.core.llm_client import get_llm_client
+from app.core.llm_scheduler import llm_priority
+from app.core.student_locks import StudentBusyError, student_turn
+from app.models.analysis import Alert
+from app.schemas.message import Message
+import structlog
+
+logger = structlog.get_logger()
+
+
+async def run_crisis_followup(alert_id: Optional[int], message: Message,
+                              risk_profile: Optional[Dict[str, Any]] = None):
+    """
+    Finish the slow part of a crisis turn after the student has the protocol message.
+
+    What This Task Does:
+    - Calculates the risk profile when the crisis fast path skipped it, and
+      tracks the turn in the Tier 1 baseline once it is written, holding the
+      student's turn lock (their next live turn writes the same baseline)
+    - Links the saved risk profile to the alert
+    - Collects crisis analytics and generates the counselor report
+    - Records progress on the alert (followup_status / followup_completed_at)
+
+    What This Task Does NOT Do:
+    - Does NOT create the alert (the request path commits it before responding)
+    - Does NOT share the request's DB session (opens its own)
+    """
+    from app.services.analysis.sequential_processor import SequentialProcessor
+    from app.services.analysis.turn_followup import track_baseline
+    from app.services.crisis.analytics_collector import CrisisAnalyticsCollector
+
+    db = SessionLocal()
+    alert = None
+
+    try:
+        llm_client = get_llm_client()
+
+        if alert_id:
+            alert = db.query(Alert).filter(Alert.id == alert_id).first()
+        _set_status(db, alert, "RUNNING")
+
+        if risk_profile is None:
+            async with AsyncSessionLocal() as pipeline_db:
+                async with unit_of_work(pipeline_db):
+                    processor = SequentialProcessor(pipeline_db, llm_client)
+                    risk_profile = await processor.calculate_crisis_risk(message)
+                # The request path skipped the baseline for this pending turn
+                try:
+                    async with student_turn(message.student_id):
+                        async with unit_of_work(pipeline_db):
+                            await track_baseline(pipeline_db, llm_client, message)
+                except StudentBusyError:
+                    logger.warning("crisis_followup_baseline_skipped", student_id=message.student_id)
+            if alert and risk_profile and risk_profile.get("risk_profile_id"):
+                alert.risk_profile_id = risk_profile["risk_profile_id"]
+                db.commit()
+
+        collector = CrisisAnalyticsCollector(db, llm_client)
+        analytics = await collector.collect_and_save_analytics(
+            student_id=message.student_id,
+            alert_id=alert_id,
+            trigger_reason="Crisis protocol triggered - immediate safety concern detected",
+            trigger_message=message.message_text[:500],  # Limit message length
+            current_risk_profile=risk_profile,
+            priority="CRITICAL"
+        )
+        # The counselor is waiting on this report; don't queue it behind batch reports
+        with llm_priority("crisis"):
+            report = await collector.generate_and_save_report(
+                student_id=message.student_id,
+                analytics_id=analytics.id,
+                alert_id=alert_id,
+                report_type="CRISIS"
+            )
+
+        _set_status(db, alert, "COMPLETED")
+        logger.info("crisis_data_collected_and_reported",
+                   student_id=message.student_id,
+                   analytics_id=analytics.id,
+                   report_id=report.id,
+                   alert_id=alert_id)
+    except Exception as e:
+        logger.error("crisis_followup_failed",
+                    student_id=message.student_id,
+                    alert_id=alert_id,
+                    error=str(e),
+                    exc_info=True)
+        db.rollback()
+        _set_status(db, alert, "FAILED", error=str(e))
+    finally:
+        db.close()
+
+
+def _set_status(db, alert: Optional[Alert], status: str, error: Optional[str] = None):
+    """Record follow-up progress on the alert."""
+    if not alert:
+        return
+
+    alert.followup_status = status
+    if status in ("COMPLETED", "FAILED"):
+        alert.followup_completed_at = datetime.utcnow()
+    if error:
+        alert.followup_error = error[:500]
+
+    try:
+        db.commit()
+    except Exception as e:
+        logger.error("crisis_followup_status_update_failed",
+                    alert_id=alert.id,
+                    status=status,
+                    error=str(e))
+        db.rollback()
@@ -0,0 +1,55 @@
+"""Analysis-queue handler: deep analysis, logging and alerting for a deferred turn."""
+from app.core.llm_client import get_llm_client
+from app.db.unit_of_work import unit_of_work
+from app.models.analysis import AnalysisJob
+from app.schemas.message import Message
+from app.services.alerts.alert_notifier import get_alert_notifier
+from app.services.analysis.turn_followup import handle_processed_message
+from app.tasks import analysis_queue
+import structlog
+
+logger = structlog.get_logger()
+
+
+async def run_message_analysis(db, job: AnalysisJob):
+    """
+    Finish a turn that was answered before its deep analysis.
+
+    What This Task Does:
+    - Runs Checkpoint 4 (emoji, concern indicators, risk profile) and logs
+      the turn to message_analyses
+    - Marks the job done in the same transaction as those writes
+    - Raises a late alert for a HIGH/CRISIS result (IMMEDIATE with crisis
+      follow-up when gating would have sent the crisis protocol) and pushes
+      it to connected counselor dashboards
+    - Tracks Tier 1 passive monitoring
+
+    What This Task Does NOT Do:
+    - Does NOT change the reply the student already has (their next turn is
+      gated on the new risk profile)
+    - Does NOT hold the student's turn lock; the LLM-bound analysis would
+      stall their next live turn, which does not touch the baseline
+    """
+    from app.services.analysis.sequential_processor import SequentialProcessor
+
+    payload = job.payload
+    message = Message(**payload["message"])
+    llm_client = get_llm_client()
+
+    # No per-student lock: in deferred mode live turns do not write the
+    # baseline, and the queue runs one job per student at a time
+    async with unit_of_work(db):
+        processor = SequentialProcessor(db, llm_client)
+        analysis = await processor.complete_deferred_analysis(message, payload)
+        await analysis_queue.complete(db, job.id)
+
+        alert = await handle_processed_message(db, llm_client, message, analysis, processor.snapshot, late=True)
+
+    if alert:
+        get_alert_notifier().publish(alert)
+    logger.info("deferred_analysis_completed",
+               job_id=job.id,
+               student_id=message.student_id,
+               analysis_id=analysis.analysis_id,
+               overall_risk=(analysis.risk_profile or {}).get("overall_risk"),
+               alert_id=alert.id if alert else None)
@@ -0,0 +1,75 @@
+"""Standalone analysis worker: consumes deferred-analysis jobs outside the API process.
+
+Each worker owns the queue partitions p with p % worker_count == worker_index
+(a job's partition is crc32(student_id) % ANALYSIS_QUEUE_PARTITIONS), so all
+of a student's turns go to one worker and are analyzed in order there, and
+workers never contend for the same rows. Run one process per index:
+
+    python -m app.worker --worker-index 0 --worker-count 4 --concurrency 8 --metrics-port 9100
+
+Set ANALYSIS_QUEUE_CONSUMER_ENABLED=false on the API so it only enqueues,
+and ALERT_NOTIFIER_BACKEND=redis so late alerts reach counselor dashboards.
+SIGTERM/SIGINT stop claiming, let running jobs finish (up to
+ANALYSIS_WORKER_DRAIN_SECONDS) and leave the rest queued for the next start.
+"""
+import argparse
+import asyncio
+import signal
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.tasks.analysis_queue import AnalysisQueueConsumer, owned_partitions
+
+logger = configure_logging(settings.log_level)
+
+
+async def run_worker(worker_index: int, worker_count: int, concurrency: int):
+    """Consume this worker's partitions until SIGTERM/SIGINT, then drain."""
+    from app.tasks import background
+    from app.core.llm_client import close_llm_client
+
+    partitions = owned_partitions(worker_index, worker_count)
+    consumer = AnalysisQueueConsumer(concurrency=concurrency, partitions=partitions)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("analysis_worker_started",
+               worker_index=worker_index,
+               worker_count=worker_count,
+               partitions=len(partitions),
+               concurrency=concurrency)
+    consumer.start()
+    await stop.wait()
+
+    logger.info("analysis_worker_draining", worker_index=worker_index)
+    await consumer.stop(timeout=settings.analysis_worker_drain_seconds)
+    # Crisis follow-ups spawned by late IMMEDIATE alerts
+    await background.drain()
+    await close_llm_client()
+    logger.info("analysis_worker_stopped", worker_index=worker_index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--worker-index", type=int, default=0)
+    parser.add_argument("--worker-count", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=settings.analysis_queue_concurrency,
+                        help="Jobs run at once by this worker (always for different students)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve /metrics on this port")
+    args = parser.parse_args()
+    try:
+        owned_partitions(args.worker_index, args.worker_count)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.metrics_port:
+        from prometheus_client import start_http_server
+        start_http_server(args.metrics_port)
+
+    asyncio.run(run_worker(args.worker_index, args.worker_count, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
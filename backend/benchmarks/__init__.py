@@ -0,0 +1 @@
+"""Load benchmark suite: fake LLM server, seeded dataset and load driver."""
@@ -0,0 +1,114 @@
+"""Concurrent turns for the same students: checks no baseline or session update is lost.
+
+Sends --turns chat turns per student at once for --students seeded students
+(benchmarks.seed_data) and compares each student's per-turn state before and
+after:
+- Session.message_count (chat_messages rows): one user message plus one reply per turn
+- baseline_profile.emoji_baseline.emoji_per_message.n: one sample per analyzed turn
+
+Any shortfall is a lost read-modify-write update. With the per-student turn
+lock (STUDENT_TURN_LOCK_ENABLED, the default) lost updates must be 0; restart
+the API with STUDENT_TURN_LOCK_ENABLED=false to see the race it closes. Also
+reports wall time, so the cost of serializing same-student turns is visible.
+
+Run with DEFERRED_ANALYSIS_ENABLED=false and TRIAGE_MODE=off on the API so
+every turn runs deep analysis inline, against the same DATABASE_URL.
+
+Usage:
+    python -m benchmarks.concurrent_turns --base-url http://127.0.0.1:8000 --students 50 --turns 8
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+import httpx
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal
+from app.models.student import Student, Session as SessionModel
+from benchmarks.seed_data import PREFIX, MESSAGES
+
+
+def snapshot(student_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """Per-turn counters for each student."""
+    db = SessionLocal()
+    try:
+        counts = {student_id: {"session_messages": 0, "emoji_baseline": 0} for student_id in student_ids}
+        for student in db.query(Student).filter(Student.student_id.in_(student_ids)):
+            emoji_baseline = (student.baseline_profile or {}).get("emoji_baseline", {})
+            counts[student.student_id]["emoji_baseline"] = emoji_baseline.get("emoji_per_message", {}).get("n", 0)
+        for session in db.query(SessionModel).filter(SessionModel.student_id.in_(student_ids)):
+            counts[session.student_id]["session_messages"] += session.message_count
+        return counts
+    finally:
+        db.close()
+
+
+async def send_turns(base_url: str, student_ids: List[str], turns: int, timeout: float, seed: int):
+    """Every turn for every student at once; returns ({student_id: [status, ...]}, wall seconds)."""
+    rng = random.Random(seed)
+    statuses = {student_id: [] for student_id in student_ids}
+    limits = httpx.Limits(max_connections=len(student_ids) * turns)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def turn(student_id: str, text: str):
+            try:
+                response = await client.post("/api/messages/process",
+                                             json={"student_id": student_id, "message_text": text})
+                statuses[student_id].append(response.status_code)
+            except httpx.HTTPError as e:
+                statuses[student_id].append(type(e).__name__)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            turn(student_id, rng.choice(MESSAGES)) for student_id in student_ids for _ in range(turns)
+        ))
+        return statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--students", type=int, default=50, help="Seeded students to send turns for")
+    parser.add_argument("--turns", type=int, default=8, help="Concurrent turns per student")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    student_ids = [f"{PREFIX}{i:05d}" for i in range(args.students)]
+    before = snapshot(student_ids)
+    statuses, wall = asyncio.run(send_turns(args.base_url, student_ids, args.turns, args.timeout, args.seed))
+    after = snapshot(student_ids)
+
+    lost = {"session_messages": 0, "emoji_baseline": 0}
+    for student_id in student_ids:
+        ok = sum(1 for status in statuses[student_id] if status == 200)
+        expected = {"session_messages": 2 * ok, "emoji_baseline": ok}
+        for counter, count in expected.items():
+            lost[counter] += max(0, count - (after[student_id][counter] - before[student_id][counter]))
+
+    status_counts: Dict[str, int] = {}
+    for student_statuses in statuses.values():
+        for status in student_statuses:
+            status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+
+    print(json.dumps({
+        "students": args.students,
+        "turns_per_student": args.turns,
+        "statuses": status_counts,
+        "wall_s": round(wall, 2),
+        "turns_per_s": round(args.students * args.turns / wall, 2),
+        "lost_updates": lost
+    }, indent=2))
+    if any(lost.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Shared benchmark configuration."""
+import os
+
+# Settings() requires a database URL at import time
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
@@ -0,0 +1,238 @@
+"""Local OpenAI-compatible stand-in for the LLM, for load benchmarks.
+
+Serves POST /v1/chat/completions (plain and stream=True). Each prompt is
+classified by the call site that built it and answered with a response that
+passes that call site's parsing/validation, after a sampled delay.
+
+Latency specs (seconds), per prompt type or "default":
+    fixed:0.4
+    uniform:0.2:0.8
+    normal:0.5:0.1          mean, stddev (clipped at 0)
+    lognormal:0.5:0.4       median, sigma
+
+Usage:
+    python -m benchmarks.fake_llm_server --port 8900 \\
+        --latency default=lognormal:0.4:0.3 --latency generation=lognormal:1.2:0.4
+    LLM_PROVIDER=local LOCAL_LLM_BASE_URL=http://127.0.0.1:8900/v1 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from typing import Dict, Any, Callable
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+# Markers from the prompt builders, checked in order (first match wins)
+PROMPT_TYPES = [
+    ("structured_analysis", "Analyze this student message once"),
+    ("emoji", "Analyze this message for genuine distress"),
+    ("contextual_risk", "Analyze this message for mental health risk in context"),
+    ("baseline", "Analyze this message for baseline tracking"),
+    ("concern", "Analyze this message for concern indicators"),
+    ("crisis_report", "clinical mental health report writer"),
+    ("journal", "journal entries"),
+]
+
+EMOJI = {
+    "genuine_distress": False,
+    "confidence": 0.6,
+    "reasoning": "Emoji reads as casual emphasis.",
+    "emoji_function": "emphasis",
+    "emoji_context": {"emojis_found": [], "text_emoji_alignment": "neutral"}
+}
+CONCERN = {
+    "language_shift_detected": False,
+    "hopelessness_themes": False,
+    "engagement_drop": False,
+    "sudden_mood_change": False,
+    "reasoning": "No concern indicators detected."
+}
+CONTEXTUAL_RISK = {
+    "suicidal_ideation": {"present": False, "is_literal": False, "confidence": 0.1,
+                          "reasoning": "No ideation expressed."},
+    "depression_indicators": {"severity_estimate": "LOW", "confidence": 0.4,
+                              "indicators": ["stress"], "reasoning": "Situational stress."},
+    "overall_context": {"tone": "tired but engaged", "escalation": False, "concern_level": "LOW"}
+}
+BASELINE = {
+    "sentiment": "neutral",
+    "sentiment_score": 0.0,
+    "contains_humor": False,
+    "reasoning": "Matter-of-fact update."
+}
+STRUCTURED_ANALYSIS = {
+    "emoji": EMOJI,
+    "concern_indicators": CONCERN,
+    **CONTEXTUAL_RISK,
+    "sentiment": {"sentiment": "neutral", "sentiment_score": 0.0, "contains_humor": False}
+}
+
+TEXT_RESPONSES = {
+    "generation": ("That sounds like a lot to carry this week. What part of it has been "
+                   "weighing on you the most? We can take it one piece at a time."),
+    "journal": "You've noticed what drains you; try protecting one small block of rest today.",
+    "crisis_report": ("Student presented with acute distress. Recent messages show escalating "
+                      "hopelessness. Immediate counselor outreach is recommended."),
+}
+
+JSON_RESPONSES = {
+    "structured_analysis": STRUCTURED_ANALYSIS,
+    "emoji": EMOJI,
+    "contextual_risk": CONTEXTUAL_RISK,
+    "baseline": BASELINE,
+    "concern": CONCERN,
+}
+
+
+def classify_prompt(system_message: str, prompt: str) -> str:
+    """Which call site built this prompt ("generation" when nothing matches)."""
+    for prompt_type, marker in PROMPT_TYPES:
+        if marker in prompt or marker in system_message:
+            return prompt_type
+    return "generation"
+
+
+def response_for(prompt_type: str) -> str:
+    """Response text for a prompt type: schema-valid JSON or a plain reply."""
+    if prompt_type in JSON_RESPONSES:
+        return json.dumps(JSON_RESPONSES[prompt_type])
+    return TEXT_RESPONSES.get(prompt_type, TEXT_RESPONSES["generation"])
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn 'lognormal:0.5:0.4' style specs into a sampler returning seconds."""
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Bad latency spec '{spec}' (fixed:s, uniform:lo:hi, normal:mean:sd, lognormal:median:sigma)")
+
+
+def _tokens(text: str) -> int:
+    # Close enough for usage accounting: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+def create_app(latencies: Dict[str, Callable[[random.Random], float]],
+               error_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    """Build the fake server; latencies maps prompt type (or "default") to a sampler."""
+    app = FastAPI(title="Fake OpenAI-compatible LLM")
+    rng = random.Random(seed)
+    stats: Dict[str, int] = {}
+
+    def sample(prompt_type: str) -> float:
+        sampler = latencies.get(prompt_type) or latencies["default"]
+        return sampler(rng)
+
+    @app.get("/stats")
+    async def get_stats():
+        """Requests served per prompt type."""
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        system_message = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        prompt = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        prompt_type = classify_prompt(system_message, prompt)
+        stats[prompt_type] = stats.get(prompt_type, 0) + 1
+
+        delay = sample(prompt_type)
+        if error_rate and rng.random() < error_rate:
+            await asyncio.sleep(delay)
+            return JSONResponse(status_code=503, content={
+                "error": {"message": "Injected failure", "type": "server_error"}
+            })
+
+        content = response_for(prompt_type)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "fake")
+        created = int(time.time())
+
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream(content, delay, completion_id, model, created),
+                media_type="text/event-stream"
+            )
+
+        await asyncio.sleep(delay)
+        prompt_tokens = _tokens(system_message) + _tokens(prompt)
+        completion_tokens = _tokens(content)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    return app
+
+
+async def _stream(content: str, delay: float, completion_id: str, model: str, created: int):
+    """Spread the sampled delay over word-sized chunks, like a real token stream."""
+    words = content.split(" ")
+    pieces = [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+    per_chunk = delay / len(pieces)
+
+    def chunk(delta: Dict[str, Any], finish_reason=None) -> str:
+        return "data: " + json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }) + "\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for piece in pieces:
+        await asyncio.sleep(per_chunk)
+        yield chunk({"content": piece})
+    yield chunk({}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", action="append", default=[], metavar="TYPE=SPEC",
+                        help="Latency for a prompt type (or 'default'); repeatable")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    latencies = {"default": parse_latency("lognormal:0.4:0.3")}
+    for item in args.latency:
+        prompt_type, _, spec = item.partition("=")
+        latencies[prompt_type] = parse_latency(spec)
+
+    import uvicorn
+    uvicorn.run(create_app(latencies, args.error_rate, args.seed),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Asyncio load driver for the API; reports p50/p95/p99 and throughput per endpoint.
+
+Run against a server backed by the seeded dataset (benchmarks.seed_data) and
+the fake LLM (benchmarks.fake_llm_server). Each scenario runs closed-loop with
+--concurrency workers for --duration seconds. Results are written as JSON
+(one file per run, named by commit) so runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.load_driver --base-url http://127.0.0.1:8000 --students 500
+    python -m benchmarks.load_driver --scenarios process,counselor_queue --concurrency 50
+    python -m benchmarks.load_driver --compare benchmarks/results/<baseline>.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional
+import httpx
+
+RESULTS_DIR = Path(__file__).parent / "results"
+COUNSELOR_ID = "bench_counselor"
+MESSAGES = [
+    "rough week honestly, three exams back to back",
+    "finally slept properly lol 😅",
+    "I keep falling behind and I don't know how to catch up",
+    "had a good talk with my roommate today",
+    "nothing feels worth the effort lately",
+]
+
+
+def _student(rng: random.Random, students: int) -> str:
+    return f"bench_{rng.randrange(students):05d}"
+
+
+# Each scenario builds (method, path, params, json_body) for one request
+SCENARIOS: Dict[str, Callable[[random.Random, int], tuple]] = {
+    "process": lambda rng, n: (
+        "POST", "/api/messages/process", None,
+        {"student_id": _student(rng, n), "message_text": rng.choice(MESSAGES)}
+    ),
+    "counselor_queue": lambda rng, n: (
+        "GET", "/api/counselor/alerts/queue", {"counselor_id": COUNSELOR_ID, "limit": 50}, None
+    ),
+    "community_feed": lambda rng, n: (
+        "GET", "/api/community/posts", {"student_id": _student(rng, n), "limit": 50}, None
+    ),
+    "dashboard_metrics": lambda rng, n: (
+        "GET", "/api/counselor/dashboard/metrics", {"counselor_id": COUNSELOR_ID, "days": 30}, None
+    ),
+    "admin_stats": lambda rng, n: (
+        "GET", "/api/admin/stats", None, None
+    ),
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(name: str, latencies: List[float], statuses: Dict[str, int], wall: float) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput for one scenario."""
+    ok = sorted(latencies)
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    requests = sum(statuses.values())
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "scenario": name,
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "p50_ms": ms(percentile(ok, 50)),
+        "p95_ms": ms(percentile(ok, 95)),
+        "p99_ms": ms(percentile(ok, 99)),
+        "max_ms": ms(ok[-1] if ok else None),
+        "mean_ms": ms(sum(ok) / len(ok) if ok else None),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, concurrency: int,
+                       duration: float, students: int, seed: int) -> Dict[str, Any]:
+    """Closed loop: each worker sends its next request as soon as the last one returns."""
+    build = SCENARIOS[name]
+    latencies: List[float] = []  # Successful requests only
+    statuses: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            method, path, params, body = build(rng, students)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            statuses[status] = statuses.get(status, 0) + 1
+            if status.startswith("2"):
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(name, latencies, statuses, time.perf_counter() - start)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def fake_llm_stats(url: Optional[str]) -> Optional[Dict[str, int]]:
+    """Calls per prompt type served by the fake LLM, if its URL was given."""
+    if not url:
+        return None
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            return (await client.get(f"{url.rstrip('/')}/stats")).json()
+    except httpx.HTTPError:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Per-scenario deltas against a baseline run; returns the regressions."""
+    baseline_by_name = {s["scenario"]: s for s in baseline["scenarios"]}
+    regressions = []
+    for scenario in current["scenarios"]:
+        before = baseline_by_name.get(scenario["scenario"])
+        if not before:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            old, new = before.get(key), scenario.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            print(f"{scenario['scenario']:>18} {key:>15}: {old:>9} -> {new:>9} ({change:+.1%})")
+            worse = change < -max_regression if key == "throughput_rps" else change > max_regression
+            if worse:
+                regressions.append(f"{scenario['scenario']} {key} {change:+.1%}")
+    return regressions
+
+
+async def run(args) -> Dict[str, Any]:
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            for name in scenarios:
+                await run_scenario(client, name, min(args.concurrency, 4), args.warmup, args.students, args.seed)
+
+        results = []
+        for name in scenarios:
+            result = await run_scenario(client, name, args.concurrency, args.duration, args.students, args.seed)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "students": args.students,
+            "seed": args.seed,
+            "label": args.label,
+        },
+        "fake_llm_calls": await fake_llm_stats(args.fake_llm_url),
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Warm-up seconds per scenario (0 to skip)")
+    parser.add_argument("--students", type=int, default=500, help="Students in the seeded dataset")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default=None, help="Free-form note stored with the results")
+    parser.add_argument("--fake-llm-url", default="http://127.0.0.1:8900",
+                        help="Fake LLM server, queried for per-prompt call counts ('' to skip)")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline results file to diff against")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Fractional p50/p95/p99 increase (or throughput drop) that fails --compare")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{report['commit'] or 'nocommit'}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"results written to {output}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.max_regression)
+        if regressions:
+            print("regressions: " + "; ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Throughput of standalone analysis workers (app.worker) as worker processes are added.
+
+For each worker count, enqueues --jobs deferred-analysis jobs for the seeded
+students (benchmarks.seed_data), starts that many `python -m app.worker`
+processes, and times how long they take to drain the queue. Reports jobs/s
+per worker count and the scaling efficiency against one worker
+(throughput_k / (k * throughput_1)).
+
+Point the workers at the fake LLM (benchmarks.fake_llm_server) through the
+usual environment, and use Postgres: SQLite serializes every write, so it
+cannot show scaling.
+
+Usage:
+    LLM_PROVIDER=local LOCAL_LLM_BASE_URL=http://127.0.0.1:8900/v1 \\
+        python -m benchmarks.queue_scaling --jobs 2000 --workers 1,2,4 --concurrency 8
+"""
+import sys
+import os
+import argparse
+import json
+import random
+import subprocess
+import time
+from datetime import datetime
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal, init_db
+from app.models.analysis import AnalysisJob
+from app.tasks.analysis_queue import partition_for, UNFINISHED
+from benchmarks.seed_data import PREFIX, MESSAGES
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def job_payload(student_id: str, message_text: str, turn: int) -> dict:
+    """A deferred-analysis job as SequentialProcessor queues it for a LOW-risk turn."""
+    reply = "That sounds like a lot. What's been the hardest part?"
+    context = {
+        "student_info": {"student_id": student_id, "name": "", "email": "", "session_count": 0, "baseline_profile": {}},
+        "conversation_history": [],
+        "conversation_summary": None,
+        "behavioral_metadata": {},
+        "current_risk_profile": {},
+        "message_metadata": {},
+        "safety_flags": [],
+        "crisis_detected": False
+    }
+    return {
+        "message": {"student_id": student_id, "message_text": message_text,
+                    "timestamp": datetime.utcnow().isoformat(), "session_id": None, "metadata": {}},
+        "message_id": f"{student_id}_q{turn}",
+        "checkpoint_results": [
+            {"name": "IMMEDIATE_SAFETY_SCREEN", "passed": True,
+             "result": {"crisis_detected": False, "flags": []}, "time_ms": 0},
+            {"name": "CONTEXT_ENRICHMENT", "passed": True, "result": {"context": context}, "time_ms": 0},
+            {"name": "LLM_GENERATION", "passed": True, "result": {"response": reply}, "time_ms": 0},
+            {"name": "RESPONSE_GATING", "passed": True,
+             "result": {"final_response": reply, "response_sent": True, "crisis_triggered": False,
+                        "gating_decision": "LOW"}, "time_ms": 0}
+        ],
+        "processing_time_ms": 0
+    }
+
+
+def enqueue(db, jobs: int, students: int, seed: int):
+    """Replace queued benchmark jobs with a fresh batch spread over the students."""
+    db.query(AnalysisJob).filter(AnalysisJob.student_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    db.add_all([
+        AnalysisJob(student_id=student_id, partition=partition_for(student_id), job_type="message_analysis",
+                    payload=job_payload(student_id, rng.choice(MESSAGES), turn), status="PENDING",
+                    attempts=0, available_at=now)
+        for turn, student_id in enumerate(f"{PREFIX}{rng.randrange(students):05d}" for _ in range(jobs))
+    ])
+    db.commit()
+
+
+def remaining(db) -> int:
+    return db.query(AnalysisJob).filter(
+        AnalysisJob.student_id.like(f"{PREFIX}%"), AnalysisJob.status.in_(UNFINISHED)
+    ).count()
+
+
+def run_workers(workers: int, concurrency: int, jobs: int, timeout: float) -> dict:
+    """Start the workers, wait for the queue to drain, stop them; returns throughput."""
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "app.worker", "--worker-index", str(index),
+                          "--worker-count", str(workers), "--concurrency", str(concurrency)],
+                         cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+        for index in range(workers)
+    ]
+    start = time.perf_counter()
+    left = jobs
+    try:
+        while time.perf_counter() - start < timeout:
+            db = SessionLocal()
+            try:
+                left = remaining(db)
+            finally:
+                db.close()
+            if left == 0:
+                break
+            time.sleep(0.25)
+        wall = time.perf_counter() - start
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=120)
+
+    done = jobs - left
+    return {"workers": workers, "concurrency": concurrency, "jobs_done": done,
+            "wall_s": round(wall, 2), "jobs_per_s": round(done / wall, 2) if wall else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--students", type=int, default=500, help="Students in the seeded dataset")
+    parser.add_argument("--workers", default="1,2,4", help="Worker counts to run, comma-separated")
+    parser.add_argument("--concurrency", type=int, default=8, help="Jobs in flight per worker")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds per worker count")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    init_db()
+    results = []
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        db = SessionLocal()
+        try:
+            enqueue(db, args.jobs, args.students, args.seed)
+        finally:
+            db.close()
+        result = run_workers(workers, args.concurrency, args.jobs, args.timeout)
+        if results and results[0]["jobs_per_s"]:
+            result["scaling_efficiency"] = round(
+                result["jobs_per_s"] / (workers / results[0]["workers"] * results[0]["jobs_per_s"]), 2
+            )
+        print(json.dumps(result))
+        results.append(result)
+
+
+if __name__ == "__main__":
+    main()
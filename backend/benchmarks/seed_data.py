@@ -0,0 +1,205 @@
+"""Seed a deterministic benchmark dataset into DATABASE_URL (Postgres or SQLite).
+
+Creates one counselor plus N students, each with message analyses, risk
+profiles, assessments and sessions; a slice of students get alerts (with
+outcomes and counselor feedback), and a handful of communities get posts
+and likes. Ids are prefixed with "bench_" and re-seeding replaces them.
+
+Usage:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.seed_data --students 500
+"""
+import sys
+import os
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal, init_db
+from app.models.student import Student, Session as SessionModel, ChatMessage
+from app.models.analysis import MessageAnalysis, Alert
+from app.models.assessment import Assessment, RiskProfile
+from app.models.community import Community, Post, PostLike
+from app.models.intervention_outcome import InterventionOutcome
+from app.models.learning import CounselorFeedback
+
+PREFIX = "bench_"
+COUNSELOR_ID = f"{PREFIX}counselor"
+
+MESSAGES = [
+    "rough week honestly, three exams back to back",
+    "finally slept properly lol 😅",
+    "I keep falling behind and I don't know how to catch up",
+    "had a good talk with my roommate today",
+    "nothing feels worth the effort lately",
+    "killing it at the gym this week 💪",
+]
+RISK_LEVELS = ["LOW", "LOW", "LOW", "MEDIUM", "MEDIUM", "HIGH"]
+ALERT_TYPES = {"MEDIUM": "ROUTINE", "HIGH": "URGENT", "CRISIS": "IMMEDIATE"}
+
+
+def clear(db):
+    """Remove a previous benchmark dataset (children first)."""
+    student_ids = [s for (s,) in db.query(Student.student_id).filter(Student.student_id.like(f"{PREFIX}%"))]
+    if not student_ids:
+        return
+    alert_ids = [a for (a,) in db.query(Alert.id).filter(Alert.student_id.in_(student_ids))]
+    post_ids = [p for (p,) in db.query(Post.post_id).filter(Post.author_id.in_(student_ids))]
+
+    db.query(PostLike).filter(PostLike.post_id.in_(post_ids)).delete(synchronize_session=False)
+    db.query(Post).filter(Post.post_id.in_(post_ids)).delete(synchronize_session=False)
+    db.query(Community).filter(Community.owner_id.in_(student_ids)).delete(synchronize_session=False)
+    db.query(CounselorFeedback).filter(CounselorFeedback.student_id.in_(student_ids)).delete(synchronize_session=False)
+    db.query(InterventionOutcome).filter(InterventionOutcome.alert_id.in_(alert_ids)).delete(synchronize_session=False)
+    for model in (Alert, MessageAnalysis, RiskProfile, Assessment, ChatMessage, SessionModel):
+        db.query(model).filter(model.student_id.in_(student_ids)).delete(synchronize_session=False)
+    db.query(Student).filter(Student.student_id.in_(student_ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def seed(db, students: int, history: int, alert_fraction: float, posts: int, seed_value: int) -> dict:
+    """Insert the dataset; returns the ids the load driver needs."""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+
+    db.add(Student(student_id=COUNSELOR_ID, email=f"{COUNSELOR_ID}@bench.local", password_hash="x",
+                   name="Bench Counselor", is_admin=True, baseline_profile={}))
+
+    student_ids = [f"{PREFIX}{i:05d}" for i in range(students)]
+    counts = {"students": students, "analyses": 0, "risk_profiles": 0, "assessments": 0, "alerts": 0}
+
+    for index, student_id in enumerate(student_ids):
+        db.add(Student(
+            student_id=student_id,
+            email=f"{student_id}@bench.local",
+            password_hash="x",
+            name=f"Student {index}",
+            anonymized_name=f"Owl {index}",
+            session_count=history // 4 + 1,
+            baseline_profile={
+                "typical_sentiment": "neutral",
+                "communication_style": "casual",
+                "common_themes": ["school", "sleep"],
+                "emoji_baseline": {"common_emojis": ["😅", "💪"], "typical_function": "humor"}
+            }
+        ))
+        db.add(SessionModel(student_id=student_id, session_number=1, session_metadata={}))
+
+        for turn in range(history):
+            text = rng.choice(MESSAGES)
+            db.add(MessageAnalysis(
+                student_id=student_id,
+                message_id=f"{student_id}_{turn}",
+                message_text=text,
+                concern_indicators=[],
+                safety_flags=[],
+                checkpoint_results=[{"checkpoint_name": "RESPONSE_GATING",
+                                     "result": {"final_response": "Thanks for sharing that."}}],
+                processing_time_ms=rng.randint(800, 4000),
+                created_at=now - timedelta(hours=history - turn)
+            ))
+        counts["analyses"] += history
+
+        profiles = []
+        for day in range(0, 28, 7):
+            level = rng.choice(RISK_LEVELS)
+            profile = RiskProfile(
+                student_id=student_id,
+                overall_risk=level,
+                confidence=round(rng.uniform(0.4, 0.9), 2),
+                risk_factors={"phq9_score": rng.randint(0, 20), "concern_indicators": []},
+                recommended_action="MONITOR" if level == "LOW" else "CHECK_IN",
+                calculated_at=now - timedelta(days=28 - day)
+            )
+            db.add(profile)
+            profiles.append(profile)
+        counts["risk_profiles"] += len(profiles)
+
+        for assessment_type, max_score in (("PHQ9", 27), ("GAD7", 21)):
+            db.add(Assessment(
+                student_id=student_id,
+                assessment_type=assessment_type,
+                score=rng.randint(0, max_score),
+                responses={"answers": []},
+                administered_at=now - timedelta(days=rng.randint(1, 30))
+            ))
+        counts["assessments"] += 2
+
+        if rng.random() < alert_fraction:
+            db.flush()
+            latest = profiles[-1]
+            alert = Alert(
+                student_id=student_id,
+                alert_type=ALERT_TYPES.get(latest.overall_risk, "ROUTINE"),
+                risk_profile_id=latest.id,
+                message=f"Risk level {latest.overall_risk} detected",
+                routing_status=rng.choice(["PENDING", "PENDING", "REVIEWED"]),
+                created_at=now - timedelta(hours=rng.randint(1, 96))
+            )
+            if alert.routing_status == "REVIEWED":
+                alert.reviewed_at = alert.created_at + timedelta(hours=rng.randint(1, 12))
+                alert.counselor_id = COUNSELOR_ID
+            db.add(alert)
+            db.flush()
+            counts["alerts"] += 1
+
+            if alert.routing_status == "REVIEWED":
+                db.add(InterventionOutcome(alert_id=alert.id, student_id=student_id,
+                                           counseling_engaged=rng.random() < 0.5,
+                                           symptom_improved=rng.random() < 0.4))
+                db.add(CounselorFeedback(student_id=student_id, alert_id=alert.id,
+                                         risk_profile_id=latest.id, was_appropriate=True,
+                                         actual_severity="Moderate", urgency="soon",
+                                         ai_accuracy="appropriate", counselor_id=COUNSELOR_ID,
+                                         feedback_date=alert.reviewed_at))
+
+        if index % 500 == 499:
+            db.commit()
+
+    community_ids = [f"{PREFIX}community_{i}" for i in range(5)]
+    for community_id in community_ids:
+        db.add(Community(community_id=community_id, name=community_id.replace("_", " ").title(),
+                         category="Wellness", owner_id=COUNSELOR_ID))
+
+    post_ids = []
+    for i in range(posts):
+        post_id = f"{PREFIX}post_{i:05d}"
+        post_ids.append(post_id)
+        db.add(Post(post_id=post_id, community_id=rng.choice(community_ids),
+                    author_id=rng.choice(student_ids), title=f"Post {i}",
+                    content=rng.choice(MESSAGES), likes_count=0,
+                    created_at=now - timedelta(minutes=i)))
+    db.flush()
+    for post_id in post_ids:
+        for liker in rng.sample(student_ids, min(3, len(student_ids))):
+            db.add(PostLike(post_id=post_id, student_id=liker))
+    counts["posts"] = posts
+
+    db.commit()
+    return {"counselor_id": COUNSELOR_ID, "student_ids": student_ids, "counts": counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--history", type=int, default=20, help="Message analyses per student")
+    parser.add_argument("--alert-fraction", type=float, default=0.3)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        clear(db)
+        dataset = seed(db, args.students, args.history, args.alert_fraction, args.posts, args.seed)
+    finally:
+        db.close()
+    print(json.dumps({"seeded": dataset["counts"], "counselor_id": dataset["counselor_id"]}))
+
+
+if __name__ == "__main__":
+    main()
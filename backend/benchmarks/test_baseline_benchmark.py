@@ -0,0 +1,85 @@
+"""
+Per-message cost of updating a student's baseline profile (pytest-benchmark).
+
+Run from backend/:
+
+    pytest benchmarks/test_baseline_benchmark.py --benchmark-only
+
+Each case records one message (passive monitoring plus emoji baseline)
+into a profile that already holds `history` messages, including the JSON
+round trip the row goes through on every turn. The unbounded_lists cases
+replay the old version 1 update (append to every list, rescan them for
+statistics) for comparison; its cost and row size grow with history, the
+accumulator profile's do not.
+"""
+import json
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.services.analysis import baseline_stats
+
+HISTORY = [10, 1_000, 10_000]
+SENTIMENT_MAP = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+
+def _legacy_profile(history: int):
+    return {
+        "language_patterns": [{"timestamp": "2026-01-01T00:00:00", "message_length": 40 + i % 30,
+                               "emoji_count": i % 2, "sentiment": "neutral"} for i in range(history)],
+        "humor_indicators": ["2026-01-01T00:00:00"] * (history // 10),
+        "mood_samples": [{"timestamp": "2026-01-01T00:00:00", "mood": "neutral"} for _ in range(history)],
+        "emoji_baseline": {"emoji_count": [i % 2 for i in range(history)],
+                           "common_emojis": {"😂": history // 2}, "function_distribution": {"humor": history // 2}}
+    }
+
+
+def _unbounded_lists_update(row: str) -> str:
+    """The version 1 update: append to every list, then rescan them all."""
+    baseline = json.loads(row)
+    baseline["language_patterns"].append({"timestamp": "2026-01-02T00:00:00", "message_length": 42,
+                                          "emoji_count": 1, "sentiment": "neutral"})
+    baseline["mood_samples"].append({"timestamp": "2026-01-02T00:00:00", "mood": "neutral"})
+    emoji_baseline = baseline["emoji_baseline"]
+    emoji_baseline["emoji_count"].append(1)
+    emoji_baseline["common_emojis"]["😂"] += 1
+    emoji_baseline["function_distribution"]["humor"] += 1
+
+    patterns = baseline["language_patterns"]
+    scores = [SENTIMENT_MAP.get(m["mood"], 0.0) for m in baseline["mood_samples"]]
+    mean = sum(scores) / len(scores)
+    baseline["statistics"] = {
+        "avg_message_length": sum(p["message_length"] for p in patterns) / len(patterns),
+        "emoji_usage_rate": sum(p["emoji_count"] for p in patterns) / len(patterns),
+        "typical_sentiment": mean,
+        "sentiment_variance": sum((x - mean) ** 2 for x in scores) / len(scores),
+        "sarcasm_frequency": len(baseline["humor_indicators"]) / len(patterns)
+    }
+    return json.dumps(baseline)
+
+
+def _accumulator_update(row: str) -> str:
+    baseline = baseline_stats.current(json.loads(row))
+    baseline_stats.record_message(baseline, message_length=42, emoji_count=1, sentiment="neutral",
+                                  mood="neutral", contains_humor=False, at="2026-01-02T00:00:00")
+    baseline_stats.record_emojis(baseline, ["😂"], "humor")
+    baseline["statistics"] = baseline_stats.statistics(baseline)
+    return json.dumps(baseline)
+
+
+@pytest.mark.benchmark(group="baseline_update")
+@pytest.mark.parametrize("history", HISTORY)
+def test_accumulator_update(benchmark, history):
+    row = json.dumps(baseline_stats.compact(_legacy_profile(history)))
+    updated = benchmark(_accumulator_update, row)
+    assert json.loads(updated)["statistics"]["total_messages"] == history + 1
+    # Row size is independent of history
+    assert len(updated) < 8_000
+
+
+@pytest.mark.benchmark(group="baseline_update")
+@pytest.mark.parametrize("history", HISTORY)
+def test_unbounded_lists_update(benchmark, history):
+    row = json.dumps(_legacy_profile(history))
+    updated = benchmark(_unbounded_lists_update, row)
+    assert len(json.loads(updated)["language_patterns"]) == history + 1
@@ -0,0 +1,146 @@
+"""
+Per-message cost of checkpoint 1 safety screening (pytest-benchmark).
+
+Run from backend/:
+
+    pytest benchmarks/test_screening_benchmark.py --benchmark-only
+
+The per_pattern_search cases replay the old loop (one re.search per
+lexicon pattern) on the same messages for comparison; long_variant checks
+that the variant scan finishes within budget on a long message. The corpus case
+screens 10k generated chat messages (short and long, benign, near-miss and
+obfuscated crisis), checks p99 against settings.safety_screen_budget_ms and
+checks that only the crisis messages are flagged.
+"""
+import random
+import re
+import time
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.core.config import settings
+from app.services.analysis.safety_lexicon import SafetyLexicon
+from app.services.analysis.safety_screener import SafetyScreener
+from benchmarks.load_driver import percentile
+
+SHORT = "honestly today was fine, just tired after the lab"
+LONG_BENIGN = (
+    "so the group project is due friday and nobody has started the slides, my roommate keeps "
+    "playing music until 2am and I have a midterm on thursday that I'm not ready for. "
+) * 40
+LONG_CRISIS = LONG_BENIGN + "I don't see the point anymore and I want to end it all."
+# ~13k characters whose only crisis phrase is a typo at the very end (variant stage)
+LONG_VARIANT = LONG_BENIGN * 2 + "honestly I keep thinking about suicde"
+
+MESSAGES = {"short": SHORT, "long_benign": LONG_BENIGN, "long_crisis": LONG_CRISIS, "long_variant": LONG_VARIANT}
+
+CHAT_LINES = [
+    "rough week honestly, three exams back to back",
+    "finally slept properly lol 😅",
+    "I keep falling behind and I don't know how to catch up",
+    "had a good talk with my roommate today",
+    "nothing feels worth the effort lately",
+    "killing it at the gym this week 💪",
+    "my mom called and we argued about money again",
+    "can't focus, the library was packed and loud",
+    "ok", "thanks, that helps", "idk anymore", "haha yeah",
+    "my professor moved the deadline again", "does anyone else feel like the semester is flying by",
+    "I skipped breakfast and now I'm starving", "the wifi in the dorm keeps dropping",
+    "I think I bombed that quiz tbh", "going home for the weekend, can't wait", "my shift at the cafe ran late",
+    "my advisor says I should drop a class", "kind of homesick this week",
+    "we stayed up way too late watching movies", "I finally finished the lab report",
+    "feeling a bit better than yesterday", "my roommate ate my leftovers AGAIN",
+    "I've been sleeping like 4 hours a night", "the dining hall food is killing me lol",
+    "my group chat is dead silent", "I got the internship!!", "I don't really want to talk about it",
+    "my parents keep asking about grades", "the bus was late so I missed the lecture",
+    "honestly I just need a nap", "I'm so done with this problem set", "practice ran long and coach was mad",
+    "I think I'm coming down with something", "it's fine, I'll figure it out",
+]
+# Everyday sentences within a typo or two of a crisis phrase; none may be flagged
+NEAR_MISSES = [
+    "I will myself to get up for the 8am", "I need to fill myself up before the exam",
+    "I built the mill myself", "I had to bill myself for the tutoring hours", "I will my self to finish this essay",
+    "ending my live stream early tonight", "I'm ending my lie about the grades to my parents",
+    "ending my lease in may", "taking my time with the reading", "taking my lift to the top floor",
+    "I won't be there tomorrow, dentist appointment", "we won't be here long, just grabbing coffee",
+    "we are so unalike it's funny", "I want to dive into the project tonight", "wanna dine out friday?",
+    "way to dive in the lake is off the dock", "my suite mate left early", "goodbye for now, talk later",
+    "goodbye forest trail, see you next semester", "committing to the gym this semester",
+    "we should end it early and get food", "bending my wrist hurts after climbing",
+    "ran 5 kms this morning", "campus is 3 kms from home",
+]
+OBFUSCATED_CRISIS = [
+    "i want to k1ll mys3lf", "s u i c i d e is all i think about", "kms", "I wanna diiiieee",
+    "thinking about suicde", "want to un@live myself", "g00dbye f0rever", "і want tо kіll myself",
+]
+
+
+def chat_corpus(size: int = 10_000, seed: int = 7):
+    """
+    (message, is_crisis) pairs: mostly 1-3 short lines, some long journal-style
+    ones, ~10% with a near-miss sentence and ~2% with obfuscated crisis.
+    """
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(size):
+        roll = rng.random()
+        lines = rng.choices(CHAT_LINES, k=rng.randint(1, 3) if roll < 0.9 else rng.randint(20, 60))
+        if rng.random() < 0.1:
+            lines.insert(rng.randrange(len(lines) + 1), rng.choice(NEAR_MISSES))
+        if roll > 0.98:
+            lines.insert(rng.randrange(len(lines) + 1), rng.choice(OBFUSCATED_CRISIS))
+        messages.append((" ".join(lines), roll > 0.98))
+    return messages
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    return SafetyLexicon.load()
+
+
+def _per_pattern_search(lexicon, text):
+    text_lower = text.lower()
+    return [
+        f"{entry['category']}: {entry['pattern']}"
+        for entry in lexicon.entries
+        if re.search(entry["pattern"], text_lower, re.IGNORECASE)
+    ]
+
+
+@pytest.mark.benchmark(group="safety_screen")
+@pytest.mark.parametrize("kind", list(MESSAGES))
+def test_screen_immediate(benchmark, lexicon, kind):
+    screener = SafetyScreener(lexicon)
+    result = benchmark(screener.screen_immediate, MESSAGES[kind])
+    assert result["crisis_detected"] == (kind in ("long_crisis", "long_variant"))
+    assert result["screen_complete"]
+
+
+@pytest.mark.benchmark(group="safety_screen")
+@pytest.mark.parametrize("kind", list(MESSAGES))
+def test_per_pattern_search(benchmark, lexicon, kind):
+    flags = benchmark(_per_pattern_search, lexicon, MESSAGES[kind])
+    assert flags == lexicon.flags(MESSAGES[kind])
+
+
+@pytest.mark.benchmark(group="safety_screen_corpus")
+def test_corpus_p99_within_budget(benchmark, lexicon):
+    screener = SafetyScreener(lexicon)
+    messages = chat_corpus()
+    
+    def screen_all():
+        timings, missed, false_positives = [], [], []
+        for message, is_crisis in messages:
+            start = time.perf_counter()
+            detected = screener.screen_immediate(message)["crisis_detected"]
+            timings.append((time.perf_counter() - start) * 1000)
+            if detected != is_crisis:
+                (missed if is_crisis else false_positives).append(message)
+        return timings, missed, false_positives
+    
+    timings, missed, false_positives = benchmark.pedantic(screen_all, rounds=1, iterations=1)
+    
+    assert percentile(sorted(timings), 99) < settings.safety_screen_budget_ms
+    assert missed == []
+    assert false_positives == []
@@ -0,0 +1,162 @@
+"""Benchmark chat throughput on the sync vs async database layer.
+
+Simulates N concurrent chats. Each chat turn does the pipeline's DB round-trips
+(student, conversation history, latest risk profile, then the analysis insert)
+around a simulated LLM call. In sync mode the queries run on SessionLocal inside
+the event loop, as the pipeline did before the async port; in async mode they
+run on AsyncSessionLocal. --pipeline drives the real SequentialProcessor on the
+async session with a fake LLM instead.
+
+Usage:
+    python scripts/benchmark_async_db.py --chats 200 --llm-latency 0.5
+    python scripts/benchmark_async_db.py --chats 200 --pipeline
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app.db.database import SessionLocal, AsyncSessionLocal, init_db
+from app.models.student import Student
+from app.models.analysis import MessageAnalysis as MessageAnalysisModel
+from app.models.assessment import RiskProfile
+
+
+STRUCTURED_RESPONSE = {
+    "emoji": {"genuine_distress": False, "confidence": 0.5, "reasoning": "", "emoji_function": "ambiguous"},
+    "concern_indicators": {"language_shift_detected": False, "hopelessness_themes": False,
+                           "engagement_drop": False, "sudden_mood_change": False, "reasoning": ""},
+    "suicidal_ideation": {"present": False, "is_literal": False, "confidence": 0.1, "reasoning": ""},
+    "depression_indicators": {"severity_estimate": "LOW", "confidence": 0.3, "indicators": [], "reasoning": ""},
+    "overall_context": {"tone": "neutral", "escalation": False, "concern_level": "LOW"},
+    "sentiment": {"sentiment": "neutral", "sentiment_score": 0.0, "contains_humor": False}
+}
+
+
+class FakeLLM:
+    """Answers every prompt after a fixed delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate(self, prompt, max_tokens=500, system_message=None, call_site=None):
+        await asyncio.sleep(self.latency)
+        if "Respond in JSON format" in prompt:
+            return json.dumps(STRUCTURED_RESPONSE)
+        return "That sounds like a lot to handle. What has been the hardest part?"
+
+
+def seed_students(count: int):
+    """Make sure the benchmark students exist."""
+    db = SessionLocal()
+    try:
+        for i in range(count):
+            student_id = f"bench_{i:04d}"
+            if not db.query(Student).filter(Student.student_id == student_id).first():
+                db.add(Student(student_id=student_id, email=f"{student_id}@bench.local", password_hash="x",
+                               baseline_profile={}, session_count=5))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def sync_turn(student_id: str, llm_latency: float):
+    """One chat turn with blocking queries (the pre-port behaviour)."""
+    db = SessionLocal()
+    try:
+        db.query(Student).filter(Student.student_id == student_id).first()
+        db.query(MessageAnalysisModel).filter(
+            MessageAnalysisModel.student_id == student_id
+        ).order_by(MessageAnalysisModel.created_at.desc()).limit(10).all()
+        db.query(RiskProfile).filter(
+            RiskProfile.student_id == student_id
+        ).order_by(RiskProfile.calculated_at.desc()).first()
+
+        await asyncio.sleep(llm_latency)
+
+        db.add(MessageAnalysisModel(student_id=student_id, message_id=f"{student_id}_{time.time()}",
+                                    message_text="benchmark", checkpoint_results=[]))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def async_turn(student_id: str, llm_latency: float):
+    """The same chat turn on the async session."""
+    async with AsyncSessionLocal() as db:
+        await db.scalar(select(Student).where(Student.student_id == student_id))
+        (await db.scalars(
+            select(MessageAnalysisModel).where(
+                MessageAnalysisModel.student_id == student_id
+            ).order_by(MessageAnalysisModel.created_at.desc()).limit(10)
+        )).all()
+        await db.scalar(
+            select(RiskProfile).where(
+                RiskProfile.student_id == student_id
+            ).order_by(RiskProfile.calculated_at.desc()).limit(1)
+        )
+
+        await asyncio.sleep(llm_latency)
+
+        db.add(MessageAnalysisModel(student_id=student_id, message_id=f"{student_id}_{time.time()}",
+                                    message_text="benchmark", checkpoint_results=[]))
+        await db.commit()
+
+
+async def pipeline_turn(student_id: str, llm_latency: float):
+    """A full SequentialProcessor turn on the async session."""
+    from app.schemas.message import Message
+    from app.services.analysis.sequential_processor import SequentialProcessor
+
+    async with AsyncSessionLocal() as db:
+        processor = SequentialProcessor(db, FakeLLM(llm_latency))
+        await processor.process_message(Message(student_id=student_id, message_text="rough week honestly"))
+
+
+async def run(mode: str, chats: int, llm_latency: float) -> dict:
+    turn = {"sync": sync_turn, "async": async_turn, "pipeline": pipeline_turn}[mode]
+    latencies = []
+
+    async def timed(student_id: str):
+        start = time.perf_counter()
+        await turn(student_id, llm_latency)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(f"bench_{i:04d}") for i in range(chats)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "chats": chats,
+        "wall_s": round(wall, 3),
+        "throughput_chats_per_s": round(chats / wall, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Simulated LLM latency in seconds")
+    parser.add_argument("--pipeline", action="store_true", help="Run the full pipeline instead of sync vs async")
+    args = parser.parse_args()
+
+    init_db()
+    seed_students(args.chats)
+
+    modes = ["pipeline"] if args.pipeline else ["sync", "async"]
+    for mode in modes:
+        print(json.dumps(asyncio.run(run(mode, args.chats, args.llm_latency))))
+
+
+if __name__ == "__main__":
+    main()
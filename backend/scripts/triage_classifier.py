@@ -0,0 +1,123 @@
+"""Train and shadow-evaluate the triage classifier.
+
+train fits a new model version on stored MessageAnalysis rows (labelled by
+the LLM pipeline's verdict, overridden by CounselorFeedback where a counselor
+reviewed the case), reports its recall impact on a held-out split and saves
+it to settings.triage_model_dir.
+
+report is the shadow evaluation to read before setting TRIAGE_MODE=enforce.
+It covers messages analysed after the model was trained, using the
+probability recorded live in shadow mode when there is one and scoring the
+message offline otherwise. For each threshold it shows how many messages
+would skip LLM analysis and how many concerning messages would have been
+missed.
+
+Usage:
+    python scripts/triage_classifier.py train
+    python scripts/triage_classifier.py report --thresholds 0.95 0.98 0.99
+    python scripts/triage_classifier.py report --version 20240101120000-1a2b3c4d --all
+"""
+import sys
+import os
+import argparse
+import json
+import time
+from datetime import datetime
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.services.analysis.triage import (
+    TriageClassifier, checkpoint_result, evaluate, load_training_examples
+)
+
+DEFAULT_THRESHOLDS = [0.9, 0.95, 0.97, 0.98, 0.99]
+
+
+def train(args):
+    from sklearn.model_selection import train_test_split
+
+    db = SessionLocal()
+    try:
+        examples = load_training_examples(db)
+    finally:
+        db.close()
+
+    texts = [text for text, _, _ in examples]
+    labels = [label for _, label, _ in examples]
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=args.holdout, stratify=labels, random_state=0
+    )
+
+    classifier = TriageClassifier.train(train_texts, train_labels)
+    holdout = evaluate([classifier.benign_probability(t) for t in test_texts], test_labels, args.thresholds)
+    classifier.metadata["holdout"] = holdout
+    path = classifier.save(args.model_dir)
+
+    print(json.dumps({"version": classifier.version, "path": str(path), **classifier.metadata}))
+
+
+def report(args):
+    classifier = TriageClassifier.load(args.model_dir, args.version)
+    trained_at = datetime.fromisoformat(classifier.metadata["trained_at"])
+
+    db = SessionLocal()
+    try:
+        examples = load_training_examples(db)
+    finally:
+        db.close()
+
+    probabilities, labels, latencies = [], [], []
+    recorded = 0
+    for text, label, row in examples:
+        if not args.all and row.created_at and row.created_at <= trained_at:
+            continue  # Seen in training
+        triage = checkpoint_result(row.checkpoint_results, "DEEP_ANALYSIS").get("triage") or {}
+        if triage.get("model_version") == classifier.version:
+            probability = triage["benign_probability"]
+            recorded += 1
+        else:
+            start = time.perf_counter()
+            probability = classifier.benign_probability(text)
+            latencies.append(time.perf_counter() - start)
+        probabilities.append(probability)
+        labels.append(label)
+
+    latencies.sort()
+    print(json.dumps({
+        "version": classifier.version,
+        "trained_at": classifier.metadata["trained_at"],
+        "messages": len(labels),
+        "recorded_in_shadow_mode": recorded,
+        "current_threshold": settings.triage_benign_threshold,
+        "score_p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+        "score_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3) if latencies else None
+    }))
+    for row in evaluate(probabilities, labels, args.thresholds):
+        print(json.dumps(row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=None, help="Defaults to settings.triage_model_dir")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subcommands.add_parser("train", help="Train and save a new model version")
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="Share of examples held out")
+    train_parser.add_argument("--thresholds", type=float, nargs="+", default=DEFAULT_THRESHOLDS)
+    train_parser.set_defaults(run=train)
+
+    report_parser = subcommands.add_parser("report", help="Shadow evaluation of a model version")
+    report_parser.add_argument("--version", default=None, help="Defaults to the newest model")
+    report_parser.add_argument("--all", action="store_true", help="Include messages seen in training")
+    report_parser.add_argument("--thresholds", type=float, nargs="+", default=DEFAULT_THRESHOLDS)
+    report_parser.set_defaults(run=report)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
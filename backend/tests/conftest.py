@@ -0,0 +1,64 @@
+"""Shared test configuration."""
+import os
+
+# Settings() requires a database URL at import time
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+import pytest_asyncio
+
+
+@pytest_asyncio.fixture
+async def async_db():
+    """In-memory SQLite AsyncSession with all tables created (fresh per test)."""
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.db.database import Base
+    
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+    
+    await engine.dispose()
+
+
+class StatementCounter:
+    """Counts SQL statements (by leading keyword) and commits issued on an engine."""
+    
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+    
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement.lstrip().split(None, 1)[0].upper())
+    
+    def on_commit(self, conn):
+        self.commits += 1
+    
+    def reset(self):
+        self.statements = []
+        self.commits = 0
+    
+    @property
+    def total(self) -> int:
+        return len(self.statements)
+    
+    def count(self, keyword: str) -> int:
+        return self.statements.count(keyword)
+
+
+@pytest_asyncio.fixture
+async def statement_counter(async_db):
+    """Attach a StatementCounter to the async_db engine for the rest of the test."""
+    from sqlalchemy import event
+    
+    counter = StatementCounter()
+    sync_engine = async_db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", counter)
+    event.listen(sync_engine, "commit", counter.on_commit)
+    yield counter
+    event.remove(sync_engine, "before_cursor_execute", counter)
+    event.remove(sync_engine, "commit", counter.on_commit)
@@ -0,0 +1,186 @@
+"""Tests for the deferred-analysis work queue and deferred chat turns."""
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app.core.config import settings
+from app.models.analysis import Alert, AnalysisJob, MessageAnalysis as MessageAnalysisModel
+from app.schemas.message import Message
+from app.services.alerts.alert_notifier import get_alert_notifier
+from app.services.analysis.sequential_processor import SequentialProcessor
+from app.tasks import analysis_queue, deferred_analysis
+from tests.test_context_snapshot import FakeLLM, _seed_student
+
+
+async def _enqueue(db, *student_ids):
+    jobs = [await analysis_queue.enqueue(db, student_id, {"n": i}) for i, student_id in enumerate(student_ids)]
+    await db.commit()
+    return jobs
+
+
+async def _status(db, job_id):
+    return await db.scalar(select(AnalysisJob.status).where(AnalysisJob.id == job_id))
+
+
+@pytest.mark.asyncio
+async def test_claims_one_job_per_student_in_order(async_db):
+    first, second, other = await _enqueue(async_db, "s1", "s1", "s2")
+
+    claimed = await analysis_queue.claim_jobs(async_db, limit=10)
+    assert [job.id for job in claimed] == [first.id, other.id]
+
+    # s1's next turn waits until its previous one is done
+    assert await analysis_queue.claim_jobs(async_db, limit=10) == []
+
+    await analysis_queue.complete(async_db, first.id)
+    await async_db.commit()
+    assert [job.id for job in await analysis_queue.claim_jobs(async_db, limit=10)] == [second.id]
+
+
+@pytest.mark.asyncio
+async def test_failed_job_backs_off_then_gives_up(async_db):
+    job, later = await _enqueue(async_db, "s1", "s1")
+
+    for attempt in range(1, settings.analysis_queue_max_attempts + 1):
+        claimed = await analysis_queue.claim_jobs(async_db, limit=1, now=datetime.utcnow() + timedelta(hours=attempt))
+        assert [c.id for c in claimed] == [job.id]
+        await analysis_queue.fail(async_db, job.id, "llm down")
+        if attempt == 1:
+            # Backoff: not claimable right away
+            assert await analysis_queue.claim_jobs(async_db, limit=1) == []
+
+    assert await _status(async_db, job.id) == "FAILED"
+    # A dead job no longer holds up the student's later turns
+    claimed = await analysis_queue.claim_jobs(async_db, limit=1, now=datetime.utcnow() + timedelta(days=1))
+    assert [c.id for c in claimed] == [later.id]
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed(async_db):
+    job, = await _enqueue(async_db, "s1")
+    await analysis_queue.claim_jobs(async_db, limit=1)
+
+    assert await analysis_queue.claim_jobs(async_db, limit=1) == []
+    after_lease = datetime.utcnow() + timedelta(seconds=settings.analysis_queue_lease_seconds + 1)
+    assert [c.id for c in await analysis_queue.claim_jobs(async_db, limit=1, now=after_lease)] == [job.id]
+
+
+@pytest.mark.asyncio
+async def test_consumer_runs_each_students_jobs_in_order(async_db):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    await _enqueue(async_db, "s1", "s2", "s1", "s2", "s1")
+    seen = []
+
+    async def handler(db, job):
+        seen.append((job.student_id, job.id))
+        await asyncio.sleep(0.01)
+        await analysis_queue.complete(db, job.id)
+
+    consumer = analysis_queue.AnalysisQueueConsumer(
+        async_sessionmaker(async_db.bind, expire_on_commit=False),
+        concurrency=2, poll_interval=0.01, handlers={"message_analysis": handler}
+    )
+    consumer.start()
+    for _ in range(200):
+        if len(seen) == 5 and not consumer._running:
+            break
+        await asyncio.sleep(0.01)
+    await consumer.stop()
+
+    for student_id in ("s1", "s2"):
+        ids = [job_id for seen_student, job_id in seen if seen_student == student_id]
+        assert ids == sorted(ids)
+    statuses = (await async_db.scalars(select(AnalysisJob.status).order_by(AnalysisJob.id))).all()
+    assert statuses == ["DONE"] * 5
+
+
+@pytest.mark.asyncio
+async def test_deferred_turn_replies_before_analysis(async_db, monkeypatch):
+    monkeypatch.setattr(settings, "deferred_analysis_enabled", True)
+    monkeypatch.setattr(deferred_analysis, "get_llm_client", FakeLLM)
+    await _seed_student(async_db)
+
+    processor = SequentialProcessor(async_db, FakeLLM())
+    analysis = await processor.process_message(Message(student_id="s1", message_text="rough week honestly"))
+    await async_db.commit()
+
+    assert analysis.response_text
+    assert analysis.risk_profile_pending and analysis.analysis_id is None
+    assert "DEEP_ANALYSIS" not in [cp.checkpoint_name for cp in analysis.checkpoint_results]
+    assert await async_db.scalar(select(MessageAnalysisModel)) is None
+
+    job, = await analysis_queue.claim_jobs(async_db, limit=1)
+    await deferred_analysis.run_message_analysis(async_db, job)
+
+    logged = await async_db.scalar(select(MessageAnalysisModel))
+    assert logged.message_id == analysis.message_id
+    assert [cp["checkpoint_name"] for cp in logged.checkpoint_results] == [
+        "IMMEDIATE_SAFETY_SCREEN", "CONTEXT_ENRICHMENT", "LLM_GENERATION", "DEEP_ANALYSIS", "RESPONSE_GATING"
+    ]
+    assert await _status(async_db, job.id) == "DONE"
+
+
+@pytest.mark.asyncio
+async def test_late_high_risk_raises_and_pushes_an_alert(async_db, monkeypatch):
+    monkeypatch.setattr(settings, "deferred_analysis_enabled", True)
+    monkeypatch.setattr(deferred_analysis, "get_llm_client", FakeLLM)
+    await _seed_student(async_db)
+
+    await SequentialProcessor(async_db, FakeLLM()).process_message(
+        Message(student_id="s1", message_text="rough week honestly")
+    )
+    await async_db.commit()
+
+    complete = SequentialProcessor.complete_deferred_analysis
+
+    async def high_risk(self, message, payload):
+        analysis = await complete(self, message, payload)
+        analysis.risk_profile = {"overall_risk": "HIGH", "confidence": 0.7}
+        return analysis
+
+    monkeypatch.setattr(SequentialProcessor, "complete_deferred_analysis", high_risk)
+
+    with get_alert_notifier().subscribe() as pushed:
+        job, = await analysis_queue.claim_jobs(async_db, limit=1)
+        await deferred_analysis.run_message_analysis(async_db, job)
+
+        alert = await async_db.scalar(select(Alert))
+        assert alert.alert_type == "URGENT"
+        assert alert.message == "High risk detected after reply: HIGH risk level"
+        assert pushed.get_nowait()["id"] == alert.id
+
+
+def test_partitions_are_stable_and_each_has_one_owner():
+    assert analysis_queue.partition_for("s1") == analysis_queue.partition_for("s1")
+    assert 0 <= analysis_queue.partition_for("s1", partitions=8) < 8
+
+    owned = [analysis_queue.owned_partitions(i, 3, partitions=8) for i in range(3)]
+    assert sorted(p for partitions in owned for p in partitions) == list(range(8))
+
+    for worker_index, worker_count in ((3, 3), (-1, 2), (0, 9)):
+        with pytest.raises(ValueError):
+            analysis_queue.owned_partitions(worker_index, worker_count, partitions=8)
+
+
+@pytest.mark.asyncio
+async def test_worker_claims_only_its_partitions(async_db):
+    students = [f"s{i}" for i in range(10)]
+    jobs = await _enqueue(async_db, *students)
+    mine = analysis_queue.owned_partitions(0, 2)
+
+    claimed = await analysis_queue.claim_jobs(async_db, limit=10, partitions=mine)
+    expected = [job.id for job in jobs if job.partition in mine]
+    assert [job.id for job in claimed] == expected
+    assert 0 < len(expected) < len(jobs)
+
+
+@pytest.mark.asyncio
+async def test_queue_lag_is_age_of_oldest_runnable_job(async_db):
+    assert await analysis_queue.queue_lag(async_db) == 0.0
+    job, = await _enqueue(async_db, "s1")
+
+    lag = await analysis_queue.queue_lag(async_db, now=job.available_at + timedelta(seconds=30))
+    assert lag == pytest.approx(30.0)
+    other = [p for p in range(settings.analysis_queue_partitions) if p != job.partition]
+    assert await analysis_queue.queue_lag(async_db, partitions=other) == 0.0
@@ -0,0 +1,197 @@
+"""Tests for the bounded baseline profile (running accumulators, recent samples, decayed histograms)."""
+import json
+import statistics as pystats
+import pytest
+from app.services.analysis import baseline_stats
+
+
+def _record(profile, n, mood="neutral", humor_every=0):
+    for i in range(n):
+        baseline_stats.record_message(profile, message_length=10 + i % 7, emoji_count=i % 3, sentiment="neutral",
+                                      mood=mood, contains_humor=bool(humor_every) and i % humor_every == 0,
+                                      at=f"t{i}")
+    return profile
+
+
+def test_welford_matches_the_batch_mean_and_variance():
+    values = [3.0, 7.5, 1.0, 12.25, 4.0, 4.0, 9.5]
+    acc = {}
+    for value in values:
+        baseline_stats.welford_update(acc, value)
+
+    assert baseline_stats.welford_mean(acc) == pytest.approx(pystats.fmean(values))
+    assert baseline_stats.welford_variance(acc) == pytest.approx(pystats.pvariance(values))
+    assert baseline_stats.welford_mean({}) is None
+
+
+def test_profile_size_stays_flat_as_messages_accumulate():
+    profile = {"schema_version": baseline_stats.SCHEMA_VERSION}
+    sizes = []
+    for _ in range(3):
+        _record(profile, 500, humor_every=4)
+        baseline_stats.record_emojis(profile, ["😂", "😭"], "humor")
+        sizes.append(len(json.dumps(profile)))
+
+    assert len(profile["language_patterns"]) == 20
+    assert len(profile["mood_samples"]) == 20
+    assert len(profile["humor_indicators"]) == 20
+    assert max(sizes) - min(sizes) < 100
+
+    stats = baseline_stats.statistics(profile)
+    assert stats["total_messages"] == 1500
+    assert stats["avg_message_length"] == pytest.approx(pystats.fmean(10 + i % 7 for i in range(500)))
+    assert stats["sarcasm_frequency"] == pytest.approx(0.25)
+
+
+def test_decayed_histogram_follows_recent_use_and_is_capped():
+    histogram = {}
+    for _ in range(200):
+        baseline_stats.decay_add(histogram, ["😂"], decay=0.9)
+    for _ in range(30):
+        baseline_stats.decay_add(histogram, ["😭"], decay=0.9)
+
+    assert histogram["😭"] > histogram["😂"]
+    assert histogram["😭"] <= 1 / (1 - 0.9)
+
+    baseline_stats.decay_add(histogram, [str(i) for i in range(50)], max_keys=8)
+    assert len(histogram) == 8
+    assert "😭" in histogram
+
+
+def test_repeated_emojis_count_once_per_message():
+    profile = {"schema_version": baseline_stats.SCHEMA_VERSION}
+    baseline_stats.record_emojis(profile, ["😭", "😭", "😭", "🙏"], "emphasis")
+
+    assert profile["emoji_baseline"]["common_emojis"] == {"😭": 1.0, "🙏": 1.0}
+    assert profile["emoji_baseline"]["recent_counts"] == [4]
+
+    for _ in range(500):
+        baseline_stats.record_emojis(profile, ["😭"] * 5, "emphasis")
+    assert profile["emoji_baseline"]["common_emojis"]["😭"] <= 1 / (1 - 0.98)
+
+
+def test_compact_folds_version_1_lists():
+    legacy = {
+        "language_patterns": [{"message_length": n, "emoji_count": 1, "sentiment": "neutral"} for n in range(100)],
+        "mood_samples": [{"mood": "negative"}] * 50 + [{"mood": "positive"}] * 50,
+        "humor_indicators": ["t"] * 10,
+        "emoji_baseline": {"emoji_count": [1] * 100, "common_emojis": {"😂": 400, "🎉": 100},
+                           "function_distribution": {"humor": 90, "literal": 10}},
+        "statistics": {"avg_message_length": 0},
+        "communication_style": "casual"
+    }
+
+    profile = baseline_stats.compact(legacy, recent_samples=5, decay=0.98)
+
+    assert profile["schema_version"] == baseline_stats.SCHEMA_VERSION
+    assert profile["communication_style"] == "casual"
+    assert len(profile["language_patterns"]) == 5
+    assert "emoji_count" not in profile["emoji_baseline"]
+    assert profile["statistics"]["avg_message_length"] == pytest.approx(49.5)
+    assert profile["statistics"]["typical_sentiment"] == pytest.approx(0.0)
+    assert profile["statistics"]["sentiment_variance"] == pytest.approx(1.0)
+    assert profile["statistics"]["sarcasm_frequency"] == pytest.approx(0.1)
+    # Scaled to the decayed steady state, proportions kept
+    common = profile["emoji_baseline"]["common_emojis"]
+    assert sum(common.values()) == pytest.approx(50.0)
+    assert common["😂"] / common["🎉"] == pytest.approx(4.0)
+    # The input is left untouched
+    assert len(legacy["language_patterns"]) == 100
+
+
+def test_current_returns_an_updatable_copy():
+    stored = _record({"schema_version": baseline_stats.SCHEMA_VERSION}, 3, mood="negative")
+
+    profile = baseline_stats.current(stored)
+    _record(profile, 1)
+
+    assert stored["message_length"]["n"] == 3
+    assert profile["message_length"]["n"] == 4
+    assert baseline_stats.current(None) == {"schema_version": baseline_stats.SCHEMA_VERSION}
+    assert baseline_stats.mood_distribution(stored) == {"n": 3, "mean": -1.0, "std": 0.0}
+    assert baseline_stats.mood_distribution({}) is None
+
+
+def test_mood_statistics_keep_their_version_1_scales():
+    moods = ["very_negative", "negative", "neutral", "very_positive", "very_negative"]
+    # Passive monitoring scored very_* moods as 0; adaptive sensitivity used -2..2
+    sentiment = [{"positive": 1.0, "neutral": 0.0, "negative": -1.0}.get(m, 0.0) for m in moods]
+    scale = [{"very_negative": -2, "negative": -1, "neutral": 0, "positive": 1, "very_positive": 2}[m] for m in moods]
+
+    recorded = {"schema_version": baseline_stats.SCHEMA_VERSION}
+    for mood in moods:
+        _record(recorded, 1, mood=mood)
+    compacted = baseline_stats.compact({"mood_samples": [{"mood": m} for m in moods], "statistics": {}})
+
+    for profile in (recorded, compacted):
+        stats = baseline_stats.statistics(profile)
+        assert stats["typical_sentiment"] == pytest.approx(pystats.fmean(sentiment))
+        assert stats["sentiment_variance"] == pytest.approx(pystats.pvariance(sentiment))
+        distribution = baseline_stats.mood_distribution(profile)
+        assert distribution["mean"] == pytest.approx(pystats.fmean(scale))
+        assert distribution["std"] == pytest.approx(pystats.pstdev(scale))
+
+
+def _load_migration():
+    import importlib.util
+    from pathlib import Path
+
+    path = Path(__file__).resolve().parent.parent / "alembic" / "versions" / "b7d3f5a9e1c2_compact_baseline_profiles.py"
+    spec = importlib.util.spec_from_file_location("compact_baseline_profiles", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+
+def _legacy_profile():
+    return {
+        "language_patterns": [{"message_length": n, "emoji_count": n % 3, "sentiment": "neutral"} for n in range(60)],
+        "mood_samples": [{"mood": mood} for mood in ["very_negative", "negative", "neutral", "very_positive"] * 15],
+        "humor_indicators": ["t"] * 7,
+        "session_lengths": [3, 5, 8],
+        "emoji_baseline": {"emoji_count": [n % 3 for n in range(60)], "common_emojis": {"😂": 90, "🎉": 10},
+                           "function_distribution": {"humor": 40, "literal": 20}},
+        "statistics": {},
+        "communication_style": "casual"
+    }
+
+
+def test_migration_compaction_matches_baseline_stats_at_its_revision():
+    migration = _load_migration()
+
+    frozen = migration._compact(_legacy_profile())
+    live = baseline_stats.compact(_legacy_profile(), migration.RECENT_SAMPLES, migration.HISTOGRAM_DECAY,
+                                  migration.HISTOGRAM_MAX_KEYS)
+
+    assert frozen == live
+
+
+def test_migration_does_not_overwrite_a_profile_written_after_its_read():
+    from sqlalchemy import create_engine, text
+
+    migration = _load_migration()
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE students (id INTEGER PRIMARY KEY, baseline_profile JSON)"))
+        for student_id in (1, 2):
+            conn.execute(text("INSERT INTO students VALUES (:id, :profile)"),
+                         {"id": student_id, "profile": json.dumps(_legacy_profile())})
+
+        # The app writes student 1's profile between the batch read and the update
+        written = baseline_stats.current(_legacy_profile())
+        _record(written, 1)
+        compact = migration._compact
+
+        def compact_racing_the_app(profile):
+            conn.execute(text("UPDATE students SET baseline_profile = :profile WHERE id = 1"),
+                         {"profile": json.dumps(written)})
+            migration._compact = compact
+            return compact(profile)
+
+        migration._compact = compact_racing_the_app
+        migration.compact_profiles(conn)
+
+        rows = dict(conn.execute(text("SELECT id, baseline_profile FROM students")).all())
+
+    assert json.loads(rows[1]) == written
+    assert json.loads(rows[2])["schema_version"] == migration.SCHEMA_VERSION
@@ -0,0 +1,43 @@
+"""Tests for the benchmark suite's fake LLM responses."""
+import json
+import random
+from app.schemas.analysis import StructuredAnalysis
+from app.services.alerts.risk_calculator import RiskCalculator
+from benchmarks import fake_llm_server
+from benchmarks.load_driver import percentile
+
+
+def test_prompts_are_classified_by_call_site():
+    from app.services.analysis.structured_analysis import StructuredAnalysisEngine
+    from app.services.analysis.emoji_analyzer import EmojiAnalyzer
+
+    structured_prompt = StructuredAnalysisEngine(None)._build_prompt("rough week", {})
+    emoji_prompt = EmojiAnalyzer(None, None)._build_emoji_analysis_prompt("rough week 😅", {}, {})
+    risk_prompt = RiskCalculator(None)._build_contextual_risk_prompt("rough week", {})
+
+    assert fake_llm_server.classify_prompt("", structured_prompt) == "structured_analysis"
+    assert fake_llm_server.classify_prompt("", emoji_prompt) == "emoji"
+    assert fake_llm_server.classify_prompt("", risk_prompt) == "contextual_risk"
+    assert fake_llm_server.classify_prompt("", "I had a rough week") == "generation"
+
+
+def test_json_responses_pass_the_consumers_validation():
+    structured = json.loads(fake_llm_server.response_for("structured_analysis"))
+    StructuredAnalysis(**structured)
+
+    contextual_risk = json.loads(fake_llm_server.response_for("contextual_risk"))
+    assert RiskCalculator(None)._validate_llm_response(contextual_risk)
+
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert fake_llm_server.parse_latency("fixed:0.25")(rng) == 0.25
+    assert 0.1 <= fake_llm_server.parse_latency("uniform:0.1:0.2")(rng) <= 0.2
+    assert fake_llm_server.parse_latency("lognormal:0.5:0.3")(rng) > 0
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) is None
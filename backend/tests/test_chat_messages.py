@@ -0,0 +1,116 @@
+"""Tests for the append-only chat_messages transcript."""
+import pytest
+from sqlalchemy import event, select
+from app.models.student import ChatMessage, Session
+from app.schemas.message import Message
+from app.services.analysis.sequential_processor import SequentialProcessor
+from tests.test_context_snapshot import FakeLLM, _seed_student
+
+
+async def _turn(db, text, session_id=None):
+    analysis = await SequentialProcessor(db, FakeLLM()).process_message(
+        Message(student_id="s1", message_text=text, session_id=session_id)
+    )
+    await db.commit()
+    return analysis
+
+
+@pytest.mark.asyncio
+async def test_turns_append_numbered_rows_and_count(async_db):
+    await _seed_student(async_db)
+    await _turn(async_db, "rough week honestly")
+    session = await async_db.scalar(select(Session))
+    for text in ("exams are close", "slept a bit better"):
+        await _turn(async_db, text, session_id=session.id)
+
+    rows = (await async_db.scalars(select(ChatMessage).order_by(ChatMessage.seq))).all()
+    assert [row.seq for row in rows] == [1, 2, 3, 4, 5, 6]
+    assert [row.sender for row in rows] == ["user", "haven"] * 3
+    assert [row.content for row in rows[::2]] == ["rough week honestly", "exams are close", "slept a bit better"]
+    assert session.message_count == 6
+
+
+@pytest.mark.asyncio
+async def test_appending_never_reads_the_transcript(async_db):
+    await _seed_student(async_db)
+    await _turn(async_db, "rough week honestly")
+    session = await async_db.scalar(select(Session))
+
+    statements = []
+    sync_engine = async_db.bind.sync_engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        for _ in range(3):
+            await _turn(async_db, "still here", session_id=session.id)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+
+    chat_statements = [s for s in statements if "chat_messages" in s]
+    assert len(chat_statements) == 3
+    assert all(s.lstrip().upper().startswith("INSERT") for s in chat_statements)
+    # The legacy JSON column is neither loaded nor written
+    assert not any("sessions.messages" in s or "messages=" in s for s in statements)
+
+
+def _load_migration():
+    import importlib.util
+    from pathlib import Path
+
+    path = Path(__file__).resolve().parent.parent / "alembic" / "versions" / "a4b9e2d7c1f3_add_chat_messages.py"
+    spec = importlib.util.spec_from_file_location("add_chat_messages", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+
+@pytest.mark.asyncio
+async def test_backfill_keeps_turns_the_app_wrote_first():
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+    from app.api.messages import get_session_messages
+    from app.db.database import Base
+    from app.models.student import Student
+
+    migration = _load_migration()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(engine)()
+    db.add(Student(student_id="s1", email="s1@example.edu", password_hash="x"))
+    legacy = [{"id": f"user_{i}", "content": f"old {i}", "sender": "user", "timestamp": "t"} for i in range(3)]
+    session = Session(student_id="s1", session_number=1, messages=legacy)
+    db.add(session)
+    db.commit()
+    # Written by the previous release, so not marked as copied
+    db.execute(text("UPDATE sessions SET legacy_message_count = NULL"))
+    # The new code appended a turn before the backfill reached the session
+    db.add_all([ChatMessage(session_id=session.id, seq=seq, student_id="s1", message_id=f"new_{seq}",
+                            sender="user", content=f"new {seq}", sent_at="t") for seq in (1, 2)])
+    session.message_count = 2
+    db.commit()
+
+    with engine.connect() as conn:
+        conn.execute(text("INSERT INTO chat_messages (session_id, seq, student_id, message_id, sender, content, "
+                          "sent_at, created_at, updated_at) VALUES (:s, -999999, 's1', 'partial', 'user', 'x', "
+                          "'t', '2026-01-01', '2026-01-01')"), {"s": session.id})  # An interrupted earlier run
+        conn.commit()
+        migration.copy_legacy_messages(conn)
+        conn.commit()
+        migration.copy_legacy_messages(conn)  # Nothing left to copy
+        conn.commit()
+
+    db.expire_all()
+    assert (session.message_count, session.legacy_message_count, session.total_messages) == (2, 3, 5)
+
+    pages, after_seq = [], None
+    while True:
+        page = await get_session_messages(session.id, student_id="s1", after_seq=after_seq, limit=2, db=db)
+        pages.extend(page)
+        if len(page) < 2:
+            break
+        after_seq = page[-1].seq
+    assert [m.content for m in pages] == ["old 0", "old 1", "old 2", "new 1", "new 2"]
+    assert all(m.seq < 1 for m in pages[:3])
@@ -0,0 +1,111 @@
+"""Tests for the LLM circuit breaker."""
+import pytest
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+from app.core.llm_client import LLMClient
+from app.core.llm_cache import LLMResponseCache
+
+
+async def _call(breaker, error=None):
+    async with breaker.guard("test"):
+        if error is not None:
+            raise error
+
+
+async def _fail(breaker, times):
+    for _ in range(times):
+        with pytest.raises(ConnectionError):
+            await _call(breaker, ConnectionError("refused"))
+
+
+@pytest.mark.asyncio
+async def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=60)
+
+    await _fail(breaker, 2)
+    assert breaker.state == CLOSED
+    await _fail(breaker, 1)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await _call(breaker)
+
+
+@pytest.mark.asyncio
+async def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=60)
+
+    await _fail(breaker, 1)
+    await _call(breaker)
+    await _fail(breaker, 1)
+
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_bad_requests_do_not_open_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+
+    with pytest.raises(ValueError):
+        await _call(breaker, ValueError("unparseable reply"))
+
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_half_open_trial_success_closes_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    await _fail(breaker, 1)
+    assert breaker.state == HALF_OPEN
+
+    async with breaker.guard("test"):
+        # Only one trial call is let through at a time
+        with pytest.raises(CircuitOpenError):
+            await _call(breaker)
+
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_half_open_trial_failure_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    await _fail(breaker, 1)
+    assert breaker.state == HALF_OPEN
+    breaker.cooldown_seconds = 60
+
+    await _fail(breaker, 1)
+
+    assert breaker.state == OPEN
+
+
+class _DownCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise ConnectionError("model down")
+
+
+class DownOpenAI:
+    """Stands in for an AsyncOpenAI whose server refuses connections."""
+
+    def __init__(self):
+        self.completions = _DownCompletions()
+        self.chat = type("Chat", (), {"completions": self.completions})
+
+
+@pytest.mark.asyncio
+async def test_client_stops_calling_the_model_once_open():
+    client = LLMClient(provider="local", base_url="http://fake/v1", model="fake",
+                       cache=LLMResponseCache(enabled=False, ttls={}),
+                       breaker=CircuitBreaker(failure_threshold=2, cooldown_seconds=60))
+    fake = DownOpenAI()
+    client.router.backends[0].client = fake
+
+    for prompt in ("a", "b"):
+        with pytest.raises(ConnectionError):
+            await client.generate(prompt, call_site="emoji")
+    with pytest.raises(CircuitOpenError):
+        await client.generate("c", call_site="emoji")
+
+    assert fake.completions.calls == 2
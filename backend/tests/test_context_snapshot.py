@@ -0,0 +1,79 @@
+"""Tests for the per-message context snapshot and pipeline query counts."""
+import json
+import pytest
+from datetime import datetime, timedelta
+from app.models.student import Student
+from app.models.assessment import RiskProfile, Assessment
+from app.schemas.message import Message
+from app.services.analysis.context_snapshot import ContextSnapshotLoader
+from app.services.analysis.sequential_processor import SequentialProcessor
+
+
+STRUCTURED = {
+    "emoji": {"genuine_distress": False, "confidence": 0.5, "reasoning": "", "emoji_function": "ambiguous"},
+    "concern_indicators": {"language_shift_detected": False, "hopelessness_themes": False,
+                           "engagement_drop": False, "sudden_mood_change": False, "reasoning": ""},
+    "suicidal_ideation": {"present": False, "is_literal": False, "confidence": 0.1, "reasoning": ""},
+    "depression_indicators": {"severity_estimate": "LOW", "confidence": 0.3, "indicators": [], "reasoning": ""},
+    "overall_context": {"tone": "tired", "escalation": False, "concern_level": "LOW"},
+    "sentiment": {"sentiment": "neutral", "sentiment_score": 0.0, "contains_humor": False}
+}
+
+
+class FakeLLM:
+    async def generate(self, prompt, max_tokens=500, system_message=None, call_site=None):
+        if "Respond in JSON format" in prompt:
+            return json.dumps(STRUCTURED)
+        return "That sounds like a long week. What made it hardest?"
+
+
+async def _seed_student(db, student_id="s1"):
+    db.add(Student(student_id=student_id, email=f"{student_id}@example.edu", password_hash="x",
+                   baseline_profile={}, session_count=5))
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_loads_in_four_queries(async_db, statement_counter):
+    await _seed_student(async_db)
+    now = datetime.utcnow()
+    async_db.add_all([
+        RiskProfile(student_id="s1", overall_risk="HIGH", confidence=0.8, risk_factors={},
+                    recommended_action="x", calculated_at=now - timedelta(days=60)),
+        Assessment(student_id="s1", assessment_type="PHQ9", score=6, responses={},
+                   administered_at=now - timedelta(days=20)),
+        Assessment(student_id="s1", assessment_type="PHQ9", score=14, responses={},
+                   administered_at=now - timedelta(days=2)),
+        Assessment(student_id="s1", assessment_type="GAD7", score=9, responses={},
+                   administered_at=now - timedelta(days=5)),
+    ])
+    await async_db.commit()
+    statement_counter.reset()
+    
+    snapshot = await ContextSnapshotLoader(async_db).load("s1")
+    
+    assert statement_counter.total == 4
+    assert snapshot.student.student_id == "s1"
+    # Latest profile is outside the 30-day window: current risk, not history
+    assert snapshot.risk_history == []
+    assert snapshot.latest_risk_profile.overall_risk == "HIGH"
+    assert snapshot.latest_assessment("PHQ9").score == 14
+    assert snapshot.latest_assessment("GAD7").score == 9
+    assert snapshot.latest_assessment("C_SSRS") is None
+
+
+@pytest.mark.asyncio
+async def test_process_message_statement_budget(async_db, statement_counter):
+    """Pins the per-message total: 4 snapshot reads plus the turn's writes."""
+    await _seed_student(async_db)
+    statement_counter.reset()
+    
+    processor = SequentialProcessor(async_db, FakeLLM())
+    analysis = await processor.process_message(Message(student_id="s1", message_text="rough week honestly"))
+    
+    assert analysis.response_generated
+    assert statement_counter.count("SELECT") == 4
+    # emoji baseline, risk profile, session (+ student session_count), chat messages (one INSERT)
+    # + session counters, analysis log
+    assert statement_counter.count("INSERT") + statement_counter.count("UPDATE") == 7
+    assert statement_counter.total == 11
@@ -0,0 +1,163 @@
+"""Tests for per-session conversation memory and the token-budgeted prompt builder."""
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core.config import settings
+from app.models.student import Session, Student
+from app.services.analysis import conversation_memory
+from app.services.analysis.conversation_memory import ConversationSummarizer
+from app.services.analysis.prompt_builder import PromptBuilder, estimate_tokens
+from app.tasks import conversation_summary
+
+
+def _render(history_text):
+    return f"Instructions for the model.\n\nHistory:\n{history_text}\n\nStudent message: rough week"
+
+
+def _context(turns, summary=None):
+    history = [{"message_text": f"message {i} " + "word " * 20} for i in range(turns)]
+    return {"conversation_history": history, "conversation_summary": summary}
+
+
+def _session(**fields):
+    defaults = {"recent_turns": [], "turn_count": 0, "summarized_turns": 0, "conversation_summary": None}
+    return SimpleNamespace(**{**defaults, **fields})
+
+
+def test_estimate_tokens_counts_words_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hi there!") == 3
+    assert estimate_tokens("internationalization") > estimate_tokens("nation")
+
+
+def test_prompt_size_stays_flat_as_history_grows():
+    builder = PromptBuilder(budget_tokens=200)
+    format_turn = lambda msg: f"Previous: {msg['message_text']}"
+
+    sizes = [estimate_tokens(builder.build(_render, _context(turns), format_turn)) for turns in (20, 50, 200)]
+
+    assert all(size <= 200 for size in sizes)
+    assert max(sizes) - min(sizes) < 30
+
+
+def test_newest_turns_are_kept_and_summary_comes_first():
+    builder = PromptBuilder(budget_tokens=120)
+    prompt = builder.build(_render, _context(30, summary="Student has exam stress."),
+                           lambda msg: msg["message_text"])
+
+    assert "Summary of earlier conversation: Student has exam stress." in prompt
+    assert "message 29" in prompt
+    assert "message 0 " not in prompt
+    assert prompt.index("Summary") < prompt.index("message 29")
+
+
+def test_no_history_when_instructions_use_the_whole_budget():
+    builder = PromptBuilder(budget_tokens=5)
+    prompt = builder.build(_render, _context(3), lambda msg: msg["message_text"], empty="none")
+
+    assert "History:\nnone" in prompt
+
+
+def test_record_turn_reports_when_turns_leave_the_window():
+    session = _session()
+    for i in range(3):
+        needs_summary = conversation_memory.record_turn(session, f"m{i}", f"r{i}", "t", window=3)
+    assert not needs_summary
+
+    assert conversation_memory.record_turn(session, "m3", "r3", "t", window=3)
+    assert [t["user"] for t in conversation_memory.turns_to_fold(session, window=3)] == ["m0"]
+
+    # Once turn 1 is summarized it drops out of the window and the history
+    session.summarized_turns = 1
+    conversation_memory.record_turn(session, "m4", "r4", "t", window=3)
+    assert [t["turn"] for t in session.recent_turns] == [2, 3, 4, 5]
+    assert [h["message_text"] for h in conversation_memory.history_from_session(session, limit=3)] == ["m2", "m3", "m4"]
+
+
+def test_new_sessions_are_seeded_from_earlier_history():
+    turns = conversation_memory.seed_turns([{"message_text": "a", "response_text": "b", "created_at": "t"}])
+
+    assert turns == [{"turn": 1, "user": "a", "assistant": "b", "at": "t"}]
+    assert conversation_memory.has_memory(_session(recent_turns=turns))
+    assert not conversation_memory.has_memory(_session())
+
+
+class SummaryLLM:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.prompts = []
+
+    async def generate(self, prompt, max_tokens=500, system_message=None, call_site=None):
+        self.prompts.append(prompt)
+        if self.fail:
+            raise ConnectionError("model down")
+        return "  Student is stressed about exams and sleeping badly.  "
+
+
+@pytest.mark.asyncio
+async def test_summarizer_folds_turns_into_previous_summary():
+    llm = SummaryLLM()
+    summary = await ConversationSummarizer(llm).fold("Student has exams.", [{"user": "can't sleep", "assistant": "ok"}])
+
+    assert summary == "Student is stressed about exams and sleeping badly."
+    assert "Student has exams." in llm.prompts[0]
+    assert "Student: can't sleep" in llm.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_summarizer_falls_back_to_extractive_summary_within_cap():
+    summarizer = ConversationSummarizer(SummaryLLM(fail=True), max_tokens=30)
+    turns = [{"user": "my roommate keeps me up every night " * 3}] * 5
+
+    summary = await summarizer.fold("Earlier: exam stress.", turns)
+
+    assert "roommate" in summary
+    assert estimate_tokens(summary) <= 30
+
+
+async def _seed_session(db, turns):
+    db.add(Student(student_id="s1", email="s1@example.edu", password_hash="x"))
+    session = Session(student_id="s1", session_number=1, turn_count=turns, summarized_turns=0,
+                      recent_turns=[{"turn": i, "user": f"m{i}", "assistant": f"r{i}", "at": "t"}
+                                    for i in range(1, turns + 1)])
+    db.add(session)
+    await db.commit()
+    return session.id
+
+
+async def _summary_state(db, session_id):
+    return (await db.execute(
+        select(Session.summarized_turns, Session.conversation_summary).where(Session.id == session_id)
+    )).one()
+
+
+@pytest.mark.asyncio
+async def test_summarize_session_folds_turns_that_left_the_window(async_db, monkeypatch):
+    monkeypatch.setattr(conversation_summary, "AsyncSessionLocal", async_sessionmaker(async_db.bind))
+    session_id = await _seed_session(async_db, settings.conversation_memory_turns + 2)
+
+    await conversation_summary.summarize_session(session_id, SummaryLLM())
+
+    assert tuple(await _summary_state(async_db, session_id)) == \
+        (2, "Student is stressed about exams and sleeping badly.")
+    assert not conversation_summary.is_summarizing(session_id)
+
+
+@pytest.mark.asyncio
+async def test_summarize_session_keeps_a_newer_concurrent_summary(async_db, monkeypatch):
+    monkeypatch.setattr(conversation_summary, "AsyncSessionLocal", async_sessionmaker(async_db.bind))
+    session_id = await _seed_session(async_db, settings.conversation_memory_turns + 2)
+    update_summary = update(Session).where(Session.id == session_id)
+
+    class RacingLLM(SummaryLLM):
+        async def generate(self, prompt, max_tokens=500, system_message=None, call_site=None):
+            # Another update lands while this one waits on the model
+            await async_db.execute(update_summary.values(summarized_turns=1, conversation_summary="newer"))
+            await async_db.commit()
+            return await super().generate(prompt, max_tokens, system_message, call_site)
+
+    await conversation_summary.summarize_session(session_id, RacingLLM())
+
+    # The compare-and-set on summarized_turns misses; the newer summary stays
+    assert tuple(await _summary_state(async_db, session_id)) == (1, "newer")
@@ -0,0 +1,112 @@
+"""Tests for the tiered emoji analyzer (no emoji / local lexicon / LLM)."""
+import json
+from types import SimpleNamespace
+import pytest
+from app.services.analysis.context_snapshot import ContextSnapshot
+from app.services.analysis.emoji_analyzer import EmojiAnalyzer
+from app.services.analysis.emoji_lexicon import extract_emojis
+
+LLM_ANALYSIS = {"genuine_distress": True, "confidence": 0.7, "reasoning": "masking", "emoji_function": "humor",
+                "emoji_context": {"emojis_found": ["😂"], "text_emoji_alignment": "contradicts"}}
+
+
+class EmojiLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt, max_tokens=500, system_message=None, call_site=None):
+        self.calls += 1
+        return json.dumps(LLM_ANALYSIS)
+
+
+def _snapshot(emoji_baseline=None):
+    student = SimpleNamespace(baseline_profile={"emoji_baseline": emoji_baseline} if emoji_baseline else {})
+    return ContextSnapshot("s1", student=student)
+
+
+async def _analyze(text, snapshot=None):
+    llm = EmojiLLM()
+    snapshot = snapshot or _snapshot()
+    analysis = await EmojiAnalyzer(llm, None).analyze("s1", text, {}, snapshot)
+    return analysis, llm, snapshot.student.baseline_profile["emoji_baseline"]
+
+
+@pytest.mark.asyncio
+async def test_message_without_emojis_skips_the_llm():
+    analysis, llm, baseline = await _analyze("rough week honestly")
+
+    assert analysis["tier"] == "none"
+    assert not analysis["genuine_distress"]
+    assert llm.calls == 0
+    assert baseline["emoji_per_message"]["n"] == 1
+    assert baseline["recent_counts"] == [0]
+    assert "function_distribution" not in baseline
+
+
+@pytest.mark.asyncio
+async def test_known_emojis_are_scored_locally():
+    analysis, llm, baseline = await _analyze("finally done with exams 🎉🎉")
+
+    assert analysis["tier"] == "lexicon"
+    assert llm.calls == 0
+    assert not analysis["genuine_distress"]
+    assert analysis["emoji_context"] == {"emojis_found": ["🎉", "🎉"], "text_emoji_alignment": "amplifies"}
+    assert baseline["common_emojis"] == {"🎉": 1}
+
+
+@pytest.mark.asyncio
+async def test_sad_emoji_with_sad_text_is_distress():
+    analysis, llm, _ = await _analyze("so lonely tonight 😢")
+
+    assert analysis["tier"] == "lexicon"
+    assert analysis["genuine_distress"]
+    assert llm.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_contradictions_and_unknown_emojis_go_to_the_llm():
+    for text in ["I want to disappear 😂", "best day ever 😢", "look at this 🦑"]:
+        analysis, llm, _ = await _analyze(text)
+
+        assert analysis["tier"] == "llm", text
+        assert llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_humor_and_ambiguous_emojis_on_unpositive_text_go_to_the_llm():
+    # Masked ideation: the cue words see nothing negative, the emoji reads as a joke
+    for text in ["nobody would even miss me 😂", "everyone would be better off without me 🙃",
+                 "what is the point of anything 🙂", "i just want it to stop 💀"]:
+        analysis, llm, _ = await _analyze(text)
+
+        assert analysis["tier"] == "llm", text
+        assert llm.calls == 1
+
+    analysis, llm, _ = await _analyze("finally slept properly lol 😅")
+    assert analysis["tier"] == "lexicon"
+    assert llm.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_habitual_use_resolves_an_ambiguous_emoji():
+    habitual = {"common_emojis": {"😭": 12}, "function_distribution": {"humor": 9, "literal": 1}}
+
+    analysis, llm, _ = await _analyze("finally done with this group project 😭", _snapshot(habitual))
+
+    assert analysis["tier"] == "lexicon"
+    assert analysis["emoji_function"] == "humor"
+    assert analysis["emoji_context"]["text_emoji_alignment"] == "amplifies"
+    assert not analysis["genuine_distress"]
+    assert llm.calls == 0
+
+    # Without the habit, the same message is a contradiction and goes to the LLM
+    analysis, llm, _ = await _analyze("finally done with this group project 😭")
+    assert analysis["tier"] == "llm"
+
+    # A habit never clears negative text
+    analysis, llm, _ = await _analyze("so tired of this group project 😭", _snapshot(habitual))
+    assert analysis["tier"] == "llm"
+
+
+def test_extract_emojis_skips_modifiers_and_non_emoji_scripts():
+    assert extract_emojis("ok 👍🏽 ❤️ 考试 😂😂") == ["👍", "❤", "😂", "😂"]
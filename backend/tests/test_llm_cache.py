@@ -0,0 +1,81 @@
+"""Tests for the LLM response cache."""
+import pytest
+from app.core.llm_cache import LRUCache, LLMResponseCache
+from app.core.llm_client import LLMClient
+
+
+class _Completions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        message = type("Message", (), {"content": f"answer {len(self.calls)}"})
+        choice = type("Choice", (), {"message": message})
+        return type("Response", (), {"choices": [choice], "usage": None})
+
+
+class FakeOpenAI:
+    """Stands in for AsyncOpenAI.chat.completions."""
+
+    def __init__(self):
+        self.completions = _Completions()
+        self.chat = type("Chat", (), {"completions": self.completions})
+        self.base_url = "http://fake"
+
+
+def _client(cache):
+    client = LLMClient(provider="local", base_url="http://fake/v1", model="fake", cache=cache)
+    client.router.backends[0].client = FakeOpenAI()
+    return client
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    cache.get("a")
+    cache.set("c", "3", ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_lru_expires_entries():
+    cache = LRUCache()
+    cache.set("a", "1", ttl=0)
+    assert cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_is_served_from_cache():
+    client = _client(LLMResponseCache(enabled=True, ttls={"emoji": 60}))
+
+    first = await client.generate("thanks 😂", call_site="emoji")
+    second = await client.generate("thanks 😂", call_site="emoji")
+    other = await client.generate("ok", call_site="emoji")
+
+    assert first == second == "answer 1"
+    assert other == "answer 2"
+    assert len(client.router.backends[0].client.completions.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_call_sites_without_ttl_are_not_cached():
+    client = _client(LLMResponseCache(enabled=True, ttls={"emoji": 60}))
+
+    await client.generate("hello", call_site="generation")
+    await client.generate("hello", call_site="generation")
+
+    assert len(client.router.backends[0].client.completions.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_key_includes_max_tokens():
+    client = _client(LLMResponseCache(enabled=True, ttls={"journal": 60}))
+
+    await client.generate("entries", max_tokens=200, call_site="journal")
+    await client.generate("entries", max_tokens=300, call_site="journal")
+
+    assert len(client.router.backends[0].client.completions.calls) == 2
@@ -0,0 +1,121 @@
+"""Tests for least-loaded LLM backend routing and ejection."""
+import asyncio
+import pytest
+from app.core.llm_router import LLMRouter, LLMBackend
+
+
+class _Models:
+    def __init__(self):
+        self.up = True
+
+    async def list(self):
+        if not self.up:
+            raise ConnectionError("backend down")
+        return []
+
+
+class FakeBackendClient:
+    """Stands in for AsyncOpenAI; only models.list is probed."""
+
+    def __init__(self):
+        self.models = _Models()
+
+
+def _router(count=2, **kwargs):
+    backends = [LLMBackend(f"http://llm-{i}/v1", FakeBackendClient()) for i in range(count)]
+    kwargs.setdefault("health_check_interval", 0)
+    return LLMRouter(backends, **kwargs)
+
+
+async def _fail(router, times):
+    for _ in range(times):
+        with pytest.raises(ConnectionError):
+            async with router.backend() as backend:
+                raise ConnectionError("refused")
+    return backend
+
+
+@pytest.mark.asyncio
+async def test_picks_backend_with_fewest_outstanding_calls():
+    router = _router()
+    release = asyncio.Event()
+    busy = []
+
+    async def hold():
+        async with router.backend() as backend:
+            busy.append(backend)
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    for _ in range(3):
+        async with router.backend() as backend:
+            assert backend is not busy[0]
+
+    release.set()
+    await holder
+    assert all(b.outstanding == 0 for b in router.backends)
+
+
+@pytest.mark.asyncio
+async def test_backend_is_ejected_after_consecutive_failures():
+    router = _router(eject_after_errors=2, eject_seconds=60)
+    failing, healthy = router.backends
+    healthy.outstanding = 10  # Steer traffic to the failing backend
+
+    await _fail(router, 2)
+    healthy.outstanding = 0
+
+    assert failing.ejected_until > 0
+    for _ in range(4):
+        async with router.backend() as backend:
+            assert backend is healthy
+
+
+@pytest.mark.asyncio
+async def test_bad_requests_do_not_count_as_backend_failures():
+    router = _router(count=1, eject_after_errors=1)
+
+    with pytest.raises(ValueError):
+        async with router.backend():
+            raise ValueError("bad prompt")
+
+    assert router.backends[0].consecutive_errors == 0
+
+
+@pytest.mark.asyncio
+async def test_single_backend_is_never_ejected():
+    router = _router(count=1, eject_after_errors=1)
+    backend = await _fail(router, 3)
+
+    assert backend.ejected_until == 0.0
+    async with router.backend() as picked:
+        assert picked is backend
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_all_backends_when_every_one_is_out():
+    router = _router()
+    for backend in router.backends:
+        backend.client.models.up = False
+        await router.probe(backend)
+
+    assert not any(b.healthy for b in router.backends)
+    async with router.backend() as backend:
+        assert backend in router.backends
+
+
+@pytest.mark.asyncio
+async def test_probe_reinstates_recovered_backend():
+    router = _router(eject_after_errors=1, eject_seconds=60)
+    backend = router.backends[0]
+    backend.client.models.up = False
+    await router.probe(backend)
+    assert not backend.healthy
+
+    backend.client.models.up = True
+    await router.probe(backend)
+
+    assert backend.healthy
+    assert backend.ejected_until == 0.0
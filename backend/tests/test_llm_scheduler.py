@@ -0,0 +1,89 @@
+"""Tests for the priority-aware LLM scheduler."""
+import asyncio
+import pytest
+from app.core.llm_scheduler import LLMScheduler, llm_priority, resolve_priority
+
+WEIGHTS = {"crisis": 16, "chat": 8, "analysis": 4, "batch": 1}
+
+
+async def _hold(scheduler, priority, order, release):
+    async with scheduler.slot(priority):
+        order.append(priority)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    scheduler = LLMScheduler(2, WEIGHTS)
+    release = asyncio.Event()
+    order = []
+
+    tasks = [asyncio.create_task(_hold(scheduler, "batch", order, release)) for _ in range(5)]
+    await asyncio.sleep(0)
+
+    assert scheduler.active == 2
+    assert scheduler.queue_depth("batch") == 3
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.active == 0
+    assert len(order) == 5
+
+
+@pytest.mark.asyncio
+async def test_chat_overtakes_queued_batch_work():
+    scheduler = LLMScheduler(1, WEIGHTS)
+    order = []
+    gate = asyncio.Event()
+
+    async def run(priority):
+        async with scheduler.slot(priority):
+            order.append(priority)
+            await gate.wait()
+
+    blocker = asyncio.create_task(run("batch"))
+    await asyncio.sleep(0)
+    batch = [asyncio.create_task(run("batch")) for _ in range(4)]
+    await asyncio.sleep(0)
+    chat = asyncio.create_task(run("chat"))
+    await asyncio.sleep(0)
+
+    gate.set()
+    await asyncio.gather(blocker, chat, *batch)
+
+    # The chat call was queued last but is served right after the running call
+    assert order[1] == "chat"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    scheduler = LLMScheduler(1, WEIGHTS)
+    release = asyncio.Event()
+    order = []
+
+    holder = asyncio.create_task(_hold(scheduler, "analysis", order, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(scheduler, "analysis", order, release))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.queue_depth() == 0
+
+    release.set()
+    await holder
+    assert scheduler.active == 0
+
+    async with scheduler.slot("chat"):
+        assert scheduler.active == 1
+
+
+def test_priority_resolution():
+    assert resolve_priority("generation") == "chat"
+    assert resolve_priority("journal") == "batch"
+    assert resolve_priority("emoji") == "analysis"
+    assert resolve_priority("journal", "crisis") == "crisis"
+
+    with llm_priority("crisis"):
+        assert resolve_priority("contextual_risk") == "crisis"
@@ -0,0 +1,49 @@
+"""Tests for the Prometheus instrumentation helpers."""
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from app.core import metrics
+
+
+def _sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_route_template_uses_path_pattern():
+    app = FastAPI()
+
+    @app.get("/api/alerts/{alert_id}")
+    async def get_alert(alert_id: int):
+        return {}
+
+    scope = {"type": "http", "method": "GET", "path": "/api/alerts/42", "app": app}
+    assert metrics.route_template(scope) == "/api/alerts/{alert_id}"
+    assert metrics.route_template({**scope, "path": "/nope"}) == "unmatched"
+
+
+def test_sql_statements_are_counted_per_route():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    before = _sample("db_queries_total", {"route": "/test/sql"})
+
+    token = metrics.current_route.set("/test/sql")
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    finally:
+        metrics.current_route.reset(token)
+
+    assert _sample("db_queries_total", {"route": "/test/sql"}) - before == 2
+    assert _sample("db_query_duration_seconds_count", {"route": "/test/sql"}) >= 2
+
+
+def test_observe_checkpoints_records_each_checkpoint():
+    before = _sample("pipeline_checkpoint_duration_seconds_count", {"checkpoint": "TEST_CHECKPOINT"})
+
+    metrics.observe_checkpoints([
+        {"name": "TEST_CHECKPOINT", "passed": True, "result": {}, "time_ms": 120},
+        {"name": "TEST_CHECKPOINT", "passed": True, "result": {}, "time_ms": 30},
+    ])
+
+    assert _sample("pipeline_checkpoint_duration_seconds_count", {"checkpoint": "TEST_CHECKPOINT"}) - before == 2
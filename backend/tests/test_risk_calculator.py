@@ -0,0 +1,57 @@
+"""Tests for risk calculator."""
+import pytest
+from prometheus_client import REGISTRY
+from app.services.alerts.risk_calculator import RiskCalculator
+
+
+def _analyses(outcome):
+    return REGISTRY.get_sample_value("contextual_risk_analyses_total", {"outcome": outcome}) or 0
+
+
+@pytest.mark.asyncio
+async def test_contextual_analysis_computed_once_per_message():
+    """Suicidal ideation and depression share one contextual analysis."""
+    calculator = RiskCalculator.__new__(RiskCalculator)
+    calculator.llm = object()
+    
+    async def no_assessment(student_id, assessment_type, snapshot=None):
+        return None
+    
+    calculator._get_latest_assessment = no_assessment
+    
+    calls = []
+    
+    async def fake_contextual_risk(message_text, context):
+        calls.append(message_text)
+        return {
+            "suicidal_ideation": {"present": False, "confidence": 0.1},
+            "depression_indicators": {"severity_estimate": "LOW", "confidence": 0.2},
+            "overall_context": {"tone": "neutral"}
+        }
+    
+    calculator._analyze_contextual_risk = fake_contextual_risk
+    computed_before, hits_before = _analyses("computed"), _analyses("memo_hit")
+    
+    cache = {}
+    await calculator._assess_suicidal_ideation("rough week", {}, cache)
+    await calculator._assess_depression_severity("s1", "rough week", {}, cache)
+    
+    assert len(calls) == 1
+    assert _analyses("computed") == computed_before + 1
+    assert _analyses("memo_hit") == hits_before + 1
+
+
+@pytest.mark.asyncio
+async def test_structured_reuse_is_not_counted_as_computed():
+    calculator = RiskCalculator.__new__(RiskCalculator)
+
+    async def fake_contextual_risk(message_text, context):
+        return {"suicidal_ideation": {"present": False, "confidence": 0.1}}
+
+    calculator._analyze_contextual_risk = fake_contextual_risk
+    computed_before, reused_before = _analyses("computed"), _analyses("structured_reuse")
+
+    await calculator._get_contextual_analysis("rough week", {"structured_analysis": {"risk": {}}}, {})
+
+    assert _analyses("computed") == computed_before
+    assert _analyses("structured_reuse") == reused_before + 1
@@ -0,0 +1,209 @@
+"""Tests for the incremental streaming response filter."""
+from app.services.analysis.safety_screener import SafetyScreener, StreamingResponseFilter
+
+
+def _stream(chunks):
+    screener = SafetyScreener()
+    stream_filter = StreamingResponseFilter(screener)
+    sent = "".join(stream_filter.feed(chunk) for chunk in chunks)
+    return sent + stream_filter.finish()
+
+
+def test_streamed_output_matches_filter_response():
+    text = "That sounds really hard. I'm here with you. Reasoning: the student seems stressed."
+    chunks = [text[i:i + 5] for i in range(0, len(text), 5)]
+    
+    assert _stream(chunks) == SafetyScreener().filter_response(text)
+
+
+def test_marker_split_across_chunks_is_not_leaked():
+    sent = _stream(["It helps to rest. Reas", "oning: internal", " notes here"])
+    
+    assert "Reas" not in sent
+    assert sent == "It helps to rest."
+
+
+def test_medical_advice_split_across_chunks_is_redacted():
+    sent = _stream(["Maybe you should ta", "ke medication for that."])
+    
+    assert "medication" not in sent.replace("[medical advice removed]", "")
+    assert "[medical advice removed]" in sent
+
+
+def _lexicon(categories, version="test"):
+    from app.services.analysis.safety_lexicon import SafetyLexicon
+    return SafetyLexicon(version, categories)
+
+
+def test_screen_flags_match_per_pattern_search():
+    import re
+    from app.services.analysis.safety_lexicon import SafetyLexicon
+    
+    lexicon = SafetyLexicon.load()
+    text = "I plan to kill myself, this is my FINAL  message. I want to commit suicide."
+    expected = [
+        f"{entry['category']}: {entry['pattern']}"
+        for entry in lexicon.entries
+        if re.search(entry["pattern"], text, re.IGNORECASE)
+    ]
+    
+    result = SafetyScreener(lexicon).screen_immediate(text)
+    
+    assert result["flags"] == expected
+    assert "crisis_keyword: suicide" in result["flags"]
+    assert "crisis_keyword: commit\\s+suicide" in result["flags"]
+    assert result["crisis_detected"]
+    assert result["lexicon_version"] == lexicon.version
+
+
+def test_benign_message_has_no_flags():
+    result = SafetyScreener().screen_immediate("Killing it at work today, exams went great!")
+    
+    assert not result["crisis_detected"]
+    assert result["flags"] == []
+    assert result["reason"] is None
+    assert result["variant_matches"] == []
+
+
+def test_phrases_sharing_a_start_position_are_all_reported():
+    lexicon = _lexicon({"crisis_keyword": [{"pattern": "give\\s+up"}, {"pattern": "give\\s+up\\s+on\\s+life"}]})
+    
+    assert lexicon.flags("I just want to give up on life") == [
+        "crisis_keyword: give\\s+up", "crisis_keyword: give\\s+up\\s+on\\s+life"
+    ]
+
+
+def test_patterns_without_a_fixed_leading_word_still_match():
+    lexicon = _lexicon({"crisis_keyword": [
+        {"pattern": "no\\s+reason|pointless"}, {"pattern": "wan?t\\s+out"}, {"pattern": "\\bunalive"}
+    ]})
+    
+    assert len(lexicon.flags("everything feels POINTLESS")) == 1
+    assert len(lexicon.flags("I just wat out")) == 1
+    assert len(lexicon.flags("thinking about how to unalive")) == 1
+
+
+def test_tagged_entries_drive_the_risk_fallback():
+    lexicon = _lexicon({
+        "crisis_keyword": [{"pattern": "suicide", "tags": ["suicidal_ideation"]}, {"pattern": "goodbye\\s+forever"}]
+    })
+    
+    assert lexicon.has_tag("thinking about suicide", "suicidal_ideation")
+    assert not lexicon.has_tag("goodbye forever", "suicidal_ideation")
+
+
+def test_lexicon_loads_from_a_versioned_file(tmp_path):
+    import json
+    from app.services.analysis.safety_lexicon import SafetyLexicon
+    
+    path = tmp_path / "lexicon.json"
+    path.write_text(json.dumps({"version": "7", "categories": {"plan_indicator": [{"pattern": "bridge"}]}}))
+    
+    lexicon = SafetyLexicon.load(str(path))
+    
+    assert lexicon.version == "7"
+    assert lexicon.flags("the bridge tonight") == ["plan_indicator: bridge"]
+
+
+def test_obfuscated_variants_are_flagged():
+    screener = SafetyScreener()
+    
+    for text in ["i want to k1ll mys3lf", "thinking about s u i c i d e", "k m s fr",
+                 "I wanna diiiieeee", "been thinking of suicde", "i want to un@live myself",
+                 "gonna kill myslf", "thinking about commit suicde",
+                 "і want tо kіll myself"]:
+        result = screener.screen_immediate(text)
+        assert result["crisis_detected"], text
+        assert result["variant_matches"], text
+
+
+def test_variant_flags_reuse_the_lexicon_flag():
+    result = SafetyScreener().screen_immediate("gonna k!ll my self tonight")
+    
+    assert result["flags"] == ["crisis_keyword: kill\\s+(myself|my\\s+self)"]
+    assert result["variant_matches"] == [{"flag": result["flags"][0], "stage": "normalized"}]
+
+
+def test_common_words_near_crisis_phrases_are_not_flagged():
+    screener = SafetyScreener()
+    
+    for text in ["I want to dine out tonight", "my skills myself are improving", "k, see you at 5",
+                 "this game is killing me lol", "ending my shift early", "the finance message was late"]:
+        assert not screener.screen_immediate(text)["crisis_detected"], text
+
+
+def test_one_letter_neighbours_of_crisis_words_are_not_flagged():
+    screener = SafetyScreener()
+    
+    for text in ["I will myself to get up", "I need to fill myself up with food", "I built the mill myself",
+                 "I had to bill myself for the hours", "ending my live stream early tonight",
+                 "I'm ending my lie about the grades", "I won't be there tomorrow, dentist appointment",
+                 "we are so unalike it's funny"]:
+        result = screener.screen_immediate(text)
+        assert not result["crisis_detected"], (text, result["flags"])
+
+
+def test_distances_in_kms_are_not_flagged():
+    screener = SafetyScreener()
+    
+    for text in ["ran 5 kms this morning", "campus is 3 kms from home", "only 10kms left on the bike"]:
+        result = screener.screen_immediate(text)
+        assert not result["crisis_detected"], (text, result["flags"])
+    for text in ["honestly kms", "KMS.", "k m s fr"]:
+        assert screener.screen_immediate(text)["crisis_detected"], text
+
+
+def test_leading_lookbehinds_keep_the_pattern_anchored():
+    from app.services.analysis.safety_lexicon import _anchor
+    
+    assert _anchor("(?<!\\d)(?<!\\d\\s)\\bkms\\b") == "kms"
+    assert _anchor("(?<!not\\s)pointless|no\\s+reason") is None
+
+
+def test_normalization_folds_obfuscation():
+    from app.services.analysis.safety_normalizer import normalize_for_screening
+    
+    assert normalize_for_screening("K1LL mys3lf!") == "kill myself!"
+    assert normalize_for_screening("s.u.i.c.i.d.e") == "suicide"
+    assert normalize_for_screening("nooooo way") == "noo way"
+    assert normalize_for_screening("café at 5pm") == "cafe at 5pm"
+
+
+def test_bounded_edit_distance_gives_up_past_the_bound():
+    from app.services.analysis.safety_normalizer import bounded_edit_distance
+    
+    assert bounded_edit_distance("suicde", "suicide", 1) == 1
+    assert bounded_edit_distance("sucde", "suicide", 1) is None
+    assert bounded_edit_distance("a", "abcd", 2) is None
+    
+    # Characters marked fixed cannot be edited, nor can anything be inserted between them
+    fixed = [True] * 3 + [False] * 6
+    assert bounded_edit_distance("kilmyslef", "kilmyself", 2, fixed) == 2
+    assert bounded_edit_distance("wilmyself", "kilmyself", 1, fixed) is None
+    assert bounded_edit_distance("kiilmyself", "kilmyself", 1, fixed) is None
+
+
+def test_variant_scan_only_compares_runs_near_a_phrase_piece(monkeypatch):
+    from app.services.analysis import safety_normalizer
+    
+    compared = []
+    edit_distance = safety_normalizer.bounded_edit_distance
+    monkeypatch.setattr(safety_normalizer, "bounded_edit_distance",
+                        lambda a, b, *args: compared.append(a) or edit_distance(a, b, *args))
+    lexicon = _lexicon({"crisis_keyword": [{"pattern": "suicide", "variants": ["suicide"], "max_edits": 1}]})
+    
+    # "slides" keeps the piece "ide", but too far from its place in "suicide" to be one edit away
+    matches, complete = lexicon.match_variants("the slides are due friday " * 2000 + "thinking about suicde")
+    
+    assert complete
+    assert [entry["pattern"] for entry, _ in matches] == ["suicide"]
+    assert compared == ["suicde"]
+
+
+def test_variant_scan_stops_at_the_deadline():
+    lexicon = _lexicon({"crisis_keyword": [{"pattern": "suicide", "variants": ["suicide"], "max_edits": 1}]})
+    
+    matches, complete = lexicon.match_variants("word " * 1000 + "suicde", deadline=0.0)
+    
+    assert not complete
+    assert matches == []
@@ -20,3 +20,130 @@ async def test_message_processing():
 
 
 
+@pytest.mark.asyncio
+async def test_generation_and_analysis_run_concurrently():
+    """Checkpoints 3 and 4 overlap and a failed branch does not discard the other."""
+    import asyncio
+    from app.services.analysis.sequential_processor import SequentialProcessor
+    
+    processor = SequentialProcessor.__new__(SequentialProcessor)
+    
+    async def fake_generation(message, context):
+        await asyncio.sleep(0.2)
+        return {"name": "LLM_GENERATION", "passed": True,
+                "result": {"response": "hi"}, "time_ms": 200}
+    
+    async def failing_analysis(message, context, snapshot=None):
+        await asyncio.sleep(0.2)
+        raise RuntimeError("analysis down")
+    
+    processor._checkpoint_3_llm_generation = fake_generation
+    processor._checkpoint_4_deep_analysis = failing_analysis
+    
+    message = Message(student_id="s1", message_text="hello", timestamp=datetime.utcnow())
+    generation, analysis, timings = await processor._run_generation_and_analysis(message, {})
+    
+    assert generation["result"]["response"] == "hi"
+    assert analysis["passed"] is False
+    assert timings["wall_ms"] < timings["llm_generation_ms"] + timings["deep_analysis_ms"]
+    
+    gating = await processor._checkpoint_5_response_gating(message, "hi", analysis["result"])
+    assert gating["result"]["gating_decision"] == "MEDIUM"
+
+
+@pytest.mark.asyncio
+async def test_crisis_followup_tracks_the_fast_path_turn_in_the_baseline(monkeypatch):
+    """The request path skips the baseline for a pending crisis turn; the follow-up tracks it under the turn lock."""
+    from contextlib import asynccontextmanager
+    from types import SimpleNamespace
+    from app.services.analysis import sequential_processor, turn_followup
+    from app.services.crisis import analytics_collector
+    from app.tasks import crisis_followup
+
+    order = []
+
+    class Processor:
+        def __init__(self, db, llm_client):
+            pass
+
+        async def calculate_crisis_risk(self, message):
+            order.append("risk_profile")
+            return {"overall_risk": "CRISIS"}
+
+    class Collector:
+        def __init__(self, db, llm_client):
+            pass
+
+        async def collect_and_save_analytics(self, **kwargs):
+            return SimpleNamespace(id=1)
+
+        async def generate_and_save_report(self, **kwargs):
+            return SimpleNamespace(id=2)
+
+    async def track_baseline(db, llm_client, message, baseline_analysis=None, snapshot=None):
+        order.append(("baseline", message.message_text))
+
+    @asynccontextmanager
+    async def session(*args):
+        yield object()
+
+    @asynccontextmanager
+    async def student_turn(student_id):
+        order.append(("locked", student_id))
+        yield
+        order.append("unlocked")
+
+    monkeypatch.setattr(sequential_processor, "SequentialProcessor", Processor)
+    monkeypatch.setattr(analytics_collector, "CrisisAnalyticsCollector", Collector)
+    monkeypatch.setattr(turn_followup, "track_baseline", track_baseline)
+    monkeypatch.setattr(crisis_followup, "AsyncSessionLocal", session)
+    monkeypatch.setattr(crisis_followup, "unit_of_work", session)
+    monkeypatch.setattr(crisis_followup, "student_turn", student_turn)
+    monkeypatch.setattr(crisis_followup, "SessionLocal", lambda: SimpleNamespace(close=lambda: None))
+    monkeypatch.setattr(crisis_followup, "get_llm_client", lambda: None)
+
+    message = Message(student_id="s1", message_text="I want to end it", timestamp=datetime.utcnow())
+    await crisis_followup.run_crisis_followup(alert_id=None, message=message)
+
+    assert order == ["risk_profile", ("locked", "s1"), ("baseline", "I want to end it"), "unlocked"]
+
+
+@pytest.mark.asyncio
+async def test_incomplete_safety_screen_is_never_triaged_as_benign(monkeypatch):
+    """A screen cut short by its budget gets the LLM analysis even when the classifier says benign."""
+    from types import SimpleNamespace
+    from app.core.config import settings
+    from app.services.analysis.sequential_processor import SequentialProcessor
+    from app.services.analysis.triage import MessageTriage
+
+    monkeypatch.setattr(settings, "structured_analysis_enabled", True)
+    calls = []
+
+    async def analyze(message_text, context):
+        calls.append("llm")
+        return None
+
+    async def emoji(student_id, message_text, context, snapshot=None):
+        return {}
+
+    async def concerns(message, context, emoji_analysis):
+        return []
+
+    async def calculate_risk(student_id, message_text, context, concern_indicators, snapshot=None):
+        return {"overall_risk": "LOW"}
+
+    processor = SequentialProcessor.__new__(SequentialProcessor)
+    processor.triage = MessageTriage(SimpleNamespace(version="t", benign_probability=lambda text: 0.999),
+                                     mode="enforce", threshold=0.98)
+    processor.structured_analysis = SimpleNamespace(analyze=analyze)
+    processor.emoji_analyzer = SimpleNamespace(analyze=emoji)
+    processor._extract_concern_indicators = concerns
+    processor.risk_calculator = SimpleNamespace(calculate_risk=calculate_risk)
+
+    message = Message(student_id="s1", message_text="long journal entry", timestamp=datetime.utcnow())
+    complete = await processor._checkpoint_4_deep_analysis(message, {"safety_flags": [], "screen_complete": True})
+    incomplete = await processor._checkpoint_4_deep_analysis(message, {"safety_flags": [], "screen_complete": False})
+
+    assert complete["result"]["triage"]["skipped"]
+    assert not incomplete["result"]["triage"]["skipped"]
+    assert calls == ["llm"]
@@ -0,0 +1,84 @@
+"""Tests for single-flight coalescing of identical LLM prompts."""
+import asyncio
+import pytest
+from app.core.llm_client import SingleFlight
+
+
+class SlowCall:
+    """Counts upstream calls and blocks until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return f"answer {self.calls}"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream_call():
+    flights = SingleFlight()
+    call = SlowCall()
+
+    callers = [asyncio.create_task(flights.do("key", call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(*callers) == ["answer 1"] * 5
+    assert call.calls == 1
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_one_caller_cancelling_does_not_cancel_the_others():
+    flights = SingleFlight()
+    call = SlowCall()
+
+    first = asyncio.create_task(flights.do("key", call))
+    second = asyncio.create_task(flights.do("key", call))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    call.release.set()
+    assert await second == "answer 1"
+    assert not call.cancelled
+
+
+@pytest.mark.asyncio
+async def test_upstream_call_is_cancelled_when_every_caller_leaves():
+    flights = SingleFlight()
+    call = SlowCall()
+
+    caller = asyncio.create_task(flights.do("key", call))
+    await asyncio.sleep(0)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    await asyncio.sleep(0)
+
+    assert call.cancelled
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ConnectionError("model down")
+
+    results = await asyncio.gather(flights.do("key", failing), flights.do("key", failing),
+                                   return_exceptions=True)
+
+    assert all(isinstance(r, ConnectionError) for r in results)
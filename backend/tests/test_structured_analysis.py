@@ -0,0 +1,49 @@
+"""Tests for the consolidated structured analysis engine."""
+import json
+import pytest
+from app.services.analysis.structured_analysis import StructuredAnalysisEngine
+
+
+VALID_DOCUMENT = {
+    "emoji": {"genuine_distress": False, "confidence": 0.8, "reasoning": "joke",
+              "emoji_function": "humor", "emoji_context": {"emojis_found": ["😂"]}},
+    "concern_indicators": {"language_shift_detected": False, "hopelessness_themes": True,
+                           "engagement_drop": False, "sudden_mood_change": False, "reasoning": ""},
+    "suicidal_ideation": {"present": False, "is_literal": False, "confidence": 0.1, "reasoning": ""},
+    "depression_indicators": {"severity_estimate": "MEDIUM", "confidence": 0.6,
+                              "indicators": ["low_energy"], "reasoning": ""},
+    "overall_context": {"tone": "tired", "escalation": False, "concern_level": "MEDIUM"},
+    "sentiment": {"sentiment": "negative", "sentiment_score": -0.4, "contains_humor": True}
+}
+
+
+class FakeLLM:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+    
+    async def generate(self, prompt, max_tokens=500, system_message=None, call_site=None):
+        self.calls += 1
+        return self.response
+
+
+@pytest.mark.asyncio
+async def test_single_call_fans_out_sections():
+    llm = FakeLLM("```json\n" + json.dumps(VALID_DOCUMENT) + "\n```")
+    engine = StructuredAnalysisEngine(llm)
+    
+    structured = await engine.analyze("so tired lol 😂", {})
+    
+    assert llm.calls == 1
+    assert engine.emoji_section(structured)["emoji_function"] == "humor"
+    assert engine.concern_section(structured)["hopelessness_themes"] is True
+    assert engine.contextual_risk_section(structured)["depression_indicators"]["severity_estimate"] == "MEDIUM"
+    assert engine.sentiment_section(structured)["contains_humor"] is True
+
+
+@pytest.mark.asyncio
+async def test_invalid_document_returns_none():
+    document = dict(VALID_DOCUMENT, suicidal_ideation={"present": "maybe", "confidence": 3})
+    engine = StructuredAnalysisEngine(FakeLLM(json.dumps(document)))
+    
+    assert await engine.analyze("hello", {}) is None
@@ -0,0 +1,78 @@
+"""Tests for per-student turn serialization."""
+import asyncio
+import pytest
+from app.core.student_locks import StudentBusyError, StudentLocks
+
+
+@pytest.mark.asyncio
+async def test_same_student_runs_in_arrival_order_without_lost_updates():
+    locks = StudentLocks(max_pending=32)
+    baseline = {"emoji_count": []}
+    order = []
+
+    async def turn(n):
+        async with locks.hold("s1"):
+            order.append(n)
+            # Read-modify-write across an await, as the pipeline does
+            counts = list(baseline["emoji_count"])
+            await asyncio.sleep(0.001)
+            baseline["emoji_count"] = counts + [n]
+
+    await asyncio.gather(*(turn(n) for n in range(20)))
+
+    assert order == list(range(20))
+    assert baseline["emoji_count"] == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_different_students_run_in_parallel():
+    locks = StudentLocks()
+    inside = set()
+    overlapped = asyncio.Event()
+
+    async def turn(student_id):
+        async with locks.hold(student_id):
+            inside.add(student_id)
+            if len(inside) == 2:
+                overlapped.set()
+            await asyncio.wait_for(overlapped.wait(), timeout=1)
+
+    await asyncio.gather(turn("s1"), turn("s2"))
+
+
+@pytest.mark.asyncio
+async def test_idle_students_are_evicted():
+    locks = StudentLocks()
+    for student_id in ("s1", "s2", "s3"):
+        async with locks.hold(student_id):
+            assert locks.active() == 1
+    assert locks.active() == 0
+
+    with pytest.raises(RuntimeError):
+        async with locks.hold("s1"):
+            raise RuntimeError("turn failed")
+    assert locks.active() == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_turns_beyond_max_pending():
+    locks = StudentLocks(max_pending=2)
+    release = asyncio.Event()
+
+    async def turn():
+        async with locks.hold("s1"):
+            await release.wait()
+
+    tasks = [asyncio.create_task(turn()) for _ in range(3)]  # one running, two waiting
+    await asyncio.sleep(0)
+    with pytest.raises(StudentBusyError):
+        async with locks.hold("s1"):
+            pass
+
+    # Other students are unaffected
+    async with locks.hold("s2"):
+        pass
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert locks.active() == 0
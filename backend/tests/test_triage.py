@@ -0,0 +1,99 @@
+"""Tests for the triage classifier that skips LLM analysis for benign messages."""
+from types import SimpleNamespace
+import pytest
+from app.schemas.analysis import StructuredAnalysis
+from app.services.analysis.triage import (
+    MessageTriage, TriageClassifier, benign_analysis, evaluate, label_analysis
+)
+
+
+def _row(concern_indicators=(), safety_flags=(), overall_risk="LOW", risk_profile_id=1, deep=None):
+    deep = deep if deep is not None else {
+        "concern_indicators": list(concern_indicators),
+        "risk_profile": {"overall_risk": overall_risk, "risk_profile_id": risk_profile_id}
+    }
+    return SimpleNamespace(
+        message_text="hi",
+        safety_flags=list(safety_flags),
+        concern_indicators=list(concern_indicators),
+        emoji_analysis={},
+        checkpoint_results=[
+            {"checkpoint_name": "DEEP_ANALYSIS", "result": deep},
+            {"checkpoint_name": "RESPONSE_GATING", "result": {"gating_decision": overall_risk}}
+        ]
+    )
+
+
+class FixedClassifier:
+    version = "test"
+
+    def __init__(self, probability):
+        self.probability = probability
+
+    def benign_probability(self, message_text):
+        return self.probability
+
+
+def test_labels_come_from_the_pipeline_verdict():
+    assert label_analysis(_row(), {}) == 1
+    assert label_analysis(_row(concern_indicators=["hopelessness_themes"]), {}) == 0
+    assert label_analysis(_row(safety_flags=["self_harm"]), {}) == 0
+    assert label_analysis(_row(overall_risk="MEDIUM"), {}) == 0
+
+
+def test_counselor_feedback_overrides_the_pipeline_label():
+    assert label_analysis(_row(overall_risk="HIGH", risk_profile_id=7), {7: "None"}) == 1
+    assert label_analysis(_row(risk_profile_id=7), {7: "Moderate"}) == 0
+
+
+def test_failed_or_triaged_analyses_are_not_labelled():
+    assert label_analysis(_row(deep={"error": "timeout"}), {}) is None
+    assert label_analysis(_row(deep={"triage": {"skipped": True}}), {}) is None
+
+
+def test_evaluate_reports_missed_concerning_messages():
+    report = evaluate([0.99, 0.99, 0.6, 0.2], [1, 0, 1, 0], [0.5, 0.95])
+
+    assert report[0]["skip_rate"] == 0.75
+    assert report[0]["missed"] == 1
+    assert report[1]["skip_rate"] == 0.5
+    assert report[1]["concerning_recall"] == 0.5
+
+
+def test_enforce_mode_skips_only_confident_unflagged_messages():
+    triage = MessageTriage(FixedClassifier(0.99), mode="enforce", threshold=0.98)
+
+    assert triage.assess("thanks!", [])["skipped"]
+    assert not triage.assess("thanks!", ["self_harm"])["skipped"]
+    assert not triage.assess("thanks!", [], screen_complete=False)["skipped"]
+    assert not MessageTriage(FixedClassifier(0.9), mode="enforce", threshold=0.98).assess("ok", [])["skipped"]
+
+
+def test_shadow_mode_records_without_skipping():
+    result = MessageTriage(FixedClassifier(0.99), mode="shadow", threshold=0.98).assess("hi", [])
+
+    assert result["confident_benign"]
+    assert not result["skipped"]
+    assert MessageTriage(FixedClassifier(0.99), mode="off").assess("hi", []) is None
+
+
+def test_benign_analysis_is_a_valid_structured_analysis():
+    document = benign_analysis(0.99)
+
+    StructuredAnalysis(**document)
+    assert document["overall_context"]["concern_level"] == "LOW"
+    assert not document["suicidal_ideation"]["present"]
+
+
+def test_train_save_and_load_round_trip(tmp_path):
+    pytest.importorskip("sklearn")
+    benign = ["hi", "thanks!", "good morning", "ok cool", "see you later", "lol nice"] * 5
+    concerning = ["i feel hopeless", "nothing matters anymore", "i can't go on",
+                  "i want to disappear", "everything is pointless", "no reason to keep going"] * 5
+
+    classifier = TriageClassifier.train(benign + concerning, [1] * len(benign) + [0] * len(concerning))
+    classifier.save(str(tmp_path))
+    loaded = TriageClassifier.load(str(tmp_path))
+
+    assert loaded.version == classifier.version
+    assert loaded.benign_probability("thanks!") > loaded.benign_probability("i feel hopeless")
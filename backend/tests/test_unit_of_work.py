@@ -0,0 +1,85 @@
+"""Tests for unit-of-work commit batching."""
+import pytest
+from sqlalchemy import select
+from app.db import unit_of_work
+from app.models.student import Student
+from app.schemas.message import Message
+from app.services.analysis.sequential_processor import SequentialProcessor
+from tests.test_context_snapshot import FakeLLM, _seed_student
+
+
+async def _process(db):
+    processor = SequentialProcessor(db, FakeLLM())
+    return await processor.process_message(Message(student_id="s1", message_text="rough week honestly"))
+
+
+@pytest.mark.asyncio
+async def test_turn_commits_once_inside_unit_of_work(async_db, statement_counter):
+    await _seed_student(async_db)
+    statement_counter.reset()
+    
+    async with unit_of_work.unit_of_work(async_db, enabled=True):
+        analysis = await _process(async_db)
+    
+    assert analysis.analysis_id is not None
+    assert statement_counter.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_turn_commits_per_write_without_unit_of_work(async_db, statement_counter):
+    await _seed_student(async_db)
+    statement_counter.reset()
+    
+    async with unit_of_work.unit_of_work(async_db, enabled=False):
+        await _process(async_db)
+    
+    # risk profile (+ emoji baseline), session, chat messages, analysis log
+    assert statement_counter.commits == 4
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_rolls_back_on_error(async_db):
+    with pytest.raises(RuntimeError):
+        async with unit_of_work.unit_of_work(async_db, enabled=True):
+            async_db.add(Student(student_id="s2", email="s2@example.edu", password_hash="x"))
+            await unit_of_work.commit(async_db)
+            raise RuntimeError("turn failed")
+    
+    assert await async_db.get(Student, 1) is None
+    assert not unit_of_work.in_unit_of_work(async_db)
+
+
+@pytest.mark.asyncio
+async def test_after_commit_callbacks_run_once_the_turn_is_committed(async_db):
+    seen = []
+    
+    async with unit_of_work.unit_of_work(async_db, enabled=True):
+        async_db.add(Student(student_id="s2", email="s2@example.edu", password_hash="x"))
+        await unit_of_work.commit(async_db)
+        unit_of_work.after_commit(async_db, lambda: seen.append(unit_of_work.in_unit_of_work(async_db)))
+        assert seen == []
+    
+    assert seen == [False]
+    
+    with pytest.raises(RuntimeError):
+        async with unit_of_work.unit_of_work(async_db, enabled=True):
+            unit_of_work.after_commit(async_db, lambda: seen.append("rolled back"))
+            raise RuntimeError("turn failed")
+    
+    assert seen == [False]
+
+
+@pytest.mark.asyncio
+async def test_failed_savepoint_keeps_the_turns_other_writes(async_db):
+    from sqlalchemy.exc import IntegrityError
+    
+    async with unit_of_work.unit_of_work(async_db, enabled=True):
+        async_db.add(Student(student_id="s2", email="s2@example.edu", password_hash="x"))
+        await unit_of_work.commit(async_db)
+        
+        with pytest.raises(IntegrityError):
+            async with unit_of_work.savepoint(async_db):
+                async_db.add(Student(student_id="s2", email="dup@example.edu", password_hash="x"))
+                await unit_of_work.commit(async_db)
+    
+    assert (await async_db.scalars(select(Student.email))).all() == ["s2@example.edu"]